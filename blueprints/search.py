@@ -1,6 +1,6 @@
 from flask import Blueprint, render_template, session, redirect, url_for, request, flash, jsonify
-from database.symbol import enhanced_search_symbols
 from database.token_db_enhanced import (
+    enhanced_search_symbols_cached as enhanced_search_symbols,
     fno_search_symbols,
     get_distinct_expiries_cached as get_distinct_expiries,
     get_distinct_underlyings_cached as get_distinct_underlyings
@@ -69,7 +69,7 @@ def search():
         results = enhanced_search_symbols(query, exchange)
         # Import freeze qty function for non-FNO exchanges
         from database.qty_freeze_db import get_freeze_qty_for_option
-        # Convert SymToken objects to dicts
+        # Convert SymbolData (or SymToken) objects to dicts
         results_dicts = [{
             'symbol': result.symbol,
             'brsymbol': result.brsymbol,
@@ -149,7 +149,7 @@ def api_search():
         results = enhanced_search_symbols(query, exchange)
         # Import freeze qty function for non-FNO exchanges
         from database.qty_freeze_db import get_freeze_qty_for_option
-        # Convert SymToken objects to dicts
+        # Convert SymbolData (or SymToken) objects to dicts
         results_dicts = [{
             'symbol': result.symbol,
             'brsymbol': result.brsymbol,
@@ -1,65 +1,34 @@
 #database/master_contract_db.py
 
 import os
+import sys
+import time
+import subprocess
 import pandas as pd
-import numpy as np
 import httpx
-from typing import List, Tuple, Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Tuple, Optional
 from utils.httpx_client import get_httpx_client
-import requests
-import gzip
-import shutil
-import http.client
-import json
-import pandas as pd
-import gzip
-import io
 
 
 from sqlalchemy import create_engine, Column, Integer, String, Float , Sequence, Index
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from database.auth_db import get_auth_token
+from database.master_contract_status_db import set_stage_timings
+from database.symtoken_staging import load_and_swap
+from broker.fyers.database.master_contract_transform import SEGMENTS
 from extensions import socketio  # Import SocketIO
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
+TRANSFORM_MODULE = 'broker.fyers.database.master_contract_transform'
 
-# Define the headers as provided
-headers = [
-    "Fytoken", "Symbol Details", "Exchange Instrument type", "Minimum lot size",
-    "Tick size", "ISIN", "Trading Session", "Last update date", "Expiry date",
-    "Symbol ticker", "Exchange", "Segment", "Scrip code", "Underlying symbol",
-    "Underlying scrip code", "Strike price", "Option type", "Underlying FyToken",
-    "Reserved column1", "Reserved column2", "Reserved column3"
-]
-
-# Data types for each header
-data_types = {
-    "Fytoken": str,
-    "Symbol Details": str,
-    "Exchange Instrument type": int,
-    "Minimum lot size": int,
-    "Tick size": float,
-    "ISIN": str,
-    "Trading Session": str,
-    "Last update date": str,
-    "Expiry date": str,
-    "Symbol ticker": str,
-    "Exchange": int,
-    "Segment": int,
-    "Scrip code": int,
-    "Underlying symbol": str,
-    "Underlying scrip code": pd.Int64Dtype(),
-    "Strike price": float,
-    "Option type": str,
-    "Underlying FyToken": str,
-    "Reserved column1": str,  
-    "Reserved column2": str, 
-    "Reserved column3": str, 
-}
+# URLs of the CSV files to be downloaded
+CSV_URLS = {key: f"https://public.fyers.in/sym_details/{key}.csv" for key in SEGMENTS}
 
 DATABASE_URL = os.getenv('DATABASE_URL')  # Replace with your database path
 
@@ -95,38 +64,27 @@ def delete_symtoken_table():
     SymToken.query.delete()
     db_session.commit()
 
-def copy_from_dataframe(df):
-    logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
-    try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            db_session.bulk_insert_mappings(SymToken, filtered_data_dict)
-            db_session.commit()
-            logger.info(f"Bulk insert completed successfully with {len(filtered_data_dict)} new records.")
-        else:
-            logger.info("No new records to insert.")
-    except Exception as e:
-        logger.exception(f"Error during bulk insert: {e}")
-        db_session.rollback()
 
+def download_segment(client, key: str, url: str, output_path: str) -> str:
+    """Stream one segment CSV to output_path/<key>.csv and return its path"""
+    file_path = os.path.join(output_path, f"{key}.csv")
+    with client.stream('GET', url, timeout=30.0) as response:
+        response.raise_for_status()  # Raises an exception for 4XX/5XX responses
+        with open(file_path, 'wb') as file:
+            for chunk in response.iter_bytes():
+                file.write(chunk)
+    logger.info(f"Successfully downloaded {key} to {file_path}")
+    return file_path
 
 
-
-def download_csv_fyers_data(output_path: str) -> Tuple[bool, List[str], Optional[str]]:
+def download_csv_fyers_data(output_path: str,
+                            on_downloaded: Optional[Callable[[str], None]] = None) -> Tuple[bool, List[str], Optional[str]]:
     """
-    Download Fyers master contract CSV files using a shared HTTPX client with connection pooling.
+    Download Fyers master contract CSV files concurrently using a shared HTTPX client with connection pooling.
     
     Args:
         output_path (str): Directory path where the CSV files will be saved
+        on_downloaded: Called with the segment key as each file completes
         
     Returns:
         Tuple[bool, List[str], Optional[str]]: 
@@ -134,37 +92,25 @@ def download_csv_fyers_data(output_path: str) -> Tuple[bool, List[str], Optional
             - List[str]: List of paths to downloaded files
             - Optional[str]: Error message if any error occurred, None otherwise
     """
-    from utils.httpx_client import get_httpx_client
     logger.info("Downloading Master Contract CSV Files")
     
-    # URLs of the CSV files to be downloaded
-    csv_urls = {
-        "NSE_CD": "https://public.fyers.in/sym_details/NSE_CD.csv",
-        "NSE_FO": "https://public.fyers.in/sym_details/NSE_FO.csv",
-        "NSE_CM": "https://public.fyers.in/sym_details/NSE_CM.csv",
-        "BSE_CM": "https://public.fyers.in/sym_details/BSE_CM.csv",
-        "BSE_FO": "https://public.fyers.in/sym_details/BSE_FO.csv",
-        "MCX_COM": "https://public.fyers.in/sym_details/MCX_COM.csv"
-    }
-    
     downloaded_files = []
     errors = []
     
-    # Get the shared HTTPX client with connection pooling
+    # Get the shared HTTPX client with connection pooling (not closed, it's shared)
     client = get_httpx_client()
     
-    try:
-        for key, url in csv_urls.items():
+    with ThreadPoolExecutor(max_workers=len(CSV_URLS), thread_name_prefix='fyers-download') as executor:
+        futures = {
+            executor.submit(download_segment, client, key, url, output_path): (key, url)
+            for key, url in CSV_URLS.items()
+        }
+        for future in as_completed(futures):
+            key, url = futures[future]
             try:
-                response = client.get(url, timeout=30.0)
-                response.raise_for_status()  # Raises an exception for 4XX/5XX responses
-                
-                file_path = os.path.join(output_path, f"{key}.csv")
-                with open(file_path, 'wb') as file:
-                    file.write(response.content)
-                downloaded_files.append(file_path)
-                logger.info(f"Successfully downloaded {key} to {file_path}")
-                
+                downloaded_files.append(future.result())
+                if on_downloaded:
+                    on_downloaded(key)
             except httpx.HTTPStatusError as e:
                 error_msg = f"HTTP error occurred while downloading {key} from {url}: {e.response.status_code} {e.response.reason_phrase}"
                 logger.error(error_msg)
@@ -177,320 +123,57 @@ def download_csv_fyers_data(output_path: str) -> Tuple[bool, List[str], Optional
                 error_msg = f"Unexpected error downloading {key}: {e}"
                 logger.error(error_msg)
                 errors.append(error_msg)
-    finally:
-        # Don't close the client as it's shared
-        pass
     
     # Determine success/failure based on whether we got all files
-    success = len(downloaded_files) == len(csv_urls)
+    success = len(downloaded_files) == len(CSV_URLS)
     error_msg = "; ".join(errors) if errors else None
     
     return success, downloaded_files, error_msg
-    
-def reformat_symbol_detail(s):
-    parts = s.split()  # Split the string into parts
-    # Reorder and format the parts to match the desired output
-    # Assuming the format is consistent and always "Name DD Mon YY FUT"
-    return f"{parts[0]}{parts[3]}{parts[2].upper()}{parts[1]}{parts[4]}"
 
-def process_fyers_nse_csv(path):
-    """
-    Processes the Fyers CSV file to fit the existing database schema and performs exchange name mapping.
-    """
-    logger.info("Processing Fyers NSE CSV Data")
-    file_path = f'{path}/NSE_CM.csv'
-
-    df = pd.read_csv(file_path, names=headers, dtype=data_types)
-
-
-    # Assigning headers to the DataFrame
-    df.columns = headers
-
-    df['token'] = df['Fytoken']
-    df['name'] = df['Symbol Details']
-    df['expiry'] = df['Expiry date']
-    df['strike'] = df['Strike price']
-    df['lotsize'] = df['Minimum lot size']
-    df['tick_size'] = df['Tick size']
-    df['brsymbol'] = df['Symbol ticker']
-
-
-    # Filtering the DataFrame based on 'Exchange Instrument type' and assigning values to 'exchange'
-    df.loc[df['Exchange Instrument type'].isin([0, 9]), 'exchange'] = 'NSE'
-    df.loc[df['Exchange Instrument type'].isin([0, 9]), 'instrumenttype'] = 'EQ'
-    df.loc[(df['Exchange Instrument type'] == 2) & (df['Symbol ticker'].str.endswith('-GB')), 'exchange'] = 'NSE'
-    df.loc[(df['Exchange Instrument type'] == 2) & (df['Symbol ticker'].str.endswith('-GB')), 'instrumenttype'] = 'GB'
-    df.loc[df['Exchange Instrument type'] == 10, 'exchange'] = 'NSE_INDEX'
-    df.loc[df['Exchange Instrument type'] == 10, 'instrumenttype'] = 'INDEX'
-
-    # Keeping only rows where 'exchange' column has been filled ('NSE' or 'NSE_INDEX')
-    df_filtered = df[df['exchange'].isin(['NSE', 'NSE_INDEX'])].copy()
-
-    df_filtered.loc[:, 'symbol'] = df_filtered['Underlying symbol']
-    df_filtered['brexchange'] = 'NSE'
-    
-    # List of columns to remove
-    columns_to_remove = [
-        "Fytoken", "Symbol Details", "Exchange Instrument type", "Minimum lot size",
-        "Tick size", "ISIN", "Trading Session", "Last update date", "Expiry date",
-        "Symbol ticker", "Exchange", "Segment", "Scrip code", "Underlying symbol",
-        "Underlying scrip code", "Strike price", "Option type", "Underlying FyToken",
-        "Reserved column1", "Reserved column2", "Reserved column3"
-    ]
 
-    # Removing the specified columns
-    token_df = df_filtered.drop(columns=columns_to_remove)
-
-
-    
-    return token_df
-
-
-def process_fyers_bse_csv(path):
-    """
-    Processes the Fyers CSV file to fit the existing database schema and performs exchange name mapping.
-    """
-    logger.info("Processing Fyers BSE CSV Data")
-    file_path = f'{path}/BSE_CM.csv'
-
-    df = pd.read_csv(file_path, names=headers, dtype=data_types)
-
-    # Assigning headers to the DataFrame
-    df.columns = headers
-
-    df['token'] = df['Fytoken']
-    df['name'] = df['Symbol Details']
-    df['expiry'] = df['Expiry date']
-    df['strike'] = df['Strike price']
-    df['lotsize'] = df['Minimum lot size']
-    df['tick_size'] = df['Tick size']
-    df['brsymbol'] = df['Symbol ticker']
-
-
-    # Filtering the DataFrame based on 'Exchange Instrument type' and assigning values to 'exchange'
-    df.loc[df['Exchange Instrument type'].isin([0, 4,50]), 'exchange'] = 'BSE'
-    df.loc[df['Exchange Instrument type'].isin([0, 4,50]), 'instrumenttype'] = 'EQ'
-    df.loc[df['Exchange Instrument type'] == 10, 'exchange'] = 'BSE_INDEX'
-    df.loc[df['Exchange Instrument type'] == 10, 'instrumenttype'] = 'INDEX'
-
-    # Keeping only rows where 'exchange' column has been filled ('BSE' or 'BSE_INDEX')
-    df_filtered = df[df['Exchange Instrument type'].isin([0, 4, 10, 50])].copy()
-
-    df_filtered.loc[:, 'symbol'] = df_filtered['Underlying symbol']
-
-    df_filtered['brexchange'] = 'BSE'
-
-    # List of columns to remove
-    columns_to_remove = [
-        "Fytoken", "Symbol Details", "Exchange Instrument type", "Minimum lot size",
-        "Tick size", "ISIN", "Trading Session", "Last update date", "Expiry date",
-        "Symbol ticker", "Exchange", "Segment", "Scrip code", "Underlying symbol",
-        "Underlying scrip code", "Strike price", "Option type", "Underlying FyToken",
-        "Reserved column1", "Reserved column2", "Reserved column3"
-    ]
-
-    # Removing the specified columns
-    token_df = df_filtered.drop(columns=columns_to_remove)
-    
-    return token_df
-
-def process_fyers_nfo_csv(path):
-    """
-    Processes the Fyers CSV file to fit the existing database schema and performs exchange name mapping.
-    """
-    logger.info("Processing Fyers NFO CSV Data")
-    file_path = f'{path}/NSE_FO.csv'
-
-    df = pd.read_csv(file_path, names=headers, dtype=data_types)
-
-    df['token'] = df['Fytoken']
-    df['name'] = df['Symbol Details']
-
-    # Convert 'Expiry date' from Unix timestamp to datetime
-    # First convert string to numeric to avoid FutureWarning
-    df['expiry'] = pd.to_datetime(pd.to_numeric(df['Expiry date'], errors='coerce'), unit='s')
-
-    # Format the datetime object to the desired format '15-APR-24'
-    df['expiry'] = df['expiry'].dt.strftime('%d-%b-%y').str.upper()
-
-    df['strike'] = df['Strike price']
-    df['lotsize'] = df['Minimum lot size']
-    df['tick_size'] = df['Tick size']
-    df['brsymbol'] = df['Symbol ticker']
-    df['brexchange'] = 'NFO'
-    df['exchange'] = 'NFO'
-    df['instrumenttype'] = df['Option type'].str.replace('XX','FUT')
-
-
-    # Apply the function to rows where 'Option type' is 'XX'
-    df.loc[df['Option type'] == 'XX', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)
-    df.loc[df['Option type'] == 'CE', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)+'CE'
-    df.loc[df['Option type'] == 'PE', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)+'PE'
-
-    # List of columns to remove
-    columns_to_remove = [
-        "Fytoken", "Symbol Details", "Exchange Instrument type", "Minimum lot size",
-        "Tick size", "ISIN", "Trading Session", "Last update date", "Expiry date",
-        "Symbol ticker", "Exchange", "Segment", "Scrip code", "Underlying symbol",
-        "Underlying scrip code", "Strike price", "Option type", "Underlying FyToken",
-        "Reserved column1", "Reserved column2", "Reserved column3"
-    ]
-
-    # Removing the specified columns
-    token_df = df.drop(columns=columns_to_remove)
-    
-    return token_df
+def transform_workers() -> int:
+    """Segments transformed at once: one per CPU, inline on a single CPU"""
+    return min(len(SEGMENTS), os.cpu_count() or 1)
 
 
-def process_fyers_cds_csv(path):
-    """
-    Processes the Fyers CSV file to fit the existing database schema and performs exchange name mapping.
+def transform_segment(key: str, output_path: str, in_process: bool = False) -> pd.DataFrame:
     """
-    logger.info("Processing Fyers CDS CSV Data")
-    file_path = f'{path}/NSE_CD.csv'
-
-    df = pd.read_csv(file_path, names=headers, dtype=data_types)
-
-    df['token'] = df['Fytoken']
-    df['name'] = df['Symbol Details']
-
-    # Convert 'Expiry date' from Unix timestamp to datetime
-    # First convert string to numeric to avoid FutureWarning
-    df['expiry'] = pd.to_datetime(pd.to_numeric(df['Expiry date'], errors='coerce'), unit='s')
-
-    # Format the datetime object to the desired format '15-APR-24'
-    df['expiry'] = df['expiry'].dt.strftime('%d-%b-%y').str.upper()
-
-    df['strike'] = df['Strike price']
-    df['lotsize'] = df['Minimum lot size']
-    df['tick_size'] = df['Tick size']
-    df['brsymbol'] = df['Symbol ticker']
-    df['brexchange'] = 'CDS'
-    df['exchange'] = 'CDS'
-    df['instrumenttype'] = df['Option type'].str.replace('XX','FUT')
-
-
-    # Apply the function to rows where 'Option type' is 'XX'
-    df.loc[df['Option type'] == 'XX', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)
-    df.loc[df['Option type'] == 'CE', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)+'CE'
-    df.loc[df['Option type'] == 'PE', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)+'PE'
-
-    # List of columns to remove
-    columns_to_remove = [
-        "Fytoken", "Symbol Details", "Exchange Instrument type", "Minimum lot size",
-        "Tick size", "ISIN", "Trading Session", "Last update date", "Expiry date",
-        "Symbol ticker", "Exchange", "Segment", "Scrip code", "Underlying symbol",
-        "Underlying scrip code", "Strike price", "Option type", "Underlying FyToken",
-        "Reserved column1", "Reserved column2", "Reserved column3"
-    ]
-
-    # Removing the specified columns
-    token_df = df.drop(columns=columns_to_remove)
-    
-    return token_df
-
+    symtoken rows of one downloaded segment CSV
 
-def process_fyers_bfo_csv(path):
-    """
-    Processes the Fyers CSV file to fit the existing database schema and performs exchange name mapping.
+    Runs the transform in a separate interpreter (see master_contract_transform)
+    so segments are transformed in parallel, or in this process when
+    in_process is set or the interpreter fails.
     """
-    logger.info("Processing Fyers BFO CSV Data")
-    file_path = f'{path}/BSE_FO.csv'
-
-    df = pd.read_csv(file_path, names=headers, dtype=data_types)
-
-    df['token'] = df['Fytoken']
-    df['name'] = df['Symbol Details']
-
-    # Convert 'Expiry date' from Unix timestamp to datetime
-    # First convert string to numeric to avoid FutureWarning
-    df['expiry'] = pd.to_datetime(pd.to_numeric(df['Expiry date'], errors='coerce'), unit='s')
-
-    # Format the datetime object to the desired format '15-APR-24'
-    df['expiry'] = df['expiry'].dt.strftime('%d-%b-%y').str.upper()
-
-    df['strike'] = df['Strike price']
-    df['lotsize'] = df['Minimum lot size']
-    df['tick_size'] = df['Tick size']
-    df['brsymbol'] = df['Symbol ticker']
-    df['brexchange'] = 'BFO'
-    df['exchange'] = 'BFO'
-    df['instrumenttype'] = df['Option type'].fillna('FUT').str.replace('XX', 'FUT')
-
-
-    # Apply the function to rows where 'Option type' is 'XX'
-    df.loc[(df['Option type'] == 'XX') | df['Option type'].isna(), 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)
-    df.loc[df['Option type'] == 'CE', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)+'CE'
-    df.loc[df['Option type'] == 'PE', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)+'PE'
-
-    # List of columns to remove
-    columns_to_remove = [
-        "Fytoken", "Symbol Details", "Exchange Instrument type", "Minimum lot size",
-        "Tick size", "ISIN", "Trading Session", "Last update date", "Expiry date",
-        "Symbol ticker", "Exchange", "Segment", "Scrip code", "Underlying symbol",
-        "Underlying scrip code", "Strike price", "Option type", "Underlying FyToken",
-        "Reserved column1", "Reserved column2", "Reserved column3"
-    ]
-
-    # Removing the specified columns
-    token_df = df.drop(columns=columns_to_remove)
+    if not in_process:
+        pickle_path = os.path.join(os.path.abspath(output_path), f"{key}.pkl")
+        result = subprocess.run(
+            [sys.executable, '-m', TRANSFORM_MODULE, key, os.path.abspath(output_path), pickle_path],
+            cwd=PROJECT_ROOT, capture_output=True, text=True,
+        )
+        if result.returncode == 0:
+            try:
+                return pd.read_pickle(pickle_path)
+            finally:
+                os.remove(pickle_path)
+        logger.warning(f"Transform of {key} failed in a worker ({result.stderr.strip().splitlines()[-1:]}), "
+                       f"transforming in process")
+    logger.info(f"Processing Fyers {key} CSV Data")
+    return SEGMENTS[key](output_path)
 
-    return token_df
 
-def process_fyers_mcx_csv(path):
+def merge_segments(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
     """
-    Processes the Fyers CSV file to fit the existing database schema and performs exchange name mapping.
+    All segments' rows in SEGMENTS order, keeping a token only from the first
+    segment that has it (rows without a token are all kept)
     """
-    logger.info("Processing Fyers MCX CSV Data")
-    file_path = f'{path}/MCX_COM.csv'
-
-    df = pd.read_csv(file_path, names=headers, dtype=data_types)
-
-    df['token'] = df['Fytoken']
-    df['name'] = df['Symbol Details']
-
-    # Convert 'Expiry date' from Unix timestamp to datetime
-    # First convert string to numeric to avoid FutureWarning
-    df['expiry'] = pd.to_datetime(pd.to_numeric(df['Expiry date'], errors='coerce'), unit='s')
-
-    # Format the datetime object to the desired format '15-APR-24'
-    df['expiry'] = df['expiry'].dt.strftime('%d-%b-%y').str.upper()
-
-    df['strike'] = df['Strike price']
-    df['lotsize'] = df['Minimum lot size']
-    df['tick_size'] = df['Tick size']
-    df['brsymbol'] = df['Symbol ticker']
-    df['brexchange'] = 'MCX'
-    df['exchange'] = 'MCX'
-    df['instrumenttype'] = df['Option type'].str.replace('XX','FUT')
+    df = pd.concat(
+        [frames[key].assign(segment=position) for position, key in enumerate(SEGMENTS)],
+        ignore_index=True,
+    )
+    first_segment = df.groupby('token', sort=False)['segment'].transform('min')
+    return df[df['token'].isna() | (df['segment'] == first_segment)].drop(columns='segment')
 
 
-
-    # Apply the function to rows where 'Option type' is 'XX'
-    df.loc[df['Option type'] == 'XX', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)
-    df.loc[df['Option type'] == 'CE', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)+'CE'
-    df.loc[df['Option type'] == 'PE', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)+'PE'
-
-    # List of columns to remove
-    columns_to_remove = [
-        "Fytoken", "Symbol Details", "Exchange Instrument type", "Minimum lot size",
-        "Tick size", "ISIN", "Trading Session", "Last update date", "Expiry date",
-        "Symbol ticker", "Exchange", "Segment", "Scrip code", "Underlying symbol",
-        "Underlying scrip code", "Strike price", "Option type", "Underlying FyToken",
-        "Reserved column1", "Reserved column2", "Reserved column3"
-    ]
-
-    # Removing the specified columns
-    token_df = df.drop(columns=columns_to_remove)
-
-
-
-
-    
-    return token_df
-
-    
-
 def delete_fyers_temp_data(output_path):
     # Check each file in the directory
     for filename in os.listdir(output_path):
@@ -506,29 +189,56 @@ def delete_fyers_temp_data(output_path):
 
 
 def master_contract_download():
+    """
+    Download, transform and load the Fyers master contract
+
+    Segment CSVs download concurrently and each is transformed as soon as it
+    arrives, so the download and transform stages overlap. The merged
+    contract is bulk-loaded into a staging table and swapped in for symtoken
+    in one transaction; until then symtoken keeps the previous contract, and
+    it is left untouched if any stage fails. Stage timings are published to
+    the master contract status.
+    """
     logger.info(f"Downloading Master Contract")
     
 
     output_path = 'tmp'
     try:
-        download_csv_fyers_data(output_path)
-        delete_symtoken_table()
-        token_df = process_fyers_nse_csv(output_path)
-        copy_from_dataframe(token_df)
-        token_df = process_fyers_bse_csv(output_path)
-        copy_from_dataframe(token_df)
-        token_df = process_fyers_bfo_csv(output_path)
-        copy_from_dataframe(token_df)
-        token_df = process_fyers_nfo_csv(output_path)
-        copy_from_dataframe(token_df)
-        token_df = process_fyers_cds_csv(output_path)
-        copy_from_dataframe(token_df)
-        token_df = process_fyers_mcx_csv(output_path)
-        copy_from_dataframe(token_df)
+        start_time = time.perf_counter()
+        timings = {}
+        in_process = transform_workers() == 1
+        frames = {}
+
+        with ThreadPoolExecutor(max_workers=transform_workers(), thread_name_prefix='fyers-transform') as executor:
+            transforms = {}
+
+            def on_downloaded(key):
+                transforms[executor.submit(transform_segment, key, output_path, in_process)] = key
+
+            success, _, error_msg = download_csv_fyers_data(output_path, on_downloaded)
+            timings['download'] = time.perf_counter() - start_time
+            if not success:
+                raise RuntimeError(f"Master contract download failed: {error_msg}")
+
+            for future in as_completed(transforms):
+                frames[transforms[future]] = future.result()
+        timings['transform'] = time.perf_counter() - start_time - timings['download']
+
+        stage_start = time.perf_counter()
+        token_df = merge_segments(frames)
+        timings['merge'] = time.perf_counter() - stage_start
+
+        timings.update(load_and_swap(engine, SymToken.__table__, token_df))
+        timings['total'] = time.perf_counter() - start_time
         delete_fyers_temp_data(output_path)
-        #token_df['token'] = pd.to_numeric(token_df['token'], errors='coerce').fillna(-1).astype(int)
-        
-        #token_df = token_df.drop_duplicates(subset='symbol', keep='first')
+        logger.info("Fyers master contract pipeline: " + ", ".join(
+            f"{stage} {value:.2f}s" for stage, value in timings.items() if stage != 'rows'
+        ) + f", {timings['rows']} symbols")
+        set_stage_timings('fyers', timings)
+
+        # The streaming HSM token cache was built from the previous contract
+        from broker.fyers.streaming.fyers_token_cache import get_hsm_token_cache
+        get_hsm_token_cache().clear(remove_files=True)
         
         return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Successfully Downloaded'})
 
@@ -0,0 +1,208 @@
+"""
+Fyers Master Contract Segment Transforms
+
+Turns each Fyers symbol master CSV into a DataFrame of symtoken columns. The
+transforms only need pandas, so master_contract_db can run them in fresh
+interpreters, several segments at once:
+
+    python -m broker.fyers.database.master_contract_transform NSE_FO tmp tmp/NSE_FO.pkl
+
+reads tmp/NSE_FO.csv and writes the transformed DataFrame as a pickle.
+(Workers are separate interpreters rather than multiprocessing children
+because app.py does its whole Flask setup at import time and would be re-run
+by the spawn start method.)
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+# Define the headers as provided
+headers = [
+    "Fytoken", "Symbol Details", "Exchange Instrument type", "Minimum lot size",
+    "Tick size", "ISIN", "Trading Session", "Last update date", "Expiry date",
+    "Symbol ticker", "Exchange", "Segment", "Scrip code", "Underlying symbol",
+    "Underlying scrip code", "Strike price", "Option type", "Underlying FyToken",
+    "Reserved column1", "Reserved column2", "Reserved column3"
+]
+
+# Data types for each header
+data_types = {
+    "Fytoken": str,
+    "Symbol Details": str,
+    "Exchange Instrument type": int,
+    "Minimum lot size": int,
+    "Tick size": float,
+    "ISIN": str,
+    "Trading Session": str,
+    "Last update date": str,
+    "Expiry date": str,
+    "Symbol ticker": str,
+    "Exchange": int,
+    "Segment": int,
+    "Scrip code": int,
+    "Underlying symbol": str,
+    "Underlying scrip code": pd.Int64Dtype(),
+    "Strike price": float,
+    "Option type": str,
+    "Underlying FyToken": str,
+    "Reserved column1": str,
+    "Reserved column2": str,
+    "Reserved column3": str,
+}
+
+# Symbol suffix by option type ('XX' is a future)
+SYMBOL_SUFFIXES = {'XX': '', 'CE': 'CE', 'PE': 'PE'}
+
+
+def reformat_symbol_details(details: pd.Series) -> pd.Series:
+    """
+    Symbols from "Name DD Mon YY FUT"-style symbol details, reordered as
+    Name YY MON DD FUT (NaN where there are fewer than 5 parts)
+    """
+    parts = details.str.split(expand=True).reindex(columns=range(5))
+    return parts[0] + parts[3] + parts[2].str.upper() + parts[1] + parts[4]
+
+
+def read_segment_csv(path, segment):
+    """Raw Fyers CSV of one segment (e.g. 'NSE_FO') from the download directory"""
+    return pd.read_csv(os.path.join(path, f'{segment}.csv'), names=headers, dtype=data_types)
+
+
+def symtoken_columns(df):
+    """Columns every segment takes from the CSV as they are"""
+    return pd.DataFrame({
+        'token': df['Fytoken'],
+        'name': df['Symbol Details'],
+        'strike': df['Strike price'],
+        'lotsize': df['Minimum lot size'],
+        'tick_size': df['Tick size'],
+        'brsymbol': df['Symbol ticker'],
+    })
+
+
+def derivatives_frame(df, exchange, option_types):
+    """
+    symtoken rows of an F&O segment
+
+    Args:
+        df: Raw segment CSV
+        exchange: OpenAlgo (and broker) exchange of the segment
+        option_types: 'XX' (futures), 'CE' or 'PE' per row
+    """
+    token_df = symtoken_columns(df)
+
+    # Convert 'Expiry date' from Unix timestamp to the format '15-APR-24'
+    # First convert string to numeric to avoid FutureWarning
+    expiry = pd.to_datetime(pd.to_numeric(df['Expiry date'], errors='coerce'), unit='s')
+    token_df['expiry'] = expiry.dt.strftime('%d-%b-%y').str.upper()
+
+    token_df['brexchange'] = exchange
+    token_df['exchange'] = exchange
+    token_df['instrumenttype'] = option_types.str.replace('XX', 'FUT')
+
+    # Futures keep the reformatted symbol details, options add CE / PE; other
+    # option types have no symbol
+    token_df['symbol'] = reformat_symbol_details(df['Symbol Details']) + option_types.map(SYMBOL_SUFFIXES)
+    return token_df
+
+
+def process_fyers_nse_csv(path):
+    """
+    Processes the Fyers CSV file to fit the existing database schema and performs exchange name mapping.
+    """
+    df = read_segment_csv(path, 'NSE_CM')
+    kind = df['Exchange Instrument type']
+    bonds = (kind == 2) & df['Symbol ticker'].str.endswith('-GB', na=False)
+
+    # Keeping only equities, government bonds and indices
+    df = df[kind.isin([0, 9, 10]) | bonds]
+    bonds = bonds[df.index]
+    index = df['Exchange Instrument type'] == 10
+
+    token_df = symtoken_columns(df)
+    token_df['expiry'] = df['Expiry date']
+    token_df['exchange'] = 'NSE'
+    token_df.loc[index, 'exchange'] = 'NSE_INDEX'
+    token_df['instrumenttype'] = 'EQ'
+    token_df.loc[bonds, 'instrumenttype'] = 'GB'
+    token_df.loc[index, 'instrumenttype'] = 'INDEX'
+    token_df['symbol'] = df['Underlying symbol']
+    token_df['brexchange'] = 'NSE'
+    return token_df
+
+
+def process_fyers_bse_csv(path):
+    """
+    Processes the Fyers CSV file to fit the existing database schema and performs exchange name mapping.
+    """
+    df = read_segment_csv(path, 'BSE_CM')
+
+    # Keeping only equities and indices
+    df = df[df['Exchange Instrument type'].isin([0, 4, 10, 50])]
+    index = df['Exchange Instrument type'] == 10
+
+    token_df = symtoken_columns(df)
+    token_df['expiry'] = df['Expiry date']
+    token_df['exchange'] = 'BSE'
+    token_df.loc[index, 'exchange'] = 'BSE_INDEX'
+    token_df['instrumenttype'] = 'EQ'
+    token_df.loc[index, 'instrumenttype'] = 'INDEX'
+    token_df['symbol'] = df['Underlying symbol']
+    token_df['brexchange'] = 'BSE'
+    return token_df
+
+
+def process_fyers_nfo_csv(path):
+    """
+    Processes the Fyers CSV file to fit the existing database schema and performs exchange name mapping.
+    """
+    df = read_segment_csv(path, 'NSE_FO')
+    return derivatives_frame(df, 'NFO', df['Option type'])
+
+
+def process_fyers_cds_csv(path):
+    """
+    Processes the Fyers CSV file to fit the existing database schema and performs exchange name mapping.
+    """
+    df = read_segment_csv(path, 'NSE_CD')
+    return derivatives_frame(df, 'CDS', df['Option type'])
+
+
+def process_fyers_bfo_csv(path):
+    """
+    Processes the Fyers CSV file to fit the existing database schema and performs exchange name mapping.
+    """
+    df = read_segment_csv(path, 'BSE_FO')
+    # BSE futures may have no option type
+    return derivatives_frame(df, 'BFO', df['Option type'].fillna('XX'))
+
+
+def process_fyers_mcx_csv(path):
+    """
+    Processes the Fyers CSV file to fit the existing database schema and performs exchange name mapping.
+    """
+    df = read_segment_csv(path, 'MCX_COM')
+    return derivatives_frame(df, 'MCX', df['Option type'])
+
+
+# Segment CSVs in symtoken load order: a token already loaded from an earlier
+# segment is not loaded again
+SEGMENTS = {
+    "NSE_CM": process_fyers_nse_csv,
+    "BSE_CM": process_fyers_bse_csv,
+    "BSE_FO": process_fyers_bfo_csv,
+    "NSE_FO": process_fyers_nfo_csv,
+    "NSE_CD": process_fyers_cds_csv,
+    "MCX_COM": process_fyers_mcx_csv,
+}
+
+
+def main():
+    segment, path, output = sys.argv[1:4]
+    SEGMENTS[segment](path).to_pickle(output)
+
+
+if __name__ == "__main__":
+    main()
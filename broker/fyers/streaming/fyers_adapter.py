@@ -7,7 +7,7 @@ Uses HSM binary protocol for real-time data
 import logging
 import time
 import threading
-from typing import Dict, List, Any, Optional, Callable
+from typing import Dict, List, Any, Optional, Callable, Union
 from collections import defaultdict
 
 from .fyers_hsm_websocket import FyersHSMWebSocket
@@ -36,17 +36,35 @@ class FyersAdapter:
         self.token_converter = FyersTokenConverter(access_token)
         self.data_mapper = FyersDataMapper()
         self.ws_client = None
+        self.raw_frame_hook = None  # handed to each HSM client (feed capture)
         
         # Subscription tracking
         self.active_subscriptions = {}  # symbol -> subscription_info
-        self.subscription_callbacks = {}  # data_type -> callback
+        self.subscription_callbacks = {}  # "LTP|Quote|Depth_EXCHANGE:SYMBOL" -> callback
+        self.depth_levels = {}  # "Depth_EXCHANGE:SYMBOL" -> depth levels to publish (1 = top of book)
         self.symbol_to_hsm = {}  # symbol -> hsm_token mapping
         self.hsm_to_symbol = {}  # hsm_token -> symbol mapping (reverse lookup)
+        self.hsm_to_brsymbol = {}  # hsm_token -> Fyers symbol, resent with resubscribes
+        
+        # Tick routing table built at subscribe time:
+        # hsm_token -> (subscription_info, ((mapper, callback, dedup_key), ...))
+        self.hsm_routes = {}
+        self.unrouted_ticks = 0  # ticks dropped because their token has no route
+        self.unrouted_tokens = set()  # tokens already logged as unrouted
+        self.unresolved_tokens = 0  # converted tokens not subscribed: no requested symbol has their brsymbol
         
         # Connection state
         self.connected = False
         self.connecting = False
         
+        # Reconnects: the HSM client reconnects on its own; a reconnect through
+        # connect() (after the client gave up) resends every routed token
+        self.on_reconnect = None  # callable(gap_seconds) set by the streaming adapter
+        self.disconnected_at = None
+        self.reconnects = 0
+        self.last_reconnect_gap = None
+        self.max_reconnect_gap = 0.0
+        
         # Threading
         self.lock = threading.Lock()
         
@@ -75,18 +93,7 @@ class FyersAdapter:
             self.logger.info("Connecting to Fyers HSM WebSocket...")
             
             # Initialize WebSocket client
-            self.ws_client = FyersHSMWebSocket(
-                access_token=self.access_token,
-                log_path=""
-            )
-            
-            # Set callbacks
-            self.ws_client.set_callbacks(
-                on_message=self._on_message,
-                on_error=self._on_error,
-                on_open=self._on_open,
-                on_close=self._on_close
-            )
+            self.ws_client = self._create_ws_client()
             
             # Connect
             self.ws_client.connect()
@@ -100,6 +107,8 @@ class FyersAdapter:
             if self.ws_client.is_connected():
                 self.connected = True
                 self.logger.info("✅ Connected to Fyers HSM WebSocket")
+                if self.hsm_routes:
+                    self._resubscribe_routes()
                 return True
             else:
                 self.logger.error("❌ Failed to authenticate with Fyers HSM WebSocket")
@@ -111,6 +120,69 @@ class FyersAdapter:
         finally:
             self.connecting = False
     
+    def _create_ws_client(self) -> FyersHSMWebSocket:
+        """Create an HSM client wired to this adapter's callbacks"""
+        ws_client = FyersHSMWebSocket(
+            access_token=self.access_token,
+            log_path=""
+        )
+        ws_client.set_callbacks(
+            on_message=self._on_message,
+            on_error=self._on_error,
+            on_open=self._on_open,
+            on_close=self._on_close
+        )
+        ws_client.on_reconnect_callback = self._on_reconnect
+        ws_client.raw_frame_hook = self.raw_frame_hook
+        return ws_client
+    
+    def _resubscribe_routes(self):
+        """
+        Resend every routed token on a new HSM client
+        
+        The routing and token tables are kept across the reconnect, so no
+        symbol is converted again and the tokens go out in a few batched frames.
+        """
+        with self.lock:
+            hsm_tokens = list(self.hsm_routes)
+            token_mappings = {token: self.hsm_to_brsymbol[token]
+                              for token in hsm_tokens if token in self.hsm_to_brsymbol}
+        self.ws_client.subscribe_symbols(hsm_tokens, token_mappings)
+        
+        frames = -(-len(hsm_tokens) // FyersHSMWebSocket.SUBSCRIBE_BATCH_SIZE)
+        gap = time.time() - self.disconnected_at if self.disconnected_at else None
+        self.logger.info(f"Resubscribed {len(hsm_tokens)} routed tokens in {frames} frames")
+        if gap is not None:
+            self._on_reconnect(gap, len(hsm_tokens), frames)
+    
+    def _on_reconnect(self, gap: float, token_count: int, frame_count: int):
+        """Record a completed reconnect (HSM client reconnect or a new client)"""
+        self.disconnected_at = None
+        self.reconnects += 1
+        self.last_reconnect_gap = gap
+        self.max_reconnect_gap = max(self.max_reconnect_gap, gap)
+        if self.on_reconnect:
+            try:
+                self.on_reconnect(gap)
+            except Exception as e:
+                self.logger.error(f"Error in reconnect callback: {e}")
+    
+    def prepare_replay(self, transport) -> Callable:
+        """
+        Create an HSM client that is "connected" without a network, for feed replay
+        
+        Args:
+            transport: Object standing in for the WebSocket (send/close are discarded)
+            
+        Returns:
+            Callable feeding one captured HSM frame through the parser
+        """
+        self.ws_client = self._create_ws_client()
+        self.ws_client.ws = transport
+        self.ws_client.running = self.ws_client.connected = self.ws_client.authenticated = True
+        self.connected = True
+        return lambda frame: self.ws_client._on_ws_message(transport, frame)
+    
     def disconnect(self, clear_mappings=True):
         """
         Disconnect from Fyers WebSocket
@@ -120,6 +192,7 @@ class FyersAdapter:
         """
         try:
             self.connected = False
+            self.disconnected_at = None
             if self.ws_client:
                 self.ws_client.disconnect()
                 self.ws_client = None
@@ -129,28 +202,50 @@ class FyersAdapter:
                 self.active_subscriptions.clear()
                 self.symbol_to_hsm.clear()
                 self.hsm_to_symbol.clear()  # Clear reverse mapping too
+                self.hsm_to_brsymbol.clear()
                 self.subscription_callbacks.clear()  # Clear callbacks
+                self.depth_levels.clear()
+                self.hsm_routes.clear()
                 self.last_data.clear()  # Clear deduplication cache
                 self.logger.info("Disconnected from Fyers WebSocket (cleared all mappings)")
             else:
                 # Keep mappings but clear active subscriptions for reconnection
                 self.active_subscriptions.clear()
                 self.subscription_callbacks.clear()
+                self.depth_levels.clear()
+                self.hsm_routes.clear()
                 self.last_data.clear()
                 #self.logger.info(f"Disconnected from Fyers WebSocket (preserved {len(self.hsm_to_symbol)} mappings)")
                 
         except Exception as e:
             self.logger.error(f"Error during disconnect: {e}")
     
-    def subscribe_symbols(self, symbols: List[Dict[str, str]], data_type: str, callback: Callable):
+    def subscribe_symbols(self, symbols: List[Dict[str, str]], data_type: str,
+                          callback: Union[Callable, Dict[str, Callable]], mode_type: Optional[str] = None,
+                          depth_level: Union[int, Dict[str, int]] = FyersDataMapper.MAX_DEPTH_LEVELS):
         """
         Subscribe to symbols for market data
         
+        All symbols are converted in one token lookup and sent in as few HSM
+        subscription frames as the protocol allows.
+        
         Args:
             symbols: List of symbol dicts with 'exchange' and 'symbol' keys
             data_type: Type of data ("SymbolUpdate", "DepthUpdate")
-            callback: Callback function to receive data
+            callback: Callback function to receive data, or a dict mapping
+                      "EXCHANGE:SYMBOL" to a per-symbol callback
+            mode_type: OpenAlgo data type the callback receives ("LTP", "Quote",
+                       "Depth"); defaults to Depth for DepthUpdate, else Quote
+            depth_level: Depth levels to publish (Depth only, capped at 5, 1 =
+                         top of book), or a dict mapping "EXCHANGE:SYMBOL" to one
+        
+        Returns:
+            Set of "EXCHANGE:SYMBOL" mapped to an HSM token and sent in this
+            call, or False if nothing was sent
         """
+        if mode_type is None:
+            mode_type = "Depth" if data_type == "DepthUpdate" else "Quote"
+        
         if not self.connected:
             self.logger.error("Not connected to Fyers WebSocket")
             return False
@@ -170,10 +265,18 @@ class FyersAdapter:
                     symbol = symbol_info.get("symbol", "")
                     if symbol:
                         full_symbol = f"{exchange}:{symbol}"
-                        callback_key = f"{data_type}_{full_symbol}"
+                        callback_key = f"{mode_type}_{full_symbol}"
                         # Store callback per symbol to ensure proper data routing
-                        self.subscription_callbacks[callback_key] = callback
-                        self.logger.debug(f"Stored callback for {callback_key}")
+                        if isinstance(callback, dict):
+                            symbol_callback = callback.get(full_symbol)
+                            if symbol_callback is None:
+                                continue
+                            self.subscription_callbacks[callback_key] = symbol_callback
+                        else:
+                            self.subscription_callbacks[callback_key] = callback
+                        if mode_type == "Depth":
+                            levels = depth_level.get(full_symbol) if isinstance(depth_level, dict) else depth_level
+                            self.depth_levels[callback_key] = FyersDataMapper.cap_depth_level(levels)
                 
                 # Store subscription info for tracking
                 valid_symbols = []
@@ -202,8 +305,9 @@ class FyersAdapter:
                 self.logger.debug(f"Converting {len(valid_symbols)} OpenAlgo symbols to HSM format using database lookup...")
                 
                 # Convert OpenAlgo symbols directly to HSM tokens using database lookup
+                brsymbol_map = {}
                 hsm_tokens, token_mappings, invalid_symbols = self.token_converter.convert_openalgo_symbols_to_hsm(
-                    valid_symbols, data_type
+                    valid_symbols, data_type, brsymbol_map
                 )
                 
                 if invalid_symbols:
@@ -213,83 +317,113 @@ class FyersAdapter:
                     self.logger.error("No valid HSM tokens generated")
                     return False
                 
-                # CRITICAL FIX: Ensure proper HSM token mapping
-                # The tokens are generated in the same order as valid_symbols
                 self.logger.debug(f"\nCreating HSM mappings for {len(hsm_tokens)} tokens...")
-                self.logger.debug(f"HSM Tokens: {hsm_tokens}")
-                valid_symbol_list = [f"{s['exchange']}:{s['symbol']}" for s in valid_symbols]
-                self.logger.debug(f"Valid Symbols: {valid_symbol_list}")
                 
-                # Primary mapping strategy: Map by order (most reliable)
-                # Since convert_openalgo_symbols_to_hsm processes symbols in order
-                for i, hsm_token in enumerate(hsm_tokens):
-                    if i < len(valid_symbols):
-                        symbol_info = valid_symbols[i]
-                        full_symbol = f"{symbol_info['exchange']}:{symbol_info['symbol']}"
-                        
-                        # Store bidirectional mappings
-                        self.symbol_to_hsm[full_symbol] = hsm_token
-                        self.hsm_to_symbol[hsm_token] = full_symbol
-                        
-                        # Get brsymbol for logging
-                        brsymbol = token_mappings.get(hsm_token, "N/A")
-                        self.logger.debug(f"✅ Mapped #{i+1}: {full_symbol} <-> {hsm_token}")
-                        self.logger.debug(f"   Brsymbol: {brsymbol}")
+                # Map each token back to its symbol only through its brsymbol: token
+                # order does not follow valid_symbols once any symbol is invalid, and
+                # a wrong guess would route one symbol's ticks to another's callback
+                brsymbol_to_symbol = {
+                    brsymbol: f"{exchange}:{symbol}"
+                    for (symbol, exchange), brsymbol in brsymbol_map.items()
+                }
+                mapped_tokens = []
+                for hsm_token in hsm_tokens:
+                    full_symbol = brsymbol_to_symbol.get(token_mappings.get(hsm_token))
+                    if full_symbol is None:
+                        self.unresolved_tokens += 1
+                        self.logger.warning(
+                            f"Not subscribing {hsm_token}: its brsymbol {token_mappings.get(hsm_token)} "
+                            f"matches no requested symbol")
+                        continue
+                    
+                    # Store bidirectional mappings
+                    self.symbol_to_hsm[full_symbol] = hsm_token
+                    self.hsm_to_symbol[hsm_token] = full_symbol
+                    mapped_tokens.append(hsm_token)
+                
+                if not mapped_tokens:
+                    self.logger.error("No HSM tokens could be mapped to the requested symbols")
+                    return False
                 
-                # Verify all active subscriptions have mappings
-                unmapped_subs = []
-                for full_symbol in self.active_subscriptions:
+                for symbol_info in valid_symbols:
+                    full_symbol = f"{symbol_info['exchange']}:{symbol_info['symbol']}"
                     if full_symbol not in self.symbol_to_hsm:
-                        unmapped_subs.append(full_symbol)
                         self.logger.warning(f"⚠️ Unmapped subscription: {full_symbol}")
                 
-                # If there are unmapped subscriptions and unused tokens, map them
-                if unmapped_subs:
-                    unused_tokens = [t for t in hsm_tokens if t not in self.hsm_to_symbol]
-                    if unused_tokens:
-                        self.logger.debug(f"Attempting to map {len(unmapped_subs)} unmapped subscriptions...")
-                        for i, full_symbol in enumerate(unmapped_subs):
-                            if i < len(unused_tokens):
-                                hsm_token = unused_tokens[i]
-                                self.symbol_to_hsm[full_symbol] = hsm_token
-                                self.hsm_to_symbol[hsm_token] = full_symbol
-                                self.logger.debug(f"✅ Recovery mapped: {full_symbol} <-> {hsm_token}")
-                
                 # Final verification
                 self.logger.debug(f"\n📊 Mapping Summary:")
                 self.logger.debug(f"   Active subscriptions: {len(self.active_subscriptions)}")
                 self.logger.debug(f"   HSM tokens generated: {len(hsm_tokens)}")
                 self.logger.debug(f"   Mappings created: {len(self.hsm_to_symbol)}")
-                self.logger.debug(f"   Forward mappings (symbol->hsm): {self.symbol_to_hsm}")
-                self.logger.debug(f"   Reverse mappings (hsm->symbol): {self.hsm_to_symbol}")
-                
-                self.logger.debug(f"\nSubscribing to {len(hsm_tokens)} HSM tokens...")
-                for token in hsm_tokens:
-                    self.logger.debug(f"  ➡️ {token}")
                 
+                # Route each token straight to its subscription and callback so
+                # _on_message needs a single dict lookup per tick
+                for hsm_token in mapped_tokens:
+                    self._add_route(hsm_token)
+                    self.hsm_to_brsymbol[hsm_token] = token_mappings[hsm_token]
+
                 # Subscribe to HSM WebSocket with all tokens at once
-                self.ws_client.subscribe_symbols(hsm_tokens, token_mappings)
+                self.ws_client.subscribe_symbols(mapped_tokens, token_mappings)
                 
                 #self.logger.info(f"\n✅ Successfully sent subscription for {len(hsm_tokens)} HSM tokens")
                 #self.logger.info(f"Expected data for {len(self.active_subscriptions)} symbols")
                 #self.logger.info("="*60 + "\n")
-                return True
+                return {self.hsm_to_symbol[hsm_token] for hsm_token in mapped_tokens}
                 
         except Exception as e:
             self.logger.error(f"Subscription error: {e}")
             return False
     
+    def _add_route(self, hsm_token: str):
+        """
+        Add or refresh the routing entry for an HSM token
+        
+        Each callback subscribed to the token's symbol gets a mapping function
+        specialized for its data type: "dp|" tokens feed Depth callbacks, "sf|"
+        tokens feed LTP and Quote callbacks, and "if|" (index) tokens feed all
+        three, Depth getting synthetic levels.
+        
+        Args:
+            hsm_token: HSM token such as "sf|nse_cm|2885"
+        """
+        full_symbol = self.hsm_to_symbol.get(hsm_token)
+        subscription = self.active_subscriptions.get(full_symbol)
+        if subscription is None:
+            return
+        
+        if hsm_token.startswith("dp|"):
+            mode_types = ("Depth",)
+        elif hsm_token.startswith("if|"):
+            mode_types = ("LTP", "Quote", "Depth")
+        else:
+            mode_types = ("LTP", "Quote")
+        
+        targets = []
+        for mode_type in mode_types:
+            callback_key = f"{mode_type}_{full_symbol}"
+            callback = self.subscription_callbacks.get(callback_key)
+            if callback:
+                mapper = self.data_mapper.build_mapper(
+                    mode_type, hsm_token,
+                    self.depth_levels.get(callback_key, FyersDataMapper.MAX_DEPTH_LEVELS))
+                targets.append((mapper, callback, callback_key))
+        
+        if targets:
+            self.hsm_routes[hsm_token] = (subscription, tuple(targets))
+            self.unrouted_tokens.discard(hsm_token)
+    
     def subscribe_ltp(self, symbols: List[Dict[str, str]], callback: Callable):
         """Subscribe to LTP data"""
-        return self.subscribe_symbols(symbols, "SymbolUpdate", callback)
+        return self.subscribe_symbols(symbols, "SymbolUpdate", callback, "LTP")
     
     def subscribe_quote(self, symbols: List[Dict[str, str]], callback: Callable):
         """Subscribe to Quote data"""
         return self.subscribe_symbols(symbols, "SymbolUpdate", callback)
     
-    def subscribe_depth(self, symbols: List[Dict[str, str]], callback: Callable):
-        """Subscribe to Depth data"""
-        return self.subscribe_symbols(symbols, "DepthUpdate", callback)
+    def subscribe_depth(self, symbols: List[Dict[str, str]], callback: Callable,
+                        depth_level: Union[int, Dict[str, int]] = FyersDataMapper.MAX_DEPTH_LEVELS):
+        """Subscribe to Depth data (depth_level 1 = top of book)"""
+        return self.subscribe_symbols(symbols, "DepthUpdate", callback, depth_level=depth_level)
     
     def unsubscribe_symbols(self, symbols: List[Dict[str, str]]):
         """
@@ -305,7 +439,10 @@ class FyersAdapter:
         self.logger.info("Fyers WebSocket connection opened")
     
     def _on_close(self):
-        """Handle WebSocket connection close"""
+        """Handle WebSocket connection close (after the HSM client stopped reconnecting)"""
+        if self.connected and self.hsm_routes:
+            # Routes are kept; the next connect() resends them
+            self.disconnected_at = time.time()
         self.connected = False
         self.logger.info("Fyers WebSocket connection closed")
     
@@ -317,6 +454,10 @@ class FyersAdapter:
         """
         Handle incoming market data from Fyers
         
+        Ticks are routed by their HSM token through hsm_routes, built at
+        subscribe time. Ticks whose token has no route are counted in
+        unrouted_ticks and dropped.
+        
         Args:
             fyers_data: Raw data from Fyers HSM WebSocket
         """
@@ -324,188 +465,46 @@ class FyersAdapter:
             if not fyers_data:
                 return
             
-            # Determine data type and get appropriate callback
-            fyers_type = fyers_data.get("type", "sf")
-            update_type = fyers_data.get("update_type", "snapshot")
-            
-            # Map to OpenAlgo format first to get symbol info
-            mapped_data = self.data_mapper.map_fyers_data(fyers_data, "Quote")
-            if not mapped_data:
-                return
-            
-            # Extract symbol information from mapped data
-            symbol_str = mapped_data.get("symbol", "")
-            if not symbol_str:
-                return
-            
-            # Find matching subscription using HSM token or original symbol
-            callback = None
-            openalgo_data_type = "Quote"  # Default
-            matched_subscription = None
-            
-            # Try to match using HSM token first (most reliable)
             hsm_token = fyers_data.get('hsm_token')
-            if hsm_token:
-                # Use bidirectional mapping for fast lookup
-                if hsm_token in self.hsm_to_symbol:
-                    full_symbol = self.hsm_to_symbol[hsm_token]
-                    if full_symbol in self.active_subscriptions:
-                        matched_subscription = self.active_subscriptions[full_symbol]
-                        self.logger.debug(f"✅ Matched by HSM token: {hsm_token} -> {full_symbol}")
-                else:
-                    # Log missing mapping for debugging
-                    self.logger.debug(f"HSM token {hsm_token} not in mappings")
-                    self.logger.debug(f"Current HSM->Symbol mappings: {self.hsm_to_symbol}")
-                    # Try fallback matching
-                    for full_symbol, sub_info in self.active_subscriptions.items():
-                        if full_symbol in self.symbol_to_hsm and self.symbol_to_hsm[full_symbol] == hsm_token:
-                            matched_subscription = sub_info
-                            # Update reverse mapping for future fast lookup
-                            self.hsm_to_symbol[hsm_token] = full_symbol
-                            self.logger.debug(f"✅ Matched by HSM token (fallback): {hsm_token} -> {full_symbol}")
-                            break
-            
-            # If no match by HSM token, try matching by original_symbol field
-            if not matched_subscription and 'original_symbol' in fyers_data:
-                original_symbol = fyers_data.get('original_symbol', '')
-                # Try exact match
-                if original_symbol in self.active_subscriptions:
-                    matched_subscription = self.active_subscriptions[original_symbol]
-                    self.logger.debug(f"✅ Matched by original_symbol: {original_symbol}")
-                else:
-                    # Try to find a match in active subscriptions
-                    # Handle cases like NSE:NIFTY25SEPFUT -> NFO:NIFTY30SEP25FUT
-                    for full_symbol, sub_info in self.active_subscriptions.items():
-                        # Check for NFO futures match
-                        if sub_info['exchange'] == 'NFO' and 'NIFTY' in original_symbol and 'FUT' in original_symbol:
-                            if 'NIFTY' in sub_info['symbol'] and 'FUT' in sub_info['symbol']:
-                                matched_subscription = sub_info
-                                self.logger.debug(f"✅ Matched NFO future by pattern: {original_symbol} -> {full_symbol}")
-                                # Update the mapping for future use
-                                if hsm_token and hsm_token not in self.hsm_to_symbol:
-                                    self.hsm_to_symbol[hsm_token] = full_symbol
-                                    self.symbol_to_hsm[full_symbol] = hsm_token
-                                break
-            
-            # If no match by token, fall back to symbol matching from fyers data
-            if not matched_subscription:
-                # Try to match using the symbol from fyers_data
-                fyers_symbol = fyers_data.get('symbol', '')
-                if fyers_symbol:
-                    # Try exact match first
-                    for full_symbol, sub_info in self.active_subscriptions.items():
-                        # Check various matching patterns
-                        if sub_info['symbol'] in fyers_symbol or fyers_symbol.endswith(sub_info['symbol']):
-                            matched_subscription = sub_info
-                            self.logger.debug(f"✅ Matched by symbol name: {fyers_symbol} -> {full_symbol}")
-                            # Update the mapping for future use
-                            if hsm_token and hsm_token not in self.hsm_to_symbol:
-                                self.hsm_to_symbol[hsm_token] = full_symbol
-                                self.symbol_to_hsm[full_symbol] = hsm_token
-                            break
-                        # Special case for NFO futures
-                        elif sub_info['exchange'] == 'NFO' and 'FUT' in sub_info['symbol']:
-                            # Extract core symbol from both
-                            fyers_core = fyers_symbol.replace('-EQ', '').split('FUT')[0] if 'FUT' in fyers_symbol else ''
-                            sub_core = sub_info['symbol'].split('FUT')[0] if 'FUT' in sub_info['symbol'] else ''
-                            if fyers_core and sub_core and fyers_core in sub_core:
-                                matched_subscription = sub_info
-                                self.logger.debug(f"✅ Matched NFO by core symbol: {fyers_symbol} -> {full_symbol}")
-                                # Update the mapping for future use
-                                if hsm_token and hsm_token not in self.hsm_to_symbol:
-                                    self.hsm_to_symbol[hsm_token] = full_symbol
-                                    self.symbol_to_hsm[full_symbol] = hsm_token
-                                break
-                
-                # If still no match and only one subscription, use it
-                if not matched_subscription and len(self.active_subscriptions) == 1:
-                    for full_symbol, sub_info in self.active_subscriptions.items():
-                        matched_subscription = sub_info
-                        self.logger.debug(f"✅ Single subscription match: {full_symbol}")
-                        break
-            
-            # Final check - if still no match, log detailed debug info and return
-            if not matched_subscription:
-                self.logger.warning(f"❌ No HSM token match for data. HSM token: {hsm_token}")
-                self.logger.debug(f"   HSM to Symbol mappings: {self.hsm_to_symbol}")
-                self.logger.debug(f"   Symbol to HSM mappings: {self.symbol_to_hsm}")
-                self.logger.debug(f"   Active subscriptions: {list(self.active_subscriptions.keys())}")
-                self.logger.debug(f"   Fyers symbol: {fyers_data.get('symbol', 'N/A')}")
-                self.logger.debug(f"   Original symbol: {fyers_data.get('original_symbol', 'N/A')}")
+            route = self.hsm_routes.get(hsm_token)
+            if route is None:
+                self.unrouted_ticks += 1
+                if hsm_token not in self.unrouted_tokens:
+                    self.unrouted_tokens.add(hsm_token)
+                    self.logger.warning(f"Dropping ticks for unrouted HSM token: {hsm_token} "
+                                        f"(symbol: {fyers_data.get('symbol', 'N/A')})")
                 return
             
-            """
-            # Complex string matching logic removed - we rely on HSM token matching
-            # This follows the same pattern as Angel adapter which uses token-based matching
-            """
-            
-            # Get the appropriate callback for this specific symbol
-            full_symbol = f"{matched_subscription['exchange']}:{matched_subscription['symbol']}"
-            
-            if fyers_type == "dp":
-                callback = self.subscription_callbacks.get(f"DepthUpdate_{full_symbol}")
-                openalgo_data_type = "Depth"
-            elif fyers_type == "if":
-                # Check if we have depth subscription for this symbol
-                depth_callback = self.subscription_callbacks.get(f"DepthUpdate_{full_symbol}")
-                if depth_callback:
-                    callback = depth_callback
-                    openalgo_data_type = "Depth"
-                else:
-                    callback = self.subscription_callbacks.get(f"SymbolUpdate_{full_symbol}")
-                    openalgo_data_type = "Quote"
-            else:
-                callback = self.subscription_callbacks.get(f"SymbolUpdate_{full_symbol}")
-                openalgo_data_type = "Quote"
-            
-            if not callback:
-                return
+            matched_subscription, targets = route
+            update_type = fyers_data.get("update_type", "snapshot")
             
-            # Re-map data with correct type if needed
-            if openalgo_data_type == "Depth":
-                mapped_data = self.data_mapper.map_fyers_data(fyers_data, "Depth")
+            for mapper, callback, dedup_key in targets:
+                # Each subscription's mapper converts only the fields its mode publishes
+                mapped_data = mapper(fyers_data)
                 if not mapped_data:
-                    return
-            
-            # Override symbol and exchange with subscription details to ensure consistency
-            mapped_data["symbol"] = matched_subscription['symbol']
-            mapped_data["exchange"] = matched_subscription['exchange']
-            mapped_data["update_type"] = update_type
-            mapped_data["timestamp"] = int(time.time())
-            
-            # Deduplication check
-            symbol_key = f"{matched_subscription['exchange']}:{matched_subscription['symbol']}"
-            current_ltp = mapped_data.get('ltp', 0)
-            
-            # Check if this is duplicate data
-            if symbol_key in self.last_data:
-                last_ltp = self.last_data[symbol_key].get('ltp', 0)
-                last_time = self.last_data[symbol_key].get('timestamp', 0)
+                    continue
                 
-                # Skip if same LTP within 100ms (likely duplicate)
-                if (current_ltp == last_ltp and 
-                    abs(mapped_data["timestamp"] - last_time) < 0.1):
-                    return
-            
-            # Update last data for deduplication
-            self.last_data[symbol_key] = {
-                'ltp': current_ltp,
-                'timestamp': mapped_data["timestamp"]
-            }
-            
-            # Debug logging
-            if openalgo_data_type == "Depth":
-                depth = mapped_data.get('depth', {})
-                buy_levels = depth.get('buy', [])
-                sell_levels = depth.get('sell', [])
-                bid1 = buy_levels[0]['price'] if buy_levels else 'N/A'
-                ask1 = sell_levels[0]['price'] if sell_levels else 'N/A'
-                self.logger.debug(f"🎉 {full_symbol} depth: Bid={bid1}, Ask={ask1}")
-            else:
-                self.logger.debug(f"🎉 {full_symbol} data: LTP={mapped_data.get('ltp', 0)}")
-            
-            # Send to symbol-specific callback
-            callback(mapped_data)
+                # Override symbol and exchange with subscription details to ensure consistency
+                mapped_data["symbol"] = matched_subscription['symbol']
+                mapped_data["exchange"] = matched_subscription['exchange']
+                mapped_data["update_type"] = update_type
+                
+                # Deduplication check: skip the same LTP within 100ms (likely duplicate).
+                # Top of book carries the mid as ltp and only publishes when a best
+                # bid/ask field changed, so a size change must not be dropped
+                current_ltp = mapped_data.get('ltp', 0)
+                last = self.last_data.get(dedup_key)
+                if (last is not None and current_ltp == last['ltp'] and
+                        abs(mapped_data["timestamp"] - last['timestamp']) < 0.1 and
+                        mapped_data.get("data_type") != "TopOfBook"):
+                    continue
+                self.last_data[dedup_key] = {
+                    'ltp': current_ltp,
+                    'timestamp': mapped_data["timestamp"]
+                }
+                
+                # Send to symbol-specific callback
+                callback(mapped_data)
             
         except Exception as e:
             self.logger.error(f"Error processing message: {e}")
@@ -522,6 +521,13 @@ class FyersAdapter:
             "connected": self.connected,
             "authenticated": self.ws_client.is_connected() if self.ws_client else False,
             "active_subscriptions": len(self.active_subscriptions),
+            "routed_tokens": len(self.hsm_routes),
+            "unrouted_ticks": self.unrouted_ticks,
+            "reconnecting": bool(self.ws_client and self.ws_client.disconnected_at is not None),
+            "reconnects": self.reconnects,
+            "last_reconnect_gap": self.last_reconnect_gap,
+            "max_reconnect_gap": self.max_reconnect_gap,
+            "hsm_token_cache": self.token_converter.token_cache.get_stats(),
             "websocket_url": FyersHSMWebSocket.HSM_URL,
             "protocol": "HSM Binary",
             "user_id": self.userid
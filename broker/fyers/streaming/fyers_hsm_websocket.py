@@ -8,6 +8,8 @@ import base64
 import json
 import struct
 import time
+import random
+import socket
 import threading
 import websocket
 import ssl
@@ -15,6 +17,22 @@ import logging
 from typing import Dict, List, Any, Optional, Callable
 from datetime import datetime
 
+# Precompiled decoders: the feed is read with unpack_from over a memoryview of
+# the received frame, so no per-field slices are created
+_UINT16 = struct.Struct("H")        # topic ids (native order, as in the official library)
+_UINT16_BE = struct.Struct(">H")
+_INT32_ARRAYS: Dict[int, struct.Struct] = {}
+NULL_VALUE = -2147483648            # field not present in this packet
+
+
+def _int32_array(count: int) -> struct.Struct:
+    """Get a precompiled decoder for `count` big-endian int32 values (count <= 255)"""
+    decoder = _INT32_ARRAYS.get(count)
+    if decoder is None:
+        decoder = _INT32_ARRAYS[count] = struct.Struct(f">{count}i")
+    return decoder
+
+
 class FyersHSMWebSocket:
     """
     Fyers HSM WebSocket client using binary protocol
@@ -24,6 +42,17 @@ class FyersHSMWebSocket:
     HSM_URL = "wss://socket.fyers.in/hsm/v1-5/prod"
     SYMBOLS_TOKEN_API = "https://api-t1.fyers.in/data/symbol-token"
     
+    # Symbols per subscription frame - the frame and field lengths are 16-bit,
+    # so large subscriptions are split into a few frames of this size
+    SUBSCRIBE_BATCH_SIZE = 1000
+    
+    # Reconnect backoff: exponential from the base delay up to the cap, each
+    # wait drawn from [delay / 2, delay] so many clients dropped at once do
+    # not reconnect in lockstep
+    RECONNECT_BASE_DELAY = 0.5
+    RECONNECT_MAX_DELAY = 30
+    MAX_RECONNECT_ATTEMPTS = 10
+    
     # Data field mappings (from official library map.json)
     DATA_FIELDS = [
         "ltp", "vol_traded_today", "last_traded_time", "exch_feed_time",
@@ -97,6 +126,21 @@ class FyersHSMWebSocket:
         self.on_error_callback = None
         self.on_open_callback = None
         self.on_close_callback = None
+        # Called with every raw frame before parsing (feed capture)
+        self.raw_frame_hook = None
+        # Called after a reconnect with (gap_seconds, token_count, frame_count)
+        self.on_reconnect_callback = None
+        
+        # Reconnection: the socket is reopened, re-authenticated and every
+        # token in subscribed_tokens is sent again in batched frames
+        self.reconnect_enabled = True
+        self.reconnect_attempts = 0
+        self.subscribed_tokens = {}  # hsm_token -> None, in subscription order
+        self.disconnected_at = None  # when an unexpected close was seen
+        self.session_started = False  # authenticated at least once
+        self.reconnects = 0
+        self.last_reconnect_gap = None
+        self.stop_event = threading.Event()
         
         # Threading
         self.lock = threading.Lock()
@@ -242,7 +286,7 @@ class FyersHSMWebSocket:
         
         return buffer_msg
     
-    def _parse_binary_message(self, data: bytearray):
+    def _parse_binary_message(self, data: memoryview):
         """
         Parse incoming binary message from HSM WebSocket
         
@@ -259,13 +303,16 @@ class FyersHSMWebSocket:
             if msg_type == 1:
                 # Authentication response
                 self.authenticated = True
+                self.session_started = True
+                self.reconnect_attempts = 0
                 self.logger.info("HSM authentication successful")
+                if self.disconnected_at is not None:
+                    self._resubscribe_all()
                 if self.on_open_callback:
                     self.on_open_callback()
                     
             elif msg_type == 6:
                 # Data feed message
-                self.logger.debug(f"Received data feed message (type 6): {len(data)} bytes")
                 self._parse_data_feed(data)
                 
             elif msg_type == 13:
@@ -284,7 +331,7 @@ class FyersHSMWebSocket:
             if self.on_error_callback:
                 self.on_error_callback(e)
     
-    def _parse_data_feed(self, data: bytearray):
+    def _parse_data_feed(self, data: memoryview):
         """
         Parse data feed message (message type 6)
         
@@ -297,8 +344,7 @@ class FyersHSMWebSocket:
                 return
                 
             # Get scrip count
-            scrip_count = struct.unpack("!H", data[7:9])[0]
-            self.logger.debug(f"Data feed contains {scrip_count} scrips")
+            scrip_count = _UINT16_BE.unpack_from(data, 7)[0]
             offset = 9
             
             for i in range(scrip_count):
@@ -307,15 +353,13 @@ class FyersHSMWebSocket:
                     break
                     
                 # Get data type
-                data_type = struct.unpack("B", data[offset:offset + 1])[0]
+                data_type = data[offset]
                 offset += 1
                 
-                self.logger.debug(f"Processing scrip {i+1}/{scrip_count}, data_type: {data_type}")
-                
-                if data_type == 83:  # Snapshot data feed
-                    offset = self._parse_snapshot_data(data, offset)
-                elif data_type == 85:  # Update data feed
+                if data_type == 85:  # Update data feed
                     offset = self._parse_update_data(data, offset)
+                elif data_type == 83:  # Snapshot data feed
+                    offset = self._parse_snapshot_data(data, offset)
                 else:
                     self.logger.warning(f"Unknown data type: {data_type}, skipping")
                     break
@@ -323,7 +367,60 @@ class FyersHSMWebSocket:
         except Exception as e:
             self.logger.error(f"Error parsing data feed: {e}")
     
-    def _parse_snapshot_data(self, data: bytearray, offset: int) -> int:
+    def _unpack_fields(self, data: memoryview, offset: int, field_count: int,
+                       fields: List[str], target: Dict[str, Any]) -> int:
+        """
+        Decode a field array of big-endian int32 values into target
+        
+        The whole array is decoded with one precompiled unpack_from call; null
+        values (-2147483648) and values beyond the known field names are skipped.
+        
+        Returns:
+            New offset after the decoded values
+        """
+        count = min(field_count, (len(data) - offset) // 4)
+        values = _int32_array(count).unpack_from(data, offset)
+        for field, value in zip(fields, values):
+            if value != NULL_VALUE:
+                target[field] = value
+        return offset + count * 4
+    
+    def _unpack_trailer(self, data: memoryview, offset: int, target: Dict[str, Any]) -> int:
+        """
+        Decode the multiplier, precision and exchange/token/symbol strings that
+        follow the field array of scrip and depth snapshots
+        
+        Returns:
+            New offset after the trailer
+        """
+        # Skip 2 bytes
+        offset += 2
+        
+        if offset + 3 > len(data):
+            return offset
+            
+        # Get multiplier and precision
+        target["multiplier"] = _UINT16_BE.unpack_from(data, offset)[0]
+        target["precision"] = data[offset + 2]
+        offset += 3
+        
+        # Parse exchange, token, symbol strings
+        for field in ("exchange", "exchange_token", "symbol"):
+            if offset + 1 > len(data):
+                break
+                
+            string_len = data[offset]
+            offset += 1
+            
+            if offset + string_len > len(data):
+                break
+                
+            target[field] = str(data[offset:offset + string_len], "utf-8", "ignore")
+            offset += string_len
+            
+        return offset
+    
+    def _parse_snapshot_data(self, data: memoryview, offset: int) -> int:
         """
         Parse snapshot data (data_type = 83)
         
@@ -338,19 +435,16 @@ class FyersHSMWebSocket:
             if offset + 3 > len(data):
                 return offset
                 
-            # Get topic ID
-            topic_id = struct.unpack("H", data[offset:offset + 2])[0]
-            offset += 2
-            
-            # Get topic name length
-            topic_name_len = struct.unpack("B", data[offset:offset + 1])[0]
-            offset += 1
+            # Get topic ID and topic name length
+            topic_id = _UINT16.unpack_from(data, offset)[0]
+            topic_name_len = data[offset + 2]
+            offset += 3
             
             if offset + topic_name_len > len(data):
                 return offset
                 
             # Get topic name (HSM token)
-            topic_name = data[offset:offset + topic_name_len].decode("utf-8")
+            topic_name = str(data[offset:offset + topic_name_len], "utf-8")
             offset += topic_name_len
             
             # Store mapping
@@ -370,63 +464,22 @@ class FyersHSMWebSocket:
             
         return offset
     
-    def _parse_scrip_snapshot(self, data: bytearray, offset: int, topic_id: int, topic_name: str) -> int:
+    def _parse_scrip_snapshot(self, data: memoryview, offset: int, topic_id: int, topic_name: str) -> int:
         """Parse scrip snapshot data"""
         try:
             if offset + 1 > len(data):
                 return offset
                 
-            field_count = struct.unpack("B", data[offset:offset + 1])[0]
+            field_count = data[offset]
             offset += 1
             
             scrip_data = {"type": "sf"}
-            
-            # Parse field values
-            for index in range(field_count):
-                if offset + 4 > len(data):
-                    break
-                    
-                value = struct.unpack(">i", data[offset:offset + 4])[0]
-                offset += 4
-                
-                if value != -2147483648 and index < len(self.DATA_FIELDS):
-                    scrip_data[self.DATA_FIELDS[index]] = value
-            
-            # Skip 2 bytes
-            offset += 2
-            
-            if offset + 3 > len(data):
-                return offset
-                
-            # Get multiplier and precision
-            multiplier = struct.unpack(">H", data[offset:offset + 2])[0]
-            scrip_data["multiplier"] = multiplier
-            offset += 2
-            
-            precision = struct.unpack("B", data[offset:offset + 1])[0]
-            scrip_data["precision"] = precision
-            offset += 1
-            
-            # Parse exchange, token, symbol strings
-            string_fields = ["exchange", "exchange_token", "symbol"]
-            for field in string_fields:
-                if offset + 1 > len(data):
-                    break
-                    
-                string_len = struct.unpack("B", data[offset:offset + 1])[0]
-                offset += 1
-                
-                if offset + string_len > len(data):
-                    break
-                    
-                string_data = data[offset:offset + string_len].decode("utf-8", errors='ignore')
-                scrip_data[field] = string_data
-                offset += string_len
+            offset = self._unpack_fields(data, offset, field_count, self.DATA_FIELDS, scrip_data)
+            offset = self._unpack_trailer(data, offset, scrip_data)
             
             # Add original symbol mapping and HSM token
             if topic_name in self.symbol_mappings:
                 scrip_data["original_symbol"] = self.symbol_mappings[topic_name]
-                self.logger.debug(f"Symbol mapping: {topic_name} -> {self.symbol_mappings[topic_name]}")
             else:
                 self.logger.warning(f"No symbol mapping found for topic_name: {topic_name}")
             
@@ -438,10 +491,7 @@ class FyersHSMWebSocket:
             
             # Send to callback
             if self.on_message_callback:
-                self.logger.debug(f"Sending scrip data to callback: {scrip_data.get('symbol', 'Unknown')} LTP={scrip_data.get('ltp', 'N/A')}")
-                # Debug: Log all available fields in HSM data
-                self.logger.debug(f"Complete HSM scrip_data fields: {list(scrip_data.keys())}")
-                self.logger.debug(f"OHLC values: open={scrip_data.get('open_price', 'N/A')}, high={scrip_data.get('high_price', 'N/A')}, low={scrip_data.get('low_price', 'N/A')}, close={scrip_data.get('prev_close_price', 'N/A')}")
+                self.logger.debug(f"Sending scrip snapshot: {scrip_data.get('symbol', 'Unknown')} LTP={scrip_data.get('ltp', 'N/A')}")
                 self.on_message_callback(scrip_data)
             else:
                 self.logger.warning(f"No callback set for scrip data: {scrip_data.get('symbol', 'Unknown')}")
@@ -451,27 +501,17 @@ class FyersHSMWebSocket:
             
         return offset
     
-    def _parse_index_snapshot(self, data: bytearray, offset: int, topic_id: int, topic_name: str) -> int:
+    def _parse_index_snapshot(self, data: memoryview, offset: int, topic_id: int, topic_name: str) -> int:
         """Parse index snapshot data"""
         try:
             if offset + 1 > len(data):
                 return offset
                 
-            field_count = struct.unpack("B", data[offset:offset + 1])[0]
+            field_count = data[offset]
             offset += 1
             
             index_data = {"type": "if"}
-            
-            # Parse field values
-            for index in range(field_count):
-                if offset + 4 > len(data):
-                    break
-                    
-                value = struct.unpack(">i", data[offset:offset + 4])[0]
-                offset += 4
-                
-                if value != -2147483648 and index < len(self.INDEX_FIELDS):
-                    index_data[self.INDEX_FIELDS[index]] = value
+            offset = self._unpack_fields(data, offset, field_count, self.INDEX_FIELDS, index_data)
             
             # Add original symbol mapping and HSM token
             if topic_name in self.symbol_mappings:
@@ -492,58 +532,19 @@ class FyersHSMWebSocket:
             
         return offset
     
-    def _parse_depth_snapshot(self, data: bytearray, offset: int, topic_id: int, topic_name: str) -> int:
+    def _parse_depth_snapshot(self, data: memoryview, offset: int, topic_id: int, topic_name: str) -> int:
         """Parse depth snapshot data"""
         try:
             if offset + 1 > len(data):
                 return offset
                 
-            field_count = struct.unpack("B", data[offset:offset + 1])[0]
+            field_count = data[offset]
             offset += 1
             
             depth_data = {"type": "dp"}
-            
-            # Parse field values
-            for index in range(field_count):
-                if offset + 4 > len(data):
-                    break
-                    
-                value = struct.unpack(">i", data[offset:offset + 4])[0]
-                offset += 4
-                
-                if value != -2147483648 and index < len(self.DEPTH_FIELDS):
-                    depth_data[self.DEPTH_FIELDS[index]] = value
-            
-            # Skip 2 bytes (similar to scrip snapshot)
-            offset += 2
-            
-            if offset + 3 > len(data):
-                return offset
-                
-            # Get multiplier and precision (depth data also has these)
-            multiplier = struct.unpack(">H", data[offset:offset + 2])[0]
-            depth_data["multiplier"] = multiplier
-            offset += 2
-            
-            precision = struct.unpack("B", data[offset:offset + 1])[0]
-            depth_data["precision"] = precision
-            offset += 1
-            
-            # Parse exchange, token, symbol strings (same as scrip)
-            string_fields = ["exchange", "exchange_token", "symbol"]
-            for field in string_fields:
-                if offset + 1 > len(data):
-                    break
-                    
-                string_len = struct.unpack("B", data[offset:offset + 1])[0]
-                offset += 1
-                
-                if offset + string_len > len(data):
-                    break
-                    
-                string_data = data[offset:offset + string_len].decode("utf-8", errors='ignore')
-                depth_data[field] = string_data
-                offset += string_len
+            offset = self._unpack_fields(data, offset, field_count, self.DEPTH_FIELDS, depth_data)
+            # Depth snapshots carry the same trailer as scrip snapshots
+            offset = self._unpack_trailer(data, offset, depth_data)
             
             # Add original symbol mapping and HSM token
             if topic_name in self.symbol_mappings:
@@ -555,11 +556,6 @@ class FyersHSMWebSocket:
             # Store data
             self.depth_data[topic_id] = depth_data
             
-            # Log depth data for debugging
-            #self.logger.info(f"Parsed depth data: {depth_data.get('symbol', 'Unknown')}")
-            self.logger.debug(f"Depth fields: bid_price1={depth_data.get('bid_price1', 'N/A')}, ask_price1={depth_data.get('ask_price1', 'N/A')}")
-            #self.logger.info(f"Multiplier={multiplier}, Precision={precision}")
-            
             # Send to callback
             if self.on_message_callback:
                 self.on_message_callback(depth_data)
@@ -569,10 +565,15 @@ class FyersHSMWebSocket:
             
         return offset
     
-    def _parse_update_data(self, data: bytearray, offset: int) -> int:
+    def _parse_update_data(self, data: memoryview, offset: int) -> int:
         """
         Parse update data (data_type = 85)
         
+        All changed fields of the topic are applied first and then a single
+        consolidated update is sent to the callback, with "changed_fields"
+        listing the field names that changed in this packet. Updates that
+        change nothing are not sent.
+        
         Args:
             data: Binary data
             offset: Current offset
@@ -584,82 +585,49 @@ class FyersHSMWebSocket:
             if offset + 3 > len(data):
                 return offset
                 
-            # Get topic ID
-            topic_id = struct.unpack("H", data[offset:offset + 2])[0]
-            offset += 2
-            
-            # Get field count
-            field_count = struct.unpack("B", data[offset:offset + 1])[0]
-            offset += 1
+            # Get topic ID and field count
+            topic_id = _UINT16.unpack_from(data, offset)[0]
+            field_count = data[offset + 2]
+            offset += 3
+            end_offset = offset + field_count * 4
             
             # Determine data type based on topic ID
-            if topic_id in self.subscriptions:
-                topic_name = self.subscriptions[topic_id]
-                
-                if topic_name.startswith("sf|") and topic_id in self.scrips_data:
-                    # Update scrip data
-                    for index in range(field_count):
-                        if offset + 4 > len(data):
-                            break
-                            
-                        value = struct.unpack(">i", data[offset:offset + 4])[0]
-                        offset += 4
-                        
-                        if value != -2147483648 and index < len(self.DATA_FIELDS):
-                            old_value = self.scrips_data[topic_id].get(self.DATA_FIELDS[index])
-                            if old_value != value:
-                                self.scrips_data[topic_id][self.DATA_FIELDS[index]] = value
-                                
-                                # Send update to callback
-                                if self.on_message_callback:
-                                    update_data = self.scrips_data[topic_id].copy()
-                                    update_data["update_type"] = "live"
-                                    self.logger.debug(f"Sending live update: {update_data.get('symbol', 'Unknown')} LTP={update_data.get('ltp', 'N/A')}")
-                                    self.on_message_callback(update_data)
-                
-                elif topic_name.startswith("if|") and topic_id in self.index_data:
-                    # Update index data
-                    for index in range(field_count):
-                        if offset + 4 > len(data):
-                            break
-                            
-                        value = struct.unpack(">i", data[offset:offset + 4])[0]
-                        offset += 4
-                        
-                        if value != -2147483648 and index < len(self.INDEX_FIELDS):
-                            old_value = self.index_data[topic_id].get(self.INDEX_FIELDS[index])
-                            if old_value != value:
-                                self.index_data[topic_id][self.INDEX_FIELDS[index]] = value
-                                
-                                # Send update to callback
-                                if self.on_message_callback:
-                                    update_data = self.index_data[topic_id].copy()
-                                    update_data["update_type"] = "live"
-                                    self.on_message_callback(update_data)
-                
-                elif topic_name.startswith("dp|") and topic_id in self.depth_data:
-                    # Update depth data
-                    for index in range(field_count):
-                        if offset + 4 > len(data):
-                            break
-                            
-                        value = struct.unpack(">i", data[offset:offset + 4])[0]
-                        offset += 4
-                        
-                        if value != -2147483648 and index < len(self.DEPTH_FIELDS):
-                            old_value = self.depth_data[topic_id].get(self.DEPTH_FIELDS[index])
-                            if old_value != value:
-                                self.depth_data[topic_id][self.DEPTH_FIELDS[index]] = value
-                                
-                                # Send update to callback
-                                if self.on_message_callback:
-                                    update_data = self.depth_data[topic_id].copy()
-                                    update_data["update_type"] = "live"
-                                    self.logger.debug(f"Sending live depth update: {update_data.get('symbol', 'Unknown')}")
-                                    self.on_message_callback(update_data)
-            else:
+            topic_name = self.subscriptions.get(topic_id)
+            if topic_name is None:
                 # Skip unknown data
-                offset += field_count * 4
+                return end_offset
+            
+            if topic_name.startswith("sf|"):
+                topic_data, fields = self.scrips_data.get(topic_id), self.DATA_FIELDS
+            elif topic_name.startswith("if|"):
+                topic_data, fields = self.index_data.get(topic_id), self.INDEX_FIELDS
+            elif topic_name.startswith("dp|"):
+                topic_data, fields = self.depth_data.get(topic_id), self.DEPTH_FIELDS
+            else:
+                topic_data, fields = None, None
+            
+            # Updates are deltas against the snapshot - nothing to apply them to yet
+            if topic_data is None:
+                return end_offset
+            
+            # Decode the whole field array in one call, then apply every
+            # changed field before notifying
+            count = min(field_count, (len(data) - offset) // 4)
+            values = _int32_array(count).unpack_from(data, offset)
+            changed_fields = []
+            for field, value in zip(fields, values):
+                if value != NULL_VALUE and topic_data.get(field) != value:
+                    topic_data[field] = value
+                    changed_fields.append(field)
+            
+            # Send one update per packet, carrying the final state
+            if changed_fields and self.on_message_callback:
+                update_data = topic_data.copy()
+                update_data["update_type"] = "live"
+                update_data["changed_fields"] = changed_fields
+                self.on_message_callback(update_data)
+                
+            return end_offset
                 
         except Exception as e:
             self.logger.error(f"Error parsing update data: {e}")
@@ -685,8 +653,10 @@ class FyersHSMWebSocket:
     
     def _on_ws_message(self, ws, message):
         """Handle WebSocket message event"""
+        if self.raw_frame_hook:
+            self.raw_frame_hook(message)
         if isinstance(message, bytes):
-            self._parse_binary_message(bytearray(message))
+            self._parse_binary_message(memoryview(message))
         else:
             self.logger.warning(f"Received unexpected text message: {message}")
     
@@ -700,10 +670,89 @@ class FyersHSMWebSocket:
         """Handle WebSocket close event"""
         self.connected = False
         self.authenticated = False
+        if self.running and self.reconnect_enabled:
+            # The run loop reconnects; subscribers keep their routes meanwhile
+            if self.disconnected_at is None and self.session_started:
+                self.disconnected_at = time.time()
+            self.logger.warning(f"HSM WebSocket closed: {close_msg} ({close_status_code}) - reconnecting")
+            return
         #self.logger.info(f"HSM WebSocket closed: {close_msg} ({close_status_code})")
         if self.on_close_callback:
             self.on_close_callback()
     
+    def _run_websocket(self):
+        """Run the WebSocket, reopening it with backoff after unexpected closes"""
+        while self.running:
+            try:
+                self.ws = websocket.WebSocketApp(
+                    self.HSM_URL,
+                    on_open=self._on_ws_open,
+                    on_message=self._on_ws_message,
+                    on_error=self._on_ws_error,
+                    on_close=self._on_ws_close,
+                    header={
+                        'Authorization': self.access_token,
+                        'User-Agent': f'{self.source}/1.0'
+                    }
+                )
+                self.ws.run_forever(sslopt={"cert_reqs": ssl.CERT_NONE})
+            except Exception as e:
+                self.logger.error(f"HSM WebSocket error: {e}")
+            
+            self.connected = False
+            self.authenticated = False
+            if not self.running or not self.reconnect_enabled:
+                break
+            if self.disconnected_at is None and self.session_started:
+                self.disconnected_at = time.time()
+            if not self._wait_before_reconnect():
+                break
+    
+    def _wait_before_reconnect(self) -> bool:
+        """
+        Sleep for the next backoff delay
+        
+        Returns:
+            False when attempts are exhausted or the client is being shut down
+        """
+        if self.reconnect_attempts >= self.MAX_RECONNECT_ATTEMPTS:
+            self.logger.error(f"Max HSM reconnect attempts ({self.MAX_RECONNECT_ATTEMPTS}) reached")
+            self.running = False
+            self.disconnected_at = None
+            if self.on_close_callback:
+                self.on_close_callback()
+            return False
+        
+        delay = min(self.RECONNECT_BASE_DELAY * (2 ** self.reconnect_attempts), self.RECONNECT_MAX_DELAY)
+        delay = random.uniform(delay / 2, delay)
+        self.reconnect_attempts += 1
+        self.logger.info(f"Reconnecting HSM WebSocket in {delay:.2f}s "
+                         f"(attempt {self.reconnect_attempts}/{self.MAX_RECONNECT_ATTEMPTS})")
+        # Woken early by disconnect()
+        return not self.stop_event.wait(delay)
+    
+    def _resubscribe_all(self):
+        """Send every subscribed token again after a reconnect, in batched frames"""
+        try:
+            with self.lock:
+                # Topic ids are reassigned by the new session's snapshots
+                self.subscriptions.clear()
+                self.scrips_data.clear()
+                self.index_data.clear()
+                self.depth_data.clear()
+                tokens = list(self.subscribed_tokens)
+            
+            frames = self._send_subscriptions(tokens)
+            gap = time.time() - self.disconnected_at
+            self.disconnected_at = None
+            self.reconnects += 1
+            self.last_reconnect_gap = gap
+            self.logger.info(f"HSM reconnected after {gap:.2f}s - resubscribed {len(tokens)} tokens in {frames} frames")
+            if self.on_reconnect_callback:
+                self.on_reconnect_callback(gap, len(tokens), frames)
+        except Exception as e:
+            self.logger.error(f"HSM resubscribe error: {e}")
+    
     def connect(self):
         """Connect to HSM WebSocket"""
         if self.connected:
@@ -711,24 +760,11 @@ class FyersHSMWebSocket:
             return
             
         self.running = True
-        
-        self.ws = websocket.WebSocketApp(
-            self.HSM_URL,
-            on_open=self._on_ws_open,
-            on_message=self._on_ws_message,
-            on_error=self._on_ws_error,
-            on_close=self._on_ws_close,
-            header={
-                'Authorization': self.access_token,
-                'User-Agent': f'{self.source}/1.0'
-            }
-        )
+        self.reconnect_enabled = True
+        self.stop_event.clear()
         
         # Run in separate thread
-        self.ws_thread = threading.Thread(
-            target=self.ws.run_forever,
-            kwargs={'sslopt': {"cert_reqs": ssl.CERT_NONE}}
-        )
+        self.ws_thread = threading.Thread(target=self._run_websocket)
         self.ws_thread.daemon = True
         self.ws_thread.start()
         
@@ -739,6 +775,11 @@ class FyersHSMWebSocket:
             time.sleep(0.1)
             
         if not self.connected:
+            # No retries for the first connection - the caller decides
+            self.running = False
+            self.stop_event.set()
+            if self.ws:
+                self._close_ws(self.ws)
             raise ConnectionError("Failed to connect to HSM WebSocket")
             
         self.logger.info("HSM WebSocket connection established")
@@ -750,12 +791,15 @@ class FyersHSMWebSocket:
             
             # Set running flag to false to stop operations
             self.running = False
+            self.reconnect_enabled = False
+            self.stop_event.set()
             self.connected = False
             self.authenticated = False
             
             # Clear all data structures
             with self.lock:
                 self.subscriptions.clear()
+                self.subscribed_tokens.clear()
                 self.symbol_mappings.clear()
                 self.scrips_data.clear()
                 self.index_data.clear()
@@ -765,7 +809,7 @@ class FyersHSMWebSocket:
             # Close WebSocket connection
             if self.ws:
                 try:
-                    self.ws.close()
+                    self._close_ws(self.ws)
                     #self.logger.info("WebSocket connection closed")
                 except Exception as e:
                     self.logger.error(f"Error closing WebSocket: {e}")
@@ -798,6 +842,28 @@ class FyersHSMWebSocket:
             self.connected = False
             self.authenticated = False
     
+    def _close_ws(self, ws):
+        """
+        Send a close frame and shut the socket down. WebSocketApp.close() only
+        closes the descriptor, which leaves run_forever blocked in select() for
+        up to 10 seconds; the shutdown wakes it at once.
+        """
+        ws.keep_running = False
+        sock = ws.sock
+        raw = sock.sock if sock else None
+        if raw is None:
+            return
+        try:
+            if sock.connected:
+                sock.send_close()
+        except (OSError, websocket.WebSocketException) as e:
+            self.logger.debug(f"HSM close frame not sent: {e}")
+        try:
+            raw.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            # Already closed by the peer or the reader thread
+            pass
+    
     def subscribe_symbols(self, hsm_symbols: List[str], symbol_mappings: Dict[str, str] = None):
         """
         Subscribe to symbols using HSM format
@@ -806,22 +872,38 @@ class FyersHSMWebSocket:
             hsm_symbols: List of HSM tokens (e.g., ["sf|bse_cm|500325"])
             symbol_mappings: Dict mapping HSM tokens to original symbols
         """
-        if not self.authenticated:
+        reconnecting = self.running and self.disconnected_at is not None
+        if not self.authenticated and not reconnecting:
             raise ConnectionError("Not authenticated to HSM WebSocket")
         
-        if symbol_mappings:
-            self.symbol_mappings.update(symbol_mappings)
-            self.logger.debug(f"Updated symbol mappings. Total mappings: {len(self.symbol_mappings)}")
+        with self.lock:
+            if symbol_mappings:
+                self.symbol_mappings.update(symbol_mappings)
+                self.logger.debug(f"Updated symbol mappings. Total mappings: {len(self.symbol_mappings)}")
+            self.subscribed_tokens.update(dict.fromkeys(hsm_symbols))
         
-        # Create and send subscription message
-        sub_msg = self._create_subscription_message(hsm_symbols, channel=11)
-        self.ws.send(sub_msg, opcode=websocket.ABNF.OPCODE_BINARY)
+        if not self.authenticated:
+            # Sent with the other tokens once the reconnect authenticates
+            self.logger.debug(f"HSM reconnecting - queued {len(hsm_symbols)} tokens")
+            return
         
-        #self.logger.info(f"\n✅ Sent subscription request for {len(hsm_symbols)} HSM symbols")
-        for i, symbol in enumerate(hsm_symbols, 1):
-            mapped_symbol = symbol_mappings.get(symbol, 'Unknown') if symbol_mappings else 'N/A'
-            #self.logger.info(f"  {i}. {symbol} => {mapped_symbol}")
-        self.logger.debug(f"Total active subscriptions in HSM: {len(hsm_symbols)}")
+        self._send_subscriptions(hsm_symbols)
+        self.logger.debug(f"Total active subscriptions in HSM: {len(self.subscribed_tokens)}")
+    
+    def _send_subscriptions(self, hsm_symbols: List[str]) -> int:
+        """
+        Send subscription messages, one per SUBSCRIBE_BATCH_SIZE tokens
+        
+        Returns:
+            Number of frames sent
+        """
+        frames = 0
+        for start in range(0, len(hsm_symbols), self.SUBSCRIBE_BATCH_SIZE):
+            batch = hsm_symbols[start:start + self.SUBSCRIBE_BATCH_SIZE]
+            sub_msg = self._create_subscription_message(batch, channel=11)
+            self.ws.send(sub_msg, opcode=websocket.ABNF.OPCODE_BINARY)
+            frames += 1
+        return frames
     
     def is_connected(self) -> bool:
         """Check if connected and authenticated"""
@@ -848,6 +930,7 @@ class FyersHSMWebSocket:
         try:
             # Force stop all operations
             self.running = False
+            self.reconnect_enabled = False
             self.connected = False
             self.authenticated = False
             
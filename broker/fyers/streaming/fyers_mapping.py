@@ -4,7 +4,7 @@ Maps Fyers HSM data to OpenAlgo format for compatibility
 """
 
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable
 from datetime import datetime
 import logging
 
@@ -291,17 +291,16 @@ class FyersDataMapper:
             buy_levels = tbt_depth.get('buy', [])
             sell_levels = tbt_depth.get('sell', [])
 
-            # Calculate LTP from best bid/ask
+            # Calculate LTP from best bid/ask (diff updates carry the touch separately)
             ltp = 0
-            if buy_levels and sell_levels:
-                best_bid = buy_levels[0]['price'] if buy_levels else 0
-                best_ask = sell_levels[0]['price'] if sell_levels else 0
-                if best_bid > 0 and best_ask > 0:
-                    ltp = (best_bid + best_ask) / 2
-                elif best_bid > 0:
-                    ltp = best_bid
-                elif best_ask > 0:
-                    ltp = best_ask
+            best_bid = tbt_depth.get('best_bid', buy_levels[0]['price'] if buy_levels else 0)
+            best_ask = tbt_depth.get('best_ask', sell_levels[0]['price'] if sell_levels else 0)
+            if best_bid > 0 and best_ask > 0:
+                ltp = (best_bid + best_ask) / 2
+            elif best_bid > 0:
+                ltp = best_bid
+            elif best_ask > 0:
+                ltp = best_ask
 
             # Map to OpenAlgo Depth format
             openalgo_data = {
@@ -319,6 +318,7 @@ class FyersDataMapper:
                 "feed_time": tbt_depth.get('feed_time', 0),
                 "data_type": "Depth",
                 "depth_levels": tbt_depth.get('levels', 50),
+                "depth_update": tbt_depth.get('depth_update', 'full'),
                 "is_50_depth": True
             }
 
@@ -458,6 +458,198 @@ class FyersDataMapper:
         
         return None
     
+    # (price, size, orders) field names of the five HSM depth levels
+    BID_LEVEL_FIELDS = [(f"bid_price{i}", f"bid_size{i}", f"bid_order{i}") for i in range(1, 6)]
+    ASK_LEVEL_FIELDS = [(f"ask_price{i}", f"ask_size{i}", f"ask_order{i}") for i in range(1, 6)]
+    MAX_DEPTH_LEVELS = 5  # HSM depth feed
+    
+    @classmethod
+    def cap_depth_level(cls, depth_level) -> int:
+        """Depth levels the HSM feed can publish for a requested depth_level (1 = top of book)"""
+        try:
+            depth_level = int(depth_level)
+        except (TypeError, ValueError):
+            return cls.MAX_DEPTH_LEVELS
+        if depth_level <= 0:
+            return cls.MAX_DEPTH_LEVELS
+        return min(depth_level, cls.MAX_DEPTH_LEVELS)
+    
+    def build_mapper(self, requested_type: str, hsm_token: str,
+                     depth_level: int = MAX_DEPTH_LEVELS) -> Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Build a mapping function specialized for one subscription
+        
+        Everything fixed for a subscription (data type, index or not, price
+        divisor, depth levels) is decided here once, so the returned function
+        only converts the fields its mode publishes:
+            LTP   - ltp and last traded time; live updates that did not change
+                    the ltp are skipped
+            Quote - ltp, OHLC, bid/ask, volume, OI and circuit limits
+            Depth - the best depth_level bid/ask levels (synthetic levels from
+                    the ltp for an index); live updates that did not touch them
+                    are skipped.
+                    depth_level 1 publishes top of book instead: best bid/ask and
+                    their sizes as flat fields, an LTP-sized message
+        
+        Symbol and exchange are left to the caller, which knows the subscription.
+        
+        Args:
+            requested_type: "LTP", "Quote" or "Depth"
+            hsm_token: HSM token of the subscription, e.g. "sf|nse_cm|2885"
+            depth_level: Depth levels to publish (Depth only, capped at 5)
+            
+        Returns:
+            Function mapping raw HSM data to OpenAlgo format, or returning None
+            when there is nothing to publish
+        """
+        is_index = hsm_token.startswith("if|")
+        # NSE, BSE and MCX prices arrive in paise; index values are not scaled
+        divisor = 1 if is_index else 100
+        
+        def convert(value, multiplier, precision):
+            if not value or multiplier <= 0:
+                return 0.0
+            return round(value / multiplier / divisor, precision)
+        
+        if requested_type == "LTP":
+            def map_ltp(fyers_data):
+                changed_fields = fyers_data.get("changed_fields")
+                if changed_fields is not None and "ltp" not in changed_fields:
+                    return None
+                return {
+                    "token": fyers_data.get("exchange_token", ""),
+                    "ltp": convert(fyers_data.get("ltp", 0), fyers_data.get("multiplier", 100),
+                                   fyers_data.get("precision", 2)),
+                    "last_traded_time": fyers_data.get("last_traded_time", 0),
+                    "timestamp": int(time.time()),
+                    "data_type": "LTP"
+                }
+            return map_ltp
+        
+        if requested_type == "Depth":
+            levels = self.cap_depth_level(depth_level)
+
+            if is_index:
+                synthetic_depth = self.map_index_to_synthetic_depth
+
+                # Synthetic levels are built from the ltp alone
+                def map_index_depth(fyers_data):
+                    changed_fields = fyers_data.get("changed_fields")
+                    if changed_fields is not None and "ltp" not in changed_fields:
+                        return None
+                    depth = synthetic_depth(fyers_data)
+                    if depth is None:
+                        return None
+                    buy_levels, sell_levels = depth["depth"]["buy"], depth["depth"]["sell"]
+                    if levels == 1:
+                        return {
+                            "token": depth["token"],
+                            "ltp": depth["ltp"],
+                            "bid_price": buy_levels[0]["price"],
+                            "bid_size": buy_levels[0]["quantity"],
+                            "ask_price": sell_levels[0]["price"],
+                            "ask_size": sell_levels[0]["quantity"],
+                            "timestamp": depth["timestamp"],
+                            "data_type": "TopOfBook"
+                        }
+                    depth["depth"] = {"buy": buy_levels[:levels], "sell": sell_levels[:levels]}
+                    return depth
+                return map_index_depth
+
+            bid_fields, ask_fields = self.BID_LEVEL_FIELDS[:levels], self.ASK_LEVEL_FIELDS[:levels]
+            published_fields = frozenset(field for level in bid_fields + ask_fields for field in level)
+            
+            if levels == 1:
+                (bid_price, bid_size, _), = bid_fields
+                (ask_price, ask_size, _), = ask_fields
+                
+                def map_top_of_book(fyers_data):
+                    changed_fields = fyers_data.get("changed_fields")
+                    if changed_fields is not None and published_fields.isdisjoint(changed_fields):
+                        return None
+                    get = fyers_data.get
+                    multiplier = get("multiplier", 100)
+                    precision = get("precision", 2)
+                    bid = convert(get(bid_price, 0), multiplier, precision)
+                    ask = convert(get(ask_price, 0), multiplier, precision)
+                    return {
+                        "token": get("exchange_token", ""),
+                        "ltp": (bid + ask) / 2 if bid > 0 and ask > 0 else 0,
+                        "bid_price": bid,
+                        "bid_size": get(bid_size, 0),
+                        "ask_price": ask,
+                        "ask_size": get(ask_size, 0),
+                        "timestamp": int(time.time()),
+                        "data_type": "TopOfBook"
+                    }
+                return map_top_of_book
+            
+            def map_depth(fyers_data):
+                changed_fields = fyers_data.get("changed_fields")
+                if changed_fields is not None and published_fields.isdisjoint(changed_fields):
+                    return None
+                get = fyers_data.get
+                multiplier = get("multiplier", 100)
+                precision = get("precision", 2)
+                buy_levels = []
+                sell_levels = []
+                for price_field, size_field, order_field in bid_fields:
+                    price = convert(get(price_field, 0), multiplier, precision)
+                    if price > 0:
+                        buy_levels.append({"price": price, "quantity": get(size_field, 0),
+                                           "orders": get(order_field, 0)})
+                for price_field, size_field, order_field in ask_fields:
+                    price = convert(get(price_field, 0), multiplier, precision)
+                    if price > 0:
+                        sell_levels.append({"price": price, "quantity": get(size_field, 0),
+                                            "orders": get(order_field, 0)})
+                
+                # LTP is the mid of best bid and ask, as in map_to_openalgo_depth
+                ltp = 0
+                if buy_levels and sell_levels:
+                    ltp = (buy_levels[0]["price"] + sell_levels[0]["price"]) / 2
+                
+                return {
+                    "token": get("exchange_token", ""),
+                    "ltp": ltp,
+                    "depth": {"buy": buy_levels, "sell": sell_levels},
+                    "timestamp": int(time.time()),
+                    "data_type": "Depth"
+                }
+            return map_depth
+        
+        def map_quote(fyers_data):
+            get = fyers_data.get
+            multiplier = get("multiplier", 100)
+            precision = get("precision", 2)
+            return {
+                "token": get("exchange_token", ""),
+                "ltp": convert(get("ltp", 0), multiplier, precision),
+                "open": convert(get("open_price", 0), multiplier, precision),
+                "high": convert(get("high_price", 0), multiplier, precision),
+                "low": convert(get("low_price", 0), multiplier, precision),
+                "close": convert(get("prev_close_price", 0), multiplier, precision),
+                "bid_price": convert(get("bid_price", 0), multiplier, precision),
+                "ask_price": convert(get("ask_price", 0), multiplier, precision),
+                "bid_size": get("bid_size", 0),
+                "ask_size": get("ask_size", 0),
+                "volume": get("vol_traded_today", 0),
+                "oi": get("OI", 0),
+                "upper_circuit": convert(get("upper_ckt", 0), multiplier, precision),
+                "lower_circuit": convert(get("lower_ckt", 0), multiplier, precision),
+                "last_traded_time": get("last_traded_time", 0),
+                "exchange_time": get("exch_feed_time", 0),
+                "avg_trade_price": convert(get("avg_trade_price", 0), multiplier, precision),
+                "last_trade_quantity": get("last_traded_qty", 0),
+                "total_buy_quantity": get("tot_buy_qty", 0),
+                "total_sell_quantity": get("tot_sell_qty", 0),
+                "change": convert(get("ch", 0), multiplier, precision),
+                "change_percent": get("chp", 0),
+                "timestamp": int(time.time()),
+                "data_type": "Quote"
+            }
+        return map_quote
+    
     def extract_symbol_info(self, symbol: str) -> Dict[str, str]:
         """
         Extract exchange and symbol from OpenAlgo format
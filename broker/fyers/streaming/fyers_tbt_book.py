@@ -0,0 +1,199 @@
+"""
+Fyers TBT 50-Level Order Book
+Array-backed, incrementally updated order book for one TBT ticker
+
+Each side keeps its 50 levels in preallocated arrays (prices in paise,
+quantities, order counts) that snapshot and diff packets update in place. A
+per-side bitmask records which levels changed since the book was last
+published, so the adapter can send only the changed levels (diff), a top-N
+slice, or the full book without rebuilding dicts for levels nobody reads.
+"""
+
+import threading
+from array import array
+from typing import Any, Dict, List
+
+MAX_LEVELS = 50
+PRICE_DIVISOR = 100  # TBT prices are in paise
+
+# Publish modes (FYERS_TBT_PUBLISH_MODE)
+PUBLISH_FULL = "full"  # every non-empty level on every publish
+PUBLISH_DIFF = "diff"  # only the levels that changed since the last publish
+PUBLISH_TOP = "top"    # the best N levels, only when one of them changed
+PUBLISH_MODES = (PUBLISH_FULL, PUBLISH_DIFF, PUBLISH_TOP)
+
+
+class TbtBookSide:
+    """One side (bids or asks) of the book: parallel arrays indexed by level"""
+
+    __slots__ = ("prices", "quantities", "orders", "dirty")
+
+    def __init__(self):
+        self.prices = array("q", bytes(8 * MAX_LEVELS))
+        self.quantities = array("q", bytes(8 * MAX_LEVELS))
+        self.orders = array("q", bytes(8 * MAX_LEVELS))
+        self.dirty = 0  # bit i set = level i changed since the last publish
+
+    def apply(self, levels) -> None:
+        """
+        Apply protobuf MarketLevel entries positionally.
+        A missing or zero field means "no change" for that level.
+        """
+        prices, quantities, orders = self.prices, self.quantities, self.orders
+        dirty = self.dirty
+        for i, level in enumerate(levels):
+            if i >= MAX_LEVELS:
+                break
+            if level.HasField('price'):
+                value = level.price.value
+                if value > 0 and prices[i] != value:
+                    prices[i] = value
+                    dirty |= 1 << i
+            if level.HasField('qty'):
+                value = level.qty.value
+                if value > 0 and quantities[i] != value:
+                    quantities[i] = value
+                    dirty |= 1 << i
+            if level.HasField('nord'):
+                value = level.nord.value
+                if value > 0 and orders[i] != value:
+                    orders[i] = value
+                    dirty |= 1 << i
+        self.dirty = dirty
+
+    def level(self, i: int) -> Dict[str, Any]:
+        """Level i in the OpenAlgo depth format"""
+        return {
+            'price': self.prices[i] / PRICE_DIVISOR,
+            'quantity': self.quantities[i],
+            'orders': self.orders[i],
+        }
+
+    def filled(self, limit: int = MAX_LEVELS) -> List[Dict[str, Any]]:
+        """Non-empty levels among the best `limit`"""
+        quantities, orders = self.quantities, self.orders
+        return [
+            {'price': price / PRICE_DIVISOR, 'quantity': quantities[i], 'orders': orders[i]}
+            for i, price in enumerate(self.prices[:limit]) if price > 0
+        ]
+
+    def changed(self) -> List[Dict[str, Any]]:
+        """Changed levels since the last publish, each tagged with its level index"""
+        levels = []
+        dirty = self.dirty
+        i = 0
+        while dirty:
+            if dirty & 1:
+                level = self.level(i)
+                level['level'] = i
+                levels.append(level)
+            dirty >>= 1
+            i += 1
+        return levels
+
+
+class TbtOrderBook:
+    """
+    50-level book for one ticker, updated in place from TBT depth packets.
+
+    The TBT reader thread applies packets and the adapter (inline or from its
+    publish thread) reads them, so both go through `lock`.
+    """
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+        self.lock = threading.Lock()
+        self.bids = TbtBookSide()
+        self.asks = TbtBookSide()
+        self.total_buy_qty = 0
+        self.total_sell_qty = 0
+        self.feed_time = 0
+        self.send_time = 0
+        self.totals_dirty = False
+        self.snapshot = False
+        # Next publish must carry the whole book (first publish, or after a snapshot)
+        self.needs_full = True
+        self.updates = 0
+
+    def apply(self, market_feed, is_snapshot: bool) -> None:
+        """Apply one MarketFeed packet (caller holds `lock`)"""
+        depth = market_feed.depth
+        if depth.bids:
+            self.bids.apply(depth.bids)
+        if depth.asks:
+            self.asks.apply(depth.asks)
+        if depth.HasField('tbq') and depth.tbq.value != self.total_buy_qty:
+            self.total_buy_qty = depth.tbq.value
+            self.totals_dirty = True
+        if depth.HasField('tsq') and depth.tsq.value != self.total_sell_qty:
+            self.total_sell_qty = depth.tsq.value
+            self.totals_dirty = True
+        self.feed_time = market_feed.feed_time.value if market_feed.HasField('feed_time') else 0
+        self.send_time = market_feed.send_time.value if market_feed.HasField('send_time') else 0
+        self.snapshot = is_snapshot
+        if is_snapshot:
+            self.needs_full = True
+        self.updates += 1
+
+    @property
+    def dirty(self) -> bool:
+        """True if any level or total changed since the last publish"""
+        return bool(self.bids.dirty or self.asks.dirty or self.totals_dirty)
+
+    def _depth(self, buy: List[Dict], sell: List[Dict], update: str, levels: int) -> Dict[str, Any]:
+        return {
+            'buy': buy,
+            'sell': sell,
+            'total_buy_qty': self.total_buy_qty,
+            'total_sell_qty': self.total_sell_qty,
+            'snapshot': self.snapshot,
+            'feed_time': self.feed_time,
+            'send_time': self.send_time,
+            'levels': levels,
+            'depth_update': update,
+            # Diff payloads may not carry level 0, so the touch is sent separately
+            'best_bid': self.bids.prices[0] / PRICE_DIVISOR,
+            'best_ask': self.asks.prices[0] / PRICE_DIVISOR,
+        }
+
+    def to_depth(self) -> Dict[str, Any]:
+        """Full book, non-empty levels only (the previous TBT callback format)"""
+        buy = self.bids.filled()
+        sell = self.asks.filled()
+        return self._depth(buy, sell, PUBLISH_FULL, max(len(buy), len(sell)))
+
+    def take_update(self, publish_mode: str = PUBLISH_FULL, top_levels: int = MAX_LEVELS):
+        """
+        Build the next payload for `publish_mode` and mark the book as published
+        (caller holds `lock`).
+
+        Returns:
+            Depth dict for FyersDataMapper.map_tbt_depth_to_openalgo, or None when
+            nothing the mode publishes has changed
+        """
+        if publish_mode == PUBLISH_DIFF:
+            if self.needs_full:
+                depth = self.to_depth()
+            elif self.dirty:
+                depth = self._depth(self.bids.changed(), self.asks.changed(), PUBLISH_DIFF, MAX_LEVELS)
+            else:
+                return None
+        elif publish_mode == PUBLISH_TOP:
+            mask = (1 << top_levels) - 1
+            if not self.needs_full and not (self.bids.dirty & mask or self.asks.dirty & mask):
+                # Only levels below the published slice (or the totals) moved
+                self.bids.dirty = self.asks.dirty = 0
+                self.totals_dirty = False
+                return None
+            buy = self.bids.filled(top_levels)
+            sell = self.asks.filled(top_levels)
+            depth = self._depth(buy, sell, PUBLISH_TOP, max(len(buy), len(sell)))
+        else:
+            if not self.dirty and not self.needs_full:
+                return None
+            depth = self.to_depth()
+
+        self.bids.dirty = self.asks.dirty = 0
+        self.totals_dirty = False
+        self.needs_full = False
+        return depth
@@ -11,6 +11,8 @@ import websocket
 import requests
 from typing import Dict, List, Any, Optional, Callable, Set
 
+from .fyers_tbt_book import TbtOrderBook
+
 # Import protobuf message definitions (local copy)
 try:
     from . import msg_pb2 as protomsg
@@ -27,13 +29,14 @@ class FyersTbtWebSocket:
     # Default TBT WebSocket URL
     DEFAULT_TBT_URL = "wss://rtsocket-api.fyers.in/versova"
 
-    def __init__(self, access_token: str, log_path: str = ""):
+    def __init__(self, access_token: str, log_path: str = "", ws_url: Optional[str] = None):
         """
         Initialize TBT WebSocket client
 
         Args:
             access_token: Fyers access token (format: APPID:SECRET)
             log_path: Path for log files
+            ws_url: WebSocket URL, looked up from the Fyers API when not given
         """
         self.access_token = access_token
         self.log_path = log_path
@@ -51,13 +54,15 @@ class FyersTbtWebSocket:
         self.active_channels: Set[str] = set()
 
         # Depth data storage (50 levels) - maintains cumulative state
-        self.depth_data: Dict[str, Dict] = {}  # ticker -> cumulative depth data
+        self.depth_data: Dict[str, TbtOrderBook] = {}  # ticker -> order book
 
         # Callbacks
         self.on_depth_update: Optional[Callable] = None
         self.on_error: Optional[Callable] = None
         self.on_open: Optional[Callable] = None
         self.on_close: Optional[Callable] = None
+        # Called with every raw frame before parsing (feed capture)
+        self.raw_frame_hook: Optional[Callable] = None
 
         # Reconnection settings
         self.reconnect_enabled = True
@@ -66,7 +71,7 @@ class FyersTbtWebSocket:
         self.reconnect_delay = 0
 
         # Get WebSocket URL
-        self.ws_url = self._get_tbt_url()
+        self.ws_url = ws_url or self._get_tbt_url()
 
     def _get_tbt_url(self) -> str:
         """Get TBT WebSocket URL from Fyers API"""
@@ -247,6 +252,8 @@ class FyersTbtWebSocket:
 
     def _on_message(self, ws, message):
         """Handle incoming WebSocket message"""
+        if self.raw_frame_hook:
+            self.raw_frame_hook(message)
         try:
             # Check message type
             if isinstance(message, str):
@@ -327,19 +334,15 @@ class FyersTbtWebSocket:
                     self.logger.debug(f"No depth data for ticker: {ticker} (token: {token})")
                     continue
 
-                # Extract depth data (stateful - accumulates updates)
-                depth_data = self._extract_depth(ticker, market_feed, socket_msg.snapshot)
-
-                # Log extraction results
-                buy_count = len(depth_data.get('buy', []))
-                sell_count = len(depth_data.get('sell', []))
-                self.logger.debug(f"TBT depth for {ticker}: {buy_count} buy, {sell_count} sell levels (snapshot={socket_msg.snapshot})")
+                # Update the ticker's order book in place (stateful - accumulates updates)
+                book = self._update_book(ticker, market_feed, socket_msg.snapshot)
+                self.logger.debug(f"TBT depth for {ticker}: update {book.updates} (snapshot={socket_msg.snapshot})")
 
                 # Invoke callback with the ticker symbol
                 if self.on_depth_update:
                     try:
                         self.logger.debug(f"Invoking depth callback for {ticker}")
-                        self.on_depth_update(ticker, depth_data)
+                        self.on_depth_update(ticker, book)
                     except Exception as e:
                         self.logger.error(f"Error in depth callback for {ticker}: {e}", exc_info=True)
                 else:
@@ -348,9 +351,9 @@ class FyersTbtWebSocket:
         except Exception as e:
             self.logger.error(f"Error processing depth message: {e}", exc_info=True)
 
-    def _extract_depth(self, ticker: str, market_feed, is_snapshot: bool) -> Dict[str, Any]:
+    def _update_book(self, ticker: str, market_feed, is_snapshot: bool) -> TbtOrderBook:
         """
-        Extract 50-level depth data from market feed with stateful updates
+        Apply a snapshot or diff packet to the ticker's 50-level order book
 
         Args:
             ticker: Symbol ticker for state tracking
@@ -358,76 +361,15 @@ class FyersTbtWebSocket:
             is_snapshot: Whether this is a snapshot or diff
 
         Returns:
-            Depth data dictionary with cumulative state
+            The ticker's TbtOrderBook, with changed levels marked
         """
-        depth = market_feed.depth
-
-        # Initialize state for this ticker if not exists
-        if ticker not in self.depth_data:
-            self.depth_data[ticker] = {
-                'buy': [{'price': 0, 'quantity': 0, 'orders': 0} for _ in range(50)],
-                'sell': [{'price': 0, 'quantity': 0, 'orders': 0} for _ in range(50)],
-                'total_buy_qty': 0,
-                'total_sell_qty': 0
-            }
+        book = self.depth_data.get(ticker)
+        if book is None:
+            book = self.depth_data[ticker] = TbtOrderBook(ticker)
 
-        state = self.depth_data[ticker]
-
-        # Process bids - update state at specific indices
-        # Only update if the value is non-zero (0 means "no change" or "empty")
-        if depth.bids:
-            for i, bid in enumerate(depth.bids):
-                if i >= 50:
-                    break
-                # Update price only if present and non-zero
-                if bid.HasField('price') and bid.price.value > 0:
-                    state['buy'][i]['price'] = bid.price.value / 100
-                if bid.HasField('qty') and bid.qty.value > 0:
-                    state['buy'][i]['quantity'] = bid.qty.value
-                if bid.HasField('nord') and bid.nord.value > 0:
-                    state['buy'][i]['orders'] = bid.nord.value
-
-        # Process asks - update state at specific indices
-        if depth.asks:
-            for i, ask in enumerate(depth.asks):
-                if i >= 50:
-                    break
-                # Update price only if present and non-zero
-                if ask.HasField('price') and ask.price.value > 0:
-                    state['sell'][i]['price'] = ask.price.value / 100
-                if ask.HasField('qty') and ask.qty.value > 0:
-                    state['sell'][i]['quantity'] = ask.qty.value
-                if ask.HasField('nord') and ask.nord.value > 0:
-                    state['sell'][i]['orders'] = ask.nord.value
-
-        # Update total quantities if present
-        if depth.HasField('tbq'):
-            state['total_buy_qty'] = depth.tbq.value
-        if depth.HasField('tsq'):
-            state['total_sell_qty'] = depth.tsq.value
-
-        # Get timestamps
-        feed_time = market_feed.feed_time.value if market_feed.HasField('feed_time') else 0
-        send_time = market_feed.send_time.value if market_feed.HasField('send_time') else 0
-
-        # Return copy of current state - include all levels with non-zero price
-        # (matching official SDK behavior which maintains all 50 levels)
-        buy_levels = [level.copy() for level in state['buy'] if level['price'] > 0]
-        sell_levels = [level.copy() for level in state['sell'] if level['price'] > 0]
-
-        # Count actual filled levels for logging
-        actual_levels = max(len(buy_levels), len(sell_levels))
-
-        return {
-            'buy': buy_levels,
-            'sell': sell_levels,
-            'total_buy_qty': state['total_buy_qty'],
-            'total_sell_qty': state['total_sell_qty'],
-            'snapshot': is_snapshot,
-            'feed_time': feed_time,
-            'send_time': send_time,
-            'levels': actual_levels
-        }
+        with book.lock:
+            book.apply(market_feed, is_snapshot)
+        return book
 
     def _ping_loop(self):
         """Send periodic ping messages to keep connection alive"""
@@ -499,6 +441,8 @@ class FyersTbtWebSocket:
                 self.subscriptions[channel].difference_update(symbols)
                 if not self.subscriptions[channel]:
                     del self.subscriptions[channel]
+            for symbol in symbols:
+                self.depth_data.pop(symbol, None)
 
             # Send unsubscribe message
             unsubscribe_msg = {
@@ -591,9 +535,13 @@ class FyersTbtWebSocket:
             symbol: Symbol ticker
 
         Returns:
-            Depth data or None
+            Depth data (all non-empty levels) or None
         """
-        return self.depth_data.get(symbol)
+        book = self.depth_data.get(symbol)
+        if book is None:
+            return None
+        with book.lock:
+            return book.to_depth()
 
     def get_subscription_count(self) -> int:
         """Get total number of subscribed symbols"""
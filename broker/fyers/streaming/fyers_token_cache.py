@@ -0,0 +1,227 @@
+"""
+Daily HSM Token Cache for Fyers WebSocket Streaming
+
+Keeps (OpenAlgo symbol, exchange) -> (brsymbol, fytoken) for the whole master
+contract, so FyersTokenConverter can derive HSM topics locally instead of
+looking up brsymbols one at a time and calling the symbol-token REST API on
+every subscribe and resubscribe.
+
+The table is built in bulk, once per trading session, from the symtoken table
+(token column = Fytoken, brsymbol column = Symbol ticker) and written to
+tmp/fyers_hsm_tokens_<session date>.json. A restart during the same session
+reloads that file instead of querying the database again. The session date
+rolls over at SESSION_EXPIRY_TIME (default 03:00 IST), the same boundary at
+which the master contract is downloaded again.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import pytz
+
+CACHE_DIR = 'tmp'
+CACHE_FILE_PREFIX = 'fyers_hsm_tokens_'
+CACHE_VERSION = 1
+
+
+def get_session_date() -> str:
+    """Date of the current trading session (YYYYMMDD, IST), rolling over at SESSION_EXPIRY_TIME"""
+    now_ist = datetime.now(pytz.timezone('Asia/Kolkata'))
+    expiry_time = os.getenv('SESSION_EXPIRY_TIME', '03:00')
+    try:
+        hour, minute = map(int, expiry_time.split(':'))
+    except ValueError:
+        hour, minute = 3, 0
+    session_start = now_ist.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if now_ist < session_start:
+        now_ist -= timedelta(days=1)
+    return now_ist.strftime('%Y%m%d')
+
+
+class FyersHSMTokenCache:
+    """
+    In-memory and on-disk (symbol, exchange) -> (brsymbol, fytoken) table.
+
+    Thread-safe: the table is built under a lock on first use in a session and
+    replaced as a whole, so lookups never see a partially built table.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.logger = logging.getLogger("fyers_token_cache")
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+
+        # exchange -> symbol -> (brsymbol, fytoken)
+        self.entries: Dict[str, Dict[str, Tuple[str, str]]] = {}
+        self.session_date: Optional[str] = None
+        self.source: Optional[str] = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def _cache_path(self, session_date: str) -> str:
+        return os.path.join(self.cache_dir, f"{CACHE_FILE_PREFIX}{session_date}.json")
+
+    def ensure_loaded(self) -> bool:
+        """
+        Make sure the table for the current session is in memory.
+
+        Returns:
+            bool: True if a table is available
+        """
+        session_date = get_session_date()
+        if self.session_date == session_date:
+            return True
+
+        with self._lock:
+            if self.session_date == session_date:
+                return True
+
+            start_time = time.time()
+            entries = self._load_file(session_date)
+            source = 'file'
+            if entries is None:
+                entries = self._build_from_database()
+                source = 'database'
+                if entries:
+                    self._save_file(session_date, entries)
+            if not entries:
+                return False
+
+            self.entries = entries
+            self.session_date = session_date
+            self.source = source
+            self.logger.info(
+                f"HSM token cache ready: {sum(len(e) for e in entries.values())} symbols "
+                f"from {source} in {time.time() - start_time:.2f}s (session {session_date})"
+            )
+            return True
+
+    def lookup(self, symbol: str, exchange: str) -> Optional[Tuple[str, str]]:
+        """
+        Get (brsymbol, fytoken) for an OpenAlgo symbol, or None if not cached
+        """
+        entry = self.entries.get(exchange, {}).get(symbol)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def preload(self, entries):
+        """
+        Install (symbol, exchange, brsymbol, fytoken) rows as this session's table
+        without touching the database or disk (used by feed replay)
+        """
+        with self._lock:
+            for symbol, exchange, brsymbol, fytoken in entries:
+                self.entries.setdefault(exchange, {})[symbol] = (brsymbol, fytoken)
+            self.session_date = get_session_date()
+            self.source = 'preload'
+
+    def clear(self, remove_files: bool = False):
+        """
+        Drop the in-memory table; the next lookup reloads it.
+
+        Args:
+            remove_files: Also delete the on-disk tables, forcing a rebuild from the database
+        """
+        with self._lock:
+            self.entries = {}
+            self.session_date = None
+            self.source = None
+            if remove_files and os.path.isdir(self.cache_dir):
+                for filename in os.listdir(self.cache_dir):
+                    if filename.startswith(CACHE_FILE_PREFIX):
+                        try:
+                            os.remove(os.path.join(self.cache_dir, filename))
+                        except OSError:
+                            pass
+
+    def get_stats(self) -> Dict:
+        """Cache size and hit counters for status reporting"""
+        return {
+            'session_date': self.session_date,
+            'source': self.source,
+            'symbols': sum(len(e) for e in self.entries.values()),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def _build_from_database(self) -> Optional[Dict[str, Dict[str, Tuple[str, str]]]]:
+        """Build the table with a single query over the symtoken table"""
+        try:
+            from database.symbol import db_session, SymToken
+
+            rows = db_session.query(
+                SymToken.symbol, SymToken.exchange, SymToken.brsymbol, SymToken.token
+            ).all()
+        except Exception as e:
+            self.logger.error(f"Could not build HSM token cache from the master contract: {e}")
+            return None
+
+        entries: Dict[str, Dict[str, Tuple[str, str]]] = {}
+        for symbol, exchange, brsymbol, fytoken in rows:
+            if symbol and brsymbol and fytoken:
+                entries.setdefault(exchange, {})[symbol] = (brsymbol, str(fytoken))
+
+        if not entries:
+            self.logger.warning("Master contract is empty - HSM token cache not built")
+        return entries
+
+    def _load_file(self, session_date: str) -> Optional[Dict[str, Dict[str, Tuple[str, str]]]]:
+        """Load this session's table from disk, or None if there is no usable file"""
+        path = self._cache_path(session_date)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            if payload.get('version') != CACHE_VERSION or payload.get('session_date') != session_date:
+                return None
+            return {
+                exchange: {symbol: tuple(entry) for symbol, entry in symbols.items()}
+                for exchange, symbols in payload['entries'].items()
+            }
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.logger.warning(f"Ignoring unreadable HSM token cache {path}: {e}")
+            return None
+
+    def _save_file(self, session_date: str, entries: Dict[str, Dict[str, Tuple[str, str]]]):
+        """Write this session's table atomically and remove files of earlier sessions"""
+        path = self._cache_path(session_date)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'session_date': session_date, 'entries': entries},
+                          f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+
+            current = os.path.basename(path)
+            for filename in os.listdir(self.cache_dir):
+                if filename.startswith(CACHE_FILE_PREFIX) and filename != current:
+                    try:
+                        os.remove(os.path.join(self.cache_dir, filename))
+                    except OSError:
+                        pass
+        except OSError as e:
+            # The in-memory table still works; only warm restarts lose out
+            self.logger.warning(f"Could not write HSM token cache {path}: {e}")
+
+
+# Shared by every FyersTokenConverter in the process
+_cache_instance: Optional[FyersHSMTokenCache] = None
+
+
+def get_hsm_token_cache() -> FyersHSMTokenCache:
+    """Get or create the process-wide HSM token cache"""
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = FyersHSMTokenCache()
+    return _cache_instance
@@ -1,7 +1,8 @@
 """
 Fyers Symbol to HSM Token Converter
 Converts OpenAlgo symbols to Fyers HSM format for WebSocket streaming
-Uses database lookup for brsymbol mapping
+Uses the daily HSM token cache built from the master contract, falling back to
+per-symbol database lookup and the symbol-token API for symbols it does not hold
 """
 
 import requests
@@ -9,6 +10,8 @@ import json
 import logging
 from typing import Dict, List, Tuple, Optional
 
+from .fyers_token_cache import get_hsm_token_cache
+
 # Import database functions
 try:
     from database.token_db import get_br_symbol
@@ -66,6 +69,7 @@ class FyersTokenConverter:
             
         self.symbols_token_api = "https://api-t1.fyers.in/data/symbol-token"
         self.database_available = DATABASE_AVAILABLE
+        self.token_cache = get_hsm_token_cache()
     
     def get_brsymbols_from_database(self, symbol_exchange_pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
         """
@@ -102,13 +106,16 @@ class FyersTokenConverter:
             
         return brsymbol_map
     
-    def convert_openalgo_symbols_to_hsm(self, symbol_info_list: List[Dict], data_type: str = "SymbolUpdate") -> Tuple[List[str], Dict[str, str], List[str]]:
+    def convert_openalgo_symbols_to_hsm(self, symbol_info_list: List[Dict], data_type: str = "SymbolUpdate",
+                                        brsymbol_map: Optional[Dict[Tuple[str, str], str]] = None) -> Tuple[List[str], Dict[str, str], List[str]]:
         """
         Convert OpenAlgo symbols to HSM tokens using database lookup for brsymbols
         
         Args:
             symbol_info_list: List of dicts with 'symbol' and 'exchange' keys
             data_type: Type of data subscription ("SymbolUpdate" or "DepthUpdate")
+            brsymbol_map: Optional dict filled with (symbol, exchange) -> brsymbol, so callers
+                          can map the returned tokens back to OpenAlgo symbols
             
         Returns:
             Tuple of (hsm_tokens, token_to_symbol_mapping, invalid_symbols)
@@ -118,8 +125,19 @@ class FyersTokenConverter:
             symbol_exchange_pairs = [(info['symbol'], info['exchange']) for info in symbol_info_list]
             #self.logger.info(f"Converting OpenAlgo symbols: {symbol_exchange_pairs}")
             
+            # Resolve what we can from the daily cache: no database or network round trips
+            hsm_tokens, token_mappings, symbol_exchange_pairs = self._convert_from_cache(
+                symbol_exchange_pairs, data_type, brsymbol_map
+            )
+            if not symbol_exchange_pairs:
+                return hsm_tokens, token_mappings, []
+            self.logger.debug(f"{len(symbol_exchange_pairs)} symbols not in HSM token cache, resolving individually")
+            
             # Get brsymbols from database using get_br_symbol
-            brsymbol_map = self.get_brsymbols_from_database(symbol_exchange_pairs)
+            found = self.get_brsymbols_from_database(symbol_exchange_pairs)
+            if brsymbol_map is not None:
+                brsymbol_map.update(found)
+            brsymbol_map = found
             
             # Convert only symbols found in database
             brsymbols = []
@@ -140,14 +158,52 @@ class FyersTokenConverter:
             
             # Convert brsymbols to HSM format
             if brsymbols:
-                return self.convert_symbols_to_hsm(brsymbols, data_type)
-            else:
-                return [], {}, invalid_symbols
+                api_tokens, api_mappings, api_invalid = self.convert_symbols_to_hsm(brsymbols, data_type)
+                hsm_tokens.extend(api_tokens)
+                token_mappings.update(api_mappings)
+                invalid_symbols.extend(api_invalid)
+            
+            return hsm_tokens, token_mappings, invalid_symbols
             
         except Exception as e:
             self.logger.error(f"OpenAlgo symbol conversion error: {e}")
             return [], {}, [f"{info['symbol']}@{info['exchange']}" for info in symbol_info_list]
         
+    def _convert_from_cache(self, symbol_exchange_pairs: List[Tuple[str, str]], data_type: str,
+                            brsymbol_map: Optional[Dict[Tuple[str, str], str]]) -> Tuple[List[str], Dict[str, str], List[Tuple[str, str]]]:
+        """
+        Derive HSM tokens locally from the daily (symbol, exchange) -> (brsymbol, fytoken) cache
+        
+        Args:
+            symbol_exchange_pairs: List of (symbol, exchange) tuples
+            data_type: Type of data subscription ("SymbolUpdate" or "DepthUpdate")
+            brsymbol_map: Optional dict filled with (symbol, exchange) -> brsymbol for cache hits
+            
+        Returns:
+            Tuple of (hsm_tokens, token_to_symbol_mapping, pairs_not_resolved)
+        """
+        hsm_tokens = []
+        token_mappings = {}
+        
+        if not self.token_cache.ensure_loaded():
+            return hsm_tokens, token_mappings, symbol_exchange_pairs
+        
+        remaining = []
+        for symbol, exchange in symbol_exchange_pairs:
+            entry = self.token_cache.lookup(symbol, exchange)
+            hsm_token = self._convert_to_hsm_token(entry[0], entry[1], data_type) if entry else None
+            if hsm_token is None:
+                remaining.append((symbol, exchange))
+                continue
+            
+            brsymbol = entry[0]
+            hsm_tokens.append(hsm_token)
+            token_mappings[hsm_token] = brsymbol
+            if brsymbol_map is not None:
+                brsymbol_map[(symbol, exchange)] = brsymbol
+        
+        return hsm_tokens, token_mappings, remaining
+    
     def convert_symbols_to_hsm(self, brsymbols: List[str], data_type: str = "SymbolUpdate") -> Tuple[List[str], Dict[str, str], List[str]]:
         """
         Convert brsymbols to HSM tokens for WebSocket subscription
@@ -4,6 +4,7 @@ Integrates with the OpenAlgo WebSocket proxy system
 """
 
 import json
+import base64
 import threading
 import logging
 import time
@@ -28,11 +29,23 @@ except ImportError:
     from mapping import SymbolMapper
 from database.auth_db import get_auth_token
 from database.token_db import get_br_symbol
+from websocket_proxy.feed_capture import NullTransport
+from websocket_proxy.metrics import feed_reconnects
 
 # Import our HSM implementation
 from .fyers_adapter import FyersAdapter
 from .fyers_tbt_websocket import FyersTbtWebSocket
+from .fyers_tbt_book import MAX_LEVELS, PUBLISH_FULL, PUBLISH_MODES, TbtOrderBook
 from .fyers_mapping import FyersDataMapper
+from .fyers_token_cache import FyersHSMTokenCache
+
+
+def _replay_access_token() -> str:
+    """Unsigned JWT carrying only what the HSM client reads (hsm_key, exp); replay never authenticates"""
+    def b64(obj):
+        return base64.urlsafe_b64encode(json.dumps(obj).encode()).decode().rstrip("=")
+    payload = {"hsm_key": "replay", "exp": int(time.time()) + 86400}
+    return f"REPLAY:{b64({'alg': 'none'})}.{b64(payload)}.sig"
 
 
 class FyersWebSocketAdapter(BaseBrokerWebSocketAdapter):
@@ -62,6 +75,17 @@ class FyersWebSocketAdapter(BaseBrokerWebSocketAdapter):
         self.tbt_symbol_to_ticker = {}  # OpenAlgo symbol -> Fyers ticker
         self.tbt_ticker_to_symbol = {}  # Fyers ticker -> OpenAlgo symbol
 
+        # TBT publish policy: full book, changed levels only, or a top-N slice,
+        # either on every update or at most once per interval per symbol
+        self.tbt_publish_mode = os.getenv('FYERS_TBT_PUBLISH_MODE', PUBLISH_FULL).strip().lower()
+        if self.tbt_publish_mode not in PUBLISH_MODES:
+            self.logger.warning(f"Invalid FYERS_TBT_PUBLISH_MODE '{self.tbt_publish_mode}', using '{PUBLISH_FULL}'")
+            self.tbt_publish_mode = PUBLISH_FULL
+        self.tbt_top_levels = max(1, min(MAX_LEVELS, int(os.getenv('FYERS_TBT_TOP_LEVELS', '20'))))
+        self.tbt_publish_interval = max(0, int(os.getenv('FYERS_TBT_PUBLISH_INTERVAL_MS', '0'))) / 1000
+        self.tbt_publish_thread = None
+        self.tbt_publish_stop = threading.Event()
+
         self.logger.info("Fyers WebSocket Adapter initialized")
     
     def initialize(self, broker_name: str, user_id: str, auth_data: Optional[Dict[str, str]] = None) -> None:
@@ -100,7 +124,8 @@ class FyersWebSocketAdapter(BaseBrokerWebSocketAdapter):
                 raise ValueError("Fyers access token is required")
             
             # Initialize Fyers HSM adapter
-            self.fyers_adapter = FyersAdapter(self.access_token, user_id)
+            self.start_feed_capture(broker_name)
+            self.fyers_adapter = self._create_fyers_adapter()
             
             self.logger.info("Fyers adapter initialized successfully")
             
@@ -108,13 +133,20 @@ class FyersWebSocketAdapter(BaseBrokerWebSocketAdapter):
             self.logger.error(f"Failed to initialize Fyers adapter: {e}")
             raise
     
+    def _create_fyers_adapter(self) -> FyersAdapter:
+        """Create the HSM adapter, handing it the feed capture hook and the reconnect metric"""
+        fyers_adapter = FyersAdapter(self.access_token, self.user_id)
+        fyers_adapter.raw_frame_hook = self.capture_hook('hsm')
+        fyers_adapter.on_reconnect = lambda gap: feed_reconnects.record(self.broker_name, gap)
+        return fyers_adapter
+    
     def connect(self):
         """Establish connection to the Fyers HSM WebSocket"""
         try:
             # Only reinitialize adapter if it doesn't exist
             if not self.fyers_adapter:
                 self.logger.debug("Initializing new Fyers adapter...")
-                self.fyers_adapter = FyersAdapter(self.access_token, self.user_id)
+                self.fyers_adapter = self._create_fyers_adapter()
             else:
                 self.logger.debug("Using existing Fyers adapter instance")
             
@@ -210,73 +242,23 @@ class FyersWebSocketAdapter(BaseBrokerWebSocketAdapter):
             symbol: Symbol to subscribe to
             exchange: Exchange name
             mode: Subscription mode (1=LTP, 2=Quote, 3=Depth)
-            depth_level: Depth level for order book (not used in Fyers)
+            depth_level: Depth levels to publish for mode 3 (HSM depth is capped
+                         at 5, 1 = top of book; "SYMBOL:50" uses TBT instead)
         """
         try:
             # Auto-reconnect if disconnected
-            if not self.connected or not self.fyers_adapter:
-                self.logger.info("Not connected to Fyers - attempting to reconnect...")
-                connect_result = self.connect()
-                if not connect_result or connect_result.get("status") != "success":
-                    self.logger.error("Failed to reconnect to Fyers WebSocket")
-                    return {
-                        "status": "error",
-                        "message": "Failed to reconnect to Fyers WebSocket"
-                    }
-                self.logger.info("Successfully reconnected to Fyers WebSocket")
+            error_response = self._ensure_connected()
+            if error_response:
+                return error_response
             
-            # Ensure adapter is properly connected
-            if self.fyers_adapter and not self.fyers_adapter.connected:
-                self.logger.info("Fyers adapter exists but not connected, reconnecting...")
-                if not self.fyers_adapter.connect():
-                    self.logger.error("Failed to reconnect Fyers adapter")
-                    return {
-                        "status": "error",
-                        "message": "Failed to reconnect Fyers adapter"
-                    }
+            self._capture_subscribe([{"symbol": symbol, "exchange": exchange}], mode, depth_level)
             
             with self.lock:
                 # Convert to OpenAlgo format
                 symbol_info = [{"exchange": exchange, "symbol": symbol}]
                 
                 # Create a unique callback for this specific subscription
-                # Capture the original subscription details
-                original_symbol = symbol
-                original_exchange = exchange
-                original_mode = mode
-                subscription_key = f"{exchange}:{symbol}:{mode}"
-                
-                # Store callback reference for cleanup
-                if not hasattr(self, 'active_callbacks'):
-                    self.active_callbacks = {}
-                
-                def data_callback(data):
-                    """Handle market data and send via ZeroMQ"""
-                    try:
-                        # Check if this subscription is still active
-                        if subscription_key not in self.subscriptions:
-                            # Subscription has been removed, don't process data
-                            # Also remove from active callbacks
-                            if subscription_key in self.active_callbacks:
-                                del self.active_callbacks[subscription_key]
-                            return
-                            
-                        # Data is already properly mapped by FyersAdapter and FyersDataMapper
-                        # Just ensure we have the subscription info for proper topic generation
-                        if data:
-                            # Override with the original subscription details to ensure correct topic
-                            # This fixes the mismatch between NFO subscription and NSE data
-                            data['symbol'] = original_symbol
-                            data['exchange'] = original_exchange
-                            data['subscription_mode'] = original_mode
-                            
-                            # Send via ZeroMQ with the original subscription details
-                            self._send_data(data)
-                    except Exception as e:
-                        self.logger.error(f"Error processing data callback: {e}")
-                
-                # Store the callback
-                self.active_callbacks[subscription_key] = data_callback
+                data_callback = self._create_data_callback(symbol, exchange, mode)
                 
                 # Subscribe based on mode
                 if mode == 1:  # LTP
@@ -301,18 +283,22 @@ class FyersWebSocketAdapter(BaseBrokerWebSocketAdapter):
                     if use_tbt and exchange in self.TBT_SUPPORTED_EXCHANGES:
                         # Use 50-level TBT WebSocket
                         # Pass both actual_symbol (for API) and original_symbol (for topic matching)
-                        success = self._subscribe_tbt_depth(actual_symbol, exchange, data_callback, original_symbol)
+                        success = self._subscribe_tbt_depth(actual_symbol, exchange, data_callback, symbol)
                         if success:
                             self.logger.info(f"Subscribed to 50-level depth (TBT) for {exchange}:{actual_symbol}")
                         else:
                             # Fallback to 5-level depth if TBT unavailable
                             self.logger.warning(f"TBT unavailable, falling back to 5-level depth for {exchange}:{actual_symbol}")
-                            success = self.fyers_adapter.subscribe_depth(symbol_info, data_callback)
+                            use_tbt = False
+                            success = self.fyers_adapter.subscribe_depth(
+                                symbol_info, data_callback, self._depth_level(symbol, exchange, depth_level))
                             if success:
                                 self.logger.info(f"Subscribed to 5-level depth (HSM) for {exchange}:{actual_symbol}")
                     else:
                         # Use 5-level depth (HSM WebSocket)
-                        success = self.fyers_adapter.subscribe_depth(symbol_info, data_callback)
+                        use_tbt = False
+                        success = self.fyers_adapter.subscribe_depth(
+                            symbol_info, data_callback, self._depth_level(symbol, exchange, depth_level))
                         if success:
                             self.logger.info(f"Subscribed to 5-level depth (HSM) for {exchange}:{actual_symbol}")
                 else:
@@ -323,21 +309,11 @@ class FyersWebSocketAdapter(BaseBrokerWebSocketAdapter):
                     }
                 
                 if success:
-                    # Track subscription
-                    key = f"{exchange}:{symbol}:{mode}"
-                    self.subscriptions[key] = {
-                        "symbol": symbol,
-                        "exchange": exchange,
-                        "mode": mode,
-                        "subscribed_at": time.time()
-                    }
-                    
-                    self.logger.debug(f"Subscribed to {exchange}:{symbol} (mode: {mode})")
-                    return {
-                        "status": "success",
-                        "message": f"Subscribed to {exchange}:{symbol}",
-                        "mode": mode
-                    }
+                    if mode == 3:
+                        return self._track_subscription(
+                            symbol, exchange, mode,
+                            50 if use_tbt else self._depth_level(symbol, exchange, depth_level))
+                    return self._track_subscription(symbol, exchange, mode)
                 else:
                     self.logger.error(f"Failed to subscribe to {exchange}:{symbol}")
                     return {
@@ -385,32 +361,13 @@ class FyersWebSocketAdapter(BaseBrokerWebSocketAdapter):
                     
                     # If no more subscriptions, disconnect completely to stop background data
                     # This is needed for Fyers HSM which doesn't support selective unsubscription
-                    if len(self.subscriptions) == 0:
-                        self.logger.debug("No active subscriptions remaining - disconnecting from Fyers to stop all background data")
-                        
-                        # Disconnect from Fyers WebSocket but keep adapter instance and mappings
-                        try:
-                            if self.fyers_adapter:
-                                # Disconnect without clearing mappings for potential reuse
-                                self.fyers_adapter.disconnect(clear_mappings=False)
-                                # Don't set to None - keep the adapter instance for reuse
-                                # self.fyers_adapter = None
-                            self.connected = False
-                            
-                            # Clear all callbacks
-                            if hasattr(self, 'active_callbacks'):
-                                self.active_callbacks.clear()
-                            
-                            self.logger.info("Disconnected from Fyers HSM WebSocket - all background data stopped")
-                            
-                            return {
-                                "status": "success",
-                                "message": f"Unsubscribed from {exchange}:{symbol} and disconnected (no active subscriptions)",
-                                "disconnected": True,
-                                "active_subscriptions": 0
-                            }
-                        except Exception as e:
-                            self.logger.error(f"Error disconnecting from Fyers: {e}")
+                    if len(self.subscriptions) == 0 and self._disconnect_when_idle():
+                        return {
+                            "status": "success",
+                            "message": f"Unsubscribed from {exchange}:{symbol} and disconnected (no active subscriptions)",
+                            "disconnected": True,
+                            "active_subscriptions": 0
+                        }
                     
                     return {
                         "status": "success",
@@ -431,6 +388,276 @@ class FyersWebSocketAdapter(BaseBrokerWebSocketAdapter):
                 "message": f"Unsubscription failed: {str(e)}"
             }
 
+    def _ensure_connected(self) -> Optional[Dict[str, Any]]:
+        """
+        Reconnect to Fyers if the connection was dropped
+        
+        Returns:
+            None when connected, otherwise an error response
+        """
+        if not self.connected or not self.fyers_adapter:
+            self.logger.info("Not connected to Fyers - attempting to reconnect...")
+            connect_result = self.connect()
+            if not connect_result or connect_result.get("status") != "success":
+                self.logger.error("Failed to reconnect to Fyers WebSocket")
+                return {
+                    "status": "error",
+                    "message": "Failed to reconnect to Fyers WebSocket"
+                }
+            self.logger.info("Successfully reconnected to Fyers WebSocket")
+        
+        # Ensure adapter is properly connected
+        if self.fyers_adapter and not self.fyers_adapter.connected:
+            self.logger.info("Fyers adapter exists but not connected, reconnecting...")
+            if not self.fyers_adapter.connect():
+                self.logger.error("Failed to reconnect Fyers adapter")
+                return {
+                    "status": "error",
+                    "message": "Failed to reconnect Fyers adapter"
+                }
+        return None
+    
+    def _create_data_callback(self, symbol: str, exchange: str, mode: int):
+        """
+        Create and register the data callback for one subscription
+        
+        The callback captures the original subscription details so the
+        published topic matches what the client subscribed to.
+        """
+        original_symbol = symbol
+        original_exchange = exchange
+        original_mode = mode
+        subscription_key = f"{exchange}:{symbol}:{mode}"
+        
+        # Store callback reference for cleanup
+        if not hasattr(self, 'active_callbacks'):
+            self.active_callbacks = {}
+        
+        def data_callback(data):
+            """Handle market data and send via ZeroMQ"""
+            try:
+                # Check if this subscription is still active
+                if subscription_key not in self.subscriptions:
+                    # Subscription has been removed, don't process data
+                    # Also remove from active callbacks
+                    if subscription_key in self.active_callbacks:
+                        del self.active_callbacks[subscription_key]
+                    return
+                    
+                # Data is already properly mapped by FyersAdapter and FyersDataMapper
+                # Just ensure we have the subscription info for proper topic generation
+                if data:
+                    # Override with the original subscription details to ensure correct topic
+                    # This fixes the mismatch between NFO subscription and NSE data
+                    data['symbol'] = original_symbol
+                    data['exchange'] = original_exchange
+                    data['subscription_mode'] = original_mode
+                    
+                    # Send via ZeroMQ with the original subscription details
+                    self._send_data(data)
+            except Exception as e:
+                self.logger.error(f"Error processing data callback: {e}")
+        
+        # Store the callback
+        self.active_callbacks[subscription_key] = data_callback
+        return data_callback
+    
+    def _depth_level(self, symbol: str, exchange: str, depth_level: int) -> int:
+        """
+        Depth levels to publish for an HSM depth subscription
+        
+        The proxy shares one ZeroMQ topic per symbol and mode, so a symbol
+        already published with more levels keeps them: the deepest request wins.
+        """
+        levels = FyersDataMapper.cap_depth_level(depth_level)
+        existing = self.subscriptions.get(f"{exchange}:{symbol}:3")
+        if existing:
+            levels = max(levels, existing.get("depth_level", levels))
+        return levels
+    
+    def _track_subscription(self, symbol: str, exchange: str, mode: int,
+                            depth_level: Optional[int] = None) -> Dict[str, Any]:
+        """Record a successful subscription and build its response"""
+        key = f"{exchange}:{symbol}:{mode}"
+        self.subscriptions[key] = {
+            "symbol": symbol,
+            "exchange": exchange,
+            "mode": mode,
+            "subscribed_at": time.time()
+        }
+        response = {
+            "status": "success",
+            "message": f"Subscribed to {exchange}:{symbol}",
+            "mode": mode
+        }
+        if depth_level is not None:
+            self.subscriptions[key]["depth_level"] = depth_level
+            response["actual_depth"] = depth_level
+        
+        self.logger.debug(f"Subscribed to {exchange}:{symbol} (mode: {mode})")
+        return response
+    
+    def _disconnect_when_idle(self) -> bool:
+        """
+        Disconnect from Fyers HSM once no subscriptions remain, keeping the
+        adapter instance and token mappings for reuse
+        
+        Returns:
+            True if the HSM connection was closed
+        """
+        self.logger.debug("No active subscriptions remaining - disconnecting from Fyers to stop all background data")
+        
+        # Disconnect from Fyers WebSocket but keep adapter instance and mappings
+        try:
+            if self.fyers_adapter:
+                # Disconnect without clearing mappings for potential reuse
+                self.fyers_adapter.disconnect(clear_mappings=False)
+            self.connected = False
+            
+            # Clear all callbacks
+            if hasattr(self, 'active_callbacks'):
+                self.active_callbacks.clear()
+            
+            self.logger.info("Disconnected from Fyers HSM WebSocket - all background data stopped")
+            return True
+        except Exception as e:
+            self.logger.error(f"Error disconnecting from Fyers: {e}")
+            return False
+    
+    def subscribe_many(self, symbols, mode: int = 2, depth_level: int = 5):
+        """
+        Subscribe to many symbols with one token conversion and batched HSM frames
+        
+        Args:
+            symbols: List of dicts with 'symbol' and 'exchange' keys
+            mode: Subscription mode (1=LTP, 2=Quote, 3=Depth)
+            depth_level: Depth levels to publish for mode 3 (HSM depth is capped
+                         at 5, 1 = top of book; "SYMBOL:50" uses TBT instead)
+            
+        Returns:
+            list: One response per symbol, in request order
+        """
+        if mode not in (1, 2, 3):
+            self.logger.error(f"Unsupported subscription mode: {mode}")
+            return [{"status": "error", "message": f"Unsupported subscription mode: {mode}"} for _ in symbols]
+        
+        try:
+            # Auto-reconnect if disconnected
+            error_response = self._ensure_connected()
+            if error_response:
+                return [dict(error_response) for _ in symbols]
+            
+            self._capture_subscribe(symbols, mode, depth_level)
+            
+            responses = [None] * len(symbols)
+            with self.lock:
+                # (response index, symbol, exchange, symbol sent to HSM)
+                hsm_batch = []
+                callbacks = {}
+                depth_levels = {}  # "EXCHANGE:SYMBOL" -> HSM depth levels (mode 3)
+                
+                for i, item in enumerate(symbols):
+                    symbol = item.get("symbol")
+                    exchange = item.get("exchange")
+                    if not symbol or not exchange:
+                        responses[i] = {"status": "error", "message": "Symbol and exchange are required"}
+                        continue
+                    
+                    data_callback = self._create_data_callback(symbol, exchange, mode)
+                    
+                    # 50-level depth ("TCS:50") goes through TBT one symbol at a time
+                    actual_symbol = symbol
+                    if mode == 3 and symbol.endswith(":50"):
+                        actual_symbol = symbol[:-3]
+                        if exchange in self.TBT_SUPPORTED_EXCHANGES:
+                            if self._subscribe_tbt_depth(actual_symbol, exchange, data_callback, symbol):
+                                responses[i] = self._track_subscription(symbol, exchange, mode, 50)
+                                continue
+                            self.logger.warning(f"TBT unavailable, falling back to 5-level depth for {exchange}:{actual_symbol}")
+                    
+                    hsm_batch.append((i, symbol, exchange, actual_symbol))
+                    callbacks[f"{exchange}:{actual_symbol}"] = data_callback
+                    if mode == 3:
+                        depth_levels[f"{exchange}:{actual_symbol}"] = self._depth_level(symbol, exchange, depth_level)
+                
+                if hsm_batch:
+                    data_type = "DepthUpdate" if mode == 3 else "SymbolUpdate"
+                    batch_symbols = [{"exchange": exchange, "symbol": actual}
+                                     for _, _, exchange, actual in hsm_batch]
+                    mode_type = {1: "LTP", 2: "Quote", 3: "Depth"}[mode]
+                    # Only symbols mapped and sent to HSM by this call are subscribed:
+                    # symbol_to_hsm also holds mappings from earlier calls
+                    subscribed = self.fyers_adapter.subscribe_symbols(
+                        batch_symbols, data_type, callbacks, mode_type, depth_levels) or set()
+                    for i, symbol, exchange, actual in hsm_batch:
+                        if f"{exchange}:{actual}" in subscribed:
+                            responses[i] = self._track_subscription(
+                                symbol, exchange, mode, depth_levels.get(f"{exchange}:{actual}"))
+                        else:
+                            self.active_callbacks.pop(f"{exchange}:{symbol}:{mode}", None)
+                            responses[i] = {
+                                "status": "error",
+                                "message": f"Failed to subscribe to {exchange}:{symbol}"
+                            }
+            
+            subscribed = sum(1 for r in responses if r.get("status") == "success")
+            self.logger.info(f"Bulk subscribed {subscribed}/{len(symbols)} symbols (mode: {mode})")
+            return responses
+            
+        except Exception as e:
+            self.logger.error(f"Bulk subscription error: {e}")
+            return [{"status": "error", "message": f"Subscription failed: {str(e)}"} for _ in symbols]
+    
+    def unsubscribe_many(self, symbols, mode: int = 2):
+        """
+        Unsubscribe from many symbols, disconnecting at most once
+        
+        Args:
+            symbols: List of dicts with 'symbol' and 'exchange' keys
+            mode: Subscription mode
+            
+        Returns:
+            list: One response per symbol, in request order
+        """
+        try:
+            responses = []
+            with self.lock:
+                removed = 0
+                for item in symbols:
+                    symbol = item.get("symbol")
+                    exchange = item.get("exchange")
+                    key = f"{exchange}:{symbol}:{mode}"
+                    
+                    if key not in self.subscriptions:
+                        responses.append({
+                            "status": "warning",
+                            "message": f"No active subscription found for {key}"
+                        })
+                        continue
+                    
+                    self.subscriptions.pop(key)
+                    if hasattr(self, 'active_callbacks'):
+                        self.active_callbacks.pop(key, None)
+                    if mode == 3:
+                        self._unsubscribe_tbt_depth(symbol, exchange)
+                    removed += 1
+                    responses.append({
+                        "status": "success",
+                        "message": f"Unsubscribed from {exchange}:{symbol}"
+                    })
+                
+                self.logger.info(f"Bulk unsubscribed {removed}/{len(symbols)} symbols (mode: {mode})")
+                
+                # Fyers HSM has no selective unsubscription - stop background data once idle
+                if removed and len(self.subscriptions) == 0:
+                    self._disconnect_when_idle()
+            
+            return responses
+            
+        except Exception as e:
+            self.logger.error(f"Bulk unsubscription error: {e}")
+            return [{"status": "error", "message": f"Unsubscription failed: {str(e)}"} for _ in symbols]
+
     def _subscribe_tbt_depth(self, symbol: str, exchange: str, callback, original_symbol: str = None) -> bool:
         """
         Subscribe to 50-level depth via TBT WebSocket
@@ -449,21 +676,7 @@ class FyersWebSocketAdapter(BaseBrokerWebSocketAdapter):
         try:
             # Initialize TBT client if needed
             if not self.tbt_client:
-                self.tbt_client = FyersTbtWebSocket(
-                    access_token=self.access_token,
-                    log_path=""
-                )
-
-                # Set up TBT callback
-                def tbt_depth_handler(ticker, depth_data):
-                    self._on_tbt_depth_update(ticker, depth_data)
-
-                self.tbt_client.set_callbacks(
-                    on_depth_update=tbt_depth_handler,
-                    on_error=lambda e: self.logger.error(f"TBT error: {e}"),
-                    on_open=lambda: self.logger.info("TBT WebSocket connected"),
-                    on_close=lambda msg: self.logger.debug(f"TBT WebSocket closed: {msg}")
-                )
+                self.tbt_client = self._create_tbt_client()
 
                 # Connect to TBT
                 if not self.tbt_client.connect():
@@ -471,6 +684,8 @@ class FyersWebSocketAdapter(BaseBrokerWebSocketAdapter):
                     self.tbt_client = None
                     return False
 
+                self._start_tbt_publisher()
+
             # Convert symbol to Fyers ticker format
             fyers_ticker = self._convert_to_fyers_ticker(symbol, exchange)
             if not fyers_ticker:
@@ -493,6 +708,12 @@ class FyersWebSocketAdapter(BaseBrokerWebSocketAdapter):
             # Subscribe via TBT client
             success = self.tbt_client.subscribe([fyers_ticker], channel='1')
             if success:
+                # A new subscriber to a ticker already streaming in diff mode
+                # needs the whole book before the next changed levels
+                book = self.tbt_client.depth_data.get(fyers_ticker)
+                if book is not None:
+                    with book.lock:
+                        book.needs_full = True
                 self.logger.info(f"TBT subscribed to {fyers_ticker} for {exchange}:{symbol}")
                 return True
             else:
@@ -503,6 +724,36 @@ class FyersWebSocketAdapter(BaseBrokerWebSocketAdapter):
             self.logger.error(f"TBT subscription error: {e}")
             return False
 
+    def _create_tbt_client(self, ws_url: Optional[str] = None) -> FyersTbtWebSocket:
+        """Create the TBT client with depth callbacks and the feed capture hook"""
+        tbt_client = FyersTbtWebSocket(
+            access_token=self.access_token,
+            log_path="",
+            ws_url=ws_url
+        )
+
+        # Set up TBT callback
+        def tbt_depth_handler(ticker, book):
+            self._on_tbt_depth_update(ticker, book)
+
+        tbt_client.set_callbacks(
+            on_depth_update=tbt_depth_handler,
+            on_error=lambda e: self.logger.error(f"TBT error: {e}"),
+            on_open=lambda: self.logger.info("TBT WebSocket connected"),
+            on_close=lambda msg: self.logger.debug(f"TBT WebSocket closed: {msg}")
+        )
+        tbt_client.raw_frame_hook = self.capture_hook('tbt')
+        return tbt_client
+
+    def _start_tbt_publisher(self):
+        """Start the interval publish thread when FYERS_TBT_PUBLISH_INTERVAL_MS is set"""
+        if self.tbt_publish_interval:
+            self.tbt_publish_stop.clear()
+            self.tbt_publish_thread = threading.Thread(
+                target=self._tbt_publish_loop, name="fyers_tbt_publish", daemon=True
+            )
+            self.tbt_publish_thread.start()
+
     def _unsubscribe_tbt_depth(self, symbol: str, exchange: str) -> bool:
         """
         Unsubscribe from 50-level depth via TBT WebSocket and cleanup mappings
@@ -569,7 +820,15 @@ class FyersWebSocketAdapter(BaseBrokerWebSocketAdapter):
             Fyers ticker (e.g., 'NSE:RELIANCE-EQ', 'NSE:NIFTY24DECFUT')
         """
         try:
-            # First, try to get brsymbol from database (same as normal 5-level depth)
+            # The HSM token cache already holds the brsymbol for every master contract symbol
+            if self.fyers_adapter:
+                token_cache = self.fyers_adapter.token_converter.token_cache
+                if token_cache.ensure_loaded():
+                    entry = token_cache.lookup(symbol, exchange)
+                    if entry:
+                        return entry[0]
+
+            # Otherwise look up brsymbol from database (same as normal 5-level depth)
             brsymbol = get_br_symbol(symbol, exchange)
 
             if brsymbol:
@@ -601,16 +860,18 @@ class FyersWebSocketAdapter(BaseBrokerWebSocketAdapter):
             self.logger.error(f"Error converting symbol: {e}")
             return None
 
-    def _on_tbt_depth_update(self, ticker: str, depth_data: Dict[str, Any]):
+    def _on_tbt_depth_update(self, ticker: str, book: TbtOrderBook):
         """
         Handle 50-level depth update from TBT WebSocket
 
         Args:
             ticker: Fyers ticker
-            depth_data: Raw depth data from TBT
+            book: The ticker's order book, already updated in place
         """
         try:
-            self.logger.debug(f"TBT depth update received for ticker: {ticker}")
+            # With a publish interval the publish thread picks up changed books
+            if self.tbt_publish_interval:
+                return
 
             # Find the subscription for this ticker
             subscription_key = self.tbt_ticker_to_symbol.get(ticker)
@@ -624,42 +885,68 @@ class FyersWebSocketAdapter(BaseBrokerWebSocketAdapter):
                 self.logger.warning(f"No subscription data for key: {subscription_key}")
                 return
 
-            # Map to OpenAlgo format
-            symbol = subscription['symbol']
-            exchange = subscription['exchange']
-
-            self.logger.debug(f"Mapping TBT depth for {exchange}:{symbol}")
-
-            mapped_data = self.data_mapper.map_tbt_depth_to_openalgo(
-                ticker, depth_data, symbol, exchange
-            )
-
-            if not mapped_data:
-                self.logger.warning(f"Failed to map TBT depth data for {ticker}")
-                return
-
-            # Add subscription mode for proper topic generation
-            mapped_data['subscription_mode'] = 3  # Depth mode
-
-            # Log mapped data summary
-            buy_levels = mapped_data.get('depth', {}).get('buy', [])
-            sell_levels = mapped_data.get('depth', {}).get('sell', [])
-            self.logger.debug(f"TBT mapped depth for {exchange}:{symbol}: {len(buy_levels)} buy levels, {len(sell_levels)} sell levels, ltp={mapped_data.get('ltp')}")
-
-            # Invoke callback
-            callback = subscription.get('callback')
-            if callback:
-                callback(mapped_data)
-                self.logger.debug(f"TBT callback invoked for {exchange}:{symbol}")
-            else:
-                self.logger.warning(f"No callback found for {subscription_key}")
+            self._publish_tbt_book(ticker, book, subscription)
 
         except Exception as e:
             self.logger.error(f"Error processing TBT depth update: {e}", exc_info=True)
 
+    def _publish_tbt_book(self, ticker: str, book: TbtOrderBook, subscription: Dict[str, Any]):
+        """Publish whatever the configured TBT publish mode needs from the book"""
+        with book.lock:
+            depth_data = book.take_update(self.tbt_publish_mode, self.tbt_top_levels)
+        if depth_data is None:
+            return
+
+        # Map to OpenAlgo format
+        symbol = subscription['symbol']
+        exchange = subscription['exchange']
+
+        mapped_data = self.data_mapper.map_tbt_depth_to_openalgo(
+            ticker, depth_data, symbol, exchange
+        )
+
+        if not mapped_data:
+            self.logger.warning(f"Failed to map TBT depth data for {ticker}")
+            return
+
+        # Add subscription mode for proper topic generation
+        mapped_data['subscription_mode'] = 3  # Depth mode
+
+        self.logger.debug(
+            f"TBT {depth_data['depth_update']} depth for {exchange}:{symbol}: "
+            f"{len(depth_data['buy'])} buy levels, {len(depth_data['sell'])} sell levels, ltp={mapped_data.get('ltp')}"
+        )
+
+        # Invoke callback
+        callback = subscription.get('callback')
+        if callback:
+            callback(mapped_data)
+        else:
+            self.logger.warning(f"No callback found for {exchange}:{symbol}")
+
+    def _tbt_publish_loop(self):
+        """Publish changed TBT books at most once per FYERS_TBT_PUBLISH_INTERVAL_MS"""
+        while not self.tbt_publish_stop.wait(self.tbt_publish_interval):
+            tbt_client = self.tbt_client
+            if not tbt_client:
+                continue
+            for subscription in list(self.tbt_subscriptions.values()):
+                try:
+                    ticker = subscription['ticker']
+                    book = tbt_client.depth_data.get(ticker)
+                    if book is not None and (book.dirty or book.needs_full):
+                        self._publish_tbt_book(ticker, book, subscription)
+                except Exception as e:
+                    self.logger.error(f"Error publishing TBT depth: {e}")
+
     def _disconnect_tbt(self):
         """Disconnect from TBT WebSocket and cleanup"""
         try:
+            self.tbt_publish_stop.set()
+            if self.tbt_publish_thread:
+                self.tbt_publish_thread.join(timeout=2)
+                self.tbt_publish_thread = None
+
             if self.tbt_client:
                 self.tbt_client.disconnect()
                 self.tbt_client = None
@@ -674,123 +961,6 @@ class FyersWebSocketAdapter(BaseBrokerWebSocketAdapter):
         except Exception as e:
             self.logger.error(f"Error disconnecting TBT: {e}")
 
-    def _convert_price_to_rupees(self, price_value: float, fyers_data: Dict[str, Any]) -> float:
-        """
-        Convert Fyers price based on instrument type:
-        - Indices: Keep raw values (no division)
-        - Stocks/Futures/Options: Divide by 100 (paise to rupees)
-        
-        Args:
-            price_value: Raw price value from Fyers
-            fyers_data: Fyers data containing symbol and exchange info
-            
-        Returns:
-            Price converted appropriately
-        """
-        try:
-            if price_value == 0:
-                return 0.0
-            
-            # Check if this is an index based on symbol or type
-            symbol = fyers_data.get("symbol", "")
-            original_symbol = fyers_data.get("original_symbol", "")
-            fyers_type = fyers_data.get("type", "")
-            
-            # Identify indices - they should keep raw values
-            is_index = (
-                "-INDEX" in symbol or 
-                "-INDEX" in original_symbol or
-                "INDEX" in symbol.upper() or
-                fyers_type == "if"  # Index feed type in HSM
-            )
-            
-            if is_index:
-                # Indices: Keep raw values, just round to 2 decimal places
-                return round(price_value, 2)
-            else:
-                # Stocks, Futures, Options: Convert paise to rupees (divide by 100)
-                # For NSE, NFO, MCX, BSE, BFO instruments
-                return round(price_value / 100.0, 2)
-            
-        except Exception as e:
-            self.logger.error(f"Error converting price {price_value}: {e}")
-            # Fallback: assume stock/future, divide by 100
-            return round(price_value / 100.0, 2)
-
-    def _map_fyers_to_openalgo(self, fyers_data: Dict[str, Any], mode: int) -> Optional[Dict[str, Any]]:
-        """
-        Map Fyers data to OpenAlgo WebSocket format
-        
-        Args:
-            fyers_data: Data from Fyers
-            mode: Subscription mode
-            
-        Returns:
-            Mapped data in OpenAlgo format
-        """
-        try:
-            if not fyers_data:
-                return None
-            
-            # Extract symbol and exchange
-            symbol = fyers_data.get("symbol", "")
-            if ":" in symbol:
-                exchange, symbol_name = symbol.split(":", 1)
-            else:
-                exchange = fyers_data.get("exchange", "NSE")
-                symbol_name = symbol
-            
-            # Base OpenAlgo format
-            openalgo_data = {
-                "symbol": symbol_name,
-                "exchange": exchange,
-                "token": fyers_data.get("token", ""),
-                "timestamp": fyers_data.get("timestamp", int(time.time()))
-            }
-            
-            # Add data based on mode
-            if mode == 1:  # LTP
-                raw_ltp = fyers_data.get("ltp", 0)
-                converted_ltp = self._convert_price_to_rupees(raw_ltp, fyers_data)
-                openalgo_data.update({
-                    "ltp": converted_ltp,
-                    "data_type": "LTP"
-                })
-            elif mode == 2:  # Quote  
-                # Convert all price fields from paise to rupees using correct field names
-                raw_ltp = fyers_data.get("ltp", 0)
-                raw_open = fyers_data.get("open_price", 0)
-                raw_high = fyers_data.get("high_price", 0)
-                raw_low = fyers_data.get("low_price", 0)
-                raw_close = fyers_data.get("prev_close_price", 0)
-                raw_bid = fyers_data.get("bid_price", 0)
-                raw_ask = fyers_data.get("ask_price", 0)
-                
-                # Data is already properly mapped by FyersDataMapper with OHLC fields
-                # Debug log to see if we have the proper data now
-                ltp = fyers_data.get("ltp", 0)
-                open_price = fyers_data.get("open", 0)  
-                high_price = fyers_data.get("high", 0)
-                low_price = fyers_data.get("low", 0) 
-                close_price = fyers_data.get("close", 0)
-                
-                self.logger.debug(f"Mapped Quote data: ltp={ltp}, open={open_price}, high={high_price}, low={low_price}, close={close_price}")
-                
-                # Return the already mapped data (no additional processing needed)
-                return fyers_data
-            elif mode == 3:  # Depth
-                openalgo_data.update({
-                    "ltp": fyers_data.get("ltp", 0),
-                    "depth": fyers_data.get("depth", {"buy": [], "sell": []}),
-                    "data_type": "Depth"
-                })
-            
-            return openalgo_data
-            
-        except Exception as e:
-            self.logger.error(f"Error mapping Fyers data: {e}")
-            return None
-    
     def _send_data(self, data: Dict[str, Any]):
         """
         Send data via ZeroMQ socket using proper topic-data format
@@ -835,6 +1005,70 @@ class FyersWebSocketAdapter(BaseBrokerWebSocketAdapter):
             self.logger.error(f"Error sending data via ZeroMQ: {e}")
             self.logger.error(f"Data causing error: {data}")
     
+    def _capture_subscribe(self, symbols, mode: int, depth_level: int):
+        """
+        Record a subscribe request in the feed capture, preceded by the resolved
+        (symbol, exchange, brsymbol, fytoken) rows so a replay needs no database
+        """
+        if not self.feed_capture or not self.fyers_adapter:
+            return
+        
+        token_cache = self.fyers_adapter.token_converter.token_cache
+        entries = []
+        if token_cache.ensure_loaded():
+            for item in symbols:
+                symbol, exchange = item.get("symbol", ""), item.get("exchange", "")
+                if symbol.endswith(":50"):
+                    symbol = symbol[:-3]
+                entry = token_cache.entries.get(exchange, {}).get(symbol)
+                if entry:
+                    entries.append([symbol, exchange, entry[0], entry[1]])
+        
+        self.capture_meta('adapter', 'symbols', entries=entries)
+        self.capture_meta('adapter', 'subscribe',
+                          symbols=[{"symbol": item.get("symbol"), "exchange": item.get("exchange")} for item in symbols],
+                          mode=mode, depth_level=depth_level)
+    
+    def prepare_replay(self, user_id):
+        """
+        Wire HSM and TBT clients to a null transport for offline feed replay
+        
+        Args:
+            user_id: User ID the replayed subscriptions run under
+            
+        Returns:
+            dict: {"hsm": handler, "tbt": handler} taking one captured frame each
+        """
+        self.user_id = user_id
+        self.broker_name = "fyers"
+        self.access_token = _replay_access_token()
+        
+        self.fyers_adapter = FyersAdapter(self.access_token, user_id)
+        # Token rows come from the capture, never from this machine's master contract
+        self.fyers_adapter.token_converter.token_cache = FyersHSMTokenCache()
+        hsm_handler = self.fyers_adapter.prepare_replay(NullTransport())
+        
+        # Never connected, so skip the TBT URL lookup against the Fyers API
+        self.tbt_client = self._create_tbt_client(ws_url=FyersTbtWebSocket.DEFAULT_TBT_URL)
+        self.tbt_client.ws = NullTransport()
+        self.tbt_client.running = self.tbt_client.connected = True
+        self._start_tbt_publisher()
+        tbt_client = self.tbt_client
+        
+        self.connected = True
+        self.running = True
+        return {
+            "hsm": hsm_handler,
+            "tbt": lambda frame: tbt_client._on_message(None, frame),
+        }
+    
+    def apply_replay_meta(self, stream, meta):
+        """Preload captured token rows, then replay subscribes as usual"""
+        if meta.get('event') == 'symbols':
+            self.fyers_adapter.token_converter.token_cache.preload(meta.get('entries', []))
+        else:
+            super().apply_replay_meta(stream, meta)
+    
     def get_connection_status(self) -> Dict[str, Any]:
         """Get connection status"""
         status = {
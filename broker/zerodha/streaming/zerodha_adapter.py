@@ -92,11 +92,13 @@ class ZerodhaWebSocketAdapter(BaseBrokerWebSocketAdapter):
                 return {'status': 'error', 'message': 'Invalid access token'}
             
             # Initialize WebSocket client
+            self.start_feed_capture(broker_name)
             self.ws_client = ZerodhaWebSocket(
                 api_key=self.api_key,
                 access_token=self.access_token,
                 on_ticks=self._handle_ticks
             )
+            self.ws_client.raw_frame_hook = self.capture_hook('kite')
             
             # Set up WebSocket callbacks
             self.ws_client.on_connect = self._on_connect
@@ -312,6 +314,8 @@ class ZerodhaWebSocketAdapter(BaseBrokerWebSocketAdapter):
                 }
                 self.token_to_symbol[token] = (symbol, exchange)
             
+            self.capture_meta('adapter', 'subscribe', symbols=[{"symbol": symbol, "exchange": exchange}],
+                              mode=mode, depth_level=depth_level, tokens=[token])
             self.logger.info(f"✅ Subscribed to {exchange}:{symbol} (token: [REDACTED], mode: {zerodha_mode})")
             return {'status': 'success', 'message': f'Subscribed to {symbol}'}
             
@@ -13,7 +13,6 @@ Implements:
 """
 import asyncio
 import json
-import struct
 import threading
 import time
 from typing import Dict, List, Optional, Callable, Any, Set
@@ -22,6 +21,43 @@ import websockets.exceptions
 from datetime import datetime
 from collections import deque
 
+from websocket_proxy.binary_decoder import PacketLayout, split_frame
+
+# Packet layouts by mode (prices in paise). Each extends the previous one, so
+# a packet is decoded with the longest layout that fits it
+_LTP_FIELDS = [('instrument_token', 'I'), ('last_price', 'i')]
+_QUOTE_FIELDS = _LTP_FIELDS + [
+    ('last_traded_quantity', 'i'), ('average_price', 'i'), ('volume', 'i'),
+    ('total_buy_quantity', 'i'), ('total_sell_quantity', 'i'),
+    ('open', 'i'), ('high', 'i'), ('low', 'i'), ('close', 'i'),
+]
+_EXTENDED_FIELDS = _QUOTE_FIELDS + [
+    ('last_traded_timestamp', 'i'), ('oi', 'i'), ('oi_day_high', 'i'), ('oi_day_low', 'i'),
+    ('exchange_timestamp', 'i'),
+]
+_FULL_FIELDS = _EXTENDED_FIELDS + [
+    field
+    for side in ('buy', 'sell')
+    for level in range(5)
+    for field in ((f'{side}_quantity_{level}', 'i'), (f'{side}_price_{level}', 'i'),
+                  (f'{side}_orders_{level}', 'h'), (None, '2x'))
+]
+
+FULL_PACKET = PacketLayout(_FULL_FIELDS)          # 184 bytes
+EXTENDED_PACKET = PacketLayout(_EXTENDED_FIELDS)  # 64 bytes
+QUOTE_PACKET = PacketLayout(_QUOTE_FIELDS)        # 44 bytes
+LTP_PACKET = PacketLayout(_LTP_FIELDS)            # 8 bytes (also the index packet prefix)
+_PACKET_LAYOUTS = (FULL_PACKET, EXTENDED_PACKET, QUOTE_PACKET, LTP_PACKET)
+
+
+def _layout_for(length: int) -> Optional[PacketLayout]:
+    """Longest packet layout that fits a packet of `length` bytes"""
+    for layout in _PACKET_LAYOUTS:
+        if length >= layout.size:
+            return layout
+    return None
+
+
 class ZerodhaWebSocket:
     """
     Enhanced WebSocket client for Zerodha's market data streaming API.
@@ -91,6 +127,8 @@ class ZerodhaWebSocket:
         self.on_connect = None
         self.on_disconnect = None
         self.on_error = None
+        # Called with every raw frame before parsing (feed capture)
+        self.raw_frame_hook = None
         
         # WebSocket URL
         self.ws_url = f"wss://ws.kite.trade?api_key={self.api_key}&access_token={self.access_token}"
@@ -668,6 +706,8 @@ class ZerodhaWebSocket:
     
     async def _process_message(self, message):
         """Process incoming WebSocket message"""
+        if self.raw_frame_hook:
+            self.raw_frame_hook(message)
         try:
             self.message_count += 1
             
@@ -719,182 +759,123 @@ class ZerodhaWebSocket:
             self.error_count += 1
     
     def _parse_binary_message(self, data: bytes) -> List[Dict]:
-        """Parse binary message according to Zerodha specification"""
+        """
+        Parse binary message according to Zerodha specification
+        
+        The frame is split without copying and every packet is decoded in
+        place with the precompiled struct of its layout (one unpack_from per
+        packet, depth levels included).
+        """
         try:
             if len(data) < 4:
                 return []
             
-            # Parse header: first 2 bytes = number of packets
-            num_packets = struct.unpack('>H', data[0:2])[0]
-            
-            packets = []
-            offset = 2
-            
-            for packet_idx in range(num_packets):
-                if offset + 2 > len(data):
-                    break
-                
-                # Next 2 bytes: packet length
-                packet_length = struct.unpack('>H', data[offset:offset+2])[0]
-                offset += 2
-                
-                if offset + packet_length > len(data):
-                    break
-                
-                # Extract and parse packet
-                packet_data = data[offset:offset+packet_length]
-                tick = self._parse_packet(packet_data)
-                if tick:
-                    packets.append(tick)
-                
-                offset += packet_length
+            with self.lock:
+                exchange_map = self.token_exchange_map
+            timestamp = int(time.time() * 1000)
+            build_tick = self._build_tick
             
-            return packets
+            ticks = []
+            for offset, length in split_frame(data):
+                layout = _layout_for(length)
+                if layout is not None:
+                    ticks.append(build_tick(layout.unpack_from(data, offset), length, exchange_map, timestamp))
+            return ticks
             
         except Exception as e:
             self.logger.error(f"❌ Error parsing binary message: {e}")
             return []
     
     def _parse_packet(self, packet: bytes) -> Optional[Dict]:
+        """Parse a single packet (without the frame's length prefix)"""
+        layout = _layout_for(len(packet))
+        if layout is None:
+            return None
+        with self.lock:
+            exchange_map = self.token_exchange_map
+        return self._build_tick(layout.unpack_from(packet), len(packet), exchange_map,
+                                int(time.time() * 1000))
+    
+    def _build_tick(self, row: tuple, length: int, exchange_map: Dict[int, str], timestamp: int) -> Dict:
         """
-        Parse individual packet with improved error handling.
+        Build a tick dict from a decoded packet row.
         ✅ ENHANCED: Adds exchange information to tick data.
         """
-        try:
-            if len(packet) < 8:
-                return None
-            
-            # Extract instrument token and last price
-            instrument_token = struct.unpack('>I', packet[0:4])[0]
-            last_price_paise = struct.unpack('>i', packet[4:8])[0]
-            last_price = last_price_paise / 100.0
-            
-            # Determine mode based on packet length
-            if len(packet) == 8:
-                mode = self.MODE_LTP
-            elif len(packet) == 44:
-                mode = self.MODE_QUOTE
-            elif len(packet) >= 184:
-                mode = self.MODE_FULL
-            else:
-                mode = self.mode_map.get(instrument_token, self.MODE_QUOTE)
-            
-            # ✅ NEW: Get exchange information for this token
-            exchange = None
-            with self.lock:
-                exchange = self.token_exchange_map.get(instrument_token)
-            
-            # Basic tick structure
+        instrument_token = row[0]
+        last_price = row[1] / 100.0
+        
+        # Determine mode based on packet length
+        if length == 8:
+            mode = self.MODE_LTP
+        elif length == 44:
+            mode = self.MODE_QUOTE
+        elif length >= 184:
+            mode = self.MODE_FULL
+        else:
+            mode = self.mode_map.get(instrument_token, self.MODE_QUOTE)
+        
+        if length < 44:
             tick = {
                 'instrument_token': instrument_token,
                 'last_traded_price': last_price,
                 'last_price': last_price,
                 'mode': mode,
-                'timestamp': int(time.time() * 1000)
+                'timestamp': timestamp
+            }
+        else:
+            # Quote mode fields (44 bytes)
+            average_price = row[3] / 100.0
+            open_price, high_price = row[7] / 100.0, row[8] / 100.0
+            low_price, close_price = row[9] / 100.0, row[10] / 100.0
+            tick = {
+                'instrument_token': instrument_token,
+                'last_traded_price': last_price,
+                'last_price': last_price,
+                'mode': mode,
+                'timestamp': timestamp,
+                'last_traded_quantity': row[2],
+                'average_traded_price': average_price,
+                'average_price': average_price,
+                'volume_traded': row[4],
+                'volume': row[4],
+                'total_buy_quantity': row[5],
+                'total_sell_quantity': row[6],
+                'open_price': open_price,
+                'high_price': high_price,
+                'low_price': low_price,
+                'close_price': close_price,
+                'ohlc': {
+                    'open': open_price,
+                    'high': high_price,
+                    'low': low_price,
+                    'close': close_price
+                }
             }
             
-            # ✅ NEW: Add exchange information if available
-            if exchange:
-                tick['source_exchange'] = exchange  # Add source exchange from mapping
-            
-            # Parse additional fields for quote mode (44 bytes)
-            if len(packet) >= 44:
-                try:
-                    # Only unpack exactly 44 bytes for quote mode
-                    fields = struct.unpack('>11i', packet[0:44])  # 11 integers * 4 bytes = 44 bytes
-                    
-                    tick.update({
-                        'instrument_token': fields[0],
-                        'last_traded_price': fields[1] / 100.0,
-                        'last_price': fields[1] / 100.0,
-                        'last_traded_quantity': fields[2],
-                        'average_traded_price': fields[3] / 100.0,
-                        'average_price': fields[3] / 100.0,
-                        'volume_traded': fields[4],
-                        'volume': fields[4],
-                        'total_buy_quantity': fields[5],
-                        'total_sell_quantity': fields[6],
-                        'open_price': fields[7] / 100.0,
-                        'high_price': fields[8] / 100.0,
-                        'low_price': fields[9] / 100.0,
-                        'close_price': fields[10] / 100.0,
-                        'ohlc': {
-                            'open': fields[7] / 100.0,
-                            'high': fields[8] / 100.0,
-                            'low': fields[9] / 100.0,
-                            'close': fields[10] / 100.0
-                        }
-                    })
-                except struct.error as e:
-                    self.logger.debug(f"⚠️ Quote parsing issue (packet length: {len(packet)}): {e}")
-                    # Fallback - just use LTP data
-                    pass
-            
-            # Parse full mode fields if available (64+ bytes)
-            if len(packet) >= 64:
-                try:
-                    extended_fields = struct.unpack('>iiiii', packet[44:64])
-                    tick.update({
-                        'last_traded_timestamp': extended_fields[0],
-                        'open_interest': extended_fields[1],
-                        'oi': extended_fields[1],
-                        'exchange_timestamp': extended_fields[4]
-                    })
-                except struct.error:
-                    pass
-            
-            # Parse market depth for full mode (184+ bytes)
-            if len(packet) >= 184:
-                try:
-                    depth = self._parse_market_depth(packet[64:184])
-                    if depth:
-                        tick['depth'] = depth
-                except Exception:
-                    pass
-            
-            return tick
-            
-        except Exception as e:
-            self.logger.error(f"❌ Error parsing packet: {e}")
-            return None
-    
-    def _parse_market_depth(self, depth_data: bytes) -> Optional[Dict]:
-        """Parse market depth data"""
-        try:
-            if len(depth_data) < 120:
-                return None
-            
-            depth = {'buy': [], 'sell': []}
-            
-            # Parse buy side (first 5 entries)
-            for i in range(5):
-                offset = i * 12
-                if offset + 10 <= len(depth_data):
-                    quantity, price, orders = struct.unpack('>iih', depth_data[offset:offset+10])
-                    if price > 0:  # Only add valid prices
-                        depth['buy'].append({
-                            'quantity': quantity,
-                            'price': price / 100.0,
-                            'orders': orders
-                        })
-            
-            # Parse sell side (next 5 entries)
-            for i in range(5):
-                offset = 60 + (i * 12)
-                if offset + 10 <= len(depth_data):
-                    quantity, price, orders = struct.unpack('>iih', depth_data[offset:offset+10])
-                    if price > 0:  # Only add valid prices
-                        depth['sell'].append({
-                            'quantity': quantity,
-                            'price': price / 100.0,
-                            'orders': orders
-                        })
-            
-            return depth if (depth['buy'] or depth['sell']) else None
-            
-        except Exception as e:
-            self.logger.error(f"❌ Error parsing market depth: {e}")
-            return None
+            # Full mode fields (64+ bytes)
+            if length >= 64:
+                tick['last_traded_timestamp'] = row[11]
+                tick['open_interest'] = tick['oi'] = row[12]
+                tick['exchange_timestamp'] = row[15]
+            
+            # Market depth for full mode (184+ bytes): 5 buy then 5 sell
+            # (quantity, price, orders) levels, only levels with a price
+            if length >= 184:
+                buy = [{'quantity': quantity, 'price': price / 100.0, 'orders': orders}
+                       for quantity, price, orders in zip(row[16:31:3], row[17:31:3], row[18:31:3])
+                       if price > 0]
+                sell = [{'quantity': quantity, 'price': price / 100.0, 'orders': orders}
+                        for quantity, price, orders in zip(row[31:46:3], row[32:46:3], row[33:46:3])
+                        if price > 0]
+                if buy or sell:
+                    tick['depth'] = {'buy': buy, 'sell': sell}
+        
+        # ✅ NEW: Add exchange information if available
+        exchange = exchange_map.get(instrument_token)
+        if exchange:
+            tick['source_exchange'] = exchange  # Add source exchange from mapping
+        
+        return tick
     
     def is_connected(self) -> bool:
         """Check if WebSocket is connected"""
@@ -7,7 +7,8 @@ This allows the app to resume operations without requiring re-login
 after a restart.
 
 Restores:
-1. Symbol cache - All trading symbols/tokens from database
+1. Symbol cache - All trading symbols/tokens from the snapshot saved after the
+   last master contract download, or from database if it is stale
 2. Auth cache - Valid (non-revoked) authentication tokens
 3. Broker cache - Broker name mappings
 
@@ -27,16 +28,19 @@ logger = get_logger(__name__)
 
 def restore_symbol_cache() -> dict:
     """
-    Restore symbol cache from database on startup.
+    Restore symbol cache on startup.
 
-    Loads all symbols from the symtoken table into the in-memory
-    BrokerSymbolCache for fast O(1) lookups.
+    Restores the in-memory BrokerSymbolCache from the symbol cache snapshot
+    (database/symbol_cache_snapshot.py) if it matches the database;
+    otherwise loads all symbols from the symtoken table and saves a new
+    snapshot for the next start.
 
     Returns:
         dict: Statistics about the restoration
             - success: bool
             - symbols_loaded: int
             - broker: str or None
+            - source: 'snapshot', 'database' or None
             - time_ms: float
             - error: str or None
     """
@@ -44,6 +48,7 @@ def restore_symbol_cache() -> dict:
         'success': False,
         'symbols_loaded': 0,
         'broker': None,
+        'source': None,
         'time_ms': 0,
         'error': None
     }
@@ -53,6 +58,10 @@ def restore_symbol_cache() -> dict:
     try:
         from database.token_db_enhanced import get_cache
         from database.auth_db import Auth
+        from database.symbol_cache_snapshot import (
+            restore_symbol_cache_snapshot,
+            save_symbol_cache_snapshot
+        )
 
         # Find the active broker from auth table (non-revoked)
         auth_record = Auth.query.filter_by(is_revoked=False).first()
@@ -72,18 +81,25 @@ def restore_symbol_cache() -> dict:
         if cache.cache_loaded and cache.stats.total_symbols > 0:
             result['success'] = True
             result['symbols_loaded'] = cache.stats.total_symbols
+            result['source'] = cache.stats.loaded_from
             result['time_ms'] = (time.time() - start_time) * 1000
             logger.debug(f"Symbol cache already loaded: {cache.stats.total_symbols} symbols")
             return result
 
-        # Load symbols from database
-        success = cache.load_all_symbols(broker)
+        # Restore from the snapshot, or load symbols from database
+        if restore_symbol_cache_snapshot(broker):
+            success = True
+        else:
+            success = cache.load_all_symbols(broker)
+            if success:
+                save_symbol_cache_snapshot(broker)
 
         if success:
             result['success'] = True
             result['symbols_loaded'] = cache.stats.total_symbols
+            result['source'] = cache.stats.loaded_from
             logger.debug(
-                f"Symbol cache restored: {cache.stats.total_symbols} symbols "
+                f"Symbol cache restored from {cache.stats.loaded_from}: {cache.stats.total_symbols} symbols "
                 f"for broker '{broker}' in {(time.time() - start_time)*1000:.0f}ms"
             )
         else:
@@ -280,7 +296,8 @@ def get_cache_restoration_status() -> dict:
             'loaded': cache.cache_loaded,
             'count': cache.stats.total_symbols,
             'broker': cache.active_broker,
-            'memory_mb': cache.stats.memory_usage_mb
+            'memory_mb': cache.stats.memory_usage_mb,
+            'loaded_from': cache.stats.loaded_from
         }
     except Exception as e:
         logger.debug(f"Error getting symbol cache status: {e}")
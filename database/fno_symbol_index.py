@@ -0,0 +1,335 @@
+"""
+Structured Derivatives Index for the In-Memory Symbol Cache
+
+Built by BrokerSymbolCache.load_all_symbols next to the search index, so F&O
+search, the expiry and underlying dropdowns and option strike lookups do not
+walk every cached symbol (or run a LIKE query) per request.
+
+Layout:
+
+    (exchange, UNDERLYING) -> UnderlyingChain
+        expiries                  expiry strings sorted chronologically, once
+        by_expiry[expiry]         one StrikeLadder per symbol type:
+            'FUT' / 'CE' / 'PE'   by symbol suffix, as fno_search_symbols filters
+            ''                    anything else
+        by_expiry[None]           the underlying's symbols without an expiry
+
+    (exchange, BASE, expiry, type) -> StrikeLadder, for option strike lookups
+
+    StrikeLadder
+        strikes                   ascending strikes, for bisect range and
+                                  exact-strike lookups
+        rows                      cache rows aligned with strikes, followed by
+                                  the rows that have no strike
+
+The underlying is the upper-cased name field, as the symtoken queries behind
+F&O search and the dropdowns filter on it. Every cached symbol sits in exactly
+one chain ladder, so any combination of exchange, underlying, expiry, type and
+strike range narrows to a set of ladder slices; candidates are returned in
+cache order so callers' results are unchanged.
+
+Strike lookups match the symbol instead (BASE + DDMMMYY expiry code, as the
+option services build symbols), since the name is not always the underlying:
+Fyers stores the symbol details there, e.g. "NIFTY 25 Jan 30 24000 CE". Those
+ladders are keyed on the symbol before its expiry code.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+SYMBOL_TYPES = ('FUT', 'CE', 'PE')
+
+
+def expiry_sort_key(expiry: str) -> datetime:
+    """Chronological sort key for DD-MMM-YY (or DD-MMM-YYYY) expiries"""
+    try:
+        return datetime.strptime(expiry, "%d-%b-%y")
+    except ValueError:
+        try:
+            return datetime.strptime(expiry, "%d-%b-%Y")
+        except ValueError:
+            return datetime.max
+
+
+def symbol_type(symbol: str) -> str:
+    """'FUT', 'CE' or 'PE' from the symbol suffix, '' for anything else"""
+    symbol = symbol.upper()
+    for suffix in SYMBOL_TYPES:
+        if symbol.endswith(suffix):
+            return suffix
+    return ''
+
+
+def symbol_base(symbol: str, expiry: Optional[str]) -> Optional[str]:
+    """Upper-cased symbol up to its DDMMMYY expiry code, or None"""
+    if expiry and symbol:
+        end = symbol.upper().find(expiry.replace('-', '').upper())
+        if end > 0:
+            return symbol[:end].upper()
+    return None
+
+
+class StrikeLadder:
+    """Symbols of one underlying, expiry and type, ordered by strike"""
+
+    __slots__ = ('strikes', 'rows', 'records')
+
+    def __init__(self, entries: List[Tuple[Optional[float], int]], records: Sequence):
+        """
+        Args:
+            entries: (strike, row) pairs; row is the position in `records`
+            records: All cached records, in cache order
+        """
+        struck = sorted(e for e in entries if e[0] is not None)
+        unstruck = [e for e in entries if e[0] is None]
+        self.strikes = array('d', (e[0] for e in struck))
+        self.rows = array('l', (e[1] for e in struck + unstruck))
+        self.records = records
+
+    @classmethod
+    def from_arrays(cls, strikes: array, rows: array, records: Sequence) -> 'StrikeLadder':
+        """Ladder from already ordered strikes and rows"""
+        ladder = cls.__new__(cls)
+        ladder.strikes = strikes
+        ladder.rows = rows
+        ladder.records = records
+        return ladder
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def get(self, strike: float):
+        """Record at exactly `strike`, or None"""
+        i = bisect_left(self.strikes, strike)
+        if i < len(self.strikes) and self.strikes[i] == strike:
+            return self.records[self.rows[i]]
+        return None
+
+    def span(self, strike_min: Optional[float] = None, strike_max: Optional[float] = None) -> Tuple[int, int]:
+        """
+        Slice of rows/records within [strike_min, strike_max]
+
+        Without bounds this is every record, including those without a strike.
+        """
+        if strike_min is None and strike_max is None:
+            return 0, len(self.rows)
+        lo = bisect_left(self.strikes, strike_min) if strike_min is not None else 0
+        hi = bisect_right(self.strikes, strike_max) if strike_max is not None else len(self.strikes)
+        return lo, max(lo, hi)
+
+
+class UnderlyingChain:
+    """Expiries and strike ladders of one underlying on one exchange"""
+
+    __slots__ = ('exchange', 'underlying', 'expiries', 'by_expiry')
+
+    def __init__(self, exchange: str, underlying: str):
+        self.exchange = exchange
+        self.underlying = underlying
+        self.expiries: List[str] = []
+        self.by_expiry: Dict[Optional[str], Dict[str, StrikeLadder]] = {}
+
+    def ladder(self, expiry: Optional[str], kind: str) -> Optional[StrikeLadder]:
+        ladders = self.by_expiry.get(expiry)
+        return ladders.get(kind) if ladders else None
+
+
+class FnoSymbolIndex:
+    """Derivatives index over the cached symbols, in cache order"""
+
+    def __init__(self, records: Iterable):
+        """
+        Args:
+            records: SymbolData objects in cache order (kept as given if it is
+                a sequence, e.g. compact cache rows)
+        """
+        self.records = records if isinstance(records, Sequence) else list(records)
+        entries: Dict[Tuple[str, str], Dict[Optional[str], Dict[str, list]]] = {}
+        names: Dict[str, set] = {}
+        bases: Dict[Tuple[str, str, str, str], list] = {}
+        for row, record in enumerate(self.records):
+            name = record.name
+            if name:
+                names.setdefault(record.exchange, set()).add(name)
+            key = (record.exchange, name.upper() if name else '')
+            kind = symbol_type(record.symbol)
+            (entries.setdefault(key, {})
+                    .setdefault(record.expiry or None, {})
+                    .setdefault(kind, [])
+                    .append((record.strike, row)))
+            base = symbol_base(record.symbol, record.expiry)
+            if base and kind:
+                bases.setdefault((record.exchange, base, record.expiry, kind), []).append((record.strike, row))
+
+        self.chains: Dict[Tuple[str, str], UnderlyingChain] = {}
+        self.chains_by_exchange: Dict[str, List[UnderlyingChain]] = {}
+        self.chains_by_underlying: Dict[str, List[UnderlyingChain]] = {}
+        for (exchange, underlying), expiries in entries.items():
+            chain = UnderlyingChain(exchange, underlying)
+            for expiry, kinds in expiries.items():
+                chain.by_expiry[expiry] = {kind: StrikeLadder(items, self.records) for kind, items in kinds.items()}
+            chain.expiries = sorted((e for e in expiries if e), key=expiry_sort_key)
+            self.chains[(exchange, underlying)] = chain
+            self.chains_by_exchange.setdefault(exchange, []).append(chain)
+            self.chains_by_underlying.setdefault(underlying, []).append(chain)
+        self.strike_ladders: Dict[Tuple[str, str, str, str], StrikeLadder] = {
+            key: StrikeLadder(items, self.records) for key, items in bases.items()
+        }
+
+        self.underlyings: Dict[str, List[str]] = {exchange: sorted(s) for exchange, s in names.items()}
+        self.all_underlyings: List[str] = sorted(set().union(*names.values()))
+        self.expiries: Dict[str, List[str]] = {
+            exchange: self._merge_expiries(chains) for exchange, chains in self.chains_by_exchange.items()
+        }
+        self.all_expiries: List[str] = self._merge_expiries(self.chains.values())
+
+    def to_snapshot(self) -> Dict:
+        """
+        State for the cache snapshot, without the records: chain metadata plus
+        every ladder's strikes and rows concatenated into two arrays
+        """
+        chains = []
+        strikes = array('d')
+        rows = array('l')
+        for chain in self.chains.values():
+            ladders = []
+            for expiry, kinds in chain.by_expiry.items():
+                for kind, ladder in kinds.items():
+                    ladders.append((expiry, kind, len(ladder.strikes), len(ladder.rows)))
+                    strikes.extend(ladder.strikes)
+                    rows.extend(ladder.rows)
+            chains.append((chain.exchange, chain.underlying, chain.expiries, ladders))
+        strike_ladders = []
+        for key, ladder in self.strike_ladders.items():
+            strike_ladders.append((key, len(ladder.strikes), len(ladder.rows)))
+            strikes.extend(ladder.strikes)
+            rows.extend(ladder.rows)
+        return {
+            'chains': chains,
+            'strike_ladders': strike_ladders,
+            'strikes': strikes,
+            'rows': rows,
+            'underlyings': self.underlyings,
+            'all_underlyings': self.all_underlyings,
+            'expiries': self.expiries,
+            'all_expiries': self.all_expiries,
+        }
+
+    @classmethod
+    def from_snapshot(cls, state: Dict, records: Sequence) -> 'FnoSymbolIndex':
+        """
+        Index from to_snapshot() state
+
+        Args:
+            state: to_snapshot() of an index built over the same records
+            records: The cached records, in the order the index was built
+        """
+        index = cls.__new__(cls)
+        index.records = records
+        index.chains = {}
+        index.chains_by_exchange = {}
+        index.chains_by_underlying = {}
+        strikes, rows = state['strikes'], state['rows']
+        strike_pos = row_pos = 0
+        for exchange, underlying, expiries, ladders in state['chains']:
+            chain = UnderlyingChain(exchange, underlying)
+            chain.expiries = expiries
+            for expiry, kind, strike_count, row_count in ladders:
+                chain.by_expiry.setdefault(expiry, {})[kind] = StrikeLadder.from_arrays(
+                    strikes[strike_pos:strike_pos + strike_count], rows[row_pos:row_pos + row_count], records)
+                strike_pos += strike_count
+                row_pos += row_count
+            index.chains[(exchange, underlying)] = chain
+            index.chains_by_exchange.setdefault(exchange, []).append(chain)
+            index.chains_by_underlying.setdefault(underlying, []).append(chain)
+        index.strike_ladders = {}
+        for key, strike_count, row_count in state['strike_ladders']:
+            index.strike_ladders[key] = StrikeLadder.from_arrays(
+                strikes[strike_pos:strike_pos + strike_count], rows[row_pos:row_pos + row_count], records)
+            strike_pos += strike_count
+            row_pos += row_count
+        index.underlyings = state['underlyings']
+        index.all_underlyings = state['all_underlyings']
+        index.expiries = state['expiries']
+        index.all_expiries = state['all_expiries']
+        return index
+
+    @staticmethod
+    def _merge_expiries(chains: Iterable[UnderlyingChain]) -> List[str]:
+        return sorted({e for chain in chains for e in chain.expiries}, key=expiry_sort_key)
+
+    def _chains(self, exchange: Optional[str], underlying: Optional[str]) -> Sequence[UnderlyingChain]:
+        if exchange and underlying:
+            chain = self.chains.get((exchange, underlying))
+            return (chain,) if chain else ()
+        if exchange:
+            return self.chains_by_exchange.get(exchange, ())
+        if underlying:
+            return self.chains_by_underlying.get(underlying, ())
+        return tuple(self.chains.values())
+
+    def get_expiries(self, exchange: Optional[str] = None, underlying: Optional[str] = None) -> List[str]:
+        """Distinct non-empty expiries, chronologically"""
+        if not underlying:
+            return list(self.expiries.get(exchange, ()) if exchange else self.all_expiries)
+        chains = self._chains(exchange, underlying)
+        if len(chains) == 1:
+            return list(chains[0].expiries)
+        return self._merge_expiries(chains)
+
+    def get_underlyings(self, exchange: Optional[str] = None) -> List[str]:
+        """Distinct non-empty names, alphabetically"""
+        return list(self.underlyings.get(exchange, ()) if exchange else self.all_underlyings)
+
+    def candidates(
+        self,
+        exchange: Optional[str] = None,
+        underlying: Optional[str] = None,
+        expiry: Optional[str] = None,
+        instrumenttype: Optional[str] = None,
+        strike_min: Optional[float] = None,
+        strike_max: Optional[float] = None,
+    ) -> List:
+        """
+        Records that can satisfy the given filters, in cache order
+
+        Only the exchange, underlying (upper-cased), expiry and symbol type
+        narrow the chains; strike bounds narrow each ladder by bisect. Callers
+        still apply their own filters to the candidates. When the chains to
+        visit are nearly one per symbol (names that are not underlyings, as
+        with Fyers), every record is a candidate instead.
+        """
+        kinds = (instrumenttype,) if instrumenttype in SYMBOL_TYPES else None
+        chains = self._chains(exchange, underlying)
+        if len(chains) > len(self.records) // 4:
+            return self.records
+        hits: List[int] = []
+        for chain in chains:
+            if expiry:
+                ladder_sets = (chain.by_expiry.get(expiry),)
+            else:
+                ladder_sets = chain.by_expiry.values()
+            for ladders in ladder_sets:
+                if not ladders:
+                    continue
+                for ladder in (ladders.get(k) for k in kinds) if kinds else ladders.values():
+                    if ladder is None:
+                        continue
+                    lo, hi = ladder.span(strike_min, strike_max)
+                    hits.extend(ladder.rows[lo:hi])
+        hits.sort()
+        return [self.records[row] for row in hits]
+
+    def get_ladder(self, exchange: str, base: str, expiry: str, kind: str) -> Optional[StrikeLadder]:
+        """Strike ladder of the symbols BASE + expiry code (upper-cased) of one type"""
+        return self.strike_ladders.get((exchange, base, expiry, kind))
+
+    def get_stats(self) -> Dict:
+        """Index size for cache monitoring"""
+        return {
+            'underlyings': len(self.chains),
+            'expiries': sum(len(chain.expiries) for chain in self.chains.values()),
+            'ladders': sum(len(ladders) for chain in self.chains.values() for ladders in chain.by_expiry.values()),
+        }
@@ -48,6 +48,10 @@ def load_symbols_to_cache(broker: str) -> bool:
                 'load_time': f"{load_time:.2f}"
             })
             
+            # Save the loaded cache so the next start restores it from the snapshot
+            from database.symbol_cache_snapshot import save_symbol_cache_snapshot
+            save_symbol_cache_snapshot(broker)
+            
             return True
         else:
             logger.error(f"Failed to load symbols into cache for broker: {broker}")
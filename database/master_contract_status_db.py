@@ -50,8 +50,19 @@ class MasterContractStatus(Base):
 # Create table if it doesn't exist
 Base.metadata.create_all(bind=engine)
 
+# Per-stage timings of each broker's last master contract download, in seconds
+# (kept in memory: they describe a download done by this process)
+_stage_timings = {}
+
+def set_stage_timings(broker, timings):
+    """Record the stage timings of a master contract download (e.g. download, transform, load, swap, total)"""
+    _stage_timings[broker] = {
+        stage: value if stage == 'rows' else round(value, 3) for stage, value in timings.items()
+    }
+
 def init_broker_status(broker):
     """Initialize status for a broker when they login"""
+    _stage_timings.pop(broker, None)
     session = SessionLocal()
     try:
         # Check if status already exists
@@ -85,6 +96,8 @@ def init_broker_status(broker):
 
 def update_status(broker, status, message, total_symbols=None):
     """Update the download status for a broker"""
+    if status == 'downloading':
+        _stage_timings.pop(broker, None)
     session = SessionLocal()
     try:
         broker_status = session.query(MasterContractStatus).filter_by(broker=broker).first()
@@ -131,7 +144,8 @@ def get_status(broker):
                 'message': status.message,
                 'last_updated': status.last_updated.isoformat() if status.last_updated else None,
                 'total_symbols': status.total_symbols,
-                'is_ready': status.is_ready
+                'is_ready': status.is_ready,
+                'stage_timings': _stage_timings.get(broker)
             }
         else:
             return {
@@ -0,0 +1,318 @@
+"""
+Persisted Snapshot of the In-Memory Symbol Cache
+
+Loading BrokerSymbolCache from the database means a SymToken.query.all() of
+the whole master contract and a rebuild of every lookup, search and F&O index,
+several seconds before the first order can resolve a token. After each master
+contract download (and each load from the database) the loaded cache is saved
+to a snapshot file; on startup cache_restoration restores the cache from it
+when it still matches the database, and falls back to the database otherwise.
+
+File layout:
+
+    magic          8 bytes, b'OASYMSNP'
+    header size    4 bytes, little-endian
+    header         JSON: snapshot version, broker, storage mode, SymbolData
+                   fields, database fingerprint, creation time, CRC32 and the
+                   offsets of the sections below (relative to the data start)
+    data           starts at the first 64-byte boundary after the header
+        payload    pickle (protocol 5) of BrokerSymbolCache.get_snapshot_state()
+        buffers    the index's NumPy arrays, pickled out-of-band, each 64-byte
+                   aligned
+
+The file is memory-mapped on restore and the NumPy arrays (the search
+postings) are read-only views into the mapping rather than copies.
+
+A snapshot is used only if its version, broker, storage mode (
+SYMBOL_CACHE_COMPACT) and SymbolData fields match this process, its CRC32
+matches its data, and its database fingerprint - the symtoken row count and
+the broker's last successful master contract download time - matches the
+database. Bump SNAPSHOT_VERSION whenever the cache state or index layout
+changes.
+
+Each save writes a new file, <SYMBOL_CACHE_SNAPSHOT_PATH>.<generation>, under
+a temporary name that is renamed into place, so a crash while saving leaves
+the previous snapshot intact. The newest generation is restored. A restored
+cache keeps its file mapped, and Windows can neither replace nor remove a
+mapped file, so older generations are removed lazily: after each save and
+restore, skipping any that a running process still maps.
+"""
+
+import json
+import mmap
+import os
+import pickle
+import struct
+import time
+import zlib
+from dataclasses import fields
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+SNAPSHOT_VERSION = 4
+
+MAGIC = b'OASYMSNP'
+
+# Header size field
+HEADER_SIZE = struct.Struct('<I')
+
+# Alignment of the data section and each out-of-band buffer
+ALIGNMENT = 64
+
+
+def is_snapshot_enabled() -> bool:
+    """SYMBOL_CACHE_SNAPSHOT, enabled by default"""
+    return os.getenv('SYMBOL_CACHE_SNAPSHOT', 'TRUE').upper() == 'TRUE'
+
+
+def get_snapshot_path() -> str:
+    """SYMBOL_CACHE_SNAPSHOT_PATH, default db/symbol_cache.snapshot"""
+    return os.getenv('SYMBOL_CACHE_SNAPSHOT_PATH', 'db/symbol_cache.snapshot')
+
+
+def snapshot_files(path: str) -> List[str]:
+    """Saved generations of the snapshot at path, newest first"""
+    directory, name = os.path.split(os.path.abspath(path))
+    try:
+        entries = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+
+    generations = []
+    for entry in entries:
+        generation = entry[len(name) + 1:]
+        if entry.startswith(name + '.') and generation.isdigit():
+            generations.append((int(generation), os.path.join(directory, entry)))
+    return [file for _, file in sorted(generations, reverse=True)]
+
+
+def _remove_old_snapshots(path: str, keep: str):
+    """Remove every generation of the snapshot at path but keep (and a file at path itself)"""
+    old_files = snapshot_files(path) + ([os.path.abspath(path)] if os.path.isfile(path) else [])
+    for file in old_files:
+        if file == os.path.abspath(keep):
+            continue
+        try:
+            os.remove(file)
+        except OSError as e:
+            # Still mapped by a process on Windows; removed after a later save or restore
+            logger.debug(f"Old symbol cache snapshot {file} not removed yet: {e}")
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _symbol_fields() -> List[str]:
+    from database.token_db_enhanced import SymbolData
+    return [f.name for f in fields(SymbolData)]
+
+
+def get_db_fingerprint(broker: str) -> Optional[Dict]:
+    """
+    What a snapshot must have been taken from to match the database: the
+    symtoken row count and the time of the broker's last successful master
+    contract download. None if the broker has no completed download.
+    """
+    from database.symbol import SymToken
+    from database.master_contract_status_db import get_status
+
+    status = get_status(broker)
+    if not status.get('is_ready') or not status.get('last_updated'):
+        return None
+    return {
+        'symbols': SymToken.query.count(),
+        'master_contract_updated': status['last_updated'],
+    }
+
+
+def write_snapshot(state: Dict, broker: str, fingerprint: Dict, path: str) -> int:
+    """
+    Write a cache state to a snapshot file
+
+    Args:
+        state: BrokerSymbolCache.get_snapshot_state() output
+        broker: Broker the cache was loaded for
+        fingerprint: get_db_fingerprint() of the database it was loaded from
+        path: Snapshot file
+
+    Returns:
+        Size of the file in bytes
+    """
+    buffers: List[pickle.PickleBuffer] = []
+    payload = pickle.dumps(state, protocol=5, buffer_callback=buffers.append)
+
+    # Data section: payload, then each buffer at the next aligned offset
+    sections = [memoryview(payload)] + [buffer.raw() for buffer in buffers]
+    offsets = []
+    end = 0
+    for section in sections:
+        offsets.append(end)
+        end = _aligned(end + section.nbytes)
+
+    crc = 0
+    for section, offset in zip(sections, offsets):
+        crc = zlib.crc32(section, crc)
+        crc = zlib.crc32(bytes(_aligned(offset + section.nbytes) - offset - section.nbytes), crc)
+
+    header = json.dumps({
+        'version': SNAPSHOT_VERSION,
+        'broker': broker,
+        'storage': state['storage'],
+        'fields': _symbol_fields(),
+        'fingerprint': fingerprint,
+        'created': datetime.now().isoformat(),
+        'crc32': crc,
+        'sections': [[offset, section.nbytes] for section, offset in zip(sections, offsets)],
+    }).encode('utf-8')
+    data_start = _aligned(len(MAGIC) + HEADER_SIZE.size + len(header))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(HEADER_SIZE.pack(len(header)))
+            f.write(header)
+            f.write(bytes(data_start - f.tell()))
+            for section, offset in zip(sections, offsets):
+                f.write(section)
+                f.write(bytes(_aligned(offset + section.nbytes) - offset - section.nbytes))
+            size = f.tell()
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return size
+
+
+def read_snapshot(path: str, broker: str, storage: str, fingerprint: Dict) -> Optional[Dict]:
+    """
+    Cache state of a snapshot file, or None if it is missing or does not match
+
+    Args:
+        path: Snapshot file
+        broker: Broker the cache is loaded for
+        storage: 'compact' or 'objects', the cache's storage mode
+        fingerprint: get_db_fingerprint() of the database now
+    """
+    if not os.path.exists(path):
+        logger.debug(f"No symbol cache snapshot at {path}")
+        return None
+
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    prefix = len(MAGIC) + HEADER_SIZE.size
+    if len(data) < prefix or data[:len(MAGIC)] != MAGIC:
+        logger.warning(f"Ignoring symbol cache snapshot {path}: not a snapshot file")
+        return None
+    header_size, = HEADER_SIZE.unpack(data[len(MAGIC):prefix])
+    header = json.loads(data[prefix:prefix + header_size])
+
+    expected = {
+        'version': SNAPSHOT_VERSION,
+        'broker': broker,
+        'storage': storage,
+        'fields': _symbol_fields(),
+        'fingerprint': fingerprint,
+    }
+    stale = [key for key, value in expected.items() if header.get(key) != value]
+    if stale:
+        logger.info(f"Symbol cache snapshot {path} does not match ({', '.join(stale)}), loading from database")
+        return None
+
+    view = memoryview(data)[_aligned(prefix + header_size):]
+    if zlib.crc32(view) != header['crc32']:
+        logger.warning(f"Ignoring symbol cache snapshot {path}: checksum mismatch")
+        return None
+
+    (payload_offset, payload_size), *buffers = header['sections']
+    return pickle.loads(
+        view[payload_offset:payload_offset + payload_size],
+        buffers=[view[offset:offset + size] for offset, size in buffers],
+    )
+
+
+def save_symbol_cache_snapshot(broker: str) -> bool:
+    """
+    Save the loaded symbol cache to the snapshot file
+
+    Called after the cache is loaded from the database (master contract
+    download, manual reload, startup without a usable snapshot).
+
+    Returns:
+        bool: True if a snapshot was written
+    """
+    if not is_snapshot_enabled():
+        return False
+
+    try:
+        from database.token_db_enhanced import get_cache
+
+        cache = get_cache()
+        if not cache.cache_loaded or cache.active_broker != broker:
+            return False
+
+        fingerprint = get_db_fingerprint(broker)
+        if fingerprint is None:
+            logger.debug(f"Symbol cache snapshot skipped: no completed master contract download for {broker}")
+            return False
+
+        start_time = time.time()
+        path = get_snapshot_path()
+        file = f"{path}.{time.time_ns()}"
+        size = write_snapshot(cache.get_snapshot_state(), broker, fingerprint, file)
+        _remove_old_snapshots(path, file)
+        logger.info(
+            f"Saved symbol cache snapshot for {broker} to {file} "
+            f"({size / (1024 * 1024):.1f} MB in {time.time() - start_time:.2f}s)"
+        )
+        return True
+
+    except Exception as e:
+        logger.error(f"Error saving symbol cache snapshot: {e}")
+        return False
+
+
+def restore_symbol_cache_snapshot(broker: str) -> bool:
+    """
+    Load the symbol cache from the snapshot file if it matches the database
+
+    Returns:
+        bool: True if the cache was restored from the snapshot
+    """
+    if not is_snapshot_enabled():
+        return False
+
+    try:
+        from database.token_db_enhanced import get_cache
+
+        fingerprint = get_db_fingerprint(broker)
+        if fingerprint is None:
+            logger.debug(f"Symbol cache snapshot not used: no completed master contract download for {broker}")
+            return False
+
+        path = get_snapshot_path()
+        files = snapshot_files(path)
+        if not files:
+            logger.debug(f"No symbol cache snapshot at {path}")
+            return False
+
+        cache = get_cache()
+        storage = 'compact' if cache.compact else 'objects'
+        restored = cache.load_from_snapshot(broker, lambda: read_snapshot(files[0], broker, storage, fingerprint))
+        _remove_old_snapshots(path, files[0])
+        return restored
+
+    except Exception as e:
+        logger.error(f"Error restoring symbol cache snapshot: {e}")
+        return False
@@ -0,0 +1,355 @@
+"""
+N-gram Inverted Index for In-Memory Symbol Search
+
+Built by BrokerSymbolCache.load_all_symbols so search-as-you-type does not scan
+and upper-case every cached symbol per keystroke.
+
+Each cached symbol is a row (its position in the cache's iteration order). A
+row's search text is its upper-cased symbol, brsymbol and name plus its token,
+joined with a separator no query term can contain, so one substring test on it
+matches exactly like testing the four fields one by one. Every trigram and
+bigram of the UTF-8 encoded text maps to a posting list: the ascending ids of
+the rows that contain it.
+
+Postings are built with NumPy in one pass over all texts: (gram, row) pairs
+are packed into 64-bit keys, sorted and deduplicated, leaving one uint32 row
+array per gram size in which each gram owns a contiguous slice.
+
+For the compact cache storage (SYMBOL_CACHE_COMPACT) the index trades some
+query time for memory: texts stay UTF-8 encoded in one bytes blob instead of
+one str per row, and grams found in more than 1/32 of the rows (exchange
+names, digits, FUT/CE/PE, ...) are kept as row bitmaps, which are smaller
+than their uint32 row lists.
+
+A term of 3+ bytes can only match rows holding all of its trigrams, a 2-byte
+term rows holding its bigram; 1-character terms are not indexed. A query walks
+the shortest posting list among its terms in row order, checks each candidate
+against every term (substring or numeric strike match, as before) and stops
+at the limit, so results and their order are unchanged.
+"""
+
+import heapq
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+SEPARATOR = '\x00'
+
+NAN = float('nan')
+
+
+def _bitmap_rows(bitmap: np.ndarray, chunk: int = 1024) -> Iterable[int]:
+    """Ascending ids of the set bits of a packed row bitmap, decoded lazily"""
+    for start in range(0, len(bitmap), chunk):
+        rows = np.flatnonzero(np.unpackbits(bitmap[start:start + chunk]))
+        if len(rows):
+            yield from (rows + start * 8).tolist()
+
+
+def _dedupe_sorted(rows: Iterable[int]) -> Iterable[int]:
+    """Drop repeats from an ascending stream of row ids"""
+    last = -1
+    for row in rows:
+        if row != last:
+            yield row
+            last = row
+
+
+class PostingLists:
+    """Posting lists of every gram of one size, by gram code (big-endian bytes)"""
+
+    __slots__ = ('row_count', 'rows', 'spans', 'bitmaps')
+
+    def __init__(self, blob, row_of_byte, size: int, row_count: int, bitmaps: bool = False):
+        """
+        Args:
+            blob: uint8 array of the separator-joined texts
+            row_of_byte: Row id of every byte of blob
+            size: Gram size in bytes
+            row_count: Number of rows
+            bitmaps: Keep dense grams as row bitmaps
+        """
+        self.row_count = row_count
+        # Sparse grams: gram code -> (start, end) of its slice of rows
+        self.spans: Dict[int, Tuple[int, int]] = {}
+        # Dense grams: gram code -> (row count, packed row bitmap)
+        self.bitmaps: Dict[int, Tuple[int, np.ndarray]] = {}
+
+        count = len(blob) - size + 1
+        if count <= 0:
+            self.rows = memoryview(np.empty(0, dtype=np.uint32))
+            return
+
+        codes = np.zeros(count, dtype=np.uint64)
+        valid = np.ones(count, dtype=bool)
+        for offset in range(size):
+            window = blob[offset:offset + count]
+            codes = (codes << np.uint64(8)) | window
+            valid &= window != 0
+
+        # Sorting (gram, row) keys groups each gram's rows in ascending order;
+        # dropping repeated keys leaves one posting per row
+        keys = (codes[valid] << np.uint64(32)) | row_of_byte[:count][valid]
+        keys.sort()
+        if len(keys):
+            distinct = np.empty(len(keys), dtype=bool)
+            distinct[0] = True
+            np.not_equal(keys[1:], keys[:-1], out=distinct[1:])
+            keys = keys[distinct]
+
+        codes = keys >> np.uint64(32)
+        rows = (keys & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(rows) else np.empty(0, dtype=np.int64)
+        ends = np.r_[starts[1:], len(rows)].astype(np.int64)
+
+        # A bitmap costs row_count / 8 bytes, a row list 4 bytes per row
+        dense = (ends - starts) * 32 > row_count
+        if not bitmaps:
+            dense[:] = False
+        for code, start, end in zip(codes[starts[dense]].tolist(), starts[dense].tolist(), ends[dense].tolist()):
+            bits = np.zeros(row_count, dtype=bool)
+            bits[rows[start:end]] = True
+            self.bitmaps[code] = (end - start, np.packbits(bits))
+
+        keep = np.repeat(~dense, ends - starts)
+        rows = rows[keep]
+        sparse_starts = starts[~dense]
+        lengths = (ends - starts)[~dense]
+        new_starts = np.r_[0, np.cumsum(lengths)[:-1]] if len(lengths) else lengths
+        self.spans = dict(zip(codes[sparse_starts].tolist(),
+                              zip(new_starts.tolist(), (new_starts + lengths).tolist())))
+        # Slices of a memoryview iterate as plain ints without copying
+        self.rows = memoryview(rows)
+
+    def __len__(self) -> int:
+        return len(self.spans) + len(self.bitmaps)
+
+    def size(self, code: int) -> Optional[int]:
+        """Number of rows holding the gram, None if no row does"""
+        span = self.spans.get(code)
+        if span is not None:
+            return span[1] - span[0]
+        dense = self.bitmaps.get(code)
+        return dense[0] if dense is not None else None
+
+    def rows_of(self, code: int) -> Iterable[int]:
+        """Ascending ids of the rows holding the gram"""
+        span = self.spans.get(code)
+        if span is not None:
+            return self.rows[span[0]:span[1]]
+        dense = self.bitmaps.get(code)
+        return _bitmap_rows(dense[1]) if dense is not None else ()
+
+    @property
+    def postings(self) -> int:
+        return len(self.rows) + sum(count for count, _ in self.bitmaps.values())
+
+    @property
+    def nbytes(self) -> int:
+        return self.rows.nbytes + sum(bitmap.nbytes for _, bitmap in self.bitmaps.values())
+
+    def to_snapshot(self) -> Dict:
+        """State for the cache snapshot; the spans as arrays"""
+        return {
+            'row_count': self.row_count,
+            'rows': np.asarray(self.rows),
+            'codes': np.fromiter(self.spans.keys(), dtype=np.uint64, count=len(self.spans)),
+            'starts': np.fromiter((span[0] for span in self.spans.values()), dtype=np.int64, count=len(self.spans)),
+            'ends': np.fromiter((span[1] for span in self.spans.values()), dtype=np.int64, count=len(self.spans)),
+            'bitmaps': self.bitmaps,
+        }
+
+    @classmethod
+    def from_snapshot(cls, state: Dict) -> 'PostingLists':
+        """Posting lists from to_snapshot() state (arrays may be read-only views)"""
+        lists = cls.__new__(cls)
+        lists.row_count = state['row_count']
+        lists.rows = memoryview(state['rows'])
+        lists.spans = dict(zip(state['codes'].tolist(), zip(state['starts'].tolist(), state['ends'].tolist())))
+        lists.bitmaps = state['bitmaps']
+        return lists
+
+
+class SymbolSearchIndex:
+    """Trigram/bigram index over the cached symbols, in cache order"""
+
+    def __init__(self, records: Sequence, compact: bool = False):
+        """
+        Args:
+            records: SymbolData objects in the order search results are returned
+                (kept as given if it is a sequence, e.g. compact cache rows)
+            compact: Keep texts in one blob and dense grams as bitmaps
+        """
+        self.records = records if isinstance(records, Sequence) else list(records)
+        self.exchanges: List[str] = []
+        self.strikes = array('d')
+        self.strike_rows: Dict[float, List[int]] = {}
+
+        encoded = []
+        for row, record in enumerate(self.records):
+            encoded.append(SEPARATOR.join((
+                record.symbol.upper(),
+                record.brsymbol.upper(),
+                record.name.upper() if record.name else '',
+                record.token or '',
+            )).encode('utf-8'))
+            self.exchanges.append(record.exchange)
+            self.strikes.append(NAN if record.strike is None else record.strike)
+            if record.strike:
+                self.strike_rows.setdefault(record.strike, []).append(row)
+
+        # Row texts joined by separators; row r spans offsets[r] to offsets[r + 1] - 1
+        joined = SEPARATOR.encode().join(encoded)
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        if compact:
+            self.texts = None
+            self.blob = joined
+            self.offsets = array('q', np.r_[0, np.cumsum(lengths + 1)].tolist())
+        else:
+            self.texts: Optional[List[str]] = [text.decode('utf-8') for text in encoded]
+            self.blob = b''
+            self.offsets = array('q')
+        del encoded
+
+        blob = np.frombuffer(joined, dtype=np.uint8)
+        # Row id of every byte in the blob
+        row_of_byte = np.repeat(np.arange(len(lengths), dtype=np.uint64), lengths + 1)[:len(blob)]
+
+        self.trigrams = PostingLists(blob, row_of_byte, 3, len(lengths), bitmaps=compact)
+        self.bigrams = PostingLists(blob, row_of_byte, 2, len(lengths), bitmaps=compact)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def to_snapshot(self) -> Dict:
+        """State for the cache snapshot, without the records"""
+        return {
+            'exchanges': self.exchanges,
+            'strikes': self.strikes,
+            'strike_rows': self.strike_rows,
+            'texts': self.texts,
+            'blob': self.blob,
+            'offsets': self.offsets,
+            'trigrams': self.trigrams.to_snapshot(),
+            'bigrams': self.bigrams.to_snapshot(),
+        }
+
+    @classmethod
+    def from_snapshot(cls, state: Dict, records: Sequence) -> 'SymbolSearchIndex':
+        """
+        Index from to_snapshot() state
+
+        Args:
+            state: to_snapshot() of an index built over the same records
+            records: The cached records, in the order the index was built
+        """
+        index = cls.__new__(cls)
+        index.records = records
+        index.exchanges = state['exchanges']
+        index.strikes = state['strikes']
+        index.strike_rows = state['strike_rows']
+        index.texts = state['texts']
+        index.blob = state['blob']
+        index.offsets = state['offsets']
+        index.trigrams = PostingLists.from_snapshot(state['trigrams'])
+        index.bigrams = PostingLists.from_snapshot(state['bigrams'])
+        return index
+
+    def _postings(self, term: str) -> Optional[Tuple[Optional[PostingLists], int, int]]:
+        """
+        Shortest posting list a row must appear in to contain `term`, as
+        (posting lists, gram code, size); the lists are None when some gram of
+        the term is in no row. None when the term is too short to be indexed
+        (every row is a candidate).
+        """
+        data = term.encode('utf-8')
+        if len(data) >= 3:
+            shortest = None
+            for i in range(len(data) - 2):
+                code = int.from_bytes(data[i:i + 3], 'big')
+                size = self.trigrams.size(code)
+                if size is None:
+                    return None, 0, 0
+                if shortest is None or size < shortest[2]:
+                    shortest = (self.trigrams, code, size)
+            return shortest
+        if len(data) == 2:
+            code = int.from_bytes(data, 'big')
+            size = self.bigrams.size(code)
+            return (self.bigrams, code, size) if size is not None else (None, 0, 0)
+        return None
+
+    def search(self, terms: List[str], exchange: Optional[str] = None, limit: int = 50) -> List:
+        """
+        Records matching every term (upper-cased), in cache order
+
+        A term matches a row if it is a substring of the upper-cased symbol,
+        brsymbol or name or of the token, or if it is a number equal to the
+        row's strike.
+        """
+        if not terms:
+            return []
+
+        numbers = []
+        for term in terms:
+            try:
+                numbers.append(float(term))
+            except ValueError:
+                numbers.append(None)
+
+        # Drive the scan from the most selective term. A numeric term also
+        # matches by strike, so its rows are its n-gram postings plus the rows
+        # with that strike
+        driver = None
+        driver_size = len(self.records)
+        for term, number in zip(terms, numbers):
+            shortest = self._postings(term)
+            if shortest is None:
+                continue
+            lists, code, size = shortest
+            strike_rows = self.strike_rows.get(number) if number is not None else None
+            size += len(strike_rows) if strike_rows else 0
+            if driver is None or size < driver_size:
+                driver, driver_size = (lists, code, strike_rows), size
+        if driver is None:
+            driver = range(len(self.records))
+        else:
+            lists, code, strike_rows = driver
+            postings = lists.rows_of(code) if lists is not None else ()
+            driver = _dedupe_sorted(heapq.merge(postings, strike_rows)) if strike_rows else postings
+
+        texts, blob, offsets = self.texts, self.blob, self.offsets
+        if texts is None:
+            terms = [term.encode('utf-8') for term in terms]
+        checks = list(zip(terms, numbers))
+        exchanges, strikes = self.exchanges, self.strikes
+        matches = []
+        for row in driver:
+            if exchange and exchanges[row] != exchange:
+                continue
+            text = texts[row] if texts is not None else blob[offsets[row]:offsets[row + 1] - 1]
+            for term, number in checks:
+                if term in text:
+                    continue
+                if number is not None:
+                    strike = strikes[row]
+                    if strike and strike == number:
+                        continue
+                break
+            else:
+                matches.append(row)
+                if len(matches) >= limit:
+                    break
+        return [self.records[row] for row in matches]
+
+    def get_stats(self) -> Dict:
+        """Index size for cache monitoring"""
+        return {
+            'rows': len(self.records),
+            'trigrams': len(self.trigrams),
+            'bigrams': len(self.bigrams),
+            'postings': self.trigrams.postings + self.bigrams.postings,
+            'postings_mb': round((self.trigrams.nbytes + self.bigrams.nbytes) / (1024 * 1024), 2),
+            'compact': self.texts is None,
+        }
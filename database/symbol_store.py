@@ -0,0 +1,227 @@
+"""
+Compact Columnar Storage for the In-Memory Symbol Cache
+
+The default BrokerSymbolCache storage keeps one SymbolData object per
+instrument and references it from five dicts, three of them keyed by
+(key, exchange) tuples. With SYMBOL_CACHE_COMPACT enabled it uses
+CompactSymbolStore instead:
+
+    rows        every loaded symtoken row is a row id; fields live in columns
+    strings     symbol, brsymbol and token columns are plain lists; repeated
+                values (name) are interned
+    codes       exchange, brexchange, instrumenttype and expiry are small
+                integer codes into a per-column value table (array('H'))
+    numbers     strike, tick_size (NaN for None) and lotsize are typed arrays
+    indexes     dicts map keys to row ids; the (key, exchange) lookups are a
+                dict per exchange, so no tuple is stored per symbol
+
+The index views below expose the same mapping interface the cache's lookups
+already use (``key in index``, ``index[key]``, ``values()``). A SymbolData
+is built from the columns on each access, so callers get the same objects
+as before at the cost of a few hundred nanoseconds per lookup.
+"""
+
+import sys
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+NAN = float('nan')
+
+# lotsize column value for a missing lot size
+NO_LOTSIZE = -(2 ** 63)
+
+
+def intern_str(value):
+    """sys.intern for strings, anything else unchanged"""
+    return sys.intern(value) if type(value) is str else value
+
+
+class CodedColumn:
+    """Column of repeated values stored as codes into a value table"""
+
+    __slots__ = ('values', 'codes', 'column')
+
+    def __init__(self):
+        self.values: List = [None]
+        self.codes: Dict = {None: 0}
+        self.column = array('H')
+
+    def append(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(intern_str(value))
+        self.column.append(code)
+
+    def __getitem__(self, row: int):
+        return self.values[self.column[row]]
+
+    def decode(self) -> List:
+        """Value of every row"""
+        values = self.values
+        return [values[code] for code in self.column]
+
+
+class CompactSymbolStore:
+    """Columns of every loaded symtoken row, addressed by row id"""
+
+    def __init__(self, record_type):
+        """
+        Args:
+            record_type: Class built by record() (SymbolData)
+        """
+        self.record_type = record_type
+        self.symbol: List[str] = []
+        self.brsymbol: List[str] = []
+        self.token: List[str] = []
+        self.name: List[Optional[str]] = []
+        self.exchange = CodedColumn()
+        self.brexchange = CodedColumn()
+        self.instrumenttype = CodedColumn()
+        self.expiry = CodedColumn()
+        self.strike = array('d')
+        self.tick_size = array('d')
+        self.lotsize = array('q')
+
+    def __len__(self) -> int:
+        return len(self.symbol)
+
+    def append(self, sym) -> int:
+        """Add one symtoken row; returns its row id"""
+        row = len(self.symbol)
+        self.symbol.append(sym.symbol)
+        self.brsymbol.append(sym.brsymbol)
+        self.token.append(sym.token)
+        self.name.append(intern_str(sym.name))
+        self.exchange.append(sym.exchange)
+        self.brexchange.append(sym.brexchange)
+        self.instrumenttype.append(sym.instrumenttype)
+        self.expiry.append(sym.expiry)
+        self.strike.append(NAN if sym.strike is None else sym.strike)
+        self.tick_size.append(NAN if sym.tick_size is None else sym.tick_size)
+        self.lotsize.append(NO_LOTSIZE if sym.lotsize is None else sym.lotsize)
+        return row
+
+    def record(self, row: int):
+        """SymbolData for a row id"""
+        strike = self.strike[row]
+        tick_size = self.tick_size[row]
+        lotsize = self.lotsize[row]
+        return self.record_type(
+            symbol=self.symbol[row],
+            brsymbol=self.brsymbol[row],
+            name=self.name[row],
+            exchange=self.exchange[row],
+            brexchange=self.brexchange[row],
+            token=self.token[row],
+            expiry=self.expiry[row],
+            strike=None if strike != strike else strike,
+            lotsize=None if lotsize == NO_LOTSIZE else lotsize,
+            instrumenttype=self.instrumenttype[row],
+            tick_size=None if tick_size != tick_size else tick_size,
+        )
+
+    def records(self) -> List:
+        """SymbolData for every row, in row order"""
+        return list(map(
+            self.record_type,
+            self.symbol,
+            self.brsymbol,
+            self.name,
+            self.exchange.decode(),
+            self.brexchange.decode(),
+            self.token,
+            self.expiry.decode(),
+            [None if strike != strike else strike for strike in self.strike],
+            [None if lotsize == NO_LOTSIZE else lotsize for lotsize in self.lotsize],
+            self.instrumenttype.decode(),
+            [None if tick_size != tick_size else tick_size for tick_size in self.tick_size],
+        ))
+
+
+class RecordSequence(Sequence):
+    """Records of a list of row ids, built on access"""
+
+    def __init__(self, store: CompactSymbolStore, rows: Sequence[int]):
+        self.store = store
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.store.record(row) for row in self.rows[i]]
+        return self.store.record(self.rows[i])
+
+    def __iter__(self) -> Iterator:
+        record = self.store.record
+        return (record(row) for row in self.rows)
+
+
+class KeyIndex:
+    """key -> row id, read as key -> record"""
+
+    def __init__(self, store: CompactSymbolStore):
+        self.store = store
+        self.rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, key) -> bool:
+        return key in self.rows
+
+    def __getitem__(self, key):
+        return self.store.record(self.rows[key])
+
+    def __setitem__(self, key, row: int):
+        self.rows[key] = row
+
+    def get(self, key, default=None):
+        row = self.rows.get(key)
+        return default if row is None else self.store.record(row)
+
+    def values(self) -> RecordSequence:
+        """Records in key insertion order (a replaced key keeps its position)"""
+        return RecordSequence(self.store, array('l', self.rows.values()))
+
+    def clear(self):
+        self.rows.clear()
+
+
+class ExchangeKeyIndex:
+    """(key, exchange) -> row id as one dict per exchange, read as (key, exchange) -> record"""
+
+    def __init__(self, store: CompactSymbolStore):
+        self.store = store
+        self.rows: Dict[str, Dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(rows) for rows in self.rows.values())
+
+    def _row(self, key: Tuple[str, str]) -> Optional[int]:
+        rows = self.rows.get(key[1])
+        return rows.get(key[0]) if rows is not None else None
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return self._row(key) is not None
+
+    def __getitem__(self, key: Tuple[str, str]):
+        row = self._row(key)
+        if row is None:
+            raise KeyError(key)
+        return self.store.record(row)
+
+    def __setitem__(self, key: Tuple[str, str], row: int):
+        rows = self.rows.get(key[1])
+        if rows is None:
+            rows = self.rows[intern_str(key[1])] = {}
+        rows[key[0]] = row
+
+    def get(self, key: Tuple[str, str], default=None):
+        row = self._row(key)
+        return default if row is None else self.store.record(row)
+
+    def clear(self):
+        self.rows.clear()
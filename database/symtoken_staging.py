@@ -0,0 +1,122 @@
+"""
+Staging Table Load for the Master Contract
+
+A master contract download used to delete the symtoken rows and insert the
+new contract segment by segment, so for the whole download symbol lookups saw
+an empty or partial table, and a failed download left it that way. Here the
+new contract is bulk-loaded into a symtoken_staging table without indexes,
+then swapped in within one transaction: drop symtoken, rename the staging
+table to symtoken and create the indexes. Readers see the previous contract
+until the swap commits, and a failure before it leaves symtoken untouched.
+
+On SQLite the rows are inserted with the driver's executemany and plain
+tuples, which skips SQLAlchemy's per-row parameter processing; other
+databases use a Core insert (the id sequence is rendered into the insert).
+"""
+
+import time
+from typing import Dict
+
+import pandas as pd
+from sqlalchemy import Index, MetaData, Table, inspect
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+STAGING_TABLE = 'symtoken_staging'
+
+
+def _quote(connection, name: str) -> str:
+    return connection.dialect.identifier_preparer.quote(name)
+
+
+def _rows(df: pd.DataFrame, columns):
+    """DataFrame rows as tuples, with NaN as None"""
+    df = df[columns].astype(object)
+    return df.where(df.notna(), None).itertuples(index=False, name=None)
+
+
+def _bulk_insert(connection, staging: Table, df: pd.DataFrame):
+    columns = [column.name for column in staging.columns if column.name in df.columns]
+    if connection.dialect.name == 'sqlite':
+        statement = (
+            f"INSERT INTO {_quote(connection, staging.name)} "
+            f"({', '.join(_quote(connection, column) for column in columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+        connection.exec_driver_sql(statement, list(_rows(df, columns)))
+    else:
+        connection.execute(staging.insert(), [dict(zip(columns, row)) for row in _rows(df, columns)])
+
+
+def _index_specs(connection, table: Table) -> Dict[str, tuple]:
+    """
+    Indexes to create on the swapped-in table: those of the current symtoken
+    table (other models of the table may define more than this one), plus the
+    model's own
+    """
+    specs = {}
+    if inspect(connection).has_table(table.name):
+        for index in inspect(connection).get_indexes(table.name):
+            columns = index['column_names']
+            if index['name'] and columns and all(column in table.c for column in columns):
+                specs[index['name']] = (tuple(columns), bool(index.get('unique')))
+    for index in table.indexes:
+        specs[index.name] = (tuple(column.name for column in index.columns), bool(index.unique))
+    return specs
+
+
+def load_and_swap(engine, table: Table, df: pd.DataFrame) -> Dict[str, float]:
+    """
+    Replace the contents of a symtoken table with a DataFrame
+
+    Args:
+        engine: Engine of the table's database
+        table: SymToken.__table__ of the broker's model
+        df: New rows, with the model's column names (id is assigned)
+
+    Returns:
+        Dict with the 'load' and 'swap' times in seconds and the 'rows' loaded
+    """
+    staging = table.to_metadata(MetaData(), name=STAGING_TABLE)
+    staging.indexes.clear()
+
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        # Not staging.drop(): that would drop the id sequence symtoken still uses
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {_quote(connection, STAGING_TABLE)}")
+        staging.create(connection, checkfirst=True)
+        _bulk_insert(connection, staging, df)
+    load_time = time.perf_counter() - start
+    logger.info(f"Loaded {len(df)} symbols into {STAGING_TABLE} in {load_time:.2f}s")
+
+    start = time.perf_counter()
+    with engine.connect() as connection:
+        if connection.dialect.name == 'sqlite':
+            # pysqlite only opens a transaction before DML, not DDL
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+        try:
+            specs = _index_specs(connection, table)
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {_quote(connection, table.name)}")
+            connection.exec_driver_sql(
+                f"ALTER TABLE {_quote(connection, STAGING_TABLE)} RENAME TO {_quote(connection, table.name)}"
+            )
+            if connection.dialect.name == 'postgresql':
+                connection.exec_driver_sql(
+                    f"ALTER INDEX {_quote(connection, STAGING_TABLE + '_pkey')} "
+                    f"RENAME TO {_quote(connection, table.name + '_pkey')}"
+                )
+
+            target = table.to_metadata(MetaData())
+            target.indexes.clear()
+            for name, (columns, unique) in specs.items():
+                Index(name, *[target.c[column] for column in columns], unique=unique).create(connection)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+    swap_time = time.perf_counter() - start
+    logger.info(f"Swapped {STAGING_TABLE} in as {table.name} with {len(specs)} indexes in {swap_time:.2f}s")
+
+    return {'load': load_time, 'swap': swap_time, 'rows': len(df)}
@@ -3,12 +3,19 @@ Enhanced Token DB with Full Memory Caching for 100,000+ symbols
 Optimized for zero-config deployment with configurable session reset time (SESSION_EXPIRY_TIME)
 """
 
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Sequence, Tuple, Any
 from datetime import datetime, timedelta
+import gc
+import os
 import time
+import tracemalloc
+from array import array
 from dataclasses import dataclass, field
 from collections import defaultdict
 import pytz
+from database.symbol_search_index import SymbolSearchIndex
+from database.fno_symbol_index import FnoSymbolIndex
+from database.symbol_store import CompactSymbolStore, KeyIndex, ExchangeKeyIndex, RecordSequence, intern_str
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -24,6 +31,10 @@ class CacheStats:
     last_loaded: Optional[datetime] = None
     total_symbols: int = 0
     memory_usage_mb: float = 0.0
+    rss_delta_mb: float = 0.0
+    memory_source: str = 'rss'
+    storage: str = 'objects'
+    loaded_from: str = 'database'
     
     def get_hit_rate(self) -> float:
         """Calculate cache hit rate"""
@@ -41,10 +52,14 @@ class CacheStats:
             'cache_loads': self.cache_loads,
             'last_loaded': self.last_loaded.isoformat() if self.last_loaded else None,
             'total_symbols': self.total_symbols,
-            'memory_usage_mb': f"{self.memory_usage_mb:.2f}"
+            'memory_usage_mb': f"{self.memory_usage_mb:.2f}",
+            'rss_delta_mb': f"{self.rss_delta_mb:.2f}",
+            'memory_source': self.memory_source,
+            'storage': self.storage,
+            'loaded_from': self.loaded_from
         }
 
-@dataclass
+@dataclass(slots=True)
 class SymbolData:
     """Lightweight symbol data structure for in-memory storage"""
     symbol: str
@@ -70,14 +85,19 @@ class BrokerSymbolCache:
         self.active_broker: Optional[str] = None
         self.cache_loaded: bool = False
         
-        # Primary storage - all symbols in memory
-        self.symbols: Dict[str, SymbolData] = {}
+        # Compact columnar storage (SYMBOL_CACHE_COMPACT) instead of one
+        # SymbolData object per symbol
+        self.compact: bool = os.getenv('SYMBOL_CACHE_COMPACT', 'FALSE').upper() == 'TRUE'
+        self.store: Optional[CompactSymbolStore] = None
         
-        # Multi-index maps for O(1) lookups
-        self.by_symbol_exchange: Dict[Tuple[str, str], SymbolData] = {}
-        self.by_token_exchange: Dict[Tuple[str, str], SymbolData] = {}
-        self.by_brsymbol_exchange: Dict[Tuple[str, str], SymbolData] = {}
-        self.by_token: Dict[str, SymbolData] = {}
+        # Primary storage and multi-index maps for O(1) lookups
+        self._init_storage()
+        
+        # N-gram index for search_symbols, built with the cache
+        self.search_index: Optional[SymbolSearchIndex] = None
+        
+        # Underlying -> expiry -> type -> strike index for F&O lookups
+        self.fno_index: Optional[FnoSymbolIndex] = None
         
         # Cache statistics
         self.stats = CacheStats()
@@ -88,6 +108,33 @@ class BrokerSymbolCache:
         
         logger.debug("BrokerSymbolCache initialized")
     
+    def _init_storage(self):
+        """
+        Empty primary dict and lookup indexes. In compact mode they are views
+        mapping keys to row ids of a CompactSymbolStore, read as SymbolData.
+        """
+        # Every loaded row in load order, including rows whose token another
+        # exchange also uses (the primary dict keeps one row per token); the
+        # search and F&O indexes are built over these
+        self.records: Sequence[SymbolData] = []
+        if self.compact:
+            self.store = CompactSymbolStore(SymbolData)
+            self.symbols = self.by_token = KeyIndex(self.store)
+            self.by_symbol_exchange = ExchangeKeyIndex(self.store)
+            self.by_token_exchange = ExchangeKeyIndex(self.store)
+            self.by_brsymbol_exchange = ExchangeKeyIndex(self.store)
+            return
+        
+        self.store = None
+        # Primary storage - all symbols in memory
+        self.symbols: Dict[str, SymbolData] = {}
+        
+        # Multi-index maps for O(1) lookups
+        self.by_symbol_exchange: Dict[Tuple[str, str], SymbolData] = {}
+        self.by_token_exchange: Dict[Tuple[str, str], SymbolData] = {}
+        self.by_brsymbol_exchange: Dict[Tuple[str, str], SymbolData] = {}
+        self.by_token: Dict[str, SymbolData] = {}
+    
     def load_all_symbols(self, broker: str) -> bool:
         """
         Load all symbols for the active broker into memory
@@ -102,66 +149,251 @@ class BrokerSymbolCache:
             # Clear existing cache
             self.clear_cache()
             
-            # Query all symbols from database
-            symbols = SymToken.query.all()
+            # Query all symbols from database and build in-memory structures
+            total_symbols, index_time = self._load_measured(
+                lambda: self._build_from_rows(SymToken.query.all())
+            )
             
-            if not symbols:
+            if not total_symbols:
                 logger.warning(f"No symbols found in database for broker: {broker}")
                 return False
             
-            # Build in-memory structures
+            self._mark_loaded(broker, total_symbols, 'database')
+            
+            load_time = time.time() - start_time
+            logger.debug(
+                f"Successfully loaded {self.stats.total_symbols} symbols "
+                f"in {load_time:.2f} seconds (indexes {index_time:.2f}s). "
+                f"Memory usage: {self.stats.memory_usage_mb:.2f} MB "
+                f"({self.stats.storage} storage, RSS +{self.stats.rss_delta_mb:.2f} MB)"
+            )
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error loading symbols into cache: {e}")
+            return False
+    
+    def load_from_snapshot(self, broker: str, read_state) -> bool:
+        """
+        Load the cache from a snapshot (database/symbol_cache_snapshot.py)
+        instead of querying symtoken and rebuilding the indexes
+        
+        Args:
+            broker: Broker the snapshot was taken for
+            read_state: Callable returning get_snapshot_state() output, or
+                None if the snapshot cannot be used
+        """
+        try:
+            start_time = time.time()
+            self.clear_cache()
+            
+            total_symbols, _ = self._load_measured(lambda: self._restore_state(read_state()), collect=False)
+            if not total_symbols:
+                return False
+            
+            self._mark_loaded(broker, total_symbols, 'snapshot')
+            logger.debug(
+                f"Restored {self.stats.total_symbols} symbols from snapshot "
+                f"in {(time.time() - start_time) * 1000:.0f} ms "
+                f"({self.stats.storage} storage, RSS +{self.stats.rss_delta_mb:.2f} MB)"
+            )
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error restoring symbol cache snapshot: {e}")
+            self.clear_cache()
+            return False
+    
+    def _mark_loaded(self, broker: str, total_symbols: int, source: str):
+        """Update cache metadata and session timing after a load"""
+        self.active_broker = broker
+        self.cache_loaded = True
+        self.stats.total_symbols = total_symbols
+        self.stats.cache_loads += 1
+        self.stats.last_loaded = datetime.now(pytz.timezone('Asia/Kolkata'))
+        self.stats.loaded_from = source
+        
+        # Set session timing
+        self._set_session_timing()
+    
+    def _load_measured(self, load, collect: bool = True) -> Tuple[int, float]:
+        """
+        Fill the cache with load() and record the memory it keeps in stats:
+        the process RSS growth over the load and, when
+        SYMBOL_CACHE_TRACE_MEMORY is enabled (or tracemalloc is already
+        running), the allocations made by the load that are still live once
+        its source rows are released. Tracing slows the load down several
+        times, so it is off by default.
+        
+        The cyclic garbage collector is paused during the load: the cache is
+        hundreds of thousands of new objects, none of them garbage, and
+        collections triggered by allocating them would rescan them repeatedly.
+        
+        Args:
+            load: Callable filling the cache and returning (rows loaded,
+                seconds spent on the search and F&O indexes)
+            collect: Run a full collection afterwards, to release source rows
+                held in reference cycles (ORM instances)
+        
+        Returns:
+            load()'s result
+        """
+        already_tracing = tracemalloc.is_tracing()
+        trace = already_tracing or os.getenv('SYMBOL_CACHE_TRACE_MEMORY', 'FALSE').upper() == 'TRUE'
+        if trace and not already_tracing:
+            tracemalloc.start()
+        traced_start = tracemalloc.get_traced_memory()[0] if trace else 0
+        rss_start = _rss_bytes()
+        
+        try:
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                total_symbols, index_time = load()
+            finally:
+                if gc_enabled:
+                    gc.enable()
+            
+            if collect:
+                gc.collect()
+            traced = tracemalloc.get_traced_memory()[0] - traced_start if trace else 0
+        finally:
+            if trace and not already_tracing:
+                tracemalloc.stop()
+        
+        self.stats.rss_delta_mb = (_rss_bytes() - rss_start) / (1024 * 1024)
+        self.stats.memory_usage_mb = traced / (1024 * 1024) if trace else self.stats.rss_delta_mb
+        self.stats.memory_source = 'tracemalloc' if trace else 'rss'
+        self.stats.storage = 'compact' if self.compact else 'objects'
+        return total_symbols, index_time
+    
+    def _build_from_rows(self, symbols) -> Tuple[int, float]:
+        """Build the cache from symtoken rows; returns (rows, index seconds)"""
+        return len(symbols), (self._build_indexes(symbols) if symbols else 0.0)
+    
+    def _build_indexes(self, symbols) -> float:
+        """
+        Fill the primary dict, lookup indexes, search index and F&O index from
+        symtoken rows
+        
+        Returns:
+            Seconds spent building the search and F&O indexes
+        """
+        if self.compact:
+            store = self.store
+            for sym in symbols:
+                # One row in the columns; the indexes hold its row id
+                row = store.append(sym)
+                self.symbols[sym.token] = row
+                self.by_symbol_exchange[(sym.symbol, sym.exchange)] = row
+                self.by_token_exchange[(sym.token, sym.exchange)] = row
+                self.by_brsymbol_exchange[(sym.brsymbol, sym.exchange)] = row
+            self.records = RecordSequence(store, range(len(store)))
+        else:
             for sym in symbols:
-                # Create lightweight data object
+                # Create lightweight data object (repeated values interned)
                 symbol_data = SymbolData(
                     symbol=sym.symbol,
                     brsymbol=sym.brsymbol,
-                    name=sym.name,
-                    exchange=sym.exchange,
-                    brexchange=sym.brexchange,
+                    name=intern_str(sym.name),
+                    exchange=intern_str(sym.exchange),
+                    brexchange=intern_str(sym.brexchange),
                     token=sym.token,
-                    expiry=sym.expiry,
+                    expiry=intern_str(sym.expiry),
                     strike=sym.strike,
                     lotsize=sym.lotsize,
-                    instrumenttype=sym.instrumenttype,
+                    instrumenttype=intern_str(sym.instrumenttype),
                     tick_size=sym.tick_size
                 )
                 
                 # Store in primary dict
                 self.symbols[sym.token] = symbol_data
+                self.records.append(symbol_data)
                 
                 # Build indexes
                 self.by_symbol_exchange[(sym.symbol, sym.exchange)] = symbol_data
                 self.by_token_exchange[(sym.token, sym.exchange)] = symbol_data
                 self.by_brsymbol_exchange[(sym.brsymbol, sym.exchange)] = symbol_data
                 self.by_token[sym.token] = symbol_data
-            
-            # Update cache metadata
-            self.active_broker = broker
-            self.cache_loaded = True
-            self.stats.total_symbols = len(symbols)
-            self.stats.cache_loads += 1
-            self.stats.last_loaded = datetime.now(pytz.timezone('Asia/Kolkata'))
-            
-            # Calculate memory usage (rough estimate)
-            self.stats.memory_usage_mb = (
-                len(self.symbols) * 500  # ~500 bytes per symbol
-            ) / (1024 * 1024)
-            
-            load_time = time.time() - start_time
-            logger.debug(
-                f"Successfully loaded {self.stats.total_symbols} symbols "
-                f"in {load_time:.2f} seconds. "
-                f"Memory usage: {self.stats.memory_usage_mb:.2f} MB"
-            )
-            
-            # Set session timing
-            self._set_session_timing()
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error loading symbols into cache: {e}")
-            return False
+        
+        # Search and F&O indexes over every row, in load order
+        index_start = time.time()
+        self.search_index = SymbolSearchIndex(self.records, compact=self.compact)
+        self.fno_index = FnoSymbolIndex(self.records)
+        return time.time() - index_start
+    
+    def get_snapshot_state(self) -> dict:
+        """
+        Loaded symbols and indexes for database/symbol_cache_snapshot.py:
+        every distinct row once as CompactSymbolStore columns, the lookup
+        indexes as row ids, and the search and F&O index state. In object
+        storage only the row ids of each dict and of the records are kept;
+        the dicts' keys are fields of the rows.
+        """
+        names = ('symbols', 'by_symbol_exchange', 'by_token_exchange', 'by_brsymbol_exchange')
+        if self.compact:
+            store = self.store
+            indexes = {name: getattr(self, name).rows for name in names}
+        else:
+            names += ('records',)
+            # Objects shared between the dicts become one row, so restoring
+            # them keeps them shared
+            store = CompactSymbolStore(SymbolData)
+            row_of: Dict[int, int] = {}
+            indexes = {}
+            for name in names:
+                index = getattr(self, name)
+                rows = array('l')
+                for symbol_data in (index if name == 'records' else index.values()):
+                    row = row_of.get(id(symbol_data))
+                    if row is None:
+                        row = row_of[id(symbol_data)] = store.append(symbol_data)
+                    rows.append(row)
+                indexes[name] = rows
+        
+        return {
+            'storage': 'compact' if self.compact else 'objects',
+            'total_symbols': self.stats.total_symbols,
+            'store': store,
+            'indexes': indexes,
+            'search_index': self.search_index.to_snapshot(),
+            'fno_index': self.fno_index.to_snapshot(),
+        }
+    
+    def _restore_state(self, state: Optional[dict]) -> Tuple[int, float]:
+        """Fill the cache from get_snapshot_state() output; returns (rows, index seconds)"""
+        if not state:
+            return 0, 0.0
+        
+        store, indexes = state['store'], state['indexes']
+        if self.compact:
+            self.store = store
+            self.symbols = self.by_token = KeyIndex(store)
+            self.symbols.rows = indexes['symbols']
+            for name in ('by_symbol_exchange', 'by_token_exchange', 'by_brsymbol_exchange'):
+                index = ExchangeKeyIndex(store)
+                index.rows = indexes[name]
+                setattr(self, name, index)
+            self.records = RecordSequence(store, range(len(store)))
+        else:
+            objects = store.records().__getitem__
+            rows = indexes['symbols']
+            self.symbols = dict(zip(map(store.token.__getitem__, rows), map(objects, rows)))
+            self.by_token = dict(self.symbols)
+            exchange = store.exchange.decode().__getitem__
+            for name, column in (('by_symbol_exchange', store.symbol),
+                                 ('by_token_exchange', store.token),
+                                 ('by_brsymbol_exchange', store.brsymbol)):
+                rows = indexes[name]
+                keys = zip(map(column.__getitem__, rows), map(exchange, rows))
+                setattr(self, name, dict(zip(keys, map(objects, rows))))
+            self.records = list(map(objects, indexes['records']))
+        
+        index_start = time.time()
+        self.search_index = SymbolSearchIndex.from_snapshot(state['search_index'], self.records)
+        self.fno_index = FnoSymbolIndex.from_snapshot(state['fno_index'], self.records)
+        return state['total_symbols'], time.time() - index_start
     
     def _set_session_timing(self):
         """Set session start and next reset time from SESSION_EXPIRY_TIME env variable"""
@@ -317,6 +549,9 @@ class BrokerSymbolCache:
         if not terms:
             return []
 
+        if self.search_index is not None:
+            return self.search_index.search(terms, exchange, limit)
+
         matches = []
 
         # Parse numeric terms for strike matching
@@ -327,7 +562,7 @@ class BrokerSymbolCache:
             except ValueError:
                 pass
 
-        for symbol_data in self.symbols.values():
+        for symbol_data in self.records:
             # Skip if exchange filter doesn't match
             if exchange and symbol_data.exchange != exchange:
                 continue
@@ -407,7 +642,18 @@ class BrokerSymbolCache:
                     except ValueError:
                         pass
 
-        for symbol_data in self.symbols.values():
+        # Narrow to the matching F&O index ladders when any F&O filter is set;
+        # every filter below is still applied to the candidates
+        if self.fno_index is not None and (
+            underlying_upper or expiry_stripped or inst_type or strike_min is not None or strike_max is not None
+        ):
+            candidates = self.fno_index.candidates(
+                exchange, underlying_upper, expiry_stripped, inst_type, strike_min, strike_max
+            )
+        else:
+            candidates = self.records
+
+        for symbol_data in candidates:
             # Exchange filter
             if exchange and symbol_data.exchange != exchange:
                 continue
@@ -485,11 +731,9 @@ class BrokerSymbolCache:
     
     def clear_cache(self):
         """Clear all cached data"""
-        self.symbols.clear()
-        self.by_symbol_exchange.clear()
-        self.by_token_exchange.clear()
-        self.by_brsymbol_exchange.clear()
-        self.by_token.clear()
+        self._init_storage()
+        self.search_index = None
+        self.fno_index = None
         self.cache_loaded = False
         self.active_broker = None
         logger.debug("Cache cleared")
@@ -503,9 +747,24 @@ class BrokerSymbolCache:
             'cache_valid': self.is_cache_valid(),
             'session_start': self.session_start.isoformat() if self.session_start else None,
             'next_reset': self.next_reset_time.isoformat() if self.next_reset_time else None,
+            'search_index': self.search_index.get_stats() if self.search_index else None,
+            'fno_index': self.fno_index.get_stats() if self.fno_index else None,
             'stats': self.stats.to_dict()
         }
 
+def _rss_bytes() -> int:
+    """Resident set size of this process (0 if it cannot be read)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0
+
 # Global cache instance (singleton pattern)
 _cache_instance: Optional[BrokerSymbolCache] = None
 
@@ -802,6 +1061,21 @@ def search_symbols(query: str, exchange: Optional[str] = None, limit: int = 50)
         return []
 
 
+def enhanced_search_symbols_cached(query: str, exchange: Optional[str] = None) -> List[SymbolData]:
+    """
+    All symbols matching every term of the query - served from the cache's
+    search index, falling back to database.symbol.enhanced_search_symbols
+    """
+    cache = get_cache()
+
+    if cache.cache_loaded and cache.is_cache_valid():
+        return cache.search_symbols(query, exchange, limit=max(len(cache.records), 1))
+
+    cache.stats.db_queries += 1
+    from database.symbol import enhanced_search_symbols
+    return enhanced_search_symbols(query, exchange)
+
+
 def fno_search_symbols(
     query: Optional[str] = None,
     exchange: Optional[str] = None,
@@ -886,40 +1160,14 @@ def fno_search_symbols(
 
 def get_distinct_expiries_cached(exchange: Optional[str] = None, underlying: Optional[str] = None) -> List[str]:
     """
-    Get distinct expiry dates from cache - fast in-memory lookup
+    Get distinct expiry dates from the cache's F&O index (sorted chronologically at load)
     Falls back to database if cache is not available
     """
     cache = get_cache()
 
-    if cache.cache_loaded and cache.is_cache_valid():
-        from datetime import datetime
-        expiries = set()
+    if cache.cache_loaded and cache.is_cache_valid() and cache.fno_index is not None:
         underlying_upper = underlying.strip().upper() if underlying else None
-
-        for symbol_data in cache.symbols.values():
-            # Filter by exchange
-            if exchange and symbol_data.exchange != exchange:
-                continue
-
-            # Filter by underlying
-            if underlying_upper and (not symbol_data.name or symbol_data.name.upper() != underlying_upper):
-                continue
-
-            # Collect non-empty expiries
-            if symbol_data.expiry:
-                expiries.add(symbol_data.expiry)
-
-        # Sort expiries chronologically
-        def parse_expiry(exp_str):
-            try:
-                return datetime.strptime(exp_str, "%d-%b-%y")
-            except ValueError:
-                try:
-                    return datetime.strptime(exp_str, "%d-%b-%Y")
-                except ValueError:
-                    return datetime.max
-
-        return sorted(list(expiries), key=parse_expiry)
+        return cache.fno_index.get_expiries(exchange, underlying_upper)
 
     # Fallback to database
     try:
@@ -932,24 +1180,13 @@ def get_distinct_expiries_cached(exchange: Optional[str] = None, underlying: Opt
 
 def get_distinct_underlyings_cached(exchange: Optional[str] = None) -> List[str]:
     """
-    Get distinct underlying names from cache - fast in-memory lookup
+    Get distinct underlying names from the cache's F&O index (sorted at load)
     Falls back to database if cache is not available
     """
     cache = get_cache()
 
-    if cache.cache_loaded and cache.is_cache_valid():
-        underlyings = set()
-
-        for symbol_data in cache.symbols.values():
-            # Filter by exchange
-            if exchange and symbol_data.exchange != exchange:
-                continue
-
-            # Collect non-empty names
-            if symbol_data.name:
-                underlyings.add(symbol_data.name)
-
-        return sorted(list(underlyings))
+    if cache.cache_loaded and cache.is_cache_valid() and cache.fno_index is not None:
+        return cache.fno_index.get_underlyings(exchange)
 
     # Fallback to database
     try:
@@ -957,4 +1194,41 @@ def get_distinct_underlyings_cached(exchange: Optional[str] = None) -> List[str]
         return get_distinct_underlyings(exchange=exchange)
     except Exception as e:
         logger.error(f"Error getting underlyings: {e}")
-        return []
\ No newline at end of file
+        return []
+
+
+def get_option_strikes_cached(base_symbol: str, expiry: str, option_type: str, exchange: str) -> Optional[List[float]]:
+    """
+    Distinct strikes (ascending) of one underlying's options for an expiry,
+    from the cache's F&O index
+
+    Args:
+        base_symbol: Underlying like "NIFTY"
+        expiry: Expiry as stored in symtoken, e.g. "28-OCT-25"
+        option_type: "CE" or "PE"
+        exchange: Options exchange like "NFO"
+
+    Returns:
+        Sorted strikes, or None when the cache is not available or has no
+        options for that underlying and expiry (callers query the database)
+    """
+    cache = get_cache()
+
+    if not (cache.cache_loaded and cache.is_cache_valid() and cache.fno_index is not None):
+        return None
+
+    base_upper = base_symbol.upper()
+    option_type = option_type.upper()
+    ladder = cache.fno_index.get_ladder(exchange.upper(), base_upper, expiry.upper(), option_type)
+    if ladder is None:
+        return None
+
+    # Same match as the symtoken query: symbol BASE + DDMMMYY prefix and instrument type
+    prefix = base_upper + expiry.upper().replace('-', '')
+    strikes = []
+    for strike, row in zip(ladder.strikes, ladder.rows):
+        record = ladder.records[row]
+        if record.instrumenttype == option_type and record.symbol.upper().startswith(prefix):
+            if not strikes or strikes[-1] != strike:
+                strikes.append(strike)
+    return strikes or None
@@ -45,9 +45,10 @@ Strike Labels (different for CE and PE):
     - Strike ABOVE ATM: CE is OTM, PE is ITM
 """
 
+from bisect import bisect_left
 from typing import Tuple, Dict, Any, List, Optional
 from database.auth_db import get_auth_token_broker
-from database.symbol import SymToken, db_session
+from database.token_db_enhanced import get_symbol_info
 from services.quotes_service import get_quotes, get_multiquotes
 from services.option_symbol_service import (
     parse_underlying_symbol,
@@ -82,15 +83,15 @@ def get_strikes_with_labels(
         - Strike ABOVE ATM: CE is OTM, PE is ITM
         - ATM strike: Both are ATM
     """
-    if atm_strike not in available_strikes:
+    atm_index = bisect_left(available_strikes, atm_strike)
+    if atm_index == len(available_strikes) or available_strikes[atm_index] != atm_strike:
         logger.warning(f"ATM strike {atm_strike} not in available strikes")
         # Return all strikes without proper labels if ATM not found
         return [{'strike': s, 'ce_label': '', 'pe_label': ''} for s in available_strikes]
 
-    atm_index = available_strikes.index(atm_strike)
-
     # If strike_count is None, use all strikes; otherwise limit around ATM
     if strike_count is None:
+        start_index = 0
         selected_strikes = available_strikes
     else:
         start_index = max(0, atm_index - strike_count)
@@ -99,18 +100,18 @@ def get_strikes_with_labels(
 
     # Build strikes with labels for both CE and PE
     result = []
-    for strike in selected_strikes:
+    for index, strike in enumerate(selected_strikes, start_index):
         if strike == atm_strike:
             ce_label = 'ATM'
             pe_label = 'ATM'
         elif strike < atm_strike:
             # Strikes below ATM: CE is ITM, PE is OTM
-            position = atm_index - available_strikes.index(strike)
+            position = atm_index - index
             ce_label = f'ITM{position}'
             pe_label = f'OTM{position}'
         else:
             # Strikes above ATM: CE is OTM, PE is ITM
-            position = available_strikes.index(strike) - atm_index
+            position = index - atm_index
             ce_label = f'OTM{position}'
             pe_label = f'ITM{position}'
 
@@ -126,7 +127,7 @@ def get_option_symbols_for_chain(
     exchange: str
 ) -> List[Dict[str, Any]]:
     """
-    Get CE and PE symbols for each strike from database.
+    Get CE and PE symbols for each strike from the symbol cache (database if not loaded).
 
     Args:
         base_symbol: Base symbol (e.g., NIFTY)
@@ -139,9 +140,6 @@ def get_option_symbols_for_chain(
     """
     chain_symbols = []
 
-    # Convert expiry format for database lookup (DDMMMYY -> DD-MMM-YY)
-    expiry_formatted = f"{expiry_date[:2]}-{expiry_date[2:5]}-{expiry_date[5:]}".upper()
-
     for strike_info in strikes_with_labels:
         strike = strike_info['strike']
         ce_label = strike_info['ce_label']
@@ -151,16 +149,9 @@ def get_option_symbols_for_chain(
         ce_symbol = construct_option_symbol(base_symbol, expiry_date, strike, "CE")
         pe_symbol = construct_option_symbol(base_symbol, expiry_date, strike, "PE")
 
-        # Query database for both CE and PE
-        ce_record = db_session.query(SymToken).filter(
-            SymToken.symbol == ce_symbol,
-            SymToken.exchange == exchange
-        ).first()
-
-        pe_record = db_session.query(SymToken).filter(
-            SymToken.symbol == pe_symbol,
-            SymToken.exchange == exchange
-        ).first()
+        # Look up both CE and PE
+        ce_record = get_symbol_info(ce_symbol, exchange)
+        pe_record = get_symbol_info(pe_symbol, exchange)
 
         chain_symbols.append({
             'strike': strike,
@@ -35,10 +35,12 @@ Example Usage (OLD METHOD - Legacy):
 
 import re
 import importlib
+from bisect import bisect_left
 from typing import Tuple, Dict, Any, Optional, List
 from datetime import datetime
 from database.auth_db import get_auth_token_broker
 from database.symbol import SymToken, db_session
+from database.token_db_enhanced import get_option_strikes_cached
 from services.quotes_service import get_quotes
 from utils.logging import get_logger
 
@@ -281,14 +283,21 @@ def get_available_strikes(base_symbol: str, expiry_date: str, option_type: str,
             logger.debug(f"Cache HIT: {len(strikes)} strikes for {base_symbol} {expiry_date} {option_type}")
             return strikes
 
-        # Cache miss - query database
+        # Cache miss - look up the symbol cache's F&O index, then the database
         _CACHE_STATS['misses'] += 1
-        logger.debug(f"Cache MISS: Querying database for {base_symbol} {expiry_date} {option_type}")
 
         # Convert expiry from DDMMMYY to DD-MMM-YY format used in database
         # e.g., "28OCT25" -> "28-OCT-25"
         expiry_formatted = f"{expiry_date[:2]}-{expiry_date[2:5]}-{expiry_date[5:]}"
 
+        strikes = get_option_strikes_cached(base_symbol, expiry_formatted, option_type, exchange)
+        if strikes is not None:
+            _STRIKES_CACHE[cache_key] = strikes
+            logger.debug(f"Loaded {len(strikes)} strikes for {base_symbol} {expiry_date} {option_type} from symbol cache")
+            return strikes
+
+        logger.debug(f"Cache MISS: Querying database for {base_symbol} {expiry_date} {option_type}")
+
         # Construct symbol pattern: BASE + EXPIRY (without hyphens) + % wildcard
         # e.g., "NIFTY" + "18NOV25" + "%" = "NIFTY18NOV25%"
         expiry_no_hyphen = expiry_date.upper()  # Already in DDMMMYY format
@@ -341,8 +350,16 @@ def find_atm_strike_from_actual(ltp: float, available_strikes: list) -> Optional
         logger.warning("No available strikes to find ATM")
         return None
 
-    # Find the strike closest to LTP
-    atm_strike = min(available_strikes, key=lambda x: abs(x - ltp))
+    # Find the strike closest to LTP: one of the two strikes around it in the
+    # sorted list (the lower one on a tie, as a linear min would pick)
+    i = bisect_left(available_strikes, ltp)
+    if i == 0:
+        atm_strike = available_strikes[0]
+    elif i == len(available_strikes):
+        atm_strike = available_strikes[-1]
+    else:
+        below, above = available_strikes[i - 1], available_strikes[i]
+        atm_strike = below if ltp - below <= above - ltp else above
 
     logger.info(f"Found ATM strike: {atm_strike} (LTP: {ltp})")
     return atm_strike
@@ -383,16 +400,15 @@ def calculate_offset_strike_from_actual(
         For CE ITM2: Move 2 positions DOWN from ATM
         Result: 23400 (actual strike from database)
     """
-    if not available_strikes or atm_strike not in available_strikes:
+    # Find the index of ATM in the sorted strikes list
+    atm_index = bisect_left(available_strikes, atm_strike) if available_strikes else 0
+    if atm_index == len(available_strikes) or available_strikes[atm_index] != atm_strike:
         logger.error(f"ATM strike {atm_strike} not found in available strikes")
         return None
 
     offset = offset.upper()
     option_type = option_type.upper()
 
-    # Find the index of ATM in the sorted strikes list
-    atm_index = available_strikes.index(atm_strike)
-
     if offset == "ATM":
         target_strike = atm_strike
         logger.info(f"Target strike (ATM): {target_strike}")
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+"""
+Raw Feed Replay Benchmark
+
+Replays a raw broker feed capture (written when STREAM_CAPTURE_DIR is set)
+through the real pipeline - the broker client's frame parser, the adapter's
+routing and mapping, ZeroMQ, and the WebSocket proxy's fan-out to N mock
+clients - and reports end-to-end throughput and proxy latency.
+
+The adapter runs offline: its clients are wired to a null transport, and the
+symbol/token rows the capture recorded at subscribe time stand in for the
+master contract, so neither a broker login nor a database is required.
+
+Without --capture, a synthetic Fyers HSM capture is generated (one snapshot
+frame, then update frames). Synthetic frames carry no real arrival times, so
+--speed only matters for recorded captures: 1 replays at the captured rate,
+10 ten times faster, 0 as fast as the pipeline accepts frames.
+
+Usage:
+    python test/benchmark_feed_replay.py
+    python test/benchmark_feed_replay.py --capture tmp/captures/fyers_20250102_091500_1234.feed --speed 10
+    python test/benchmark_feed_replay.py --symbols 500 --frames 20000 --clients 20 --mode 2
+    python test/benchmark_feed_replay.py --save-synthetic tmp/synthetic.feed
+"""
+
+import sys
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from unittest.mock import patch
+
+# Add parent directory to path to import broker modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables from parent directory
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+# Never capture the replay itself
+os.environ['STREAM_CAPTURE_DIR'] = ''
+
+from websocket_proxy.feed_capture import FeedCapture, FeedReplayer, KIND_META, read_capture
+from benchmark_fyers_hsm_parser import snapshot_frame, update_frame
+from benchmark_ws_fanout import MockClient
+
+
+def write_synthetic_capture(path, num_symbols, num_frames, scrips_per_frame, mode):
+    """Write a Fyers capture: resolved symbols, one subscribe, then HSM frames"""
+    topics = [(i, f"sf|nse_cm|{1000 + i}") for i in range(num_symbols)]
+    capture = FeedCapture(path)
+    capture.write_meta('adapter', 'symbols', entries=[
+        [f"SYM{i}", "NSE", f"NSE:SYM{i}-EQ", f"1010000000{1000 + i}"] for i in range(num_symbols)
+    ])
+    capture.write_meta('adapter', 'subscribe',
+                       symbols=[{"symbol": f"SYM{i}", "exchange": "NSE"} for i in range(num_symbols)],
+                       mode=mode, depth_level=5)
+    capture.write_frame('hsm', snapshot_frame(topics))
+    for _ in range(num_frames):
+        capture.write_frame('hsm', update_frame(topics, scrips_per_frame))
+    capture.close()
+
+
+def create_adapter(broker):
+    """Import the broker's streaming adapter the same way the proxy does"""
+    from websocket_proxy.broker_factory import create_broker_adapter
+    adapter = create_broker_adapter(broker, use_pooling=False)
+    if adapter is None:
+        raise SystemExit(f"No streaming adapter for broker '{broker}'")
+    return adapter
+
+
+def build_proxy():
+    """Create a WebSocketProxy subscribed to the adapter's ZMQ port (set when the adapter binds)"""
+    from websocket_proxy.server import WebSocketProxy
+
+    with patch('websocket_proxy.server.is_port_in_use', return_value=False):
+        return WebSocketProxy(host="127.0.0.1", port=0)
+
+
+def register_clients(proxy, num_clients, keys, broker):
+    """Attach mock clients (with writer tasks) subscribed to every captured key"""
+    clients = []
+    for n in range(num_clients):
+        client = MockClient()
+        client_id = id(client)
+        proxy.clients[client_id] = client
+        proxy.subscriptions[client_id] = set()
+        proxy.user_mapping[client_id] = "replay"
+        proxy.user_broker_mapping["replay"] = broker
+        proxy.start_client_writer(client_id, client)
+        for symbol, exchange, mode in keys:
+            proxy._index_subscription(client_id, broker, symbol, exchange, mode)
+        clients.append(client)
+    return clients
+
+
+def subscription_keys(records):
+    """(symbol, exchange, mode) for every subscribe event in the capture"""
+    keys = set()
+    for record in records:
+        if record.kind == KIND_META and record.payload.get('event') == 'subscribe':
+            for item in record.payload.get('symbols', []):
+                keys.add((item['symbol'], item['exchange'], record.payload.get('mode', 2)))
+    return keys
+
+
+async def run_benchmark(proxy, adapter, handlers, records, args):
+    clients = register_clients(proxy, args.clients, subscription_keys(records), args.broker)
+    proxy.running = True
+    listener = asyncio.get_running_loop().create_task(proxy.zmq_listener())
+    # Let the SUB socket's filters reach the adapter's publisher before frames flow
+    await asyncio.sleep(0.5)
+
+    replayer = FeedReplayer(handlers, on_meta=adapter.apply_replay_meta, speed=args.speed)
+    start = time.perf_counter()
+    replay_elapsed = await asyncio.get_running_loop().run_in_executor(None, replayer.run, records)
+
+    # Wait until the proxy has drained ZeroMQ and the client queues
+    idle_since = time.perf_counter()
+    last = -1
+    while time.perf_counter() - idle_since < 0.5:
+        delivered = sum(c.messages for c in clients)
+        if delivered != last:
+            last, idle_since = delivered, time.perf_counter()
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - start - 0.5
+
+    proxy.running = False
+    await listener
+    metrics = proxy.get_metrics()
+    for client_id in list(proxy.client_writers):
+        proxy.stop_client_writer(client_id)
+    return replayer, replay_elapsed, elapsed, clients, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Raw feed capture replay benchmark")
+    parser.add_argument("--capture", help="Capture file to replay (default: synthetic Fyers HSM capture)")
+    parser.add_argument("--broker", default="fyers", help="Broker whose adapter replays the capture")
+    parser.add_argument("--speed", type=float, default=0, help="Replay speed (1 = real time, 0 = max)")
+    parser.add_argument("--clients", type=int, default=10, help="Number of mock proxy clients")
+    parser.add_argument("--symbols", type=int, default=200, help="Symbols in the synthetic capture")
+    parser.add_argument("--frames", type=int, default=5000, help="Update frames in the synthetic capture")
+    parser.add_argument("--scrips-per-frame", type=int, default=10, help="Scrips per synthetic update frame")
+    parser.add_argument("--mode", type=int, default=2, choices=(1, 2), help="Synthetic subscription mode")
+    parser.add_argument("--save-synthetic", help="Keep the synthetic capture at this path")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    path = args.capture
+    if not path:
+        random.seed(args.seed)
+        path = args.save_synthetic or os.path.join(tempfile.mkdtemp(), "synthetic.feed")
+        write_synthetic_capture(path, args.symbols, args.frames, args.scrips_per_frame, args.mode)
+    records = list(read_capture(path))
+    frames = sum(1 for record in records if record.kind != KIND_META)
+
+    adapter = create_adapter(args.broker)
+    handlers = adapter.prepare_replay("replay")
+    if handlers is None:
+        raise SystemExit(f"The {args.broker} streaming adapter does not support feed replay")
+    proxy = build_proxy()
+
+    print("=" * 70)
+    print("RAW FEED REPLAY BENCHMARK")
+    print("=" * 70)
+    print(f"Capture: {path}")
+    print(f"Frames: {frames:,} | Streams: {', '.join(sorted(handlers))} | "
+          f"Clients: {args.clients} | Speed: {'max' if not args.speed else f'{args.speed:g}x'}")
+
+    try:
+        replayer, replay_elapsed, elapsed, clients, metrics = asyncio.run(
+            run_benchmark(proxy, adapter, handlers, records, args))
+    finally:
+        proxy.socket.close(linger=0)
+        proxy.context.term()
+        adapter.disconnect()
+
+    received = sum(t['total'] for t in metrics['ticks'])
+    delivered = sum(c.messages for c in clients)
+    fanout = metrics['latency']['fanout']
+    delivery = metrics['latency']['delivery']
+
+    print("-" * 70)
+    print(f"Replay:           {replay_elapsed:.3f} s | {replayer.frames / max(replay_elapsed, 1e-9):,.0f} frames/sec"
+          f" | {replayer.skipped:,} frames without a handler")
+    print(f"Ticks to proxy:   {received:,} ({received / max(elapsed, 1e-9):,.0f}/sec)")
+    print(f"Delivered:        {delivered:,} messages to {len(clients)} clients "
+          f"({delivered / max(elapsed, 1e-9):,.0f}/sec)")
+    print(f"Fan-out latency:  {fanout}")
+    print(f"Delivery latency: {delivery}")
+
+
+if __name__ == "__main__":
+    main()
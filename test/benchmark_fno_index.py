@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+"""
+F&O Index Benchmark
+
+Loads a master contract into BrokerSymbolCache and times the F&O lookups
+behind the option chain, F&O search and expiry / underlying dropdowns:
+
+    scan    - the previous lookups: a pass over every cached symbol per call
+    index   - the underlying -> expiry -> type -> strike index built by
+              load_all_symbols (FnoSymbolIndex)
+
+Results of both are compared for every lookup. The contract source options
+are the same as benchmark_symbol_search.py. Each contract runs twice: as
+loaded, and with Fyers-style names on the derivatives (the symbol details,
+e.g. "NIFTY 25 Jan 30 24000 CE"). Strike lookups match the symbol, so their
+results must not change with the names.
+
+Usage:
+    python test/benchmark_fno_index.py
+    python test/benchmark_fno_index.py --contract symtoken.csv
+    python test/benchmark_fno_index.py --db --iterations 200
+"""
+
+import sys
+import os
+import time
+import argparse
+from datetime import datetime
+from types import SimpleNamespace
+
+# Add parent directory to path to import database modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Load environment variables from parent directory
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+from database.token_db_enhanced import BrokerSymbolCache
+from database.fno_symbol_index import expiry_sort_key
+from benchmark_symbol_search import load_contract_csv, load_contract_db, synthetic_contract
+
+
+def scan_expiries(cache, exchange=None, underlying=None):
+    """The previous get_distinct_expiries_cached pass"""
+    expiries = set()
+    for s in cache.records:
+        if exchange and s.exchange != exchange:
+            continue
+        if underlying and (not s.name or s.name.upper() != underlying):
+            continue
+        if s.expiry:
+            expiries.add(s.expiry)
+    return sorted(expiries, key=expiry_sort_key)
+
+
+def scan_underlyings(cache, exchange=None):
+    """The previous get_distinct_underlyings_cached pass"""
+    return sorted({s.name for s in cache.records
+                   if s.name and (not exchange or s.exchange == exchange)})
+
+
+def scan_strikes(cache, base, expiry, option_type, exchange):
+    """The symtoken query of get_available_strikes, over the cache"""
+    prefix = base + expiry.replace('-', '')
+    return sorted({s.strike for s in cache.records
+                   if s.exchange == exchange and s.expiry == expiry and s.instrumenttype == option_type
+                   and s.symbol.upper().startswith(prefix) and s.symbol.upper().endswith(option_type)
+                   and s.strike is not None})
+
+
+def index_strikes(cache, base, expiry, option_type, exchange):
+    """get_option_strikes_cached without the cache validity check"""
+    ladder = cache.fno_index.get_ladder(exchange, base, expiry, option_type)
+    prefix = base + expiry.replace('-', '')
+    strikes = []
+    for strike, row in zip(ladder.strikes, ladder.rows) if ladder else ():
+        record = ladder.records[row]
+        if record.instrumenttype == option_type and record.symbol.upper().startswith(prefix):
+            if not strikes or strikes[-1] != strike:
+                strikes.append(strike)
+    return strikes
+
+
+def lookups(cache):
+    """(label, scan, index) callables for typical F&O lookups on this contract"""
+    def calls(chain):
+        return [e for e in chain.expiries if chain.ladder(e, 'CE')]
+
+    # The name with calls and the most expiries, for the search and dropdowns
+    underlying = max(cache.fno_index.chains_by_underlying.items(),
+                     key=lambda item: (any(calls(c) for c in item[1]), sum(len(c.expiries) for c in item[1])))[0]
+    chain = next(c for c in cache.fno_index.chains_by_underlying[underlying] if calls(c))
+    exchange, expiry = chain.exchange, calls(chain)[0]
+    ladder = chain.ladder(expiry, 'CE')
+    mid = ladder.strikes[len(ladder.strikes) // 2] if ladder.strikes else 0.0
+
+    # The longest call strike ladder, keyed on the symbol
+    base_exchange, base, base_expiry, _ = max(
+        (key for key in cache.fno_index.strike_ladders if key[3] == 'CE'),
+        key=lambda key: len(cache.fno_index.strike_ladders[key]))
+
+    def fno(**kwargs):
+        return lambda: [s.token for s in cache.fno_search_symbols(**kwargs)]
+
+    def scan_fno(**kwargs):
+        def run():
+            fno_index, cache.fno_index = cache.fno_index, None
+            try:
+                return [s.token for s in cache.fno_search_symbols(**kwargs)]
+            finally:
+                cache.fno_index = fno_index
+        return run
+
+    searches = [
+        (f"fno {underlying}", dict(exchange=exchange, underlying=underlying)),
+        (f"fno {underlying} {expiry} CE", dict(exchange=exchange, underlying=underlying,
+                                               expiry=expiry, instrumenttype="CE")),
+        (f"fno {underlying} strikes +-10%", dict(exchange=exchange, underlying=underlying, expiry=expiry,
+                                                 strike_min=mid * 0.9, strike_max=mid * 1.1)),
+        (f"fno {exchange} FUT", dict(exchange=exchange, instrumenttype="FUT")),
+        (f"fno query '{underlying.split()[0]} CE'", dict(query=f"{underlying.split()[0]} CE",
+                                                          underlying=underlying)),
+    ]
+    cases = [(label, scan_fno(**kwargs), fno(**kwargs)) for label, kwargs in searches]
+    cases += [
+        (f"expiries {exchange} {underlying}", lambda: scan_expiries(cache, exchange, underlying),
+         lambda: cache.fno_index.get_expiries(exchange, underlying)),
+        (f"expiries {exchange}", lambda: scan_expiries(cache, exchange),
+         lambda: cache.fno_index.get_expiries(exchange)),
+        (f"underlyings {exchange}", lambda: scan_underlyings(cache, exchange),
+         lambda: cache.fno_index.get_underlyings(exchange)),
+        (f"strikes {base} {base_expiry} CE", lambda: scan_strikes(cache, base, base_expiry, "CE", base_exchange),
+         lambda: index_strikes(cache, base, base_expiry, "CE", base_exchange)),
+    ]
+    return cases
+
+
+def fyers_names(rows):
+    """Copy of the contract with Fyers symbol details as the derivatives' names"""
+    renamed = []
+    for row in rows:
+        name = row.name
+        if row.expiry and name:
+            expiry = datetime.strptime(row.expiry, "%d-%b-%y")
+            kind = "FUT" if row.symbol.endswith("FUT") else f"{row.strike:g} {row.symbol[-2:]}"
+            name = f"{name} {expiry:%y %b %d} {kind}"
+        renamed.append(SimpleNamespace(
+            symbol=row.symbol, brsymbol=row.brsymbol, name=name, exchange=row.exchange,
+            brexchange=row.brexchange, token=row.token, expiry=row.expiry, strike=row.strike,
+            lotsize=row.lotsize, instrumenttype=row.instrumenttype, tick_size=row.tick_size,
+        ))
+    return renamed
+
+
+def time_call(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        result = func()
+    return (time.perf_counter() - start) / iterations * 1e6, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BrokerSymbolCache F&O index benchmark")
+    parser.add_argument("--contract", help="CSV export of the symtoken table")
+    parser.add_argument("--db", action="store_true", help="Load the symtoken table of DATABASE_URL")
+    parser.add_argument("--iterations", type=int, default=20, help="Runs per lookup")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.contract:
+        source, rows = args.contract, load_contract_csv(args.contract)
+    elif args.db:
+        source, rows = "DATABASE_URL symtoken", load_contract_db()
+    else:
+        source, rows = "synthetic", synthetic_contract(args.seed)
+
+    print("=" * 70)
+    print("F&O INDEX BENCHMARK")
+    print("=" * 70)
+
+    identical = True
+    results = []
+    for label, contract in ((source, rows), (f"{source}, Fyers names", fyers_names(rows))):
+        cache = BrokerSymbolCache()
+        cache._build_indexes(contract)
+        start = time.perf_counter()
+        cache.fno_index = type(cache.fno_index)(cache.records)
+        build_time = time.perf_counter() - start
+        stats = cache.fno_index.get_stats()
+
+        print(f"Contract: {label} | Cached symbols: {len(cache.symbols):,}")
+        print(f"F&O index build: {build_time:.2f} s | Underlyings: {stats['underlyings']:,} | "
+              f"Expiries: {stats['expiries']:,} | Ladders: {stats['ladders']:,}")
+        print(f"{'Lookup':<36} {'Results':>7} {'Scan us':>10} {'Index us':>9} {'Speed-up':>8}")
+        print("-" * 70)
+
+        contract_results = []
+        for lookup, scan, index in lookups(cache):
+            scan_us, scan_result = time_call(scan, max(1, args.iterations // 5))
+            index_us, index_result = time_call(index, args.iterations)
+            identical &= scan_result == index_result
+            contract_results.append((lookup, index_result))
+            print(f"{lookup[:36]:<36} {len(index_result):>7} {scan_us:>10,.0f} {index_us:>9,.1f} "
+                  f"{scan_us / index_us:>7.0f}x")
+        print("-" * 70)
+        results.append(contract_results)
+
+    print(f"Results identical: {identical}")
+    # Strikes match the symbol, so the names must not change them
+    print(f"Same strikes with Fyers names: {results[0][-1] == results[1][-1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+"""
+Fyers HSM Binary Parser Benchmark
+
+Feeds data feed frames (message type 6) through FyersHSMWebSocket's parser and
+reports frames/sec and field values/sec. The current parser (precompiled
+struct.Struct decoders over a memoryview, one unpack_from per field array) is
+compared with the previous decoding style, which sliced a new bytearray for
+every 4-byte field and copied each received frame into a bytearray.
+
+No network or Fyers login is required: frames are either synthetic (a snapshot
+of every topic followed by update frames) or captured.
+
+Captured frame file format: one base64-encoded binary WebSocket frame per line,
+starting with the snapshot frames so updates can be applied.
+
+Usage:
+    python test/benchmark_fyers_hsm_parser.py
+    python test/benchmark_fyers_hsm_parser.py --topics 500 --frames 20000 --scrips-per-frame 8
+    python test/benchmark_fyers_hsm_parser.py --capture hsm_frames.b64
+"""
+
+import sys
+import os
+import json
+import time
+import base64
+import random
+import struct
+import logging
+import argparse
+
+# Add parent directory to path to import broker modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables from parent directory
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+from broker.fyers.streaming.fyers_hsm_websocket import FyersHSMWebSocket, NULL_VALUE
+
+
+def dummy_access_token():
+    """An unsigned JWT carrying only what FyersHSMWebSocket reads (hsm_key, exp)"""
+    def b64(obj):
+        return base64.urlsafe_b64encode(json.dumps(obj).encode()).decode().rstrip("=")
+    payload = {"hsm_key": "benchmark", "exp": int(time.time()) + 3600}
+    return f"APPID:{b64({'alg': 'none'})}.{b64(payload)}.sig"
+
+
+def frame_header(scrip_count):
+    """Data feed frame header: length, message type 6, padding, scrip count"""
+    return bytearray(b"\x00\x00\x06\x00\x00\x00\x00") + struct.pack("!H", scrip_count)
+
+
+def snapshot_frame(topics):
+    """One frame carrying a scrip snapshot for every (topic_id, topic_name)"""
+    frame = frame_header(len(topics))
+    fields = len(FyersHSMWebSocket.DATA_FIELDS) - 2  # type and symbol are not numeric
+    for topic_id, topic_name in topics:
+        name = topic_name.encode()
+        frame += bytes([83]) + struct.pack("H", topic_id) + bytes([len(name)]) + name
+        frame += bytes([fields]) + struct.pack(f">{fields}i", *(random.randint(1, 10**6) for _ in range(fields)))
+        frame += b"\x00\x00" + struct.pack(">H", 100) + bytes([2])
+        for text in ("NSE", topic_name.split("|")[-1], f"SYM{topic_id}-EQ"):
+            frame += bytes([len(text)]) + text.encode()
+    return bytes(frame)
+
+
+def update_frame(topics, scrips_per_frame):
+    """One frame of live updates; each scrip changes a handful of fields"""
+    chosen = random.sample(topics, min(scrips_per_frame, len(topics)))
+    frame = frame_header(len(chosen))
+    fields = len(FyersHSMWebSocket.DATA_FIELDS) - 2
+    for topic_id, _ in chosen:
+        values = [NULL_VALUE] * fields
+        for index in random.sample(range(fields), random.randint(3, 10)):
+            values[index] = random.randint(1, 10**6)
+        frame += bytes([85]) + struct.pack("H", topic_id) + bytes([fields])
+        frame += struct.pack(f">{fields}i", *values)
+    return bytes(frame)
+
+
+def synthetic_frames(num_topics, num_frames, scrips_per_frame):
+    """Return (snapshot frames, update frames) for num_topics NSE scrips"""
+    topics = [(i, f"sf|nse_cm|{1000 + i}") for i in range(num_topics)]
+    return [snapshot_frame(topics)], [update_frame(topics, scrips_per_frame) for _ in range(num_frames)]
+
+
+def load_capture(path):
+    """Load a captured stream; its snapshot frames are timed along with the updates"""
+    frames = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                frames.append(base64.b64decode(line))
+    return [], frames
+
+
+class SlicingHSMWebSocket(FyersHSMWebSocket):
+    """The previous decoding style: one bytearray slice + struct.unpack per value"""
+
+    def _unpack_fields(self, data, offset, field_count, fields, target):
+        for index in range(field_count):
+            if offset + 4 > len(data):
+                break
+            value = struct.unpack(">i", data[offset:offset + 4])[0]
+            offset += 4
+            if value != NULL_VALUE and index < len(fields):
+                target[fields[index]] = value
+        return offset
+
+    def _parse_data_feed(self, data):
+        scrip_count = struct.unpack("!H", data[7:9])[0]
+        offset = 9
+        for _ in range(scrip_count):
+            if offset >= len(data):
+                break
+            data_type = struct.unpack("B", data[offset:offset + 1])[0]
+            offset += 1
+            if data_type == 83:
+                offset = self._parse_snapshot_data(data, offset)
+            elif data_type == 85:
+                offset = self._parse_update_data(data, offset)
+            else:
+                break
+
+    def _parse_update_data(self, data, offset):
+        topic_id = struct.unpack("H", data[offset:offset + 2])[0]
+        offset += 2
+        field_count = struct.unpack("B", data[offset:offset + 1])[0]
+        offset += 1
+        topic_data = self.scrips_data.get(topic_id)
+        if topic_data is None:
+            return offset + field_count * 4
+        changed_fields = []
+        for index in range(field_count):
+            if offset + 4 > len(data):
+                break
+            value = struct.unpack(">i", data[offset:offset + 4])[0]
+            offset += 4
+            if value != NULL_VALUE and index < len(self.DATA_FIELDS):
+                field = self.DATA_FIELDS[index]
+                if topic_data.get(field) != value:
+                    topic_data[field] = value
+                    changed_fields.append(field)
+        if changed_fields and self.on_message_callback:
+            update_data = topic_data.copy()
+            update_data["update_type"] = "live"
+            update_data["changed_fields"] = changed_fields
+            self.on_message_callback(update_data)
+        return offset
+
+
+def run(parser_cls, wrap, snapshots, updates):
+    """Parse all frames the way _on_ws_message would; return (seconds, callbacks, final state)"""
+    parser = parser_cls(dummy_access_token())
+    received = []
+    parser.set_callbacks(on_message=received.append)
+
+    for frame in snapshots:
+        parser._parse_binary_message(wrap(frame))
+    received.clear()
+
+    start = time.perf_counter()
+    for frame in updates:
+        parser._parse_binary_message(wrap(frame))
+    elapsed = time.perf_counter() - start
+    return elapsed, len(received), parser.scrips_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fyers HSM binary parser benchmark")
+    parser.add_argument("--topics", type=int, default=500, help="Subscribed scrips in the synthetic stream")
+    parser.add_argument("--frames", type=int, default=20000, help="Update frames in the synthetic stream")
+    parser.add_argument("--scrips-per-frame", type=int, default=8, help="Scrip updates per synthetic frame")
+    parser.add_argument("--capture", help="Captured frames (base64 per line) to parse instead")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    # Synthetic topics have no OpenAlgo symbol mapping; skip the per-topic warning
+    logging.getLogger("fyers_hsm_websocket").setLevel(logging.ERROR)
+    if args.capture:
+        snapshots, updates = load_capture(args.capture)
+    else:
+        snapshots, updates = synthetic_frames(args.topics, args.frames, args.scrips_per_frame)
+
+    values = sum((len(f) - 9) // 4 for f in updates)  # approximate int32 values per stream
+
+    print("=" * 70)
+    print("FYERS HSM PARSER BENCHMARK")
+    print("=" * 70)
+    print(f"Frames: {len(updates):,} | Bytes: {sum(len(f) for f in updates):,}")
+    print(f"{'Parser':<34} {'Frames/sec':>12} {'Values/sec':>14} {'Callbacks':>10}")
+    print("-" * 70)
+
+    results, states = {}, []
+    for label, cls, wrap in (
+        ("before: bytearray + slice/field", SlicingHSMWebSocket, bytearray),
+        ("after: memoryview + Struct", FyersHSMWebSocket, memoryview),
+    ):
+        elapsed, callbacks, state = run(cls, wrap, snapshots, updates)
+        results[label] = elapsed
+        states.append(state)
+        print(f"{label:<34} {len(updates) / elapsed:>12,.0f} {values / elapsed:>14,.0f} {callbacks:>10,}")
+
+    before, after = results.values()
+    print("-" * 70)
+    print(f"Speed-up: {before / after:.2f}x | Decoded state identical: {states[0] == states[1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Fyers Data Mapping Benchmark
+
+Compares, per subscription mode, the cost of turning one raw HSM tick into the
+OpenAlgo payload:
+
+    generic      - the previous tick path: FyersDataMapper.map_fyers_data(data, "Quote")
+                   for every tick, followed by a second map_fyers_data(data, "Depth")
+                   for depth subscriptions (LTP subscribers got the full Quote mapping)
+    specialized  - the function returned by FyersDataMapper.build_mapper() for the
+                   subscription's mode, chosen once when routing is set up
+
+Depth is also run with a depth_level cap (Depth/2) and as top of book
+(Depth/1: best bid/ask and sizes only); "Bytes" is the JSON size of the
+specialized payload each subscriber receives.
+
+No network or Fyers login is required; ticks are synthetic HSM dicts shaped like
+the output of FyersHSMWebSocket.
+
+Usage:
+    python test/benchmark_fyers_mapping.py
+    python test/benchmark_fyers_mapping.py --iterations 200000
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+
+# Add parent directory to path to import broker modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables from parent directory
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+from broker.fyers.streaming.fyers_mapping import FyersDataMapper
+
+SCRIP_TICK = {
+    "type": "sf", "hsm_token": "sf|nse_cm|2885", "original_symbol": "NSE:RELIANCE-EQ",
+    "symbol": "NSE:RELIANCE-EQ", "exchange": "NSE", "exchange_token": "2885",
+    "multiplier": 100, "precision": 2,
+    "ltp": 14245500, "vol_traded_today": 4587213, "last_traded_time": 1735712345,
+    "exch_feed_time": 1735712345, "bid_size": 120, "ask_size": 85,
+    "bid_price": 14245000, "ask_price": 14246000, "last_traded_qty": 25,
+    "tot_buy_qty": 312540, "tot_sell_qty": 298770, "avg_trade_price": 14196400,
+    "low_price": 14053500, "high_price": 14312000, "lower_ckt": 12712000,
+    "upper_ckt": 15536000, "open_price": 14100000, "prev_close_price": 14128000,
+    "update_type": "live", "changed_fields": ["ltp", "vol_traded_today", "last_traded_time"],
+}
+
+DEPTH_TICK = {
+    "type": "dp", "hsm_token": "dp|nse_cm|2885", "original_symbol": "NSE:RELIANCE-EQ",
+    "symbol": "NSE:RELIANCE-EQ", "exchange": "NSE", "exchange_token": "2885",
+    "multiplier": 100, "precision": 2, "update_type": "live",
+}
+for _i in range(1, 6):
+    DEPTH_TICK.update({
+        f"bid_price{_i}": 14245000 - 500 * _i, f"ask_price{_i}": 14246000 + 500 * _i,
+        f"bid_size{_i}": 100 + _i, f"ask_size{_i}": 90 + _i,
+        f"bid_order{_i}": 3 + _i, f"ask_order{_i}": 2 + _i,
+    })
+
+
+def generic_path(mapper, mode_type):
+    """The previous per-tick mapping sequence for a subscription of mode_type"""
+    def run(tick):
+        mapped = mapper.map_fyers_data(tick, "Quote")
+        if mode_type == "Depth":
+            mapped = mapper.map_fyers_data(tick, "Depth")
+        return mapped
+    return run
+
+
+def time_mapping(fn, tick, iterations):
+    """Return microseconds per tick"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(tick)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fyers per-mode mapping benchmark")
+    parser.add_argument("--iterations", type=int, default=100000, help="Ticks mapped per case")
+    args = parser.parse_args()
+
+    mapper = FyersDataMapper()
+    cases = [
+        ("LTP", SCRIP_TICK, 5),
+        ("Quote", SCRIP_TICK, 5),
+        ("Depth", DEPTH_TICK, 5),
+        ("Depth", DEPTH_TICK, 2),
+        ("Depth", DEPTH_TICK, 1),
+    ]
+
+    print("=" * 70)
+    print("FYERS DATA MAPPING BENCHMARK")
+    print("=" * 70)
+    print(f"Iterations per case: {args.iterations:,}")
+    print(f"{'Mode':<8} {'Generic us':>11} {'Specialized us':>15} {'Ticks/sec':>11} {'Speed-up':>9} "
+          f"{'Bytes':>6} {'LTP ok':>6}")
+    print("-" * 70)
+
+    for mode_type, tick, depth_level in cases:
+        generic = generic_path(mapper, mode_type)
+        specialized = mapper.build_mapper(mode_type, tick["hsm_token"], depth_level)
+
+        generic_us = time_mapping(generic, tick, args.iterations)
+        specialized_us = time_mapping(specialized, tick, args.iterations)
+        payload = specialized(tick)
+        ltp_match = generic(tick)["ltp"] == payload["ltp"]
+        label = f"{mode_type}/{depth_level}" if mode_type == "Depth" else mode_type
+
+        print(f"{label:<8} {generic_us:>11.2f} {specialized_us:>15.2f} "
+              f"{1e6 / specialized_us:>11,.0f} {generic_us / specialized_us:>8.1f}x "
+              f"{len(json.dumps(payload)):>6} {str(ltp_match):>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+"""
+Fyers Master Contract Pipeline Benchmark
+
+Generates a synthetic set of Fyers segment CSVs (NSE_CM, BSE_CM, BSE_FO,
+NSE_FO, NSE_CD, MCX_COM, about 145,000 rows with a few tokens listed in more
+than one segment) and times the stages of master_contract_download after the
+download itself:
+
+    transform  - the previous transforms (F&O symbols reformatted row by row
+                 with apply, one segment after another) against
+                 master_contract_db.transform_segment run from a thread pool
+                 of transform_workers(), as master_contract_download does:
+                 one worker interpreter per segment, or in process with one
+                 CPU
+    load       - the previous load (delete symtoken, then per segment a query
+                 of the tokens already loaded and bulk_insert_mappings of the
+                 new ones) against merge_segments and the staging table load
+                 and swap (database/symtoken_staging.py)
+
+Both loads go to fresh SQLite databases in a temporary directory, never
+DATABASE_URL, and the resulting symtoken tables are compared row by row.
+
+Usage:
+    python test/benchmark_fyers_master_contract.py
+    python test/benchmark_fyers_master_contract.py --scale 2
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import broker modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables from parent directory
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+import pandas as pd
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from broker.fyers.database.master_contract_transform import SEGMENTS, read_segment_csv
+from broker.fyers.database.master_contract_db import (
+    SymToken, merge_segments, transform_segment, transform_workers
+)
+from database.symtoken_staging import load_and_swap
+
+UNDERLYINGS = ["NIFTY", "BANKNIFTY", "FINNIFTY", "MIDCPNIFTY", "RELIANCE", "HDFCBANK", "INFY", "TCS",
+               "ICICIBANK", "SBIN", "TATAMOTORS", "AXISBANK", "LT", "ITC", "MARUTI", "SENSEX", "BANKEX"]
+CURRENCIES = ["USDINR", "EURINR", "GBPINR", "JPYINR"]
+COMMODITIES = ["CRUDEOIL", "NATURALGAS", "GOLD", "SILVER", "COPPER", "ZINC"]
+
+# Rows per segment at --scale 1
+SEGMENT_ROWS = {"NSE_CM": 9000, "BSE_CM": 12000, "BSE_FO": 20000,
+                "NSE_FO": 90000, "NSE_CD": 8000, "MCX_COM": 6000}
+
+
+def fyers_row(token, details, kind, ticker, underlying, expiry=None, strike=-1.0, option_type="XX"):
+    return [token, details, kind, 1, 0.05, "INE000A01000", "0915-1530|1815-1915:", "1718000000",
+            "" if expiry is None else str(int(expiry.timestamp())), ticker, 10, 10, 2885, underlying,
+            "", strike, option_type, "", "", "", ""]
+
+
+def equity_rows(rng, prefix, exchange, count, kinds):
+    rows = []
+    for i in range(count):
+        name = f"{prefix}{i:05d}"
+        kind = rng.choice(kinds)
+        suffix = "-GB" if kind == 2 and rng.random() < 0.5 else "-EQ"
+        rows.append(fyers_row(f"10{prefix}{i:08d}", f"{name} LIMITED", kind,
+                              f"{exchange}:{name}{suffix}", name))
+    return rows
+
+
+def derivative_rows(rng, segment, exchange, count, underlyings, blank_futures=False):
+    rows = []
+    base = datetime(2025, 1, 30, 15, 30)
+    for i in range(count):
+        underlying = rng.choice(underlyings)
+        expiry = base + timedelta(weeks=rng.randrange(26))
+        date_part = f"{expiry:%d} {expiry:%b} {expiry:%y}"
+        if i % 20 == 0:
+            option_type = "" if blank_futures and i % 40 == 0 else "XX"
+            details = f"{underlying} {date_part} FUT"
+            ticker = f"{exchange}:{underlying}{expiry:%y%b}FUT".upper()
+            strike = -1.0
+        else:
+            option_type = rng.choice(("CE", "PE"))
+            strike = float(rng.randrange(100, 60000, 50))
+            details = f"{underlying} {date_part} {strike:g} {option_type}"
+            ticker = f"{exchange}:{underlying}{expiry:%y%b}{strike:g}{option_type}".upper()
+        rows.append(fyers_row(f"{segment}{i:09d}", details, 14, ticker, underlying,
+                              expiry, strike, option_type))
+    return rows
+
+
+def write_segments(path, scale, seed):
+    """Synthetic segment CSVs in path; returns the row count"""
+    rng = random.Random(seed)
+    n = {key: int(rows * scale) for key, rows in SEGMENT_ROWS.items()}
+    segments = {
+        "NSE_CM": equity_rows(rng, "NSE", "NSE", n["NSE_CM"], (0, 0, 0, 9, 10, 2, 2, 1)),
+        "BSE_CM": equity_rows(rng, "BSE", "BSE", n["BSE_CM"], (0, 0, 4, 50, 10, 3)),
+        "BSE_FO": derivative_rows(rng, "BFO", "BSE", n["BSE_FO"], ["SENSEX", "BANKEX"], blank_futures=True),
+        "NSE_FO": derivative_rows(rng, "NFO", "NSE", n["NSE_FO"], UNDERLYINGS),
+        "NSE_CD": derivative_rows(rng, "CDS", "NSE", n["NSE_CD"], CURRENCIES),
+        "MCX_COM": derivative_rows(rng, "MCX", "MCX", n["MCX_COM"], COMMODITIES),
+    }
+    # A few tokens listed in more than one segment: only the first is loaded
+    for i in range(0, min(len(segments["BSE_CM"]), len(segments["NSE_CM"])), 500):
+        segments["BSE_CM"][i][0] = segments["NSE_CM"][i][0]
+    for key, rows in segments.items():
+        pd.DataFrame(rows).to_csv(os.path.join(path, f"{key}.csv"), header=False, index=False)
+    return sum(len(rows) for rows in segments.values())
+
+
+def reformat_symbol_detail(s):
+    parts = s.split()
+    return f"{parts[0]}{parts[3]}{parts[2].upper()}{parts[1]}{parts[4]}"
+
+
+def previous_equity(df, exchange, index, kinds, bonds):
+    """The previous NSE_CM / BSE_CM transform"""
+    df.loc[df['Exchange Instrument type'].isin(kinds), 'exchange'] = exchange
+    df.loc[df['Exchange Instrument type'].isin(kinds), 'instrumenttype'] = 'EQ'
+    if bonds:
+        gb = (df['Exchange Instrument type'] == 2) & (df['Symbol ticker'].str.endswith('-GB'))
+        df.loc[gb, 'exchange'] = exchange
+        df.loc[gb, 'instrumenttype'] = 'GB'
+    df.loc[df['Exchange Instrument type'] == 10, 'exchange'] = index
+    df.loc[df['Exchange Instrument type'] == 10, 'instrumenttype'] = 'INDEX'
+    df = df[df['exchange'].isin([exchange, index])].copy()
+    df['symbol'] = df['Underlying symbol']
+    df['brexchange'] = exchange
+    return df
+
+
+def previous_derivatives(df, exchange, blank_futures):
+    """The previous F&O transform, symbols reformatted row by row"""
+    df['expiry'] = pd.to_datetime(pd.to_numeric(df['Expiry date'], errors='coerce'), unit='s')
+    df['expiry'] = df['expiry'].dt.strftime('%d-%b-%y').str.upper()
+    df['brexchange'] = exchange
+    df['exchange'] = exchange
+    option_type = df['Option type']
+    df['instrumenttype'] = (option_type.fillna('FUT') if blank_futures else option_type).str.replace('XX', 'FUT')
+    futures = (option_type == 'XX') | option_type.isna() if blank_futures else option_type == 'XX'
+    reformat = lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x
+    df.loc[futures, 'symbol'] = df['Symbol Details'].apply(reformat)
+    df.loc[option_type == 'CE', 'symbol'] = df['Symbol Details'].apply(reformat) + 'CE'
+    df.loc[option_type == 'PE', 'symbol'] = df['Symbol Details'].apply(reformat) + 'PE'
+    return df
+
+
+def previous_transform(key, path):
+    """symtoken rows of a segment as the download computed them before the pipeline"""
+    df = read_segment_csv(path, key)
+    df['token'] = df['Fytoken']
+    df['name'] = df['Symbol Details']
+    df['expiry'] = df['Expiry date']
+    df['strike'] = df['Strike price']
+    df['lotsize'] = df['Minimum lot size']
+    df['tick_size'] = df['Tick size']
+    df['brsymbol'] = df['Symbol ticker']
+    if key == 'NSE_CM':
+        df = previous_equity(df, 'NSE', 'NSE_INDEX', [0, 9], bonds=True)
+    elif key == 'BSE_CM':
+        df = previous_equity(df, 'BSE', 'BSE_INDEX', [0, 4, 50], bonds=False)
+    else:
+        exchange = {'BSE_FO': 'BFO', 'NSE_FO': 'NFO', 'NSE_CD': 'CDS', 'MCX_COM': 'MCX'}[key]
+        df = previous_derivatives(df, exchange, blank_futures=key == 'BSE_FO')
+    return df[['token', 'name', 'strike', 'lotsize', 'tick_size', 'brsymbol', 'expiry',
+               'exchange', 'instrumenttype', 'symbol', 'brexchange']]
+
+
+def same_frame(previous, pipeline):
+    return previous[pipeline.columns].reset_index(drop=True).equals(pipeline.reset_index(drop=True))
+
+
+def previous_load(engine, frames):
+    """The load before the staging table: per segment, skip tokens already loaded"""
+    with Session(engine) as session:
+        session.query(SymToken).delete()
+        session.commit()
+        for key in SEGMENTS:
+            existing_tokens = {token for token, in session.execute(select(SymToken.token))}
+            rows = [row for row in frames[key].to_dict(orient='records') if row['token'] not in existing_tokens]
+            session.bulk_insert_mappings(SymToken, rows)
+            session.commit()
+
+
+def table_rows(engine):
+    with engine.connect() as connection:
+        return [tuple(row) for row in connection.execute(select(SymToken.__table__).order_by(SymToken.id))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fyers master contract pipeline benchmark")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier of the synthetic segment sizes")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        total_rows = write_segments(directory, args.scale, args.seed)
+
+        start = time.perf_counter()
+        previous = {key: previous_transform(key, directory) for key in SEGMENTS}
+        sequential_time = time.perf_counter() - start
+
+        workers = transform_workers()
+        in_process = workers == 1
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            frames = dict(zip(SEGMENTS, executor.map(
+                lambda key: transform_segment(key, directory, in_process), SEGMENTS)))
+        parallel_time = time.perf_counter() - start
+        same_frames = all(same_frame(previous[key], frames[key]) for key in SEGMENTS)
+
+        previous_engine = create_engine(f"sqlite:///{os.path.join(directory, 'previous.db')}")
+        staging_engine = create_engine(f"sqlite:///{os.path.join(directory, 'staging.db')}")
+        for engine in (previous_engine, staging_engine):
+            SymToken.__table__.create(engine)
+
+        start = time.perf_counter()
+        previous_load(previous_engine, previous)
+        previous_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        timings = load_and_swap(staging_engine, SymToken.__table__, merge_segments(frames))
+        staging_time = time.perf_counter() - start
+        same_table = table_rows(previous_engine) == table_rows(staging_engine)
+
+    print("=" * 70)
+    print("FYERS MASTER CONTRACT PIPELINE BENCHMARK")
+    print("=" * 70)
+    print(f"CSV rows: {total_rows:,} | symtoken rows: {timings['rows']:,} | "
+          f"transform workers: {workers} (CPUs: {os.cpu_count()}"
+          f"{', in process' if in_process else ''})")
+    print(f"{'Stage':<11} {'Previous s':>11} {'Pipeline s':>11} {'Speed-up':>9} {'Identical':>10}")
+    print("-" * 70)
+    print(f"{'transform':<11} {sequential_time:>11.2f} {parallel_time:>11.2f} "
+          f"{sequential_time / parallel_time:>8.1f}x {str(same_frames):>10}")
+    print(f"{'load':<11} {previous_time:>11.2f} {staging_time:>11.2f} "
+          f"{previous_time / staging_time:>8.1f}x {str(same_table):>10}")
+    print("-" * 70)
+    print(f"Pipeline load: staging insert {timings['load']:.2f}s, swap and indexes {timings['swap']:.2f}s "
+          f"(merge {staging_time - timings['load'] - timings['swap']:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
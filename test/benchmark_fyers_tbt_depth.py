@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+"""
+Fyers TBT 50-Level Depth Benchmark
+
+Replays synthetic TBT depth packets (one 50-level snapshot per symbol, then diff
+packets that touch a few levels each) and compares, per publish mode, the cost
+of turning a packet into the payload published on ZeroMQ and the size of that
+payload:
+
+    before  - the previous path: rebuild 2 x 50 level dicts in the client,
+              copy every non-empty level and publish the full book
+    full    - array-backed TbtOrderBook, full book on every change
+    diff    - only the levels that changed since the last publish
+    top     - the best N levels, only when one of them changed
+
+No network or Fyers login is required; packets are built with the bundled
+protobuf definitions (msg_pb2).
+
+Usage:
+    python test/benchmark_fyers_tbt_depth.py
+    python test/benchmark_fyers_tbt_depth.py --symbols 20 --packets 20000 --top-levels 10
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import argparse
+
+# Add parent directory to path to import broker modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables from parent directory
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+from broker.fyers.streaming import msg_pb2 as protomsg
+from broker.fyers.streaming.fyers_mapping import FyersDataMapper
+from broker.fyers.streaming.fyers_tbt_book import TbtOrderBook, MAX_LEVELS
+
+
+def build_packet(ticker, snapshot, bids, asks, tbq):
+    """One SocketMessage carrying a depth MarketFeed; bids/asks map level -> (price, qty, orders)"""
+    message = protomsg.SocketMessage()
+    message.snapshot = snapshot
+    feed = message.feeds[ticker]
+    feed.ticker = ticker
+    feed.feed_time.value = int(time.time())
+    for side, levels in ((feed.depth.bids, bids), (feed.depth.asks, asks)):
+        for i in range(max(levels) + 1 if levels else 0):
+            level = side.add()
+            if i in levels:
+                price, qty, orders = levels[i]
+                level.price.value = price
+                level.qty.value = qty
+                level.nord.value = orders
+    feed.depth.tbq.value = tbq
+    return message
+
+
+def synthetic_packets(num_symbols, num_packets, changes_per_packet):
+    """Return (snapshots, diffs) as lists of (ticker, MarketFeed, is_snapshot)"""
+    tickers = [f"NSE:SYM{i}-EQ" for i in range(num_symbols)]
+    snapshots = []
+    for ticker in tickers:
+        mid = random.randint(10000, 500000)
+        bids = {i: (mid - 5 * (i + 1), random.randint(1, 5000), random.randint(1, 50)) for i in range(MAX_LEVELS)}
+        asks = {i: (mid + 5 * (i + 1), random.randint(1, 5000), random.randint(1, 50)) for i in range(MAX_LEVELS)}
+        message = build_packet(ticker, True, bids, asks, 10**6)
+        snapshots.append((ticker, message.feeds[ticker], True))
+
+    diffs = []
+    for _ in range(num_packets):
+        ticker = random.choice(tickers)
+        # Activity concentrates near the touch
+        levels = {min(int(random.expovariate(0.15)), MAX_LEVELS - 1) for _ in range(changes_per_packet)}
+        bids = {i: (0, random.randint(1, 5000), 0) for i in levels if random.random() < 0.5}
+        asks = {i: (0, random.randint(1, 5000), 0) for i in levels if i not in bids}
+        message = build_packet(ticker, False, bids, asks, random.randint(10**5, 10**7))
+        diffs.append((ticker, message.feeds[ticker], False))
+    return snapshots, diffs
+
+
+def previous_extract(state, market_feed):
+    """The previous FyersTbtWebSocket._extract_depth: dict levels, full copy per packet"""
+    depth = market_feed.depth
+    for side, levels in (('buy', depth.bids), ('sell', depth.asks)):
+        for i, level in enumerate(levels):
+            if i >= MAX_LEVELS:
+                break
+            if level.HasField('price') and level.price.value > 0:
+                state[side][i]['price'] = level.price.value / 100
+            if level.HasField('qty') and level.qty.value > 0:
+                state[side][i]['quantity'] = level.qty.value
+            if level.HasField('nord') and level.nord.value > 0:
+                state[side][i]['orders'] = level.nord.value
+    if depth.HasField('tbq'):
+        state['total_buy_qty'] = depth.tbq.value
+    buy = [level.copy() for level in state['buy'] if level['price'] > 0]
+    sell = [level.copy() for level in state['sell'] if level['price'] > 0]
+    return {'buy': buy, 'sell': sell, 'total_buy_qty': state['total_buy_qty'],
+            'total_sell_qty': state['total_sell_qty'], 'levels': max(len(buy), len(sell))}
+
+
+def run_previous(mapper, snapshots, diffs):
+    states = {}
+    for ticker, feed, _ in snapshots:
+        states[ticker] = {'buy': [{'price': 0, 'quantity': 0, 'orders': 0} for _ in range(MAX_LEVELS)],
+                          'sell': [{'price': 0, 'quantity': 0, 'orders': 0} for _ in range(MAX_LEVELS)],
+                          'total_buy_qty': 0, 'total_sell_qty': 0}
+        previous_extract(states[ticker], feed)
+
+    published = 0
+    size = 0
+    start = time.perf_counter()
+    for ticker, feed, _ in diffs:
+        depth = previous_extract(states[ticker], feed)
+        payload = mapper.map_tbt_depth_to_openalgo(ticker, depth, ticker, "NSE")
+        size += len(json.dumps(payload))
+        published += 1
+    return time.perf_counter() - start, published, size
+
+
+def run_book(mapper, snapshots, diffs, publish_mode, top_levels):
+    books = {}
+    for ticker, feed, is_snapshot in snapshots:
+        books[ticker] = TbtOrderBook(ticker)
+        books[ticker].apply(feed, is_snapshot)
+        books[ticker].take_update(publish_mode, top_levels)
+
+    published = 0
+    size = 0
+    start = time.perf_counter()
+    for ticker, feed, is_snapshot in diffs:
+        book = books[ticker]
+        book.apply(feed, is_snapshot)
+        depth = book.take_update(publish_mode, top_levels)
+        if depth is None:
+            continue
+        payload = mapper.map_tbt_depth_to_openalgo(ticker, depth, ticker, "NSE")
+        size += len(json.dumps(payload))
+        published += 1
+    return time.perf_counter() - start, published, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fyers TBT 50-level depth benchmark")
+    parser.add_argument("--symbols", type=int, default=20, help="TBT symbols in the stream")
+    parser.add_argument("--packets", type=int, default=20000, help="Diff packets in the stream")
+    parser.add_argument("--changes", type=int, default=4, help="Levels touched per diff packet")
+    parser.add_argument("--top-levels", type=int, default=20, help="Levels published in top mode")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    snapshots, diffs = synthetic_packets(args.symbols, args.packets, args.changes)
+    mapper = FyersDataMapper()
+
+    print("=" * 70)
+    print("FYERS TBT DEPTH BENCHMARK")
+    print("=" * 70)
+    print(f"Symbols: {args.symbols} | Diff packets: {len(diffs):,} | Levels touched per packet: {args.changes}")
+    print(f"{'Path':<12} {'us/packet':>10} {'Published':>10} {'Avg bytes':>10} {'Total MB':>10} {'Speed-up':>9}")
+    print("-" * 70)
+
+    elapsed, published, size = run_previous(mapper, snapshots, diffs)
+    baseline = elapsed
+    print(f"{'before':<12} {elapsed / len(diffs) * 1e6:>10.2f} {published:>10,} "
+          f"{size / max(published, 1):>10,.0f} {size / 1e6:>10.2f} {'1.0x':>9}")
+
+    for mode in ("full", "diff", "top"):
+        elapsed, published, size = run_book(mapper, snapshots, diffs, mode, args.top_levels)
+        label = f"top {args.top_levels}" if mode == "top" else mode
+        print(f"{label:<12} {elapsed / len(diffs) * 1e6:>10.2f} {published:>10,} "
+              f"{size / max(published, 1):>10,.0f} {size / 1e6:>10.2f} {baseline / elapsed:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""
+Symbol Cache Memory Benchmark
+
+Loads a master contract into BrokerSymbolCache with each storage mode and
+reports the memory the cache keeps (CacheStats with SYMBOL_CACHE_TRACE_MEMORY:
+tracemalloc of the load, and RSS growth) along with lookup latencies:
+
+    objects  - the default: one SymbolData per symbol, referenced from five
+               dicts (three keyed by (key, exchange) tuples)
+    compact  - SYMBOL_CACHE_COMPACT=TRUE: columns with interned strings and
+               integer-coded exchanges / instrument types / expiries, indexes
+               mapping to row ids (database/symbol_store.py)
+
+Both include the search and F&O indexes. Each mode is loaded in its own
+process so RSS growth is not shared, and the rows are unpickled inside the
+measured load so their strings are counted, as they are for a symtoken query.
+The contract source options are the same as benchmark_symbol_search.py.
+
+Usage:
+    python test/benchmark_symbol_cache_memory.py
+    python test/benchmark_symbol_cache_memory.py --contract symtoken.csv
+    python test/benchmark_symbol_cache_memory.py --storage compact
+"""
+
+import sys
+import os
+import time
+import pickle
+import random
+import argparse
+import subprocess
+from types import SimpleNamespace
+
+# Add parent directory to path to import database modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Load environment variables from parent directory
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+os.environ['SYMBOL_CACHE_TRACE_MEMORY'] = 'TRUE'
+
+from database.token_db_enhanced import BrokerSymbolCache
+from benchmark_symbol_search import load_contract_csv, load_contract_db, synthetic_contract
+
+FIELDS = ("symbol", "brsymbol", "name", "exchange", "brexchange", "token",
+          "expiry", "strike", "lotsize", "instrumenttype", "tick_size")
+
+HEADER = (f"{'Storage':<9} {'Traced MB':>10} {'RSS MB':>8} {'B/symbol':>9} {'Load s':>7} "
+          f"{'token us':>9} {'info us':>8} {'search us':>10} {'fno us':>8}")
+
+
+def time_us(func, args_list):
+    start = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1e6
+
+
+def measure(storage, blob, iterations, seed):
+    """Load the pickled rows with one storage mode; one table row"""
+    cache = BrokerSymbolCache()
+    cache.compact = storage == "compact"
+    cache._init_storage()
+
+    def fetch():
+        return [SimpleNamespace(**dict(zip(FIELDS, row))) for row in pickle.loads(blob)]
+
+    total, _ = cache._load_measured(lambda: cache._build_from_rows(fetch()))
+    stats = cache.stats
+
+    # Load time without tracemalloc, as with the default settings
+    os.environ['SYMBOL_CACHE_TRACE_MEMORY'] = 'FALSE'
+    untraced = BrokerSymbolCache()
+    untraced.compact = cache.compact
+    untraced._init_storage()
+    start = time.perf_counter()
+    untraced._load_measured(lambda: untraced._build_from_rows(fetch()))
+    load_time = time.perf_counter() - start
+
+    random.seed(seed)
+    sample = random.sample([(s.symbol, s.exchange) for s in cache.symbols.values()], min(iterations, total))
+    underlying = max(cache.fno_index.chains_by_underlying, key=lambda u: len(cache.fno_index.chains_by_underlying[u]))
+    token_us = time_us(cache.get_token, sample)
+    info_us = time_us(cache.get_symbol_info, sample)
+    search_us = time_us(cache.search_symbols, [(q, None) for q in ("RELI", "NIFTY 24000 CE", "INFY", "TATA")] * 5)
+    fno_us = time_us(lambda u: cache.fno_search_symbols(underlying=u, instrumenttype="CE"), [(underlying,)] * 5)
+
+    return (f"{storage:<9} {stats.memory_usage_mb:>10.1f} {stats.rss_delta_mb:>8.1f} "
+            f"{stats.memory_usage_mb * 1024 * 1024 / total:>9,.0f} {load_time:>7.2f} "
+            f"{token_us:>9.2f} {info_us:>8.2f} {search_us:>10,.0f} {fno_us:>8,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BrokerSymbolCache memory benchmark")
+    parser.add_argument("--contract", help="CSV export of the symtoken table")
+    parser.add_argument("--db", action="store_true", help="Load the symtoken table of DATABASE_URL")
+    parser.add_argument("--storage", default="both", choices=("both", "objects", "compact"))
+    parser.add_argument("--iterations", type=int, default=20000, help="Point lookups to time")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--row-only", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.contract:
+        source, rows = args.contract, load_contract_csv(args.contract)
+    elif args.db:
+        source, rows = "DATABASE_URL symtoken", load_contract_db()
+    else:
+        source, rows = "synthetic", synthetic_contract(args.seed)
+
+    if args.row_only:
+        blob = pickle.dumps([tuple(getattr(row, f) for f in FIELDS) for row in rows])
+        del rows
+        print(measure(args.storage, blob, args.iterations, args.seed))
+        return
+
+    print("=" * 84)
+    print("SYMBOL CACHE MEMORY BENCHMARK")
+    print("=" * 84)
+    print(f"Contract: {source} | Rows: {len(rows):,}")
+    print(HEADER)
+    print("-" * 84)
+    for storage in (("objects", "compact") if args.storage == "both" else (args.storage,)):
+        command = [sys.executable, os.path.abspath(__file__), "--storage", storage, "--row-only",
+                   "--iterations", str(args.iterations), "--seed", str(args.seed)]
+        if args.contract:
+            command += ["--contract", args.contract]
+        elif args.db:
+            command.append("--db")
+        result = subprocess.run(command, capture_output=True, text=True)
+        print(result.stdout.strip().splitlines()[-1] if result.returncode == 0 else
+              f"{storage:<9} failed: {result.stderr.strip().splitlines()[-1:]}")
+    print("-" * 84)
+    print("Traced MB: live allocations of the load (CacheStats.memory_usage_mb); RSS MB: RSS growth; "
+          "Load s: untraced load; lookups in microseconds")
+
+
+if __name__ == "__main__":
+    main()
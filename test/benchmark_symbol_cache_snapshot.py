@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+Symbol Cache Snapshot Benchmark
+
+Times a BrokerSymbolCache start from the snapshot saved after a master
+contract download (database/symbol_cache_snapshot.py) against a rebuild of the
+cache and its search and F&O indexes from symtoken rows, for each storage mode:
+
+    rebuild    - load_all_symbols: fetch the rows (only with --db, where the
+                 symtoken query is included) and build every index
+    write      - get_snapshot_state and write_snapshot to a temporary file
+    restore    - read_snapshot (header, CRC32, memory map) and
+                 load_from_snapshot
+
+The restored cache is compared with the rebuilt one: symbol order, every
+lookup index, search results and F&O lookups. The contract source options
+are the same as benchmark_symbol_search.py.
+
+Usage:
+    python test/benchmark_symbol_cache_snapshot.py
+    python test/benchmark_symbol_cache_snapshot.py --contract symtoken.csv
+    python test/benchmark_symbol_cache_snapshot.py --db --storage compact
+"""
+
+import sys
+import os
+import time
+import argparse
+import tempfile
+from dataclasses import astuple
+
+# Add parent directory to path to import database modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Load environment variables from parent directory
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+from database.token_db_enhanced import BrokerSymbolCache
+from database.symbol_cache_snapshot import read_snapshot, write_snapshot
+from benchmark_symbol_search import QUERIES, load_contract_csv, load_contract_db, synthetic_contract
+from benchmark_fno_index import lookups
+
+BROKER = "benchmark"
+
+
+def new_cache(storage):
+    cache = BrokerSymbolCache()
+    cache.compact = storage == "compact"
+    cache._init_storage()
+    return cache
+
+
+def contents(cache):
+    """Everything a caller can observe of the cache"""
+    records = list(cache.records)
+    return (
+        [astuple(record) for record in records],
+        [astuple(record) for record in cache.symbols.values()],
+        [(cache.get_token(r.symbol, r.exchange), cache.get_symbol(r.token, r.exchange),
+          cache.get_oa_symbol(r.brsymbol, r.exchange), cache.get_symbol_data(r.token).symbol)
+         for r in records],
+        [[astuple(r) for r in cache.search_symbols(query, exchange)] for query, exchange in QUERIES],
+        [index() for _, _, index in lookups(cache)],
+    )
+
+
+def measure(storage, fetch, path):
+    """One table row for a storage mode"""
+    built = new_cache(storage)
+    start = time.perf_counter()
+    total, _ = built._load_measured(lambda: built._build_from_rows(fetch()))
+    rebuild_time = time.perf_counter() - start
+    built._mark_loaded(BROKER, total, 'database')
+
+    fingerprint = {'symbols': total, 'master_contract_updated': 'benchmark'}
+    start = time.perf_counter()
+    size = write_snapshot(built.get_snapshot_state(), BROKER, fingerprint, path)
+    write_time = time.perf_counter() - start
+
+    restored = new_cache(storage)
+    start = time.perf_counter()
+    loaded = restored.load_from_snapshot(BROKER, lambda: read_snapshot(path, BROKER, storage, fingerprint))
+    restore_time = time.perf_counter() - start
+
+    identical = loaded and contents(built) == contents(restored)
+    return (f"{storage:<9} {rebuild_time:>10.2f} {write_time:>8.2f} {size / (1024 * 1024):>8.1f} "
+            f"{restore_time * 1000:>11,.0f} {rebuild_time / restore_time:>8.0f}x {str(identical):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BrokerSymbolCache snapshot benchmark")
+    parser.add_argument("--contract", help="CSV export of the symtoken table")
+    parser.add_argument("--db", action="store_true", help="Load the symtoken table of DATABASE_URL")
+    parser.add_argument("--storage", default="both", choices=("both", "objects", "compact"))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.contract:
+        source, rows = args.contract, load_contract_csv(args.contract)
+    elif args.db:
+        source, rows = "DATABASE_URL symtoken", None
+    else:
+        source, rows = "synthetic", synthetic_contract(args.seed)
+    fetch = load_contract_db if rows is None else (lambda: rows)
+
+    print("=" * 70)
+    print("SYMBOL CACHE SNAPSHOT BENCHMARK")
+    print("=" * 70)
+    print(f"Contract: {source}" + ("" if args.db else " (rebuild excludes the symtoken query)"))
+    print(f"{'Storage':<9} {'Rebuild s':>10} {'Write s':>8} {'Size MB':>8} {'Restore ms':>11} "
+          f"{'Speed-up':>9} {'Identical':>10}")
+    print("-" * 70)
+    with tempfile.TemporaryDirectory() as directory:
+        for storage in (("objects", "compact") if args.storage == "both" else (args.storage,)):
+            print(measure(storage, fetch, os.path.join(directory, f"{storage}.snapshot")))
+    print("-" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+"""
+Symbol Search Benchmark
+
+Loads a full master contract into BrokerSymbolCache and times search_symbols
+(search-as-you-type and /api/v1/search) for a set of typical queries:
+
+    scan    - the previous search: every cached symbol upper-cased and tested
+              per term and keystroke
+    index   - the trigram/bigram inverted index built by load_all_symbols
+
+Results of both are compared for every query.
+
+The contract comes from, in order of preference:
+    --contract   a CSV export of the symtoken table (symbol, brsymbol, name,
+                 exchange, brexchange, token, expiry, strike, lotsize,
+                 instrumenttype, tick_size), e.g. from
+                 sqlite3 -header -csv db/openalgo.db "select * from symtoken"
+    --db         the symtoken table of DATABASE_URL
+    (default)    a synthetic Fyers-style contract of about 75,000 instruments
+
+Usage:
+    python test/benchmark_symbol_search.py
+    python test/benchmark_symbol_search.py --contract symtoken.csv
+    python test/benchmark_symbol_search.py --db --iterations 200
+"""
+
+import sys
+import os
+import csv
+import time
+import random
+import argparse
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+# Add parent directory to path to import database modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables from parent directory
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+from database.token_db_enhanced import BrokerSymbolCache
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+QUERIES = [
+    ("R", None), ("RE", None), ("REL", None), ("RELI", None), ("RELIANCE", None),
+    ("RELIANCE", "NSE"), ("INFY", None), ("TATA", "NSE"), ("NIFTY", None),
+    ("NIFTY FUT", None), ("NIFTY 24000", None), ("NIFTY 24000 CE", "NFO"),
+    ("BANKNIFTY 52000 PE", "NFO"), ("2885", None), ("ZZZZQ", None),
+]
+
+
+def load_contract_csv(path):
+    """symtoken rows from a CSV export"""
+    def number(value, cast):
+        try:
+            return cast(value) if value not in (None, '') else None
+        except ValueError:
+            return None
+
+    rows = []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            rows.append(SimpleNamespace(
+                symbol=row['symbol'], brsymbol=row['brsymbol'], name=row.get('name'),
+                exchange=row['exchange'], brexchange=row.get('brexchange'), token=row['token'],
+                expiry=row.get('expiry') or None, strike=number(row.get('strike'), float),
+                lotsize=number(row.get('lotsize'), int), instrumenttype=row.get('instrumenttype'),
+                tick_size=number(row.get('tick_size'), float),
+            ))
+    return rows
+
+
+def load_contract_db():
+    """symtoken rows of DATABASE_URL"""
+    from database.symbol import SymToken
+    return SymToken.query.all()
+
+
+def synthetic_contract(seed):
+    """Fyers-style equities (from test/*.csv) plus stock and index derivatives"""
+    random.seed(seed)
+    equities = {}
+    for filename, exchange_column in (("symbols.csv", "exchange"), ("all_symbols.csv", "exchange")):
+        with open(os.path.join(TEST_DIR, filename), newline='') as f:
+            for row in csv.DictReader(f):
+                equities.setdefault((row['symbol'].strip(), row[exchange_column].strip()), None)
+
+    rows = []
+    token = 10100000000000
+
+    def add(symbol, brsymbol, name, exchange, expiry=None, strike=None, lotsize=1, instrumenttype="EQ"):
+        nonlocal token
+        token += random.randint(1, 50)
+        rows.append(SimpleNamespace(
+            symbol=symbol, brsymbol=brsymbol, name=name, exchange=exchange, brexchange=exchange,
+            token=str(token), expiry=expiry, strike=strike, lotsize=lotsize,
+            instrumenttype=instrumenttype, tick_size=0.05,
+        ))
+
+    for symbol, exchange in equities:
+        add(symbol, f"{exchange}:{symbol}-EQ", f"{symbol} LIMITED", exchange)
+
+    expiries = [date(2025, 1, 30) + timedelta(days=28 * i) for i in range(3)]
+    weeklies = [date(2025, 1, 2) + timedelta(days=7 * i) for i in range(8)]
+    stocks = sorted(symbol for symbol, exchange in equities if exchange == "NSE")[:180]
+    underlyings = [(name, 24000, 50, weeklies) for name in ("NIFTY",)]
+    underlyings += [(name, 52000, 100, weeklies[:4]) for name in ("BANKNIFTY", "FINNIFTY")]
+    underlyings += [(name, random.randint(2, 400) * 10, 10, expiries) for name in stocks]
+
+    for name, spot, step, option_expiries in underlyings:
+        for expiry in expiries:
+            code = expiry.strftime("%d%b%y").upper()
+            add(f"{name}{code}FUT", f"NSE:{name}{expiry.strftime('%y%b').upper()}FUT", name, "NFO",
+                expiry.strftime("%d-%b-%y").upper(), None, 25, "FUT")
+        for expiry in option_expiries:
+            code = expiry.strftime("%d%b%y").upper()
+            for i in range(-30, 31):
+                strike = spot + i * step
+                for option_type in ("CE", "PE"):
+                    add(f"{name}{code}{strike}{option_type}",
+                        f"NSE:{name}{expiry.strftime('%y%b').upper()}{strike}{option_type}",
+                        name, "NFO", expiry.strftime("%d-%b-%y").upper(), float(strike), 25, option_type)
+    return rows
+
+
+def time_queries(cache, iterations):
+    """Microseconds per query and the results of each query"""
+    timings, results = [], []
+    for query, exchange in QUERIES:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            matches = cache.search_symbols(query, exchange, limit=500)
+        timings.append((time.perf_counter() - start) / iterations * 1e6)
+        results.append([m.token for m in matches])
+    return timings, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BrokerSymbolCache search benchmark")
+    parser.add_argument("--contract", help="CSV export of the symtoken table")
+    parser.add_argument("--db", action="store_true", help="Load the symtoken table of DATABASE_URL")
+    parser.add_argument("--iterations", type=int, default=20, help="Runs per query")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.contract:
+        source, rows = args.contract, load_contract_csv(args.contract)
+    elif args.db:
+        source, rows = "DATABASE_URL symtoken", load_contract_db()
+    else:
+        source, rows = "synthetic", synthetic_contract(args.seed)
+
+    cache = BrokerSymbolCache()
+    start = time.perf_counter()
+    index_time = cache._build_indexes(rows)
+    build_time = time.perf_counter() - start
+    stats = cache.search_index.get_stats()
+
+    print("=" * 70)
+    print("SYMBOL SEARCH BENCHMARK")
+    print("=" * 70)
+    print(f"Contract: {source} | Rows: {len(rows):,} | Cached symbols: {len(cache.symbols):,}")
+    print(f"Cache build: {build_time:.2f} s (indexes {index_time:.2f} s) | "
+          f"Grams: {stats['trigrams'] + stats['bigrams']:,} | Postings: {stats['postings']:,}")
+
+    index_timings, index_results = time_queries(cache, args.iterations)
+    search_index, cache.search_index = cache.search_index, None
+    scan_timings, scan_results = time_queries(cache, max(1, args.iterations // 10))
+    cache.search_index = search_index
+
+    print(f"{'Query':<24} {'Exchange':<9} {'Results':>8} {'Scan us':>11} {'Index us':>10} {'Speed-up':>9}")
+    print("-" * 70)
+    for (query, exchange), scan_us, index_us, results in zip(QUERIES, scan_timings, index_timings, index_results):
+        print(f"{query:<24} {exchange or '-':<9} {len(results):>8} {scan_us:>11,.0f} {index_us:>10,.1f} "
+              f"{scan_us / index_us:>8.0f}x")
+    print("-" * 70)
+    print(f"Results identical: {scan_results == index_results}")
+
+
+if __name__ == "__main__":
+    main()
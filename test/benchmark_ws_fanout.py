@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+"""
+WebSocket Proxy Fan-out Benchmark
+
+Replays a recorded (or synthetic) tick stream through
+WebSocketProxy.broadcast_market_data against N mock clients and reports
+messages/sec and fan-out latency percentiles. Optionally some clients can be
+made slow to check that they do not hold back the others.
+
+No broker, ZeroMQ publisher or network is required - the proxy is created
+with mock client connections that only count what they receive.
+
+Recorded tick file format (JSON lines):
+    {"topic": "fyers_NSE_RELIANCE_LTP", "data": {"ltp": 1424.5, ...}}
+
+Usage:
+    python test/benchmark_ws_fanout.py --clients 50 --symbols 1800 --ticks 20000
+    python test/benchmark_ws_fanout.py --clients 50 --replay ticks.jsonl
+    python test/benchmark_ws_fanout.py --clients 50 --slow-clients 5
+"""
+
+import sys
+import os
+import time
+import json
+import random
+import asyncio
+import argparse
+import statistics
+from unittest.mock import patch
+
+# Add parent directory to path to import websocket_proxy modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables from parent directory
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+MODE_MAP = {"LTP": 1, "QUOTE": 2, "DEPTH": 3}
+
+
+class MockClient:
+    """Stands in for a websockets ServerConnection and counts delivered frames"""
+
+    def __init__(self, delay=0.0):
+        self.messages = 0
+        self.bytes = 0
+        self.delay = delay
+
+    async def send(self, message, text=None):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.messages += 1
+        self.bytes += len(message)
+
+    async def close(self, code=1000, reason=""):
+        pass
+
+
+def parse_topic(topic):
+    """Split BROKER_EXCHANGE_SYMBOL_MODE to build the subscription keys up front"""
+    parts = topic.split('_')
+    if len(parts) >= 5 and parts[2] == "INDEX":
+        return parts[0], f"{parts[1]}_{parts[2]}", parts[3], MODE_MAP.get(parts[4])
+    return parts[0], parts[1], parts[2], MODE_MAP.get(parts[3])
+
+
+def synthetic_ticks(num_symbols, num_ticks, broker="fyers"):
+    """Generate a tick stream over num_symbols NSE symbols with mixed modes"""
+    symbols = [f"SYM{i:04d}" for i in range(num_symbols)]
+    modes = ["LTP", "QUOTE", "DEPTH"]
+    ticks = []
+    for _ in range(num_ticks):
+        symbol = random.choice(symbols)
+        mode = random.choices(modes, weights=[6, 3, 1])[0]
+        ltp = round(random.uniform(100, 3000), 2)
+        data = {"symbol": symbol, "exchange": "NSE", "ltp": ltp,
+                "timestamp": int(time.time() * 1000)}
+        if mode != "LTP":
+            data.update({"open": ltp, "high": ltp + 5, "low": ltp - 5, "close": ltp,
+                         "volume": random.randint(1000, 100000),
+                         "bid": ltp - 0.05, "ask": ltp + 0.05})
+        if mode == "DEPTH":
+            data["depth"] = {
+                "buy": [{"price": ltp - 0.05 * i, "quantity": 100, "orders": 1} for i in range(5)],
+                "sell": [{"price": ltp + 0.05 * i, "quantity": 100, "orders": 1} for i in range(5)],
+            }
+        ticks.append((f"{broker}_NSE_{symbol}_{mode}", data))
+    return ticks
+
+
+def load_ticks(path):
+    """Load a recorded JSON-lines tick stream"""
+    ticks = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                record = json.loads(line)
+                ticks.append((record["topic"], record["data"]))
+    return ticks
+
+
+def build_proxy():
+    """Create a WebSocketProxy without binding the WebSocket port"""
+    os.environ.setdefault('ZMQ_PORT', '5555')
+    from websocket_proxy.server import WebSocketProxy
+
+    with patch('websocket_proxy.server.is_port_in_use', return_value=False):
+        return WebSocketProxy(host="127.0.0.1", port=0)
+
+
+def register_clients(proxy, num_clients, num_slow, ticks, broker="fyers"):
+    """Attach mock clients (with writer tasks) subscribed to every replayed key"""
+    keys = set()
+    for topic, _ in ticks:
+        _, exchange, symbol, mode = parse_topic(topic)
+        keys.add((symbol, exchange, mode))
+
+    clients = []
+    for n in range(num_clients):
+        client = MockClient(delay=0.005 if n < num_slow else 0.0)
+        client_id = id(client)
+        proxy.clients[client_id] = client
+        proxy.subscriptions[client_id] = set()
+        proxy.user_mapping[client_id] = f"user{n % 4}"
+        proxy.user_broker_mapping[f"user{n % 4}"] = broker
+        proxy.start_client_writer(client_id, client)
+        for key in keys:
+            proxy.subscription_index[key].add(client_id)
+        clients.append(client)
+    return clients
+
+
+async def run_benchmark(proxy, args, ticks):
+    clients = register_clients(proxy, args.clients, args.slow_clients, ticks)
+    fast_clients = clients[args.slow_clients:]
+
+    # Topics arrive from ZeroMQ as raw bytes
+    frames = [(topic.encode('utf-8'), data) for topic, data in ticks]
+
+    latencies = []
+    start = time.perf_counter()
+    for topic, data in frames:
+        t0 = time.perf_counter()
+        broker_name, exchange, symbol, mode = proxy.parse_topic(topic)
+        proxy.broadcast_market_data(broker_name, symbol, exchange, mode, data)
+        latencies.append(time.perf_counter() - t0)
+        # The real listener yields to the writer tasks while awaiting ZMQ
+        await asyncio.sleep(0)
+
+    # Wait for the fast clients' queues to drain
+    fast_ids = [id(c) for c in fast_clients]
+    while any(len(proxy.client_queues[cid]) for cid in fast_ids):
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+
+    stats = proxy.get_client_queue_stats()
+    for client_id in list(proxy.client_writers):
+        proxy.stop_client_writer(client_id)
+    return elapsed, latencies, clients, fast_clients, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket proxy fan-out benchmark")
+    parser.add_argument("--clients", type=int, default=50, help="Number of mock clients")
+    parser.add_argument("--symbols", type=int, default=1800, help="Symbols in the synthetic stream")
+    parser.add_argument("--ticks", type=int, default=20000, help="Ticks in the synthetic stream")
+    parser.add_argument("--replay", help="Recorded JSON-lines tick file to replay instead")
+    parser.add_argument("--slow-clients", type=int, default=0,
+                        help="Number of clients that take 5 ms per send")
+    args = parser.parse_args()
+
+    ticks = load_ticks(args.replay) if args.replay else synthetic_ticks(args.symbols, args.ticks)
+    proxy = build_proxy()
+
+    print("=" * 70)
+    print("WEBSOCKET PROXY FAN-OUT BENCHMARK")
+    print("=" * 70)
+    print(f"Ticks: {len(ticks):,} | Clients: {args.clients} ({args.slow_clients} slow)")
+
+    try:
+        elapsed, latencies, clients, fast_clients, stats = asyncio.run(
+            run_benchmark(proxy, args, ticks))
+    finally:
+        proxy.socket.close(linger=0)
+        proxy.context.term()
+
+    delivered = sum(c.messages for c in fast_clients)
+    dropped = sum(s['dropped'] for s in stats.values())
+    conflated = sum(s['conflated'] for s in stats.values())
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1e6
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6
+
+    print(f"Elapsed:          {elapsed:.3f} s")
+    print(f"Ticks/sec:        {len(ticks) / elapsed:,.0f}")
+    print(f"Messages/sec:     {delivered / elapsed:,.0f} ({delivered:,} delivered to fast clients)")
+    print(f"Queues:           {conflated:,} conflated | {dropped:,} dropped")
+    print(f"Enqueue latency:  mean {statistics.mean(latencies) * 1e6:.1f} us | "
+          f"p50 {p50:.1f} us | p99 {p99:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
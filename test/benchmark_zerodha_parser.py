@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+"""
+Zerodha Binary Parser Benchmark
+
+Feeds synthetic Kite ticker frames through ZerodhaWebSocket's parser and
+reports frames/sec and ticks/sec:
+
+    before   - the previous parser: a bytes slice and struct.unpack call per
+               field group and per depth level for every packet
+    after    - websocket_proxy.binary_decoder: the frame is split without
+               copying and each packet decoded in place with one precompiled
+               unpack_from (depth levels included)
+
+A second table isolates the decode step for one frame layout: per-packet
+struct tuples (what the tick path uses) against a zero-copy NumPy structured
+view (PacketLayout.decode_array), both as a column read and converted to rows.
+
+No network or Kite login is required. Ticks from every decoder are compared
+(ignoring the receive timestamp) to check the output is unchanged.
+
+Usage:
+    python test/benchmark_zerodha_parser.py
+    python test/benchmark_zerodha_parser.py --mode full --packets-per-frame 50
+    python test/benchmark_zerodha_parser.py --mode mixed --frames 20000
+"""
+
+import sys
+import os
+import time
+import random
+import struct
+import argparse
+from typing import Dict, Optional
+
+# Add parent directory to path to import broker modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables from parent directory
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+from websocket_proxy import binary_decoder
+from websocket_proxy.binary_decoder import split_frame
+from broker.zerodha.streaming.zerodha_websocket import (
+    ZerodhaWebSocket, LTP_PACKET, QUOTE_PACKET, FULL_PACKET
+)
+
+
+def ltp_packet(token):
+    return struct.pack('>Ii', token, random.randint(10000, 500000))
+
+
+def quote_packet(token):
+    price = random.randint(10000, 500000)
+    return struct.pack('>Ii9i', token, price, random.randint(1, 500), price - 50,
+                       random.randint(1000, 10 ** 7), random.randint(1000, 10 ** 6),
+                       random.randint(1000, 10 ** 6), price - 500, price + 800, price - 900, price - 200)
+
+
+def full_packet(token):
+    packet = quote_packet(token)
+    packet += struct.pack('>5i', int(time.time()), random.randint(0, 10 ** 6), 0, 0, int(time.time()))
+    price = struct.unpack_from('>i', packet, 4)[0]
+    for side in (-1, 1):
+        for level in range(5):
+            packet += struct.pack('>iih2x', random.randint(1, 5000), price + side * 5 * (level + 1),
+                                  random.randint(1, 40))
+    return packet
+
+
+PACKET_BUILDERS = {'ltp': ltp_packet, 'quote': quote_packet, 'full': full_packet}
+
+
+def synthetic_frames(num_frames, packets_per_frame, num_tokens, mode):
+    """Frames of `packets_per_frame` packets of one mode, or a random mix for 'mixed'"""
+    tokens = [256265 + i * 7 for i in range(num_tokens)]
+    frames = []
+    for _ in range(num_frames):
+        packets = []
+        for _ in range(packets_per_frame):
+            builder = PACKET_BUILDERS[random.choice(list(PACKET_BUILDERS)) if mode == 'mixed' else mode]
+            packets.append(builder(random.choice(tokens)))
+        frame = struct.pack('>H', len(packets))
+        for packet in packets:
+            frame += struct.pack('>H', len(packet)) + packet
+        frames.append(frame)
+    return frames
+
+
+class SlicingZerodhaWebSocket(ZerodhaWebSocket):
+    """The previous parser: slices and struct.unpack per field group and depth level"""
+
+    def _parse_binary_message(self, data: bytes):
+        if len(data) < 4:
+            return []
+        num_packets = struct.unpack('>H', data[0:2])[0]
+        packets = []
+        offset = 2
+        for _ in range(num_packets):
+            if offset + 2 > len(data):
+                break
+            packet_length = struct.unpack('>H', data[offset:offset + 2])[0]
+            offset += 2
+            if offset + packet_length > len(data):
+                break
+            tick = self._parse_packet(data[offset:offset + packet_length])
+            if tick:
+                packets.append(tick)
+            offset += packet_length
+        return packets
+
+    def _parse_packet(self, packet: bytes) -> Optional[Dict]:
+        if len(packet) < 8:
+            return None
+        instrument_token = struct.unpack('>I', packet[0:4])[0]
+        last_price = struct.unpack('>i', packet[4:8])[0] / 100.0
+        if len(packet) == 8:
+            mode = self.MODE_LTP
+        elif len(packet) == 44:
+            mode = self.MODE_QUOTE
+        elif len(packet) >= 184:
+            mode = self.MODE_FULL
+        else:
+            mode = self.mode_map.get(instrument_token, self.MODE_QUOTE)
+        with self.lock:
+            exchange = self.token_exchange_map.get(instrument_token)
+        tick = {
+            'instrument_token': instrument_token,
+            'last_traded_price': last_price,
+            'last_price': last_price,
+            'mode': mode,
+            'timestamp': int(time.time() * 1000)
+        }
+        if exchange:
+            tick['source_exchange'] = exchange
+        if len(packet) >= 44:
+            fields = struct.unpack('>11i', packet[0:44])
+            tick.update({
+                'instrument_token': fields[0],
+                'last_traded_price': fields[1] / 100.0,
+                'last_price': fields[1] / 100.0,
+                'last_traded_quantity': fields[2],
+                'average_traded_price': fields[3] / 100.0,
+                'average_price': fields[3] / 100.0,
+                'volume_traded': fields[4],
+                'volume': fields[4],
+                'total_buy_quantity': fields[5],
+                'total_sell_quantity': fields[6],
+                'open_price': fields[7] / 100.0,
+                'high_price': fields[8] / 100.0,
+                'low_price': fields[9] / 100.0,
+                'close_price': fields[10] / 100.0,
+                'ohlc': {
+                    'open': fields[7] / 100.0,
+                    'high': fields[8] / 100.0,
+                    'low': fields[9] / 100.0,
+                    'close': fields[10] / 100.0
+                }
+            })
+        if len(packet) >= 64:
+            extended_fields = struct.unpack('>iiiii', packet[44:64])
+            tick.update({
+                'last_traded_timestamp': extended_fields[0],
+                'open_interest': extended_fields[1],
+                'oi': extended_fields[1],
+                'exchange_timestamp': extended_fields[4]
+            })
+        if len(packet) >= 184:
+            depth = self._parse_market_depth(packet[64:184])
+            if depth:
+                tick['depth'] = depth
+        return tick
+
+    def _parse_market_depth(self, depth_data: bytes) -> Optional[Dict]:
+        depth = {'buy': [], 'sell': []}
+        for side, start in (('buy', 0), ('sell', 60)):
+            for i in range(5):
+                offset = start + i * 12
+                quantity, price, orders = struct.unpack('>iih', depth_data[offset:offset + 10])
+                if price > 0:
+                    depth[side].append({'quantity': quantity, 'price': price / 100.0, 'orders': orders})
+        return depth if (depth['buy'] or depth['sell']) else None
+
+
+def run(client, frames):
+    """Parse every frame; return (seconds, ticks, parsed ticks without timestamps)"""
+    parse = client._parse_binary_message
+    tick_count = 0
+    start = time.perf_counter()
+    for frame in frames:
+        # Ticks are dropped right away, as after the adapter publishes them
+        tick_count += len(parse(frame))
+    elapsed = time.perf_counter() - start
+    ticks = [dict(tick, timestamp=0) for frame in frames for tick in parse(frame)]
+    return elapsed, tick_count, ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zerodha binary parser benchmark")
+    parser.add_argument("--frames", type=int, default=10000, help="Synthetic frames")
+    parser.add_argument("--packets-per-frame", type=int, default=20, help="Packets per frame")
+    parser.add_argument("--tokens", type=int, default=500, help="Distinct instrument tokens")
+    parser.add_argument("--mode", default="full", choices=("ltp", "quote", "full", "mixed"),
+                        help="Packet mode of the synthetic frames")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    frames = synthetic_frames(args.frames, args.packets_per_frame, args.tokens, args.mode)
+    token_map = {256265 + i * 7: "NSE" for i in range(args.tokens)}
+
+    print("=" * 70)
+    print("ZERODHA BINARY PARSER BENCHMARK")
+    print("=" * 70)
+    print(f"Frames: {len(frames):,} | Packets/frame: {args.packets_per_frame} | Mode: {args.mode} | "
+          f"Bytes: {sum(len(f) for f in frames):,}")
+    print(f"{'Decoder':<34} {'Frames/sec':>12} {'Ticks/sec':>14} {'Speed-up':>9}")
+    print("-" * 70)
+
+    results = []
+    for label, cls in (
+        ("before: slice + unpack per field", SlicingZerodhaWebSocket),
+        ("after: split_frame + unpack_from", ZerodhaWebSocket),
+    ):
+        client = cls("benchmark", "benchmark")
+        client.set_token_exchange_mapping(token_map)
+        elapsed, tick_count, ticks = run(client, frames)
+        results.append((elapsed, ticks))
+        print(f"{label:<34} {len(frames) / elapsed:>12,.0f} {tick_count / elapsed:>14,.0f} "
+              f"{results[0][0] / elapsed:>8.2f}x")
+
+    print("-" * 70)
+    identical = all(ticks == results[0][1] for _, ticks in results[1:])
+    print(f"Ticks identical to the previous parser: {identical}")
+
+    if args.mode != "mixed":
+        benchmark_decode(frames, args.mode)
+
+
+def benchmark_decode(frames, mode):
+    """Decode-only cost per packet for one layout: struct tuples vs a NumPy view"""
+    layout = {"ltp": LTP_PACKET, "quote": QUOTE_PACKET, "full": FULL_PACKET}[mode]
+    batches = [(frame, [offset for offset, _ in split_frame(frame)]) for frame in frames]
+    packets = sum(len(offsets) for _, offsets in batches)
+
+    cases = [("struct: decode_batch", lambda f, o: layout.decode_batch(f, o))]
+    if binary_decoder.np is not None:
+        cases += [
+            ("numpy: decode_array, ltp column", lambda f, o: layout.decode_array(f, o)['last_price'] / 100.0),
+            ("numpy: decode_array + tolist", lambda f, o: layout.decode_array(f, o).tolist()),
+        ]
+
+    print()
+    print(f"{'Decode only (' + mode + ')':<34} {'Packets/sec':>12} {'us/packet':>14}")
+    print("-" * 70)
+    if len(batches[0][1]) < binary_decoder.NUMPY_MIN_BATCH:
+        cases = cases[:1]
+    for label, decode in cases:
+        start = time.perf_counter()
+        for frame, offsets in batches:
+            decode(frame, offsets)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<34} {packets / elapsed:>12,.0f} {elapsed / packets * 1e6:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+ZeroMQ Payload Codec Micro-benchmark
+
+Compares encode + decode cost per tick for the JSON and MessagePack codecs in
+websocket_proxy/zmq_codec.py, for LTP, Quote and Depth payloads, and projects
+the CPU share of one core spent on the ZeroMQ hop at 5k and 10k ticks/sec.
+
+Usage:
+    python test/benchmark_zmq_codec.py
+    python test/benchmark_zmq_codec.py --iterations 200000
+"""
+
+import sys
+import os
+import time
+import argparse
+
+# Add parent directory to path to import websocket_proxy modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables from parent directory (importing websocket_proxy needs them)
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+from websocket_proxy.zmq_codec import (
+    CODEC_JSON, CODEC_MSGPACK, encode_market_data, decode_market_data, msgpack
+)
+
+LTP_TICK = {
+    "symbol": "RELIANCE", "exchange": "NSE", "token": "10100000002885",
+    "ltp": 1424.55, "timestamp": 1735712345123,
+}
+
+QUOTE_TICK = dict(LTP_TICK, **{
+    "open": 1410.0, "high": 1431.2, "low": 1405.35, "close": 1412.8,
+    "volume": 4587213, "last_quantity": 25, "average_price": 1419.64,
+    "total_buy_quantity": 312540, "total_sell_quantity": 298770,
+    "bid": 1424.5, "ask": 1424.6, "bid_qty": 120, "ask_qty": 85,
+    "upper_circuit": 1553.6, "lower_circuit": 1271.2,
+})
+
+DEPTH_TICK = dict(QUOTE_TICK, depth={
+    "buy": [{"price": 1424.5 - 0.05 * i, "quantity": 100 + i, "orders": 3 + i} for i in range(5)],
+    "sell": [{"price": 1424.6 + 0.05 * i, "quantity": 90 + i, "orders": 2 + i} for i in range(5)],
+})
+
+
+def time_codec(codec, tick, iterations):
+    """Return (encode_us, decode_us, payload_bytes) per tick"""
+    payload = encode_market_data(tick, codec)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        encode_market_data(tick, codec)
+    encode_us = (time.perf_counter() - start) / iterations * 1e6
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decode_market_data(payload)
+    decode_us = (time.perf_counter() - start) / iterations * 1e6
+
+    return encode_us, decode_us, len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ZeroMQ payload codec micro-benchmark")
+    parser.add_argument("--iterations", type=int, default=100000, help="Iterations per measurement")
+    args = parser.parse_args()
+
+    codecs = [CODEC_JSON]
+    if msgpack is not None:
+        codecs.append(CODEC_MSGPACK)
+    else:
+        print("[WARNING] msgpack is not installed - only JSON will be measured (pip install msgpack)")
+
+    print("=" * 86)
+    print("ZMQ PAYLOAD CODEC BENCHMARK")
+    print("=" * 86)
+    print(f"{'Mode':<7}{'Codec':<9}{'Bytes':>7}{'Encode us':>12}{'Decode us':>12}"
+          f"{'Total us':>11}{'CPU @5k/s':>13}{'CPU @10k/s':>13}")
+    print("-" * 86)
+
+    for mode, tick in (("LTP", LTP_TICK), ("Quote", QUOTE_TICK), ("Depth", DEPTH_TICK)):
+        for codec in codecs:
+            encode_us, decode_us, size = time_codec(codec, tick, args.iterations)
+            total_us = encode_us + decode_us
+            # Share of one core: ticks/sec x seconds per tick
+            cpu_5k = 5000 * total_us / 1e6 * 100
+            cpu_10k = 10000 * total_us / 1e6 * 100
+            print(f"{mode:<7}{codec:<9}{size:>7}{encode_us:>12.2f}{decode_us:>12.2f}"
+                  f"{total_us:>11.2f}{cpu_5k:>12.1f}%{cpu_10k:>12.1f}%")
+        print("-" * 86)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+"""
+WebSocket Proxy Multi-worker Load Test
+
+Opens many client connections against a running OpenAlgo WebSocket proxy,
+subscribes each one to the same symbol set and measures how many market data
+messages per second the proxy delivers in aggregate. Run it once per
+WEBSOCKET_PROXY_WORKERS setting (restart OpenAlgo in between) to see how fan-out
+throughput scales with the number of proxy processes.
+
+Requires a running OpenAlgo instance with a logged-in broker and a valid API key
+(from .env API_KEY or --api-key). Symbols are read from test/symbols.csv.
+
+Usage:
+    python test/loadtest_ws_workers.py --connections 200 --symbols 500 --duration 60
+    python test/loadtest_ws_workers.py --connections 200 --mode Quote --throttle-ms 0
+
+Example comparison (same market, same load):
+    WEBSOCKET_PROXY_WORKERS=1  ->  python test/loadtest_ws_workers.py ... --label 1-worker
+    WEBSOCKET_PROXY_WORKERS=4  ->  python test/loadtest_ws_workers.py ... --label 4-workers
+"""
+
+import sys
+import os
+import csv
+import json
+import time
+import asyncio
+import argparse
+import statistics
+
+import websockets
+
+# Load environment variables from parent directory
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+
+def load_symbols(limit):
+    """Load exchange/symbol pairs from test/symbols.csv"""
+    csv_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "symbols.csv")
+    symbols = []
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            exchange = row.get('exchange', '').strip()
+            symbol = row.get('symbol', '').strip()
+            if exchange and symbol:
+                symbols.append({"exchange": exchange, "symbol": symbol})
+            if len(symbols) >= limit:
+                break
+    return symbols
+
+
+class ConnectionStats:
+    """Counters for one client connection"""
+
+    def __init__(self):
+        self.connected = False
+        self.messages = 0
+        self.bytes = 0
+        self.connect_time = None
+        self.error = None
+
+
+async def run_connection(url, api_key, symbols, args, stats, start_event, stop_time):
+    """Authenticate, subscribe and count market data frames until stop_time"""
+    try:
+        t0 = time.perf_counter()
+        async with websockets.connect(url, max_queue=None) as ws:
+            await ws.send(json.dumps({"action": "authenticate", "api_key": api_key}))
+            auth = json.loads(await ws.recv())
+            if auth.get("status") != "success":
+                stats.error = auth.get("message", "authentication failed")
+                return
+
+            subscribe = {"action": "subscribe", "symbols": symbols, "mode": args.mode}
+            if args.throttle_ms is not None:
+                subscribe["throttle_ms"] = args.throttle_ms
+            await ws.send(json.dumps(subscribe))
+            stats.connect_time = time.perf_counter() - t0
+            stats.connected = True
+
+            # Count only once every connection is up
+            await start_event.wait()
+            while True:
+                remaining = stop_time[0] - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    message = await asyncio.wait_for(ws.recv(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                # Cheap check - avoid parsing every frame on the load generator
+                if '"market_data"' in message[:40]:
+                    stats.messages += 1
+                    stats.bytes += len(message)
+    except Exception as e:
+        stats.error = str(e)
+
+
+async def run_load_test(args):
+    url = args.url or os.getenv('WEBSOCKET_URL', 'ws://127.0.0.1:8765')
+    api_key = args.api_key or os.getenv('API_KEY')
+    if not api_key:
+        print("[ERROR] API key required: pass --api-key or set API_KEY in .env")
+        sys.exit(1)
+
+    symbols = load_symbols(args.symbols)
+    stats = [ConnectionStats() for _ in range(args.connections)]
+    start_event = asyncio.Event()
+    stop_time = [0.0]
+
+    print(f"Opening {args.connections} connections to {url} ({len(symbols)} symbols, mode {args.mode})...")
+    tasks = []
+    for s in stats:
+        tasks.append(asyncio.create_task(
+            run_connection(url, api_key, symbols, args, s, start_event, stop_time)))
+        # Ramp up gently so authentication does not dominate the proxy at start
+        await asyncio.sleep(args.ramp / max(1, args.connections))
+
+    # Give subscriptions time to settle before measuring
+    await asyncio.sleep(args.warmup)
+    stop_time[0] = time.perf_counter() + args.duration
+    start_event.set()
+    await asyncio.gather(*tasks)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket proxy multi-worker load test")
+    parser.add_argument("--url", help="WebSocket URL (default: WEBSOCKET_URL from .env)")
+    parser.add_argument("--api-key", help="OpenAlgo API key (default: API_KEY from .env)")
+    parser.add_argument("--connections", type=int, default=100, help="Concurrent client connections")
+    parser.add_argument("--symbols", type=int, default=200, help="Symbols subscribed per connection")
+    parser.add_argument("--mode", default="LTP", choices=["LTP", "Quote", "Depth"])
+    parser.add_argument("--throttle-ms", type=float, help="Per-subscription throttle_ms to request")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measurement window in seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds to wait after connecting")
+    parser.add_argument("--ramp", type=float, default=5.0, help="Seconds over which to open connections")
+    parser.add_argument("--label", default=os.getenv('WEBSOCKET_PROXY_WORKERS', '?') + " worker(s)",
+                        help="Label for this run in the report")
+    args = parser.parse_args()
+
+    stats = asyncio.run(run_load_test(args))
+
+    connected = [s for s in stats if s.connected]
+    failed = [s for s in stats if s.error]
+    total_messages = sum(s.messages for s in connected)
+    total_bytes = sum(s.bytes for s in connected)
+    per_conn = sorted(s.messages / args.duration for s in connected) or [0.0]
+    connect_times = [s.connect_time * 1000 for s in connected if s.connect_time is not None] or [0.0]
+
+    print("=" * 70)
+    print(f"WEBSOCKET PROXY LOAD TEST - {args.label}")
+    print("=" * 70)
+    print(f"Connections:        {len(connected)}/{args.connections} connected, {len(failed)} errors")
+    print(f"Symbols x mode:     {args.symbols} x {args.mode}")
+    print(f"Duration:           {args.duration:.0f} s")
+    print(f"Aggregate:          {total_messages / args.duration:,.0f} msgs/sec "
+          f"({total_bytes / args.duration / 1e6:,.2f} MB/s)")
+    print(f"Per connection:     mean {statistics.mean(per_conn):,.1f} | "
+          f"min {per_conn[0]:,.1f} | max {per_conn[-1]:,.1f} msgs/sec")
+    print(f"Connect+subscribe:  mean {statistics.mean(connect_times):,.0f} ms | "
+          f"max {max(connect_times):,.0f} ms")
+    if failed:
+        print(f"First error:        {failed[0].error}")
+
+
+if __name__ == "__main__":
+    main()
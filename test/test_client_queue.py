@@ -0,0 +1,238 @@
+"""
+Unit tests for the WebSocket proxy's per-client send queues: conflation,
+drop-oldest with saturation tracking, per-key update intervals with the
+trailing-edge timer, and full-state resync of incremental (depth diff) frames
+
+Run with: python -m pytest test/test_client_queue.py -v
+"""
+
+import sys
+import os
+import time
+import asyncio
+
+# Add parent directory to path to import websocket_proxy modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables from parent directory (importing websocket_proxy needs them)
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+from websocket_proxy.client_queue import ClientSendQueue
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def drain(queue):
+    """Payloads of every pending frame, oldest first"""
+    return [(await queue.get())[1] for _ in range(len(queue))]
+
+
+class TestConflation:
+    """A newer frame for a pending key replaces it in place"""
+
+    def test_replaces_pending_payload_in_place(self):
+        async def scenario():
+            queue = ClientSendQueue(maxsize=10)
+            queue.put('a', b'a1')
+            queue.put('b', b'b1')
+            queue.put('a', b'a2')
+            return queue, await drain(queue)
+
+        queue, payloads = run(scenario())
+        assert payloads == [b'a2', b'b1']
+        assert queue.conflated == 1
+        assert queue.sent == 2
+
+    def test_keeps_received_at_of_latest_frame(self):
+        async def scenario():
+            queue = ClientSendQueue(maxsize=10)
+            queue.put('a', b'a1', 1.0)
+            queue.put('a', b'a2', 2.0)
+            return await queue.get()
+
+        assert run(scenario()) == ('a', b'a2', 2.0)
+
+
+class TestDropOldest:
+    """A full queue drops its stalest key and tracks saturation"""
+
+    def test_drops_oldest_key_when_full(self):
+        async def scenario():
+            queue = ClientSendQueue(maxsize=2)
+            assert queue.put('a', b'a')
+            assert queue.put('b', b'b')
+            accepted = queue.put('c', b'c')
+            return queue, accepted, await drain(queue)
+
+        queue, accepted, payloads = run(scenario())
+        assert accepted is False
+        assert payloads == [b'b', b'c']
+        assert queue.dropped == 1
+
+    def test_saturation_ends_after_half_the_backlog(self):
+        async def scenario():
+            queue = ClientSendQueue(maxsize=4)
+            for key in 'abcde':
+                queue.put(key, key.encode())
+            saturated = queue.saturated_since is not None
+            await queue.get()
+            still_saturated = queue.saturated_since is not None
+            await queue.get()
+            return saturated, still_saturated, queue.saturated_for()
+
+        saturated, still_saturated, saturated_for = run(scenario())
+        assert saturated and still_saturated
+        assert saturated_for == 0.0
+
+    def test_stats(self):
+        async def scenario():
+            queue = ClientSendQueue(maxsize=1)
+            queue.put('a', b'a')
+            queue.put('a', b'a')
+            queue.put('b', b'b')
+            return queue.get_stats()
+
+        stats = run(scenario())
+        assert stats['enqueued'] == 3
+        assert stats['conflated'] == 1
+        assert stats['dropped'] == 1
+        assert stats['depth'] == 1
+        assert stats['capacity'] == 1
+
+
+class TestUpdateIntervals:
+    """Per-key minimum intervals hold ticks for a trailing-edge timer"""
+
+    def test_holds_ticks_inside_window_and_flushes_last(self):
+        async def scenario():
+            queue = ClientSendQueue(maxsize=10)
+            queue.set_interval('a', 0.05)
+            queue.put('a', b'a1')
+            queue.put('a', b'a2')
+            queue.put('a', b'a3')
+            first = await queue.get()
+            held = len(queue)
+            start = time.monotonic()
+            second = await queue.get()
+            return first[1], held, second[1], time.monotonic() - start, queue.throttled
+
+        first, held, second, waited, throttled = run(scenario())
+        assert first == b'a1'
+        assert held == 0
+        assert second == b'a3'
+        assert waited >= 0.03
+        assert throttled == 2
+
+    def test_keys_have_their_own_intervals(self):
+        async def scenario():
+            queue = ClientSendQueue(maxsize=10)
+            queue.set_interval('a', 10)
+            queue.put('a', b'a1')
+            queue.put('a', b'a2')
+            queue.put('b', b'b1')
+            queue.put('b', b'b2')
+            payloads = await drain(queue)
+            queue.close()
+            return payloads
+
+        # 'a' holds its second tick for the window, 'b' is unthrottled and conflates
+        assert run(scenario()) == [b'a1', b'b2']
+
+    def test_clearing_interval_releases_held_tick(self):
+        async def scenario():
+            queue = ClientSendQueue(maxsize=10)
+            queue.set_interval('a', 10)
+            queue.put('a', b'a1')
+            await queue.get()
+            queue.put('a', b'a2')
+            queue.set_interval('a', 0)
+            return await drain(queue), queue._timers
+
+        payloads, timers = run(scenario())
+        assert payloads == [b'a2']
+        assert not timers
+
+    def test_discard_cancels_timer(self):
+        async def scenario():
+            queue = ClientSendQueue(maxsize=10)
+            queue.set_interval('a', 0.01)
+            queue.put('a', b'a1')
+            queue.put('a', b'a2')
+            queue.discard('a')
+            await asyncio.sleep(0.05)
+            return len(queue), queue._timers
+
+        depth, timers = run(scenario())
+        assert depth == 0
+        assert not timers
+
+
+class TestIncrementalFrames:
+    """Incremental frames are replaced by the full state instead of each other"""
+
+    def test_diff_replacing_pending_diff_sends_full_state(self):
+        async def scenario():
+            queue = ClientSendQueue(maxsize=10)
+            queue.put('a', b'd1', None, lambda: b'F1')
+            queue.put('a', b'd2', None, lambda: b'F2')
+            return await drain(queue)
+
+        assert run(scenario()) == [b'F2']
+
+    def test_diff_without_pending_frame_is_sent_as_is(self):
+        async def scenario():
+            queue = ClientSendQueue(maxsize=10)
+            queue.put('a', b'd1', None, lambda: b'F1')
+            first = await drain(queue)
+            queue.put('a', b'd2', None, lambda: b'F2')
+            return first + await drain(queue)
+
+        assert run(scenario()) == [b'd1', b'd2']
+
+    def test_diff_after_dropped_frame_sends_full_state(self):
+        async def scenario():
+            queue = ClientSendQueue(maxsize=2)
+            queue.put('a', b'd1', None, lambda: b'F1')
+            queue.put('b', b'b')
+            queue.put('c', b'c')  # drops 'a'
+            queue.put('a', b'd2', None, lambda: b'F2')  # drops 'b'
+            return await drain(queue)
+
+        assert run(scenario()) == [b'c', b'F2']
+
+    def test_full_state_clears_resync(self):
+        async def scenario():
+            queue = ClientSendQueue(maxsize=1)
+            queue.put('a', b'd1', None, lambda: b'F1')
+            queue.put('b', b'b')  # drops 'a'
+            await drain(queue)
+            queue.put('a', b'full')
+            await drain(queue)
+            queue.put('a', b'd2', None, lambda: b'F2')
+            return await drain(queue)
+
+        assert run(scenario()) == [b'd2']
+
+    def test_held_diff_replaced_by_full_state(self):
+        async def scenario():
+            queue = ClientSendQueue(maxsize=10)
+            queue.set_interval('a', 0.02)
+            queue.put('a', b'd1', None, lambda: b'F1')
+            queue.put('a', b'd2', None, lambda: b'F2')
+            queue.put('a', b'd3', None, lambda: b'F3')
+            return [(await queue.get())[1] for _ in range(2)]
+
+        assert run(scenario()) == [b'd1', b'F3']
+
+    def test_unknown_full_state_keeps_diff(self):
+        async def scenario():
+            queue = ClientSendQueue(maxsize=10)
+            queue.put('a', b'd1', None, lambda: None)
+            queue.put('a', b'd2', None, lambda: None)
+            return await drain(queue)
+
+        assert run(scenario()) == [b'd2']
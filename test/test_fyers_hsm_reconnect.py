@@ -0,0 +1,186 @@
+"""
+Mock tests for the Fyers HSM reconnect path - run against a local WebSocket
+server that speaks just enough of the HSM protocol (authentication response,
+subscription frames) and drops the connection on request.
+
+Checks that after a drop the client re-authenticates, resends every token in
+batched subscription frames without converting symbols again, keeps the
+adapter's routing table and records the reconnect gap, and that disconnect()
+stops the client's thread promptly, also during a reconnect backoff.
+
+Run with: python -m pytest test/test_fyers_hsm_reconnect.py -v
+"""
+
+import sys
+import os
+import time
+import struct
+import asyncio
+import threading
+
+# Add parent directory to path to import broker modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Load environment variables from parent directory
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+import pytest
+import websockets
+
+import websocket_proxy  # noqa: F401 - registers adapters, avoids a circular import
+from websocket_proxy.metrics import feed_reconnects
+from broker.fyers.streaming.fyers_hsm_websocket import FyersHSMWebSocket
+from broker.fyers.streaming.fyers_adapter import FyersAdapter
+from benchmark_fyers_hsm_parser import dummy_access_token
+
+TOKENS = [f"sf|nse_cm|{1000 + i}" for i in range(2500)]
+
+
+class MockHSMServer:
+    """Answers authentication and records (connection number, tokens) per subscription frame"""
+
+    def __init__(self):
+        self.connections = []
+        self.auths = 0
+        self.subscriptions = []
+        self.loop = asyncio.new_event_loop()
+        self.server = None
+        self.port = None
+
+    async def handler(self, ws):
+        self.connections.append(ws)
+        connection = len(self.connections)
+        async for message in ws:
+            if message[2] == 1:
+                self.auths += 1
+                await ws.send(b"\x00\x01\x01")
+            elif message[2] == 4:
+                self.subscriptions.append((connection, struct.unpack(">H", message[7:9])[0]))
+
+    def start(self):
+        async def serve():
+            return await websockets.serve(self.handler, "127.0.0.1", 0, close_timeout=0.5)
+
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.server = self.loop.run_until_complete(serve())
+            self.port = self.server.sockets[0].getsockname()[1]
+            started.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        started.wait(5)
+
+    def stop(self):
+        async def close():
+            self.server.close()
+            await self.server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(close(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def drop(self):
+        """Close the latest connection from the server side"""
+        asyncio.run_coroutine_threadsafe(self.connections[-1].close(), self.loop).result()
+
+    def tokens_on(self, connection):
+        return sum(n for c, n in self.subscriptions if c == connection)
+
+    def frames_on(self, connection):
+        return sum(1 for c, _ in self.subscriptions if c == connection)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = MockHSMServer()
+    server.start()
+    monkeypatch.setattr(FyersHSMWebSocket, 'HSM_URL', f"ws://127.0.0.1:{server.port}")
+    monkeypatch.setattr(FyersHSMWebSocket, 'RECONNECT_BASE_DELAY', 0.2)
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def adapter(server):
+    adapter = FyersAdapter(dummy_access_token(), "test")
+    adapter.gaps = []
+    adapter.on_reconnect = lambda gap: (adapter.gaps.append(gap), feed_reconnects.record("fyers", gap))
+    assert adapter.connect()
+    yield adapter
+    adapter.disconnect()
+
+
+def subscribe_tokens(adapter, tokens):
+    """Stand-in routes, as built by subscribe_symbols, and the HSM subscription"""
+    with adapter.lock:
+        for token in tokens:
+            adapter.hsm_routes[token] = ({}, ())
+            adapter.hsm_to_brsymbol[token] = token
+    adapter.ws_client.subscribe_symbols(tokens, {token: token for token in tokens})
+
+
+def test_resubscribes_after_drop(server, adapter):
+    subscribe_tokens(adapter, TOKENS)
+    assert wait_for(lambda: server.frames_on(1) == 3), "initial subscribe sent in 3 frames"
+
+    # Server drops the connection - the client reconnects on its own
+    server.drop()
+    assert wait_for(lambda: server.auths == 2), "re-authenticated after drop"
+    assert wait_for(lambda: server.tokens_on(2) == len(TOKENS))
+    assert server.frames_on(2) == 3
+    assert len(adapter.hsm_routes) == len(TOKENS), "routing table kept"
+    assert adapter.connected and adapter.is_connected()
+    assert wait_for(lambda: len(adapter.gaps) == 1) and adapter.reconnects == 1
+    assert feed_reconnects.get_stats()['gap']['count'] >= 1
+
+
+def test_subscribe_during_outage_is_resent(server, adapter):
+    subscribe_tokens(adapter, TOKENS)
+    assert wait_for(lambda: server.frames_on(1) == 3)
+
+    # A subscribe during an outage is queued and sent with the resubscribe
+    server.drop()
+    wait_for(lambda: adapter.ws_client.disconnected_at is not None, timeout=2)
+    adapter.ws_client.subscribe_symbols(["sf|nse_cm|9999"], {"sf|nse_cm|9999": "NSE:NEW-EQ"})
+    assert wait_for(lambda: server.tokens_on(2) == len(TOKENS) + 1)
+
+
+def test_disconnect_stops_thread(server):
+    # Whether closing leaves the reader blocked depends on which thread reads
+    # the server's close frame, so repeat the connect / disconnect cycle
+    for _ in range(5):
+        adapter = FyersAdapter(dummy_access_token(), "test")
+        assert adapter.connect()
+        thread = adapter.ws_client.ws_thread
+        start = time.time()
+        adapter.disconnect()
+        assert not thread.is_alive()
+        assert time.time() - start < 1
+
+
+def test_disconnect_during_backoff_stops_thread(server, adapter, monkeypatch):
+    # A long backoff, so the drop leaves the thread waiting to reconnect
+    monkeypatch.setattr(FyersHSMWebSocket, 'RECONNECT_BASE_DELAY', 60)
+    thread = adapter.ws_client.ws_thread
+    server.drop()
+    assert wait_for(lambda: adapter.ws_client.reconnect_attempts == 1), "waiting to reconnect"
+
+    start = time.time()
+    adapter.disconnect()
+    assert not thread.is_alive()
+    assert time.time() - start < 1
+    assert server.auths == 1
@@ -0,0 +1,138 @@
+"""
+Unit tests for the array-backed Fyers TBT 50-level order book
+
+Replays the synthetic packet stream of test/benchmark_fyers_tbt_depth.py and
+checks every publish mode against the previous dict-based extraction.
+
+Run with: python -m pytest test/test_fyers_tbt_book.py -v
+"""
+
+import sys
+import os
+import random
+
+# Add parent directory to path to import broker modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Load environment variables from parent directory
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+import pytest
+
+from broker.fyers.streaming.fyers_tbt_book import (
+    MAX_LEVELS, PUBLISH_DIFF, PUBLISH_FULL, PUBLISH_TOP, TbtOrderBook
+)
+from benchmark_fyers_tbt_depth import previous_extract, synthetic_packets
+
+
+@pytest.fixture(scope="module")
+def packets():
+    random.seed(42)
+    return synthetic_packets(num_symbols=5, num_packets=2000, changes_per_packet=4)
+
+
+def previous_states(snapshots):
+    states = {}
+    for ticker, feed, _ in snapshots:
+        states[ticker] = {'buy': [{'price': 0, 'quantity': 0, 'orders': 0} for _ in range(MAX_LEVELS)],
+                          'sell': [{'price': 0, 'quantity': 0, 'orders': 0} for _ in range(MAX_LEVELS)],
+                          'total_buy_qty': 0, 'total_sell_qty': 0}
+        previous_extract(states[ticker], feed)
+    return states
+
+
+def new_books(snapshots, publish_mode, top_levels=MAX_LEVELS):
+    books = {}
+    for ticker, feed, is_snapshot in snapshots:
+        books[ticker] = TbtOrderBook(ticker)
+        books[ticker].apply(feed, is_snapshot)
+        books[ticker].take_update(publish_mode, top_levels)
+    return books
+
+
+def apply_diff(levels, changed):
+    """Apply changed levels (tagged with 'level') to a full side, as a client would"""
+    levels = list(levels)
+    for level in changed:
+        level = dict(level)
+        index = level.pop('level')
+        while len(levels) <= index:
+            levels.append({'price': 0, 'quantity': 0, 'orders': 0})
+        levels[index] = level
+    return levels
+
+
+def test_full_mode_matches_previous_extraction(packets):
+    snapshots, diffs = packets
+    states = previous_states(snapshots)
+    books = new_books(snapshots, PUBLISH_FULL)
+    for ticker, feed, is_snapshot in diffs:
+        expected = previous_extract(states[ticker], feed)
+        books[ticker].apply(feed, is_snapshot)
+        depth = books[ticker].take_update(PUBLISH_FULL)
+        assert depth is not None
+        assert depth['buy'] == expected['buy']
+        assert depth['sell'] == expected['sell']
+        assert depth['total_buy_qty'] == expected['total_buy_qty']
+        assert depth['levels'] == expected['levels']
+
+
+def test_diff_mode_rebuilds_full_book(packets):
+    snapshots, diffs = packets
+    full_books = new_books(snapshots, PUBLISH_FULL)
+    diff_books = new_books(snapshots, PUBLISH_DIFF)
+    mirrors = {ticker: (book.to_depth()['buy'], book.to_depth()['sell']) for ticker, book in diff_books.items()}
+    for ticker, feed, is_snapshot in diffs:
+        full_books[ticker].apply(feed, is_snapshot)
+        full = full_books[ticker].take_update(PUBLISH_FULL)
+        diff_books[ticker].apply(feed, is_snapshot)
+        depth = diff_books[ticker].take_update(PUBLISH_DIFF)
+        if depth is None:
+            continue
+        assert depth['depth_update'] == PUBLISH_DIFF
+        buy = apply_diff(mirrors[ticker][0], depth['buy'])
+        sell = apply_diff(mirrors[ticker][1], depth['sell'])
+        mirrors[ticker] = buy, sell
+        assert buy == full['buy']
+        assert sell == full['sell']
+        assert depth['best_bid'] == full['buy'][0]['price']
+        assert depth['best_ask'] == full['sell'][0]['price']
+
+
+def test_top_mode_is_prefix_of_full_book(packets):
+    snapshots, diffs = packets
+    full_books = new_books(snapshots, PUBLISH_FULL)
+    top_books = new_books(snapshots, PUBLISH_TOP, 5)
+    last = {ticker: book.to_depth() for ticker, book in top_books.items()}
+    for ticker, feed, is_snapshot in diffs:
+        full_books[ticker].apply(feed, is_snapshot)
+        full = full_books[ticker].take_update(PUBLISH_FULL)
+        top_books[ticker].apply(feed, is_snapshot)
+        depth = top_books[ticker].take_update(PUBLISH_TOP, 5)
+        if depth is None:
+            # Nothing in the top 5 levels moved since the last publish
+            assert last[ticker]['buy'][:5] == full['buy'][:5]
+            assert last[ticker]['sell'][:5] == full['sell'][:5]
+            continue
+        last[ticker] = depth
+        assert depth['buy'] == full['buy'][:5]
+        assert depth['sell'] == full['sell'][:5]
+
+
+def test_needs_full_publishes_whole_book_in_diff_mode(packets):
+    snapshots, diffs = packets
+    ticker, feed, is_snapshot = snapshots[0]
+    book = TbtOrderBook(ticker)
+    book.apply(feed, is_snapshot)
+    assert book.take_update(PUBLISH_DIFF)['depth_update'] == PUBLISH_FULL
+    assert book.take_update(PUBLISH_DIFF) is None
+
+    # A new subscriber to the ticker
+    book.needs_full = True
+    depth = book.take_update(PUBLISH_DIFF)
+    assert depth['depth_update'] == PUBLISH_FULL
+    assert depth['buy'] == book.to_depth()['buy']
+    assert book.take_update(PUBLISH_DIFF) is None
@@ -0,0 +1,102 @@
+"""
+Unit tests for the BrokerSymbolCache search index and F&O index: every query
+must return the same symbols, in the same order, as the previous full scans
+
+Uses the synthetic contract of test/benchmark_symbol_search.py, as loaded and
+with Fyers-style names on the derivatives (test/benchmark_fno_index.py).
+
+Run with: python -m pytest test/test_symbol_cache_indexes.py -v
+"""
+
+import sys
+import os
+from types import SimpleNamespace
+
+# Add parent directory to path to import database modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Load environment variables from parent directory
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+import pytest
+
+from database.token_db_enhanced import BrokerSymbolCache
+from database.fno_symbol_index import symbol_base
+from benchmark_symbol_search import QUERIES, synthetic_contract, time_queries
+from benchmark_fno_index import fyers_names, lookups
+
+
+@pytest.fixture(scope="module")
+def contract():
+    return synthetic_contract(42)
+
+
+def with_shared_tokens(rows):
+    """Contract plus a BSE row for every NSE equity, reusing its token"""
+    return rows + [SimpleNamespace(**dict(vars(row), exchange="BSE", brexchange="BSE"))
+                   for row in rows if row.exchange == "NSE"]
+
+
+@pytest.fixture(scope="module", params=["as loaded", "Fyers names", "shared tokens"])
+def cache(request, contract):
+    cache = BrokerSymbolCache()
+    cache._build_indexes({
+        "as loaded": contract,
+        "Fyers names": fyers_names(contract),
+        "shared tokens": with_shared_tokens(contract),
+    }[request.param])
+    return cache
+
+
+def test_search_index_matches_scan(cache):
+    _, index_results = time_queries(cache, 1)
+    search_index, cache.search_index = cache.search_index, None
+    try:
+        _, scan_results = time_queries(cache, 1)
+    finally:
+        cache.search_index = search_index
+    for (query, exchange), scanned, indexed in zip(QUERIES, scan_results, index_results):
+        assert indexed == scanned, f"{query!r} on {exchange}"
+    assert any(index_results), "queries match symbols"
+
+
+@pytest.mark.parametrize("case", range(9))
+def test_fno_index_matches_scan(cache, case):
+    label, scan, index = lookups(cache)[case]
+    result = index()
+    assert result == scan(), label
+    assert result, f"{label} finds symbols"
+
+
+def test_symbol_base():
+    assert symbol_base("NIFTY30JAN2524000CE", "30-JAN-25") == "NIFTY"
+    assert symbol_base("banknifty27FEB25FUT", "27-FEB-25") == "BANKNIFTY"
+    assert symbol_base("RELIANCE", None) is None
+    assert symbol_base("ODDSYMBOL", "30-JAN-25") is None
+
+
+def test_underlyings_are_names(contract):
+    cache = BrokerSymbolCache()
+    cache._build_indexes(fyers_names(contract))
+    names = sorted({row.name for row in fyers_names(contract) if row.name and row.exchange == "NFO"})
+    assert cache.fno_index.get_underlyings("NFO") == names
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_search_finds_every_exchange_of_a_shared_token(compact):
+    rows = with_shared_tokens([
+        SimpleNamespace(symbol="RELIANCE", brsymbol="RELIANCE-EQ", name="RELIANCE INDUSTRIES", exchange="NSE",
+                        brexchange="NSE", token="2885", expiry=None, strike=None, lotsize=1,
+                        instrumenttype="EQ", tick_size=0.05),
+    ])
+    cache = BrokerSymbolCache()
+    cache.compact = compact
+    cache._init_storage()
+    cache._build_indexes(rows)
+    assert len(cache.symbols) == 1
+    for query in ("RELIANCE", "2885"):
+        assert sorted(s.exchange for s in cache.search_symbols(query)) == ["BSE", "NSE"]
+        assert [s.exchange for s in cache.search_symbols(query, "BSE")] == ["BSE"]
@@ -0,0 +1,135 @@
+"""
+Unit tests for the symbol cache snapshot: a cache restored from a snapshot
+must be identical to the one it was written from (rows sharing a token across
+exchanges included), and a snapshot of another database, broker, storage mode
+or format version must be ignored
+
+Run with: python -m pytest test/test_symbol_cache_snapshot.py -v
+"""
+
+import sys
+import os
+from dataclasses import astuple
+
+# Add parent directory to path to import database modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Load environment variables from parent directory
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+import pytest
+
+from database import symbol_cache_snapshot
+from database.symbol_cache_snapshot import (
+    read_snapshot, restore_symbol_cache_snapshot, save_symbol_cache_snapshot, snapshot_files, write_snapshot
+)
+from benchmark_symbol_search import synthetic_contract
+from benchmark_symbol_cache_snapshot import BROKER, contents, new_cache
+from test_symbol_cache_indexes import with_shared_tokens
+
+FINGERPRINT = {'symbols': 0, 'master_contract_updated': 'test'}
+
+
+@pytest.fixture(scope="module")
+def contract():
+    return with_shared_tokens(synthetic_contract(42))
+
+
+def built_cache(storage, rows):
+    cache = new_cache(storage)
+    total, _ = cache._load_measured(lambda: cache._build_from_rows(rows))
+    cache._mark_loaded(BROKER, total, 'database')
+    return cache
+
+
+@pytest.mark.parametrize("storage", ["objects", "compact"])
+def test_restored_cache_is_identical(storage, contract, tmp_path):
+    path = str(tmp_path / "symbols.snapshot")
+    built = built_cache(storage, contract)
+    assert write_snapshot(built.get_snapshot_state(), BROKER, FINGERPRINT, path) > 0
+
+    restored = new_cache(storage)
+    assert restored.load_from_snapshot(BROKER, lambda: read_snapshot(path, BROKER, storage, FINGERPRINT))
+    assert contents(restored) == contents(built)
+
+
+@pytest.fixture
+def snapshot(contract, tmp_path):
+    path = str(tmp_path / "symbols.snapshot")
+    write_snapshot(built_cache("objects", contract[:500]).get_snapshot_state(), BROKER, FINGERPRINT, path)
+    return path
+
+
+def test_matching_snapshot_is_read(snapshot):
+    assert read_snapshot(snapshot, BROKER, "objects", FINGERPRINT) is not None
+
+
+@pytest.mark.parametrize("broker, storage, fingerprint", [
+    ("other", "objects", FINGERPRINT),
+    (BROKER, "compact", FINGERPRINT),
+    (BROKER, "objects", dict(FINGERPRINT, master_contract_updated='later')),
+])
+def test_mismatched_snapshot_is_ignored(snapshot, broker, storage, fingerprint):
+    assert read_snapshot(snapshot, broker, storage, fingerprint) is None
+
+
+def test_other_version_is_ignored(snapshot, monkeypatch):
+    monkeypatch.setattr(symbol_cache_snapshot, 'SNAPSHOT_VERSION', symbol_cache_snapshot.SNAPSHOT_VERSION + 1)
+    assert read_snapshot(snapshot, BROKER, "objects", FINGERPRINT) is None
+
+
+def test_corrupt_snapshot_is_ignored(snapshot):
+    with open(snapshot, 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+    assert read_snapshot(snapshot, BROKER, "objects", FINGERPRINT) is None
+
+
+def test_missing_snapshot_is_ignored(tmp_path):
+    assert read_snapshot(str(tmp_path / "missing.snapshot"), BROKER, "objects", FINGERPRINT) is None
+
+
+@pytest.fixture
+def saved_cache(contract, tmp_path, monkeypatch):
+    """Loaded cache behind get_cache(), snapshot path in tmp_path, fingerprint stubbed"""
+    from database import token_db_enhanced
+
+    cache = built_cache("objects", contract[:500])
+    monkeypatch.setattr(token_db_enhanced, 'get_cache', lambda: cache)
+    monkeypatch.setattr(symbol_cache_snapshot, 'get_db_fingerprint', lambda broker: FINGERPRINT)
+    monkeypatch.setenv('SYMBOL_CACHE_SNAPSHOT', 'TRUE')
+    monkeypatch.setenv('SYMBOL_CACHE_SNAPSHOT_PATH', str(tmp_path / "symbols.snapshot"))
+    return cache
+
+
+def test_each_save_writes_new_generation(saved_cache, tmp_path):
+    path = str(tmp_path / "symbols.snapshot")
+    assert save_symbol_cache_snapshot(BROKER)
+    [first] = snapshot_files(path)
+    assert save_symbol_cache_snapshot(BROKER)
+    [second] = snapshot_files(path)
+    assert second != first
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(second)]
+
+
+def test_restores_newest_generation(saved_cache, tmp_path, monkeypatch):
+    path = str(tmp_path / "symbols.snapshot")
+    expected = [astuple(record) for record in saved_cache.records]
+    save_symbol_cache_snapshot(BROKER)
+
+    # A mapped file cannot be removed on Windows: the old generation stays
+    with monkeypatch.context() as windows:
+        windows.setattr(os, 'remove', lambda file: (_ for _ in ()).throw(PermissionError(file)))
+        save_symbol_cache_snapshot(BROKER)
+        assert len(snapshot_files(path)) == 2
+
+    assert restore_symbol_cache_snapshot(BROKER)
+    assert saved_cache.stats.loaded_from == 'snapshot'
+    assert [astuple(record) for record in saved_cache.records] == expected
+    # Removed lazily on restore
+    assert len(snapshot_files(path)) == 1
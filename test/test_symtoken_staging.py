@@ -0,0 +1,88 @@
+"""
+Unit tests for the master contract's staging table load: load_and_swap must
+replace the symtoken rows, keep the table's indexes, and leave the previous
+contract in place when the load fails
+
+Run with: python -m pytest test/test_symtoken_staging.py -v
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import database modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables from parent directory
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from database.symbol import SymToken
+from database.symtoken_staging import STAGING_TABLE, load_and_swap
+
+TABLE = SymToken.__table__
+
+
+def contract(count, suffix=""):
+    return pd.DataFrame({
+        'symbol': [f"SYM{i}{suffix}" for i in range(count)],
+        'brsymbol': [f"NSE:SYM{i}{suffix}-EQ" for i in range(count)],
+        'name': [f"SYM{i} LIMITED" for i in range(count)],
+        'exchange': ["NSE"] * count,
+        'brexchange': ["NSE"] * count,
+        'token': [str(1000 + i) for i in range(count)],
+        'expiry': [None] * count,
+        'strike': [float('nan')] * count,
+        'lotsize': [1] * count,
+        'instrumenttype': ["EQ"] * count,
+        'tick_size': [0.05] * count,
+    })
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'symtoken.db'}")
+    TABLE.create(engine)
+    yield engine
+    engine.dispose()
+
+
+def rows(engine):
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT symbol, strike FROM symtoken ORDER BY id")).fetchall()
+
+
+def index_names(engine):
+    return {index['name'] for index in inspect(engine).get_indexes('symtoken')}
+
+
+def test_replaces_rows(engine):
+    load_and_swap(engine, TABLE, contract(10))
+    timings = load_and_swap(engine, TABLE, contract(5, "X"))
+    assert timings['rows'] == 5
+    assert rows(engine) == [(f"SYM{i}X", None) for i in range(5)]
+    assert not inspect(engine).has_table(STAGING_TABLE)
+
+
+def test_keeps_indexes(engine):
+    with engine.begin() as connection:
+        connection.execute(text("CREATE INDEX idx_extra_token ON symtoken (token, exchange)"))
+    before = index_names(engine)
+    load_and_swap(engine, TABLE, contract(3))
+    assert index_names(engine) == before
+    assert {index.name for index in TABLE.indexes} <= before
+
+
+def test_failed_load_keeps_previous_contract(engine):
+    load_and_swap(engine, TABLE, contract(4))
+    before = index_names(engine)
+    broken = contract(2)
+    broken.loc[1, 'symbol'] = None  # symbol is NOT NULL
+    with pytest.raises(Exception):
+        load_and_swap(engine, TABLE, broken)
+    assert rows(engine) == [(f"SYM{i}", None) for i in range(4)]
+    assert index_names(engine) == before
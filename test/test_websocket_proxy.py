@@ -0,0 +1,141 @@
+"""
+Unit tests for WebSocketProxy topic parsing (bounded LRU) and the last-value
+cache of broadcast_market_data, including 50-level depth diffs
+
+No broker, ZeroMQ publisher or network is required - the proxy is created
+without binding the WebSocket port, as in test/benchmark_ws_fanout.py.
+
+Run with: python -m pytest test/test_websocket_proxy.py -v
+"""
+
+import sys
+import os
+import json
+import random
+
+# Add parent directory to path to import websocket_proxy modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Load environment variables from parent directory (importing websocket_proxy needs them)
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+import pytest
+
+from websocket_proxy.client_queue import ClientSendQueue
+from benchmark_ws_fanout import build_proxy, synthetic_ticks
+
+KEY = ("RELIANCE", "NSE", 3)
+
+
+@pytest.fixture
+def proxy():
+    proxy = build_proxy()
+    yield proxy
+    proxy.socket.close(linger=0)
+
+
+def add_client(proxy, client_id, broker="fyers", key=KEY):
+    """A subscribed client with a send queue and no writer task"""
+    queue = ClientSendQueue(maxsize=10)
+    proxy.client_queues[client_id] = queue
+    proxy.user_mapping[client_id] = f"user{client_id}"
+    proxy.user_broker_mapping[f"user{client_id}"] = broker
+    proxy.subscription_index[key].add(client_id)
+    return queue
+
+
+def depth_tick(levels, update="full"):
+    buy = [{"price": 100.0 - i, "quantity": 10 + i, "orders": 1} for i in range(levels)]
+    sell = [{"price": 101.0 + i, "quantity": 20 + i, "orders": 2} for i in range(levels)]
+    return {"ltp": 100.5, "depth": {"buy": buy, "sell": sell}, "depth_levels": levels,
+            "depth_update": update, "is_50_depth": True}
+
+
+def frames(queue):
+    return [json.loads(payload)["data"] for payload, _ in queue._items.values()]
+
+
+class TestTopicCache:
+    """parse_topic memoizes in a bounded LRU and matches the uncached parse"""
+
+    @pytest.mark.parametrize("topic, parsed", [
+        (b"fyers_NSE_RELIANCE_LTP", ("fyers", "NSE", "RELIANCE", 1)),
+        (b"fyers_NSE_INDEX_NIFTY_DEPTH", ("fyers", "NSE_INDEX", "NIFTY", 3)),
+        (b"NSE_INDEX_NIFTY_QUOTE", ("unknown", "NSE_INDEX", "NIFTY", 2)),
+        (b"BSE_INDEX_SENSEX_LTP", ("unknown", "BSE_INDEX", "SENSEX", 1)),
+        (b"NSE_RELIANCE_QUOTE", ("unknown", "NSE", "RELIANCE", 2)),
+        (b"NSE_RELIANCE", None),
+        (b"fyers_NSE_RELIANCE_TICK", None),
+    ])
+    def test_formats(self, proxy, topic, parsed):
+        assert proxy.parse_topic(topic) == parsed
+        # Second lookup is served from the cache
+        assert proxy.parse_topic(topic) == parsed
+        assert topic in proxy.topic_cache
+
+    def test_same_as_uncached_parse(self, proxy):
+        random.seed(7)
+        for topic, _ in synthetic_ticks(200, 2000):
+            assert proxy.parse_topic(topic.encode()) == proxy._parse_topic_uncached(topic)
+
+    def test_bounded_least_recently_used(self, proxy):
+        proxy.TOPIC_CACHE_SIZE = 2
+        proxy.parse_topic(b"fyers_NSE_A_LTP")
+        proxy.parse_topic(b"fyers_NSE_B_LTP")
+        proxy.parse_topic(b"fyers_NSE_A_LTP")
+        proxy.parse_topic(b"fyers_NSE_C_LTP")
+        assert list(proxy.topic_cache) == [b"fyers_NSE_A_LTP", b"fyers_NSE_C_LTP"]
+
+
+class TestLastValueCache:
+    """broadcast_market_data caches the latest tick, merging depth diffs"""
+
+    def test_caches_latest_tick(self, proxy):
+        add_client(proxy, 1)
+        proxy.broadcast_market_data("fyers", "RELIANCE", "NSE", 3, depth_tick(5))
+        assert proxy._get_last_value(KEY, "fyers") == depth_tick(5)
+        assert proxy._get_last_value(KEY, "zerodha") is None
+
+    def test_diff_merged_into_cached_book(self, proxy):
+        add_client(proxy, 1)
+        proxy.broadcast_market_data("fyers", "RELIANCE", "NSE", 3, depth_tick(3))
+        diff = depth_tick(0, "diff")
+        diff["depth"] = {"buy": [{"price": 98.5, "quantity": 7, "orders": 3, "level": 1}],
+                         "sell": [{"price": 104.0, "quantity": 1, "orders": 1, "level": 3}]}
+        proxy.broadcast_market_data("fyers", "RELIANCE", "NSE", 3, diff)
+
+        book = proxy._get_last_value(KEY, "fyers")
+        assert book["depth_update"] == "full"
+        assert book["depth"]["buy"][1] == {"price": 98.5, "quantity": 7, "orders": 3}
+        assert book["depth"]["buy"][0] == depth_tick(3)["depth"]["buy"][0]
+        assert book["depth"]["sell"][3] == {"price": 104.0, "quantity": 1, "orders": 1}
+        assert book["depth_levels"] == 4
+
+    def test_diff_without_cached_book_is_not_cached(self, proxy):
+        add_client(proxy, 1)
+        proxy.broadcast_market_data("fyers", "RELIANCE", "NSE", 3, depth_tick(2, "diff"))
+        assert proxy._get_last_value(KEY, "fyers") is None
+
+    def test_pending_diff_replaced_by_merged_book(self, proxy):
+        queue = add_client(proxy, 1)
+        proxy.broadcast_market_data("fyers", "RELIANCE", "NSE", 3, depth_tick(3))
+        diff = depth_tick(0, "diff")
+        diff["depth"] = {"buy": [{"price": 99.5, "quantity": 5, "orders": 1, "level": 0}], "sell": []}
+        proxy.broadcast_market_data("fyers", "RELIANCE", "NSE", 3, diff)
+
+        # The full book was still pending, so the client gets the merged book
+        [sent] = frames(queue)
+        assert sent == proxy._get_last_value(KEY, "fyers")
+        assert sent["depth"]["buy"][0]["price"] == 99.5
+
+    def test_diff_sent_as_is_when_nothing_pending(self, proxy):
+        queue = add_client(proxy, 1)
+        proxy.broadcast_market_data("fyers", "RELIANCE", "NSE", 3, depth_tick(3))
+        queue._items.clear()
+        diff = depth_tick(0, "diff")
+        diff["depth"] = {"buy": [{"price": 99.5, "quantity": 5, "orders": 1, "level": 0}], "sell": []}
+        proxy.broadcast_market_data("fyers", "RELIANCE", "NSE", 3, diff)
+        assert frames(queue) == [diff]
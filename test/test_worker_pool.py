@@ -0,0 +1,144 @@
+"""
+Unit tests for the multi-core proxy's adapter control channel: a worker's
+RemoteBrokerAdapter against the primary's AdapterControlServer, over a local
+ZeroMQ socket, with a stand-in proxy and broker adapter
+
+Run with: python -m pytest test/test_worker_pool.py -v
+"""
+
+import sys
+import os
+import time
+import asyncio
+import threading
+
+# Add parent directory to path to import websocket_proxy modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables from parent directory (importing websocket_proxy needs them)
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+import zmq
+import zmq.asyncio
+
+from websocket_proxy.worker_pool import AdapterControlServer, RemoteBrokerAdapter
+
+
+class StubAdapter:
+    """Local broker adapter of the primary"""
+
+    def __init__(self):
+        self.subscribed = []
+
+    def subscribe_many(self, symbols, mode=2, depth_level=5):
+        self.subscribed.extend((item['symbol'], item['exchange'], mode) for item in symbols)
+        return [{'status': 'success'} for _ in symbols]
+
+    def unsubscribe_many(self, symbols, mode=2):
+        for item in symbols:
+            self.subscribed.remove((item['symbol'], item['exchange'], mode))
+        return [{'status': 'success'} for _ in symbols]
+
+
+class StubProxy:
+    """The parts of the primary WebSocketProxy the control server uses"""
+
+    def __init__(self):
+        self.context = zmq.asyncio.Context.instance()
+        self.running = True
+        self.broker_adapters = {}
+        self.released = []
+        self.acquire_delay = 0
+
+    async def get_or_create_adapter(self, user_id, broker_name):
+        # Blocking, as a broker login is
+        time.sleep(self.acquire_delay)
+        adapter = self.broker_adapters.setdefault(user_id, StubAdapter())
+        return adapter, None, None
+
+    def has_local_clients(self, user_id):
+        return False
+
+    async def release_user_adapter(self, user_id):
+        self.released.append(user_id)
+        self.broker_adapters.pop(user_id, None)
+
+
+def with_control_channel(scenario):
+    """Run scenario(proxy, address) against a control server on its own thread and loop"""
+    proxy = StubProxy()
+    server = AdapterControlServer(proxy, "tcp://127.0.0.1:*")
+    address = server.socket.getsockopt(zmq.LAST_ENDPOINT).decode()
+    thread = threading.Thread(target=asyncio.run, args=(server.serve(),), daemon=True)
+    thread.start()
+    try:
+        return asyncio.run(scenario(proxy, address))
+    finally:
+        proxy.running = False
+        thread.join(5)
+        server.close()
+
+
+def remote_adapter(address, user_id="user1"):
+    adapter = RemoteBrokerAdapter(address, worker_id=1)
+    adapter.initialize("fyers", user_id)
+    return adapter
+
+
+def test_subscribe_and_release():
+    async def scenario(proxy, address):
+        adapter = remote_adapter(address)
+        assert (await adapter.connect())['success']
+        symbols = [{'symbol': 'RELIANCE', 'exchange': 'NSE'}, {'symbol': 'TCS', 'exchange': 'NSE'}]
+        results = await adapter.subscribe_many(symbols, 2, 5)
+        assert [r['status'] for r in results] == ['success', 'success']
+        assert proxy.broker_adapters["user1"].subscribed == [('RELIANCE', 'NSE', 2), ('TCS', 'NSE', 2)]
+        await adapter.disconnect()
+        return proxy
+
+    proxy = with_control_channel(scenario)
+    assert proxy.released == ["user1"]
+
+
+def test_waiting_for_reply_does_not_block_event_loop():
+    async def scenario(proxy, address):
+        proxy.acquire_delay = 0.3
+        adapter = remote_adapter(address)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.get_running_loop().create_task(ticker())
+        reply = await adapter.connect()
+        task.cancel()
+        await adapter.disconnect()
+        return reply, ticks
+
+    reply, ticks = with_control_channel(scenario)
+    assert reply['success']
+    # The worker's other tasks kept running while the primary was busy
+    assert ticks >= 10
+
+
+def test_timeout_then_late_reply_is_skipped():
+    async def scenario(proxy, address):
+        adapter = remote_adapter(address)
+        adapter.timeout = 0.1
+        proxy.acquire_delay = 0.3
+        timed_out = await adapter.connect()
+        proxy.acquire_delay = 0
+        adapter.timeout = 5
+        # The late 'acquire' reply arrives first and must not answer this request
+        results = await adapter.subscribe_many([{'symbol': 'INFY', 'exchange': 'NSE'}])
+        await adapter.disconnect()
+        return timed_out, results
+
+    timed_out, results = with_control_channel(scenario)
+    assert timed_out['code'] == 'CONTROL_TIMEOUT'
+    assert results == [{'status': 'success'}]
@@ -0,0 +1,60 @@
+"""
+Unit tests for the ZeroMQ wire codec between broker adapters and the proxy
+
+Run with: python -m pytest test/test_zmq_codec.py -v
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import websocket_proxy modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Load environment variables from parent directory (importing websocket_proxy needs them)
+from dotenv import load_dotenv
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(env_path)
+
+import pytest
+
+from websocket_proxy import zmq_codec
+from websocket_proxy.zmq_codec import (
+    CODEC_JSON, CODEC_MSGPACK, decode_market_data, encode_market_data, get_zmq_codec
+)
+from benchmark_zmq_codec import LTP_TICK, QUOTE_TICK, DEPTH_TICK
+
+TICKS = [LTP_TICK, QUOTE_TICK, DEPTH_TICK]
+
+needs_msgpack = pytest.mark.skipif(zmq_codec.msgpack is None, reason="msgpack is not installed")
+
+
+@pytest.mark.parametrize("codec", [CODEC_JSON, pytest.param(CODEC_MSGPACK, marks=needs_msgpack)])
+def test_round_trip(codec):
+    for tick in TICKS:
+        assert decode_market_data(encode_market_data(tick, codec)) == tick
+
+
+@needs_msgpack
+def test_decoder_detects_codec_per_payload():
+    tick = DEPTH_TICK
+    assert decode_market_data(encode_market_data(tick, CODEC_JSON)) == \
+        decode_market_data(encode_market_data(tick, CODEC_MSGPACK))
+
+
+def test_json_payload_is_unchanged():
+    tick = {"symbol": "RELIANCE", "exchange": "NSE", "ltp": 1424.5}
+    assert encode_market_data(tick) == b'{"symbol": "RELIANCE", "exchange": "NSE", "ltp": 1424.5}'
+
+
+def test_unknown_codec_falls_back_to_json(monkeypatch):
+    monkeypatch.setenv('ZMQ_CODEC', 'protobuf')
+    assert get_zmq_codec() == CODEC_JSON
+
+
+def test_msgpack_without_package_falls_back_to_json(monkeypatch):
+    monkeypatch.setenv('ZMQ_CODEC', 'msgpack')
+    monkeypatch.setattr(zmq_codec, 'msgpack', None)
+    assert get_zmq_codec() == CODEC_JSON
+    with pytest.raises(ValueError):
+        decode_market_data(b'\x81\xa3ltp\xcb@\x96B\x00\x00\x00\x00\x00')
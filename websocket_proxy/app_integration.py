@@ -53,6 +53,12 @@ def cleanup_websocket_server():
             # For Windows compatibility, set a shutdown flag instead of trying to 
             # manipulate the event loop from a different thread
             _websocket_proxy_instance.running = False
+
+            # Terminate multi-core proxy workers, if any were started
+            try:
+                _websocket_proxy_instance.stop_workers()
+            except Exception as e:
+                logger.warning(f"Error stopping WebSocket proxy workers: {e}")
             
             # Try to close the server gracefully
             try:
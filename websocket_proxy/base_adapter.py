@@ -1,4 +1,3 @@
-import json
 import threading
 import zmq
 import random
@@ -6,6 +5,8 @@ import socket
 import os
 from abc import ABC, abstractmethod
 from utils.logging import get_logger
+from .zmq_codec import get_zmq_codec, encode_market_data
+from .feed_capture import open_feed_capture
 
 # Initialize logger
 logger = get_logger(__name__)
@@ -141,10 +142,16 @@ class BaseBrokerWebSocketAdapter(ABC):
                 os.environ["ZMQ_PORT"] = str(self.zmq_port)
                 self.logger.info(f"BaseBrokerWebSocketAdapter initialized on port {self.zmq_port}")
 
+            # Payload codec for the ZeroMQ hop (json or msgpack)
+            self.zmq_codec = get_zmq_codec()
+
             # Initialize instance variables
             self.subscriptions = {}
             self.connected = False
 
+            # Raw feed capture (STREAM_CAPTURE_DIR), opened by start_feed_capture()
+            self.feed_capture = None
+
         except Exception as e:
             self.logger.error(f"Error in BaseBrokerWebSocketAdapter init: {e}")
             raise
@@ -249,7 +256,44 @@ class BaseBrokerWebSocketAdapter(ABC):
             dict: Response with status
         """
         pass
-        
+
+    def subscribe_many(self, symbols, mode=2, depth_level=5):
+        """
+        Subscribe to market data for many symbols in one call
+
+        The default implementation calls subscribe() per symbol. Adapters whose
+        broker accepts bulk subscription frames should override it.
+
+        Args:
+            symbols: List of dicts with 'symbol' and 'exchange' keys
+            mode: Subscription mode - 1:LTP, 2:Quote, 3:Depth
+            depth_level: Market depth level
+
+        Returns:
+            list: One subscribe() style response per symbol, in request order
+        """
+        self.capture_meta('adapter', 'subscribe', symbols=symbols, mode=mode, depth_level=depth_level)
+        return [
+            self.subscribe(item['symbol'], item['exchange'], mode, depth_level)
+            for item in symbols
+        ]
+
+    def unsubscribe_many(self, symbols, mode=2):
+        """
+        Unsubscribe from market data for many symbols in one call
+
+        Args:
+            symbols: List of dicts with 'symbol' and 'exchange' keys
+            mode: Subscription mode
+
+        Returns:
+            list: One unsubscribe() style response per symbol, in request order
+        """
+        return [
+            self.unsubscribe(item['symbol'], item['exchange'], mode)
+            for item in symbols
+        ]
+
     @abstractmethod
     def connect(self):
         """
@@ -264,11 +308,78 @@ class BaseBrokerWebSocketAdapter(ABC):
         """
         pass
         
+    def start_feed_capture(self, broker_name):
+        """
+        Open a raw feed capture for this adapter if STREAM_CAPTURE_DIR is set.
+
+        Adapters call this from initialize() and pass capture_hook(stream) to
+        their WebSocket clients, which call the hook with every received frame.
+
+        Returns:
+            FeedCapture or None when capture is disabled
+        """
+        if getattr(self, 'feed_capture', None) is None:
+            self.feed_capture = open_feed_capture(broker_name)
+        return self.feed_capture
+
+    def capture_hook(self, stream):
+        """
+        Frame hook for one of the adapter's WebSocket clients
+
+        Returns:
+            callable(frame) writing to the capture, or None when capture is disabled
+        """
+        capture = getattr(self, 'feed_capture', None)
+        return capture.hook(stream) if capture else None
+
+    def capture_meta(self, stream, event, **fields):
+        """Record a meta event (e.g. a subscribe request) in the capture, if any"""
+        capture = getattr(self, 'feed_capture', None)
+        if capture:
+            capture.write_meta(stream, event, **fields)
+
+    def stop_feed_capture(self):
+        """Flush and close the raw feed capture"""
+        capture = getattr(self, 'feed_capture', None)
+        if capture:
+            capture.close()
+            self.feed_capture = None
+
+    def prepare_replay(self, user_id):
+        """
+        Wire the adapter for offline replay of a feed capture
+
+        Broker adapters that support replay create their WebSocket clients
+        without opening a network connection, so subscribe calls succeed and
+        captured frames can be fed straight into the clients' message handlers.
+
+        Args:
+            user_id: User ID the replayed subscriptions run under
+
+        Returns:
+            dict: Capture stream name -> callable(frame), or None when the
+            adapter does not support replay
+        """
+        return None
+
+    def apply_replay_meta(self, stream, meta):
+        """
+        Apply a meta event from a feed capture during replay
+
+        Args:
+            stream: Capture stream the event was written to
+            meta: Decoded meta event
+        """
+        if meta.get('event') == 'subscribe':
+            self.subscribe_many(meta['symbols'], meta['mode'], meta.get('depth_level', 5))
+
     def cleanup_zmq(self):
         """
         Properly clean up ZeroMQ resources and release bound ports.
         Skips cleanup if using shared ZeroMQ publisher (connection pooling mode).
         """
+        self.stop_feed_capture()
+
         # Skip cleanup if using shared ZMQ (managed by ConnectionPool)
         if hasattr(self, '_uses_shared_zmq') and self._uses_shared_zmq:
             self.logger.debug("Skipping ZMQ cleanup - using shared publisher")
@@ -316,7 +427,7 @@ class BaseBrokerWebSocketAdapter(ABC):
                 # Use own socket
                 self.socket.send_multipart([
                     topic.encode('utf-8'),
-                    json.dumps(data).encode('utf-8')
+                    encode_market_data(data, self.zmq_codec)
                 ])
             else:
                 self.logger.warning("No ZMQ socket available for publishing")
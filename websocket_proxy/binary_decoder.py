@@ -0,0 +1,142 @@
+"""
+Binary Frame Decoding Helpers for Broker Streaming Clients
+
+Many broker feeds (Zerodha, Angel, Dhan, ...) send market data as binary frames
+holding several fixed-layout packets. Decoding them with a ``struct.unpack``
+call per field or per depth level, on a freshly sliced ``bytes`` each time,
+dominates the parse cost at high tick rates. This module provides:
+
+    PacketLayout   - a packet's fields declared once, compiled into a single
+                     ``struct.Struct`` (one ``unpack_from`` per packet, no
+                     slicing) and, when NumPy is installed, a structured dtype
+    split_frame    - (offset, length) of every packet in a count-prefixed,
+                     length-prefixed frame, without copying
+    decode_batch   - decode the same-layout packets of one frame into tuples
+                     with the precompiled struct
+    decode_array   - view a batch of evenly spaced same-layout packets (e.g. a
+                     frame of full-mode packets) as a NumPy structured array,
+                     zero-copy, for column-wise consumers
+
+NumPy is optional; without it decode_array returns None.
+"""
+
+import struct
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Batches smaller than this are not worth a NumPy view
+NUMPY_MIN_BATCH = 8
+
+UINT16_BE = struct.Struct('>H')
+
+# struct format code -> NumPy scalar type (byte order is added from the layout)
+_NUMPY_CODES = {
+    'b': 'i1', 'B': 'u1', 'h': 'i2', 'H': 'u2', 'i': 'i4', 'I': 'u4',
+    'l': 'i4', 'L': 'u4', 'q': 'i8', 'Q': 'u8', 'f': 'f4', 'd': 'f8',
+}
+
+
+class PacketLayout:
+    """
+    Fixed binary layout of one packet type.
+
+    Fields are (name, struct code) pairs in wire order; a name of None marks
+    padding (e.g. ``(None, '2x')``). Decoded rows are tuples of the named
+    fields' values, in declaration order.
+    """
+
+    def __init__(self, fields: Sequence[Tuple[Optional[str], str]], byte_order: str = '>'):
+        self.byte_order = byte_order
+        self.fields = [(name, code) for name, code in fields]
+        self.names = tuple(name for name, _ in self.fields if name is not None)
+        self.struct = struct.Struct(byte_order + ''.join(code for _, code in self.fields))
+        self.size = self.struct.size
+        self._dtype = None
+
+    def unpack_from(self, buffer, offset: int = 0) -> tuple:
+        """Decode one packet starting at `offset` of `buffer`"""
+        return self.struct.unpack_from(buffer, offset)
+
+    @property
+    def dtype(self):
+        """NumPy structured dtype with the same layout (None without NumPy)"""
+        if self._dtype is None and np is not None:
+            order = '<' if self.byte_order == '<' else '>'
+            names, formats, offsets = [], [], []
+            offset = 0
+            for name, code in self.fields:
+                size = struct.calcsize(self.byte_order + code)
+                if name is not None:
+                    names.append(name)
+                    formats.append(order + _NUMPY_CODES[code[-1]])
+                    offsets.append(offset)
+                offset += size
+            self._dtype = np.dtype({'names': names, 'formats': formats,
+                                    'offsets': offsets, 'itemsize': self.size})
+        return self._dtype
+
+    def decode_batch(self, buffer, offsets: Sequence[int]) -> List[tuple]:
+        """
+        Decode packets of this layout at each offset in `buffer`
+
+        Returns:
+            One tuple per offset, in order
+        """
+        unpack_from = self.struct.unpack_from
+        return [unpack_from(buffer, offset) for offset in offsets]
+
+    def decode_array(self, buffer, offsets: Sequence[int]):
+        """
+        View evenly spaced packets of this layout as a NumPy structured array
+
+        The array is a strided view over `buffer` (no copy), for consumers that
+        work on whole columns (e.g. every last price of a full-mode frame).
+        Converting it back to per-packet Python rows is slower than
+        decode_batch, so tick-by-tick consumers should use that instead.
+
+        Returns:
+            Structured array with one record per offset, or None when NumPy is
+            not installed, there are fewer than NUMPY_MIN_BATCH packets, or the
+            packets are not evenly spaced
+        """
+        count = len(offsets)
+        if np is None or count < NUMPY_MIN_BATCH:
+            return None
+        stride = offsets[1] - offsets[0]
+        if stride < self.size or any(offsets[i + 1] - offsets[i] != stride for i in range(count - 1)):
+            return None
+        return np.ndarray((count,), dtype=self.dtype, buffer=buffer, offset=offsets[0], strides=(stride,))
+
+
+def split_frame(data, count_struct: struct.Struct = UINT16_BE,
+                length_struct: struct.Struct = UINT16_BE) -> List[Tuple[int, int]]:
+    """
+    Locate the packets of a frame laid out as
+    ``count, (length, packet) * count`` (Zerodha style)
+
+    Returns:
+        (offset, length) of every complete packet; a truncated packet ends the list
+    """
+    size = len(data)
+    if size < count_struct.size:
+        return []
+    count = count_struct.unpack_from(data, 0)[0]
+    length_size = length_struct.size
+    length_from = length_struct.unpack_from
+
+    spans = []
+    offset = count_struct.size
+    for _ in range(count):
+        if offset + length_size > size:
+            break
+        length = length_from(data, offset)[0]
+        offset += length_size
+        if offset + length > size:
+            break
+        spans.append((offset, length))
+        offset += length
+    return spans
@@ -0,0 +1,266 @@
+"""
+Per-client Send Queues for the WebSocket Proxy
+
+Each connected client gets its own bounded, conflating queue drained by a
+dedicated writer task. The ZeroMQ listener only enqueues pre-encoded frames and
+never awaits a socket write, so one slow client cannot delay delivery to the
+others or stall the ZeroMQ receive loop.
+
+Conflation: the queue is keyed by (symbol, exchange, mode). A newer tick for a
+key that is still waiting replaces the pending payload in place, so a lagging
+client receives the latest value per key instead of a backlog of stale ticks.
+
+Incremental frames (50-level depth published as changed levels only) cannot
+replace each other: the levels of the dropped frame would be lost. put() takes
+a callable for the key's full state with such frames, and the queue sends that
+instead whenever the frame would replace a pending or held one, or follows a
+frame dropped from a full queue.
+
+Update rates: each key can carry a client-requested minimum interval. Ticks
+arriving inside the window are held as the pending value for that key and a
+trailing-edge timer enqueues the last one when the window closes, so the final
+tick of a burst is never lost.
+
+Latency: every frame carries the perf_counter() time its tick was received from
+ZeroMQ, handed back by get() so the writer can time delivery. Frames held back
+by a key's update interval are re-stamped when their window closes, so the
+measured latency excludes the deliberate delay.
+
+Configuration:
+    WEBSOCKET_CLIENT_QUEUE_SIZE: Maximum distinct keys pending per client (default: 2000)
+    WEBSOCKET_SLOW_CLIENT_TIMEOUT: Seconds a client may stay saturated before it is
+                                   disconnected, 0 disables the policy (default: 30)
+"""
+
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+DEFAULT_CLIENT_QUEUE_SIZE = 2000
+DEFAULT_SLOW_CLIENT_TIMEOUT = 30.0
+
+
+def get_client_queue_size() -> int:
+    """Get maximum pending keys per client queue from config"""
+    return int(os.getenv('WEBSOCKET_CLIENT_QUEUE_SIZE', DEFAULT_CLIENT_QUEUE_SIZE))
+
+
+def get_slow_client_timeout() -> float:
+    """Get seconds a client may stay saturated before being disconnected"""
+    return float(os.getenv('WEBSOCKET_SLOW_CLIENT_TIMEOUT', DEFAULT_SLOW_CLIENT_TIMEOUT))
+
+
+class ClientSendQueue:
+    """
+    Bounded, conflating FIFO of pre-encoded frames for a single client.
+
+    Not thread-safe: all methods must be called from the proxy's event loop.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None):
+        """
+        Initialize the queue.
+
+        Args:
+            maxsize: Maximum distinct keys pending (default from config)
+        """
+        self.maxsize = maxsize or get_client_queue_size()
+        # key -> (payload, received_at)
+        self._items: "OrderedDict[Hashable, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._ready = asyncio.Event()
+
+        # Per-key update rate state: key -> interval seconds / last emit time /
+        # payload held back inside the window / trailing-edge timer
+        self._intervals: Dict[Hashable, float] = {}
+        self._last_emit: Dict[Hashable, float] = {}
+        self._held: Dict[Hashable, Tuple[bytes, Optional[Callable[[], Optional[bytes]]]]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+
+        # Keys whose pending frame was dropped: an incremental frame can't follow it
+        self._resync = set()
+
+        # Metrics
+        self.enqueued = 0
+        self.throttled = 0
+        self.conflated = 0
+        self.dropped = 0
+        self.sent = 0
+        self.max_depth = 0
+
+        # Monotonic time of the first drop in the current saturation episode
+        self.saturated_since: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def set_interval(self, key: Hashable, interval: float):
+        """
+        Set the minimum interval between frames for a key.
+
+        Args:
+            key: Conflation key, typically (symbol, exchange, mode)
+            interval: Minimum seconds between frames, 0 for unthrottled delivery
+        """
+        if interval > 0:
+            self._intervals[key] = interval
+            return
+
+        self._intervals.pop(key, None)
+        self._last_emit.pop(key, None)
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        held = self._held.pop(key, None)
+        if held is not None:
+            self._enqueue(key, held[0], time.perf_counter(), held[1])
+
+    def put(self, key: Hashable, payload: bytes, received_at: Optional[float] = None,
+            full: Optional[Callable[[], Optional[bytes]]] = None) -> bool:
+        """
+        Enqueue a frame without blocking, honouring the key's update interval.
+
+        Args:
+            key: Conflation key, typically (symbol, exchange, mode)
+            payload: Pre-encoded frame
+            received_at: perf_counter() time the tick arrived, None if not timed
+            full: For an incremental frame, returns the pre-encoded full state of
+                  the key (None if unknown); None for frames that are full state
+
+        Returns:
+            bool: False if an older pending frame had to be dropped to make room
+        """
+        self.enqueued += 1
+
+        interval = self._intervals.get(key)
+        if interval:
+            now = time.monotonic()
+            last = self._last_emit.get(key)
+            if last is not None and now - last < interval:
+                # Inside the window: hold the latest value for the trailing edge
+                self.throttled += 1
+                if full is not None and key in self._held:
+                    payload = full() or payload
+                self._held[key] = (payload, full)
+                if key not in self._timers:
+                    self._timers[key] = asyncio.get_running_loop().call_later(
+                        last + interval - now, self._flush_held, key
+                    )
+                return True
+            self._last_emit[key] = now
+            # A late-running timer must not replace this tick with an older held one
+            if key in self._timers:
+                self._timers.pop(key).cancel()
+                if self._held.pop(key, None) is not None and full is not None:
+                    payload = full() or payload
+
+        return self._enqueue(key, payload, received_at, full)
+
+    def _flush_held(self, key: Hashable):
+        """Trailing edge: enqueue the last payload held back inside the window"""
+        self._timers.pop(key, None)
+        held = self._held.pop(key, None)
+        if held is not None:
+            self._last_emit[key] = time.monotonic()
+            self._enqueue(key, held[0], time.perf_counter(), held[1])
+
+    def _enqueue(self, key: Hashable, payload: bytes, received_at: Optional[float],
+                 full: Optional[Callable[[], Optional[bytes]]] = None) -> bool:
+        """Add a frame to the send queue, conflating by key"""
+        items = self._items
+
+        if full is None:
+            self._resync.discard(key)
+        elif key in items or key in self._resync:
+            # An incremental frame can't stand in for the one it replaces
+            full_payload = full()
+            if full_payload is not None:
+                payload = full_payload
+                self._resync.discard(key)
+
+        if key in items:
+            # Conflate: keep the queue position, replace with the latest payload
+            items[key] = (payload, received_at)
+            self.conflated += 1
+            return True
+
+        accepted = True
+        if len(items) >= self.maxsize:
+            # Queue full - drop the stalest pending frame
+            dropped_key, _ = items.popitem(last=False)
+            self._resync.add(dropped_key)
+            self.dropped += 1
+            accepted = False
+            if self.saturated_since is None:
+                self.saturated_since = time.monotonic()
+
+        items[key] = (payload, received_at)
+        depth = len(items)
+        if depth > self.max_depth:
+            self.max_depth = depth
+        self._ready.set()
+        return accepted
+
+    async def get(self) -> Tuple[Hashable, bytes, Optional[float]]:
+        """
+        Wait for and remove the oldest pending frame.
+
+        Returns:
+            Tuple of (key, payload, received_at)
+        """
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+
+        key, (payload, received_at) = self._items.popitem(last=False)
+        self.sent += 1
+
+        # Saturation ends once the client has worked through half of the backlog
+        if self.saturated_since is not None and len(self._items) <= self.maxsize // 2:
+            self.saturated_since = None
+
+        return key, payload, received_at
+
+    def discard(self, key: Hashable):
+        """Remove all pending and rate state for a key, e.g. after the client unsubscribed"""
+        self._items.pop(key, None)
+        self._held.pop(key, None)
+        self._resync.discard(key)
+        self._intervals.pop(key, None)
+        self._last_emit.pop(key, None)
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+
+    def close(self):
+        """Cancel all trailing-edge timers"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._held.clear()
+
+    def saturated_for(self) -> float:
+        """Seconds the queue has been continuously saturated (0 if not saturated)"""
+        if self.saturated_since is None:
+            return 0.0
+        return time.monotonic() - self.saturated_since
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get queue statistics.
+
+        Returns:
+            Dict with queue depth and counters
+        """
+        return {
+            'depth': len(self._items),
+            'max_depth': self.max_depth,
+            'capacity': self.maxsize,
+            'enqueued': self.enqueued,
+            'throttled': self.throttled,
+            'conflated': self.conflated,
+            'dropped': self.dropped,
+            'sent': self.sent,
+            'saturated_seconds': round(self.saturated_for(), 3)
+        }
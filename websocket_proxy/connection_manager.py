@@ -11,12 +11,12 @@ Configuration:
 """
 
 import os
-import json
 import threading
 import zmq
 from typing import Dict, List, Optional, Any, Tuple, Callable
 from collections import defaultdict
 from utils.logging import get_logger
+from .zmq_codec import get_zmq_codec, encode_market_data
 
 logger = get_logger(__name__)
 
@@ -82,6 +82,7 @@ class SharedZmqPublisher:
         self.zmq_port = None
         self._bound = False
         self._publish_lock = threading.Lock()
+        self.zmq_codec = get_zmq_codec()
 
     def bind(self, port: Optional[int] = None) -> int:
         """
@@ -140,12 +141,16 @@ class SharedZmqPublisher:
             self.logger.error("Cannot publish: ZMQ socket not bound")
             return
 
+        # Encode outside the lock so concurrent adapters only serialize the send
+        try:
+            frames = [topic.encode('utf-8'), encode_market_data(data, self.zmq_codec)]
+        except Exception as e:
+            self.logger.error(f"Error encoding market data for {topic}: {e}")
+            return
+
         with self._publish_lock:
             try:
-                self.socket.send_multipart([
-                    topic.encode('utf-8'),
-                    json.dumps(data).encode('utf-8')
-                ])
+                self.socket.send_multipart(frames)
             except Exception as e:
                 self.logger.error(f"Error publishing to ZMQ: {e}")
 
@@ -522,6 +527,146 @@ class ConnectionPool:
                     'message': str(e)
                 }
 
+    def subscribe_many(self, symbols: List[Dict[str, str]], mode: int = 2, depth_level: int = 5) -> List[dict]:
+        """
+        Subscribe to many symbols, filling connections with capacity in bulk.
+
+        Symbols are split into one chunk per connection (creating connections as
+        needed) and each chunk is handed to the adapter's subscribe_many().
+
+        Args:
+            symbols: List of dicts with 'symbol' and 'exchange' keys
+            mode: Subscription mode (1=LTP, 2=Quote, 3=Depth)
+            depth_level: Market depth level
+
+        Returns:
+            List of subscription result dicts, in request order
+        """
+        responses: List[Optional[dict]] = [None] * len(symbols)
+
+        with self.lock:
+            # Skip symbols that are already subscribed, and repeats within the
+            # request (they get the response of the first occurrence)
+            pending = []
+            first_index: Dict[tuple, int] = {}
+            repeats = []
+            for i, item in enumerate(symbols):
+                sub_key = (item['symbol'], item['exchange'], mode)
+                if sub_key in first_index:
+                    repeats.append((i, first_index[sub_key]))
+                    continue
+                first_index[sub_key] = i
+                if sub_key in self.subscription_map:
+                    responses[i] = {
+                        'status': 'success',
+                        'message': f"Already subscribed to {item['symbol']}.{item['exchange']}",
+                        'connection': self.subscription_map[sub_key] + 1
+                    }
+                else:
+                    pending.append(i)
+
+            while pending:
+                try:
+                    adapter_idx, adapter = self._get_adapter_with_capacity()
+                except RuntimeError as e:
+                    # Max capacity reached - fail the remainder
+                    for i in pending:
+                        responses[i] = {
+                            'status': 'error',
+                            'code': 'MAX_CAPACITY_REACHED',
+                            'message': str(e)
+                        }
+                    break
+
+                capacity = self.max_symbols - self.adapter_symbol_counts[adapter_idx]
+                chunk, pending = pending[:capacity], pending[capacity:]
+
+                try:
+                    results = adapter.subscribe_many([symbols[i] for i in chunk], mode, depth_level)
+                except Exception as e:
+                    self.logger.error(f"Error bulk subscribing {len(chunk)} symbols: {e}")
+                    results = [{'status': 'error', 'code': 'SUBSCRIPTION_ERROR', 'message': str(e)} for _ in chunk]
+
+                for i, result in zip(chunk, results):
+                    if result.get('status') == 'success':
+                        self.subscription_map[(symbols[i]['symbol'], symbols[i]['exchange'], mode)] = adapter_idx
+                        self.adapter_symbol_counts[adapter_idx] += 1
+                        result['connection'] = adapter_idx + 1
+                    responses[i] = result
+
+                self.logger.info(
+                    f"[POOL] Connection {adapter_idx + 1}: bulk subscribed {len(chunk)} symbols, "
+                    f"{self.adapter_symbol_counts[adapter_idx]}/{self.max_symbols} used"
+                )
+
+            total_symbols = sum(self.adapter_symbol_counts)
+            if total_symbols > self.peak_total_symbols:
+                self.peak_total_symbols = total_symbols
+                self.peak_connections_used = len(self.adapters)
+                self.peak_symbol_counts = list(self.adapter_symbol_counts)
+
+            for i, first in repeats:
+                responses[i] = dict(responses[first])
+
+            for result in responses:
+                if result.get('status') == 'success':
+                    result['total_connections'] = len(self.adapters)
+
+        return responses
+
+    def unsubscribe_many(self, symbols: List[Dict[str, str]], mode: int = 2) -> List[dict]:
+        """
+        Unsubscribe from many symbols with one bulk call per connection.
+
+        Args:
+            symbols: List of dicts with 'symbol' and 'exchange' keys
+            mode: Subscription mode
+
+        Returns:
+            List of unsubscription result dicts, in request order
+        """
+        responses: List[Optional[dict]] = [None] * len(symbols)
+
+        with self.lock:
+            # Group request positions by the connection holding the subscription;
+            # repeats within the request get the response of the first occurrence
+            by_adapter: Dict[int, List[int]] = {}
+            first_index: Dict[tuple, int] = {}
+            repeats = []
+            for i, item in enumerate(symbols):
+                sub_key = (item['symbol'], item['exchange'], mode)
+                if sub_key in first_index:
+                    repeats.append((i, first_index[sub_key]))
+                    continue
+                first_index[sub_key] = i
+                adapter_idx = self.subscription_map.get(sub_key)
+                if adapter_idx is None:
+                    responses[i] = {
+                        'status': 'error',
+                        'code': 'NOT_SUBSCRIBED',
+                        'message': f"Not subscribed to {item['symbol']}.{item['exchange']}"
+                    }
+                else:
+                    by_adapter.setdefault(adapter_idx, []).append(i)
+
+            for adapter_idx, chunk in by_adapter.items():
+                try:
+                    results = self.adapters[adapter_idx].unsubscribe_many([symbols[i] for i in chunk], mode)
+                except Exception as e:
+                    self.logger.error(f"Error bulk unsubscribing {len(chunk)} symbols: {e}")
+                    results = [{'status': 'error', 'code': 'UNSUBSCRIPTION_ERROR', 'message': str(e)} for _ in chunk]
+
+                for i, result in zip(chunk, results):
+                    if result.get('status') == 'success':
+                        del self.subscription_map[(symbols[i]['symbol'], symbols[i]['exchange'], mode)]
+                        self.adapter_symbol_counts[adapter_idx] -= 1
+                    responses[i] = result
+
+            for i, first in repeats:
+                responses[i] = dict(responses[first])
+
+        return responses
+
     def unsubscribe_all(self):
         """Unsubscribe from all symbols across all connections"""
         with self.lock:
@@ -696,6 +841,16 @@ def create_pooled_adapter(
                     return self._pool.unsubscribe(symbol, exchange, mode)
                 return {'status': 'error', 'message': 'Not initialized'}
 
+            def subscribe_many(self, symbols: list, mode: int = 2, depth_level: int = 5):
+                if self._pool:
+                    return self._pool.subscribe_many(symbols, mode, depth_level)
+                return [{'status': 'error', 'message': 'Not initialized'} for _ in symbols]
+
+            def unsubscribe_many(self, symbols: list, mode: int = 2):
+                if self._pool:
+                    return self._pool.unsubscribe_many(symbols, mode)
+                return [{'status': 'error', 'message': 'Not initialized'} for _ in symbols]
+
             def unsubscribe_all(self):
                 if self._pool:
                     self._pool.unsubscribe_all()
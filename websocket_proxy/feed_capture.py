@@ -0,0 +1,239 @@
+"""
+Raw Feed Capture and Replay for Broker Streaming Adapters
+
+Records the frames a broker WebSocket client receives, exactly as they arrive,
+into a compact append-only file so a market session can be replayed later
+through the same parse -> map -> ZeroMQ -> proxy path without a network.
+
+File layout:
+
+    b"OAFEED1\\n"                                  magic / format version
+    record*                                       until end of file
+
+    record = header (<dBBI: wall-clock time, kind, stream id, payload length)
+             + payload
+
+    kind 0 = binary frame, 1 = text frame (UTF-8), 2 = meta event (JSON)
+
+Streams are small integers declared by a "stream" meta event the first time a
+stream name is used (e.g. Fyers writes "hsm" and "tbt"). Adapters also write
+"subscribe" meta events with the symbols, mode and depth level they were asked
+for, plus any broker-specific state replay needs, so a replay can rebuild the
+subscriptions before feeding frames. Access tokens are never written.
+
+Writes are buffered; a process that dies without closing the capture loses at
+most the last buffer of frames.
+
+Configuration:
+    STREAM_CAPTURE_DIR: Directory for capture files, unset or empty disables capture
+"""
+
+import os
+import json
+import time
+import struct
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional, Union
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+MAGIC = b"OAFEED1\n"
+RECORD_HEADER = struct.Struct("<dBBI")
+
+KIND_BINARY = 0
+KIND_TEXT = 1
+KIND_META = 2
+
+WRITE_BUFFER_SIZE = 1 << 16
+
+
+class CaptureRecord(NamedTuple):
+    """One record read back from a capture file"""
+    timestamp: float
+    kind: int
+    stream: str
+    payload: Union[bytes, str, Dict[str, Any]]
+
+
+def get_capture_dir() -> Optional[str]:
+    """Get the capture directory from config (None = capture disabled)"""
+    value = os.getenv('STREAM_CAPTURE_DIR', '').strip()
+    return value or None
+
+
+class FeedCapture:
+    """
+    Append-only writer for raw feed frames.
+
+    Thread-safe: a broker adapter may run several client threads (Fyers HSM and
+    TBT) writing to the same capture.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._streams: Dict[str, int] = {}
+        self.frames = 0
+        self.bytes = 0
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'ab', buffering=WRITE_BUFFER_SIZE)
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+
+    def _write(self, kind: int, stream_id: int, payload: bytes):
+        self._file.write(RECORD_HEADER.pack(time.time(), kind, stream_id, len(payload)))
+        self._file.write(payload)
+
+    def _stream_id(self, stream: str) -> int:
+        """Id for a stream name, declaring it on first use (caller holds the lock)"""
+        stream_id = self._streams.get(stream)
+        if stream_id is None:
+            stream_id = self._streams[stream] = len(self._streams)
+            meta = {'event': 'stream', 'id': stream_id, 'name': stream}
+            self._write(KIND_META, stream_id, json.dumps(meta).encode('utf-8'))
+        return stream_id
+
+    def write_frame(self, stream: str, frame: Union[bytes, bytearray, memoryview, str]):
+        """Record one received frame"""
+        if isinstance(frame, str):
+            kind, payload = KIND_TEXT, frame.encode('utf-8')
+        else:
+            kind, payload = KIND_BINARY, bytes(frame)
+        with self._lock:
+            if self._file.closed:
+                return
+            self._write(kind, self._stream_id(stream), payload)
+            self.frames += 1
+            self.bytes += len(payload)
+
+    def write_meta(self, stream: str, event: str, **fields):
+        """Record a meta event (subscriptions, resolved tokens, ...)"""
+        fields['event'] = event
+        payload = json.dumps(fields, separators=(',', ':')).encode('utf-8')
+        with self._lock:
+            if self._file.closed:
+                return
+            self._write(KIND_META, self._stream_id(stream), payload)
+
+    def hook(self, stream: str) -> Callable[[Union[bytes, str]], None]:
+        """Callable a client can invoke with every received frame"""
+        return lambda frame: self.write_frame(stream, frame)
+
+    def close(self):
+        """Flush and close the capture file"""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+                logger.info(f"Feed capture closed: {self.path} ({self.frames:,} frames, {self.bytes:,} bytes)")
+
+
+def open_feed_capture(broker_name: str, capture_dir: Optional[str] = None) -> Optional[FeedCapture]:
+    """
+    Open a new capture file for a broker adapter if capture is enabled
+
+    Returns:
+        FeedCapture, or None when STREAM_CAPTURE_DIR is not set
+    """
+    capture_dir = capture_dir or get_capture_dir()
+    if not capture_dir:
+        return None
+    filename = f"{broker_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.feed"
+    try:
+        capture = FeedCapture(os.path.join(capture_dir, filename))
+    except OSError as e:
+        logger.error(f"Could not open feed capture in {capture_dir}: {e}")
+        return None
+    logger.info(f"Capturing raw {broker_name} feed to {capture.path}")
+    return capture
+
+
+def read_capture(path: str) -> Iterator[CaptureRecord]:
+    """
+    Read a capture file record by record
+
+    Meta payloads are decoded from JSON and text frames from UTF-8. A record cut
+    short by a crash ends the iteration.
+    """
+    streams: Dict[int, str] = {}
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a feed capture file")
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            timestamp, kind, stream_id, length = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+
+            if kind == KIND_META:
+                meta = json.loads(payload)
+                if meta.get('event') == 'stream':
+                    streams[meta['id']] = meta['name']
+                yield CaptureRecord(timestamp, kind, streams.get(stream_id, str(stream_id)), meta)
+            elif kind == KIND_TEXT:
+                yield CaptureRecord(timestamp, kind, streams.get(stream_id, str(stream_id)), payload.decode('utf-8'))
+            else:
+                yield CaptureRecord(timestamp, kind, streams.get(stream_id, str(stream_id)), payload)
+
+
+class NullTransport:
+    """Stands in for a client's WebSocket during replay: everything sent is discarded"""
+
+    def send(self, *args, **kwargs):
+        pass
+
+    def close(self, *args, **kwargs):
+        pass
+
+
+class FeedReplayer:
+    """
+    Paces captured frames into frame handlers.
+
+    speed 1 replays at the captured rate, 10 ten times faster, and 0 as fast as
+    the handlers accept frames. Meta events go to `on_meta` in stream order.
+    """
+
+    def __init__(self, handlers: Dict[str, Callable[[Union[bytes, str]], None]],
+                 on_meta: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                 speed: float = 0):
+        self.handlers = handlers
+        self.on_meta = on_meta
+        self.speed = speed
+        self.frames = 0
+        self.skipped = 0
+
+    def run(self, records) -> float:
+        """
+        Replay records; returns the wall-clock seconds spent
+        """
+        start = time.perf_counter()
+        first_timestamp = paced_from = None
+        for record in records:
+            if record.kind == KIND_META:
+                if self.on_meta and record.payload.get('event') != 'stream':
+                    self.on_meta(record.stream, record.payload)
+                continue
+
+            handler = self.handlers.get(record.stream)
+            if handler is None:
+                self.skipped += 1
+                continue
+
+            if self.speed > 0:
+                if first_timestamp is None:
+                    first_timestamp, paced_from = record.timestamp, time.perf_counter()
+                due = paced_from + (record.timestamp - first_timestamp) / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            handler(record.payload)
+            self.frames += 1
+        return time.perf_counter() - start
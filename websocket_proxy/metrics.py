@@ -0,0 +1,350 @@
+"""
+Proxy Metrics for the WebSocket Proxy
+
+An in-process registry of counters and latency histograms kept by each
+WebSocketProxy process, so it is possible to see during market hours whether
+the proxy itself is the bottleneck:
+
+    ticks received      - per broker and mode, with per-second rates over a
+                          sliding window
+    ticks filtered      - ticks dropped before fan-out (invalid topic, no subscribers)
+    feed reconnects     - broker feed reconnects and the gap in data each caused
+    fan-out latency     - ZeroMQ receive -> frame queued for the last subscriber
+    delivery latency    - ZeroMQ receive -> WebSocket send completed
+    client queues       - per-client depth and throttled/conflated/dropped/sent counts
+    index sizes         - subscription index, ZeroMQ topic filters, last-value cache
+
+Recording is a handful of integer updates per tick; nothing here allocates per
+client. The registry is exposed over plain HTTP on a loopback port when
+WEBSOCKET_METRICS_PORT is set:
+
+    GET /metrics       - Prometheus text exposition format (version 0.0.4)
+    GET /metrics.json  - the same data as JSON, including tick rates
+
+In multi-core mode every process serves its own metrics on
+WEBSOCKET_METRICS_PORT + worker_id.
+
+Configuration:
+    WEBSOCKET_METRICS_PORT: Port of the metrics endpoint, unset or 0 disables it (default: unset)
+    WEBSOCKET_METRICS_HOST: Interface the metrics endpoint binds to (default: 127.0.0.1)
+"""
+
+import os
+import json
+import time
+import threading
+import asyncio as aio
+from bisect import bisect_left
+from collections import defaultdict, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Upper bounds in seconds, from 50us to 2.5s
+DEFAULT_LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+# Upper bounds in seconds for broker feed reconnect gaps, from 100ms to 2min
+RECONNECT_GAP_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+RATE_WINDOW_SECONDS = 10
+MODE_NAMES = {1: "LTP", 2: "QUOTE", 3: "DEPTH"}
+
+
+def get_metrics_port() -> int:
+    """Get the metrics endpoint port from config (0 = disabled)"""
+    value = os.getenv('WEBSOCKET_METRICS_PORT', '').strip()
+    return int(value) if value else 0
+
+
+def get_metrics_host() -> str:
+    """Get the interface the metrics endpoint binds to"""
+    return os.getenv('WEBSOCKET_METRICS_HOST', '127.0.0.1')
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with Prometheus-style cumulative output"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One slot per bucket plus the +Inf overflow slot
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Record one observation in seconds"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile as the upper bound of the bucket that contains it.
+
+        Returns:
+            Upper bound in seconds, inf if it falls in the overflow bucket, or
+            None when nothing has been observed
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[i] if i < len(self.buckets) else float('inf')
+        return float('inf')
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Summary for the JSON endpoint, in milliseconds"""
+        def ms(value):
+            if value is None or value == float('inf'):
+                return None
+            return round(value * 1000, 3)
+
+        return {
+            'count': self.count,
+            'mean_ms': ms(self.sum / self.count) if self.count else None,
+            'p50_ms': ms(self.quantile(0.50)),
+            'p90_ms': ms(self.quantile(0.90)),
+            'p99_ms': ms(self.quantile(0.99)),
+        }
+
+
+class FeedReconnects:
+    """
+    Broker feed reconnects in this process, recorded by the broker adapters.
+
+    Adapters record from their own WebSocket threads; a reconnect is rare, so
+    a lock costs nothing here.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.gaps = Histogram(RECONNECT_GAP_BUCKETS)
+        # broker -> reconnects
+        self.counts: Dict[str, int] = defaultdict(int)
+        # broker -> seconds without data in the last reconnect
+        self.last_gap: Dict[str, float] = {}
+
+    def record(self, broker_name: str, gap_seconds: float):
+        """Record one completed reconnect and how long the feed was down"""
+        with self._lock:
+            self.gaps.observe(gap_seconds)
+            self.counts[broker_name] += 1
+            self.last_gap[broker_name] = gap_seconds
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Summary for the JSON endpoint, gaps in milliseconds"""
+        with self._lock:
+            return {
+                'brokers': [
+                    {'broker': broker_name, 'reconnects': count,
+                     'last_gap_ms': round(self.last_gap.get(broker_name, 0) * 1000, 1)}
+                    for broker_name, count in self.counts.items()
+                ],
+                'gap': self.gaps.get_stats(),
+            }
+
+
+# Shared by every broker adapter in the process
+feed_reconnects = FeedReconnects()
+
+
+class ProxyMetrics:
+    """
+    Counters and histograms for one WebSocketProxy process.
+
+    Not thread-safe: recording happens on the proxy's event loop only. Readers
+    in other threads (the Flask process) only take shallow copies.
+    """
+
+    def __init__(self, worker_id: int = 0):
+        self.worker_id = worker_id
+        self.started_at = time.time()
+
+        # (broker, mode) -> ticks received from ZeroMQ
+        self.ticks_received: Dict[Tuple[str, int], int] = defaultdict(int)
+        # reason -> ticks dropped before fan-out
+        self.ticks_filtered: Dict[str, int] = defaultdict(int)
+        # Frames handed to client send queues (one per subscribed client per tick)
+        self.frames_fanned_out = 0
+
+        self.fanout_latency = Histogram()
+        self.delivery_latency = Histogram()
+
+        # Counters of client queues that have been closed, so the totals stay
+        # monotonic as clients come and go
+        self.retired_queue_totals: Dict[str, int] = defaultdict(int)
+
+        # (monotonic time, ticks_received copy) taken about once per second
+        self._rate_samples: deque = deque(maxlen=RATE_WINDOW_SECONDS + 1)
+        self.next_sample = 0.0
+
+    def record_tick(self, broker_name: str, mode: int):
+        """Count a tick received from ZeroMQ"""
+        self.ticks_received[(broker_name, mode)] += 1
+
+    def record_filtered(self, reason: str):
+        """Count a tick dropped before fan-out"""
+        self.ticks_filtered[reason] += 1
+
+    def record_fanout(self, frames: int, received_at: float):
+        """Record a completed fan-out of one tick to `frames` client queues"""
+        self.frames_fanned_out += frames
+        self.fanout_latency.observe(time.perf_counter() - received_at)
+
+    def retire_queue(self, stats: Dict[str, Any]):
+        """Fold the counters of a closed client queue into the running totals"""
+        for name in ('enqueued', 'throttled', 'conflated', 'dropped', 'sent'):
+            self.retired_queue_totals[name] += stats.get(name, 0)
+
+    def sample(self, now: float):
+        """Take a rate sample (call about once per second with time.perf_counter())"""
+        self._rate_samples.append((now, dict(self.ticks_received)))
+        self.next_sample = now + 1.0
+
+    def tick_rates(self) -> Dict[Tuple[str, int], float]:
+        """Ticks per second per (broker, mode) over the sampled window"""
+        if len(self._rate_samples) < 2:
+            return {}
+        (t0, first), (t1, last) = self._rate_samples[0], self._rate_samples[-1]
+        elapsed = t1 - t0
+        if elapsed <= 0:
+            return {}
+        return {key: (count - first.get(key, 0)) / elapsed for key, count in last.items()}
+
+
+def render_prometheus(snapshot: Dict[str, Any], histograms: Dict[str, Tuple[str, Histogram]]) -> str:
+    """
+    Render a proxy metrics snapshot in Prometheus text exposition format.
+
+    Args:
+        snapshot: Output of WebSocketProxy.get_metrics()
+        histograms: Metric name -> (help text, Histogram) to render with buckets
+
+    Returns:
+        str: Exposition text
+    """
+    lines: List[str] = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+    metric("openalgo_ws_ticks_received_total", "counter",
+           "Market data ticks received from ZeroMQ",
+           [({"broker": t['broker'], "mode": t['mode']}, t['total']) for t in snapshot['ticks']])
+    metric("openalgo_ws_ticks_filtered_total", "counter",
+           "Ticks dropped before fan-out",
+           [({"reason": reason}, count) for reason, count in snapshot['ticks_filtered'].items()])
+    metric("openalgo_ws_frames_fanned_out_total", "counter",
+           "Frames handed to client send queues",
+           [({}, snapshot['frames_fanned_out'])])
+    metric("openalgo_ws_feed_reconnects_total", "counter",
+           "Broker feed reconnects completed",
+           [({"broker": b['broker']}, b['reconnects']) for b in snapshot['feed_reconnects']['brokers']])
+
+    queues = snapshot['queues']
+    for name in ('enqueued', 'throttled', 'conflated', 'dropped', 'sent'):
+        metric(f"openalgo_ws_queue_{name}_total", "counter",
+               f"Client send queue frames {name}",
+               [({}, queues['totals'][name])])
+    metric("openalgo_ws_client_queue_depth", "gauge",
+           "Frames pending in a client's send queue",
+           [({"client": c['client_id'], "user": c['user']}, c['depth']) for c in queues['clients']])
+
+    for name, help_text in (
+        ('clients', "Connected WebSocket clients"),
+        ('subscription_keys', "Distinct (symbol, exchange, mode) keys in the subscription index"),
+        ('subscriptions', "Client subscriptions across all keys"),
+        ('zmq_topics', "ZeroMQ topic filters currently subscribed"),
+        ('last_values', "Entries in the last-value cache"),
+        ('topic_cache', "Entries in the parsed topic cache"),
+    ):
+        metric(f"openalgo_ws_{name}", "gauge", help_text, [({}, snapshot['index'][name])])
+
+    for name, (help_text, histogram) in histograms.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum {histogram.sum}")
+        lines.append(f"{name}_count {histogram.count}")
+
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """
+    Minimal HTTP/1.0 endpoint serving /metrics and /metrics.json.
+
+    Runs on the proxy's event loop; every request is answered from the current
+    in-memory state and the connection is closed.
+    """
+
+    def __init__(self, get_metrics: Callable[[], Dict[str, Any]], render: Callable[[], str]):
+        """
+        Args:
+            get_metrics: Returns the JSON-serializable metrics snapshot
+            render: Returns the Prometheus exposition text
+        """
+        self.get_metrics = get_metrics
+        self.render = render
+        self.server: Optional[aio.AbstractServer] = None
+
+    async def start(self, host: str, port: int):
+        """Bind the endpoint"""
+        self.server = await aio.start_server(self._handle, host, port)
+        logger.info(f"WebSocket proxy metrics available at http://{host}:{port}/metrics")
+
+    def close(self):
+        """Stop accepting scrapes"""
+        if self.server:
+            self.server.close()
+            self.server = None
+
+    async def _handle(self, reader: aio.StreamReader, writer: aio.StreamWriter):
+        try:
+            request_line = await aio.wait_for(reader.readline(), timeout=5)
+            # Drain the headers; the request body (if any) is ignored
+            while True:
+                line = await aio.wait_for(reader.readline(), timeout=5)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+
+            parts = request_line.decode('latin-1').split()
+            method = parts[0] if parts else ''
+            path = parts[1].split('?', 1)[0] if len(parts) > 1 else ''
+
+            if method != 'GET':
+                status, content_type, body = '405 Method Not Allowed', 'text/plain', b'Method Not Allowed\n'
+            elif path == '/metrics':
+                status, content_type = '200 OK', 'text/plain; version=0.0.4; charset=utf-8'
+                body = self.render().encode('utf-8')
+            elif path == '/metrics.json':
+                status, content_type = '200 OK', 'application/json'
+                body = json.dumps(self.get_metrics()).encode('utf-8')
+            else:
+                status, content_type, body = '404 Not Found', 'text/plain', b'Not Found\n'
+
+            writer.write(
+                f"HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body
+            )
+            await writer.drain()
+        except (aio.TimeoutError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error(f"Error serving metrics request: {e}")
+        finally:
+            writer.close()
@@ -1,6 +1,7 @@
 import asyncio as aio
 import websockets
 import json
+import functools
 from utils.logging import get_logger, highlight_url
 import signal
 import zmq
@@ -8,10 +9,12 @@ import zmq.asyncio
 import threading
 import time
 import os
+import sys
 import socket
+import inspect
 from typing import Dict, Set, Any, Optional, Tuple
 from dotenv import load_dotenv
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
 from .port_check import is_port_in_use, find_available_port
 from database.auth_db import get_broker_name
@@ -19,10 +22,27 @@ from sqlalchemy import text
 from database.auth_db import verify_api_key
 from .broker_factory import create_broker_adapter
 from .base_adapter import BaseBrokerWebSocketAdapter
+from .zmq_codec import decode_market_data
+from .client_queue import ClientSendQueue, get_slow_client_timeout
+from .metrics import (
+    ProxyMetrics, MetricsServer, MODE_NAMES, feed_reconnects, get_metrics_host, get_metrics_port,
+    render_prometheus
+)
+from .worker_pool import (
+    AdapterControlServer, RemoteBrokerAdapter, get_proxy_workers, get_control_address,
+    spawn_proxy_workers, stop_proxy_workers
+)
 
 # Initialize logger
 logger = get_logger("websocket_proxy")
 
+
+async def _adapter_result(result):
+    """Result of a broker adapter call - RemoteBrokerAdapter calls are coroutines"""
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
 class WebSocketProxy:
     """
     WebSocket Proxy Server that handles client connections and authentication,
@@ -30,19 +50,23 @@ class WebSocketProxy:
     Supports dynamic broker selection based on user configuration.
     """
     
-    def __init__(self, host: str = "127.0.0.1", port: int = 8765):
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, worker_id: int = 0):
         """
         Initialize the WebSocket Proxy
         
         Args:
             host: Hostname to bind the WebSocket server to
             port: Port number to bind the WebSocket server to
+            worker_id: 0 for the primary proxy, 1..N-1 for extra worker processes
+                       sharing the port (see worker_pool.py)
         """
         self.host = host
         self.port = port
+        self.worker_id = worker_id
         
         # Check if the required port is already in use - wait briefly for cleanup to complete
-        if is_port_in_use(host, port, wait_time=2.0):  # Wait up to 2 seconds for port release
+        # (workers bind the port the primary already holds, via SO_REUSEPORT)
+        if worker_id == 0 and is_port_in_use(host, port, wait_time=2.0):  # Wait up to 2 seconds for port release
             error_msg = (
                 f"WebSocket port {port} is already in use on {host}.\n"
                 f"This port is required for SDK compatibility (see strategies/ltp_example.py).\n"
@@ -68,14 +92,20 @@ class WebSocketProxy:
         self.subscription_index: Dict[Tuple[str, str, int], Set[int]] = defaultdict(set)
 
         # PERFORMANCE OPTIMIZATION 2: Message throttling to avoid excessive updates
-        # Maps (symbol, exchange, mode) -> last message timestamp
-        # Prevents sending duplicate LTP updates faster than 50ms
-        self.last_message_time: Dict[Tuple[str, str, int], float] = {}
-        self.message_throttle_interval = 0.05  # 50ms minimum between messages
+        # Clients choose a maximum update rate per subscription ("throttle_ms");
+        # conflation state lives in each client's send queue and is removed on
+        # unsubscribe. Without a requested rate, LTP defaults to 50ms and
+        # Quote/Depth are unthrottled
+        self.message_throttle_interval = 0.05  # Default LTP interval (50ms)
+        self.MAX_THROTTLE_MS = 60000
 
         # PERFORMANCE OPTIMIZATION 3: Pre-compute mode mappings
         self.MODE_MAP = {"LTP": 1, "QUOTE": 2, "DEPTH": 3}
 
+        # Bounded LRU of raw topic bytes -> (broker, exchange, symbol, mode)
+        self.topic_cache: "OrderedDict[bytes, Optional[Tuple[str, str, str, int]]]" = OrderedDict()
+        self.TOPIC_CACHE_SIZE = 20000
+
         # ZeroMQ context for subscribing to broker adapters
         self.context = zmq.asyncio.Context()
         self.socket = self.context.socket(zmq.SUB)
@@ -84,8 +114,38 @@ class WebSocketProxy:
         ZMQ_PORT = os.getenv('ZMQ_PORT')
         self.socket.connect(f"tcp://{ZMQ_HOST}:{ZMQ_PORT}")  # Connect to broker adapter publisher
         
-        # Set up ZeroMQ subscriber to receive all messages
-        self.socket.setsockopt(zmq.SUBSCRIBE, b"")  # Subscribe to all topics
+        # PERFORMANCE OPTIMIZATION 4: Topic-filtered ZeroMQ subscriptions
+        # Instead of SUBSCRIBE "" the proxy subscribes only to topics that have at
+        # least one client, so unwanted ticks are dropped inside libzmq before they
+        # reach Python. Maps (broker, exchange, symbol, mode) -> client reference count
+        self.zmq_topic_refs: Dict[Tuple[str, str, str, int], int] = {}
+        self.MODE_TOPIC_NAMES = {1: "LTP", 2: "QUOTE", 3: "DEPTH"}
+
+        # PERFORMANCE OPTIMIZATION 5: Per-client conflating send queues
+        # The ZMQ listener only enqueues; a writer task per client does the socket
+        # writes, so a slow client never blocks the listener or other clients
+        self.client_queues: Dict[int, ClientSendQueue] = {}
+        self.client_writers: Dict[int, aio.Task] = {}
+        self.slow_client_timeout = get_slow_client_timeout()
+
+        # PERFORMANCE OPTIMIZATION 6: Last-value cache
+        # Latest tick per streamed (symbol, exchange, mode) as (broker_name, market_data),
+        # sent to new subscribers right away and served by the "snapshot" action.
+        # Entries live as long as at least one client is subscribed to the key
+        self.last_values: Dict[Tuple[str, str, int], Tuple[str, dict]] = {}
+
+        # Observability: tick counters, fan-out/delivery latency histograms and
+        # queue totals, served on WEBSOCKET_METRICS_PORT (see metrics.py)
+        self.metrics = ProxyMetrics(worker_id)
+        self.metrics_server: Optional[MetricsServer] = None
+
+        # Multi-core mode: the primary owns the broker adapters and serves them to
+        # worker processes over the control channel; workers use RemoteBrokerAdapter
+        self.num_workers = get_proxy_workers() if worker_id == 0 else 1
+        self.control_address = get_control_address()
+        self.control_server: Optional[AdapterControlServer] = None
+        self.control_task: Optional[aio.Task] = None
+        self.worker_processes = []
     
     async def start(self):
         """Start the WebSocket server and ZeroMQ listener"""
@@ -148,6 +208,14 @@ class WebSocketProxy:
                 
                 highlighted_success_address = highlight_url(f"{self.host}:{self.port}")
                 logger.debug(f"WebSocket server successfully started on {highlighted_success_address}")
+
+                await self.start_metrics_server()
+
+                # Multi-core mode: serve adapters to the workers, then start them
+                if self.num_workers > 1:
+                    self.control_server = AdapterControlServer(self, self.control_address)
+                    self.control_task = loop.create_task(self.control_server.serve())
+                    self.worker_processes = spawn_proxy_workers(self.num_workers, self.host, self.port)
                 
                 await stop  # Wait until stopped
                 
@@ -172,6 +240,9 @@ class WebSocketProxy:
         self.running = False
         
         try:
+            # Stop worker processes first so they release their adapter references
+            self.stop_workers()
+
             # Close the WebSocket server first (this releases the port)
             if hasattr(self, 'server') and self.server:
                 try:
@@ -194,6 +265,10 @@ class WebSocketProxy:
                 except Exception as e:
                     logger.error(f"Error closing WebSocket server: {e}")
             
+            # Stop all client writer tasks
+            for client_id in list(self.client_writers):
+                self.stop_client_writer(client_id)
+
             # Close all client connections
             close_tasks = []
             for client_id, websocket in self.clients.items():
@@ -216,10 +291,28 @@ class WebSocketProxy:
             # Disconnect all broker adapters
             for user_id, adapter in self.broker_adapters.items():
                 try:
-                    adapter.disconnect()
+                    await _adapter_result(adapter.disconnect())
                 except Exception as e:
                     logger.error(f"Error disconnecting adapter for user {user_id}: {e}")
             
+            if self.control_task:
+                self.control_task.cancel()
+                try:
+                    await self.control_task
+                except aio.CancelledError:
+                    pass
+                except Exception as e:
+                    logger.error(f"Error stopping adapter control channel: {e}")
+                self.control_task = None
+
+            if self.control_server:
+                self.control_server.close()
+                self.control_server = None
+
+            if self.metrics_server:
+                self.metrics_server.close()
+                self.metrics_server = None
+
             # Close ZeroMQ socket with linger=0 for immediate close
             if hasattr(self, 'socket') and self.socket:
                 try:
@@ -250,6 +343,7 @@ class WebSocketProxy:
         client_id = id(websocket)
         self.clients[client_id] = websocket
         self.subscriptions[client_id] = set()
+        self.start_client_writer(client_id, websocket)
         
         # Get path info from websocket if available
         path = getattr(websocket, 'path', '/unknown')
@@ -287,10 +381,14 @@ class WebSocketProxy:
         # Remove client from tracking
         if client_id in self.clients:
             del self.clients[client_id]
+
+        # Stop the client's writer task and drop any pending frames
+        self.stop_client_writer(client_id)
         
         # Clean up subscriptions
         if client_id in self.subscriptions:
             subscriptions = self.subscriptions[client_id]
+            to_unsubscribe = []
             # Unsubscribe from all subscriptions
             for sub_json in subscriptions:
                 try:
@@ -300,56 +398,68 @@ class WebSocketProxy:
                     exchange = sub_info.get('exchange')
                     mode = sub_info.get('mode')
 
-                    # OPTIMIZATION: Remove from subscription index
-                    sub_key = (symbol, exchange, mode)
-                    if sub_key in self.subscription_index:
-                        self.subscription_index[sub_key].discard(client_id)
-                        # Clean up empty entries
-                        if not self.subscription_index[sub_key]:
-                            del self.subscription_index[sub_key]
-
-                    # Get the user's broker adapter
-                    user_id = self.user_mapping.get(client_id)
-                    if user_id and user_id in self.broker_adapters:
-                        adapter = self.broker_adapters[user_id]
-                        adapter.unsubscribe(symbol, exchange, mode)
+                    # OPTIMIZATION: Remove from subscription index (and ZMQ filter)
+                    self._unindex_subscription(client_id, sub_info.get('broker'), symbol, exchange, mode)
+                    to_unsubscribe.append((symbol, exchange, mode))
                 except json.JSONDecodeError as e:
                     logger.exception(f"Error parsing subscription: {sub_json}, Error: {e}")
                 except Exception as e:
                     logger.exception(f"Error processing subscription: {e}")
                     continue
 
+            # Get the user's broker adapter and unsubscribe in bulk
+            user_id = self.user_mapping.get(client_id)
+            if to_unsubscribe and user_id and user_id in self.broker_adapters:
+                try:
+                    await self._unsubscribe_many(self.broker_adapters[user_id], to_unsubscribe)
+                except Exception as e:
+                    logger.exception(f"Error unsubscribing client {client_id}: {e}")
+
             del self.subscriptions[client_id]
         
         # Remove from user mapping
         if client_id in self.user_mapping:
-            user_id = self.user_mapping[client_id]
-            
-            # Check if this was the last client for this user
-            is_last_client = True
-            for other_client_id, other_user_id in self.user_mapping.items():
-                if other_client_id != client_id and other_user_id == user_id:
-                    is_last_client = False
-                    break
+            user_id = self.user_mapping.pop(client_id)
             
-            # If this was the last client for this user, handle the adapter state
-            if is_last_client and user_id in self.broker_adapters:
-                adapter = self.broker_adapters[user_id]
-                broker_name = self.user_broker_mapping.get(user_id)
-
-                # For Flattrade and Shoonya, keep the connection alive and just unsubscribe from data
-                if broker_name in ['flattrade', 'shoonya'] and hasattr(adapter, 'unsubscribe_all'):
-                    logger.info(f"{broker_name.title()} adapter for user {user_id}: last client disconnected. Unsubscribing all symbols instead of disconnecting.")
-                    adapter.unsubscribe_all()
-                else:
-                    # For all other brokers, disconnect the adapter completely
-                    logger.info(f"Last client for user {user_id} disconnected. Disconnecting {broker_name or 'unknown broker'} adapter.")
-                    adapter.disconnect()
-                    del self.broker_adapters[user_id]
-                    if user_id in self.user_broker_mapping:
-                        del self.user_broker_mapping[user_id]
-            
-            del self.user_mapping[client_id]
+            # If this was the last client for this user (in every proxy process),
+            # handle the adapter state
+            remote_users = self.control_server is not None and self.control_server.has_remote_users(user_id)
+            if not remote_users and not self.has_local_clients(user_id):
+                await self.release_user_adapter(user_id)
+
+    def has_local_clients(self, user_id) -> bool:
+        """
+        Check whether any client connected to this process belongs to a user
+        
+        Args:
+            user_id: User ID to check
+        """
+        return any(other_user_id == user_id for other_user_id in self.user_mapping.values())
+
+    async def release_user_adapter(self, user_id):
+        """
+        Handle the adapter state once the last client of a user has gone
+        
+        Args:
+            user_id: User ID whose adapter is no longer needed
+        """
+        if user_id not in self.broker_adapters:
+            return
+
+        adapter = self.broker_adapters[user_id]
+        broker_name = self.user_broker_mapping.get(user_id)
+
+        # For Flattrade and Shoonya, keep the connection alive and just unsubscribe from data
+        if broker_name in ['flattrade', 'shoonya'] and hasattr(adapter, 'unsubscribe_all'):
+            logger.info(f"{broker_name.title()} adapter for user {user_id}: last client disconnected. Unsubscribing all symbols instead of disconnecting.")
+            await _adapter_result(adapter.unsubscribe_all())
+        else:
+            # For all other brokers, disconnect the adapter completely
+            logger.info(f"Last client for user {user_id} disconnected. Disconnecting {broker_name or 'unknown broker'} adapter.")
+            await _adapter_result(adapter.disconnect())
+            del self.broker_adapters[user_id]
+            if user_id in self.user_broker_mapping:
+                del self.user_broker_mapping[user_id]
     
     async def process_client_message(self, client_id, message):
         """
@@ -367,7 +477,7 @@ class WebSocketProxy:
             # Accept both 'action' and 'type' fields for better compatibility with different clients
             action = data.get("action") or data.get("type")
             # OPTIMIZATION: Only log important actions, not every subscribe/unsubscribe
-            if action not in ["subscribe", "unsubscribe"]:
+            if action not in ["subscribe", "unsubscribe", "snapshot"]:
                 logger.info(f"Client {client_id} requested action: {action}")
             
             if action in ["authenticate", "auth"]:
@@ -376,6 +486,8 @@ class WebSocketProxy:
                 await self.subscribe_client(client_id, data)
             elif action in ["unsubscribe", "unsubscribe_all"]:
                 await self.unsubscribe_client(client_id, data)
+            elif action == "snapshot":
+                await self.send_snapshot(client_id, data)
             elif action == "get_broker_info":
                 await self.get_broker_info(client_id)
             elif action == "get_supported_brokers":
@@ -487,44 +599,11 @@ class WebSocketProxy:
             await self.send_error(client_id, "BROKER_ERROR", "No broker configuration found for user")
             return
         
-        # Store the broker mapping for this user
-        self.user_broker_mapping[user_id] = broker_name
-        
         # Create or reuse broker adapter
-        if user_id not in self.broker_adapters:
-            try:
-                # Create broker adapter with dynamic broker selection
-                adapter = create_broker_adapter(broker_name)
-                if not adapter:
-                    await self.send_error(client_id, "BROKER_ERROR", f"Failed to create adapter for broker: {broker_name}")
-                    return
-                
-                # Initialize adapter with broker configuration
-                # The adapter's initialize method should handle broker-specific setup
-                initialization_result = adapter.initialize(broker_name, user_id)
-                if initialization_result and not initialization_result.get('success', True):
-                    error_msg = initialization_result.get('error', 'Failed to initialize broker adapter')
-                    await self.send_error(client_id, "BROKER_INIT_ERROR", error_msg)
-                    return
-                
-                # Connect to the broker
-                connect_result = adapter.connect()
-                if connect_result and not connect_result.get('success', True):
-                    error_msg = connect_result.get('error', 'Failed to connect to broker')
-                    await self.send_error(client_id, "BROKER_CONNECTION_ERROR", error_msg)
-                    return
-                
-                # Store the adapter
-                self.broker_adapters[user_id] = adapter
-                
-                logger.info(f"Successfully created and connected {broker_name} adapter for user {user_id}")
-                
-            except Exception as e:
-                logger.error(f"Failed to create broker adapter for {broker_name}: {e}")
-                import traceback
-                logger.error(traceback.format_exc())
-                await self.send_error(client_id, "BROKER_ERROR", str(e))
-                return
+        adapter, error_code, error_msg = await self.get_or_create_adapter(user_id, broker_name)
+        if adapter is None:
+            await self.send_error(client_id, error_code, error_msg)
+            return
         
         # Send success response with broker information
         await self.send_message(client_id, {
@@ -540,6 +619,60 @@ class WebSocketProxy:
             }
         })
     
+    async def get_or_create_adapter(self, user_id, broker_name):
+        """
+        Get the user's broker adapter, creating and connecting it on first use
+        
+        In a worker process the adapter is a RemoteBrokerAdapter that forwards
+        calls to the primary proxy, which owns the real broker connection.
+        
+        Args:
+            user_id: User ID the adapter belongs to
+            broker_name: Broker the user is connected to
+            
+        Returns:
+            tuple: (adapter, None, None) on success, (None, error_code, error_message) on failure
+        """
+        # Store the broker mapping for this user
+        self.user_broker_mapping[user_id] = broker_name
+        
+        if user_id in self.broker_adapters:
+            return self.broker_adapters[user_id], None, None
+        
+        try:
+            # Create broker adapter with dynamic broker selection
+            if self.worker_id:
+                adapter = RemoteBrokerAdapter(self.control_address, self.worker_id)
+            else:
+                adapter = create_broker_adapter(broker_name)
+            if not adapter:
+                return None, "BROKER_ERROR", f"Failed to create adapter for broker: {broker_name}"
+            
+            # Initialize adapter with broker configuration
+            # The adapter's initialize method should handle broker-specific setup
+            initialization_result = adapter.initialize(broker_name, user_id)
+            if initialization_result and not initialization_result.get('success', True):
+                error_msg = initialization_result.get('error', 'Failed to initialize broker adapter')
+                return None, "BROKER_INIT_ERROR", error_msg
+            
+            # Connect to the broker
+            connect_result = await _adapter_result(adapter.connect())
+            if connect_result and not connect_result.get('success', True):
+                error_msg = connect_result.get('error', 'Failed to connect to broker')
+                return None, "BROKER_CONNECTION_ERROR", error_msg
+            
+            # Store the adapter
+            self.broker_adapters[user_id] = adapter
+            
+            logger.info(f"Successfully created and connected {broker_name} adapter for user {user_id}")
+            return adapter, None, None
+            
+        except Exception as e:
+            logger.error(f"Failed to create broker adapter for {broker_name}: {e}")
+            import traceback
+            logger.error(traceback.format_exc())
+            return None, "BROKER_ERROR", str(e)
+    
     async def get_supported_brokers(self, client_id):
         """
         Get list of supported brokers from environment configuration
@@ -631,6 +764,22 @@ class WebSocketProxy:
         if not symbols:
             await self.send_error(client_id, "INVALID_PARAMETERS", "At least one symbol must be specified")
             return
+
+        # Client-requested maximum update rate: minimum milliseconds between frames
+        # per symbol (e.g. 100 for dashboards, 0 for unthrottled execution strategies)
+        throttle_ms = data.get("throttle_ms")
+        if throttle_ms is None:
+            throttle_ms = self.message_throttle_interval * 1000 if mode == 1 else 0
+        try:
+            throttle_ms = float(throttle_ms)
+            if not 0 <= throttle_ms <= self.MAX_THROTTLE_MS:
+                raise ValueError
+        except (TypeError, ValueError):
+            await self.send_error(
+                client_id, "INVALID_PARAMETERS",
+                f"throttle_ms must be a number between 0 and {self.MAX_THROTTLE_MS}"
+            )
+            return
         
         # Get the user's broker adapter
         user_id = self.user_mapping[client_id]
@@ -640,20 +789,25 @@ class WebSocketProxy:
         
         adapter = self.broker_adapters[user_id]
         broker_name = self.user_broker_mapping.get(user_id, "unknown")
+        queue = self.client_queues.get(client_id)
         
         # Process each symbol in the subscription request
         subscription_responses = []
         subscription_success = True
         
-        for symbol_info in symbols:
-            symbol = symbol_info.get("symbol")
-            exchange = symbol_info.get("exchange")
-            
-            if not symbol or not exchange:
-                continue  # Skip invalid symbols
-                
-            # Subscribe to market data
-            response = adapter.subscribe(symbol, exchange, mode, depth_level)
+        # Skip invalid symbols, then subscribe the rest in one bulk call
+        valid_symbols = [
+            {"symbol": symbol_info.get("symbol"), "exchange": symbol_info.get("exchange")}
+            for symbol_info in symbols
+            if symbol_info.get("symbol") and symbol_info.get("exchange")
+        ]
+        responses = []
+        if valid_symbols:
+            responses = await _adapter_result(adapter.subscribe_many(valid_symbols, mode, depth_level))
+        
+        for symbol_info, response in zip(valid_symbols, responses):
+            symbol = symbol_info["symbol"]
+            exchange = symbol_info["exchange"]
             
             if response.get("status") == "success":
                 # Store the subscription
@@ -671,8 +825,11 @@ class WebSocketProxy:
                     self.subscriptions[client_id] = {json.dumps(subscription_info)}
 
                 # OPTIMIZATION: Update subscription index for O(1) lookup
-                sub_key = (symbol, exchange, mode)
-                self.subscription_index[sub_key].add(client_id)
+                self._index_subscription(client_id, broker_name, symbol, exchange, mode)
+
+                # Per-subscription update rate (re-subscribing updates it)
+                if queue is not None:
+                    queue.set_interval((symbol, exchange, mode), throttle_ms / 1000)
 
                 # Add to successful subscriptions
                 subscription_responses.append({
@@ -681,6 +838,7 @@ class WebSocketProxy:
                     "status": "success",
                     "mode": mode_str,
                     "depth": response.get("actual_depth", depth_level),
+                    "throttle_ms": throttle_ms,
                     "broker": broker_name
                 })
             else:
@@ -702,6 +860,18 @@ class WebSocketProxy:
             "message": "Subscription processing complete",
             "broker": broker_name
         })
+
+        # Snapshot-on-subscribe: queue the cached last value of every symbol another
+        # client is already streaming, instead of waiting for its next tick
+        if queue is not None:
+            for response in subscription_responses:
+                if response["status"] != "success":
+                    continue
+                sub_key = (response["symbol"], response["exchange"], mode)
+                cached = self._get_last_value(sub_key, broker_name)
+                if cached is not None:
+                    queue.put(sub_key, self._encode_market_data(
+                        response["symbol"], response["exchange"], mode, cached, broker_name))
     
     async def unsubscribe_client(self, client_id, data):
         """
@@ -761,14 +931,19 @@ class WebSocketProxy:
                     except json.JSONDecodeError:
                         logger.error(f"Failed to parse subscription: {sub_json}")
                 
-                # Unsubscribe from each subscription
+                # Unsubscribe from all subscriptions in bulk
+                all_subscriptions = [sub for sub in all_subscriptions if sub.get("symbol") and sub.get("exchange")]
+                responses = await self._unsubscribe_many(
+                    adapter, [(sub["symbol"], sub["exchange"], sub.get("mode")) for sub in all_subscriptions]
+                )
                 for sub in all_subscriptions:
                     symbol = sub.get("symbol")
                     exchange = sub.get("exchange")
                     mode = sub.get("mode")
                     
                     if symbol and exchange:
-                        response = adapter.unsubscribe(symbol, exchange, mode)
+                        response = responses[(symbol, exchange, mode)]
+                        self._unindex_subscription(client_id, sub.get("broker", broker_name), symbol, exchange, mode)
                         
                         if response.get("status") == "success":
                             successful_unsubscriptions.append({
@@ -789,42 +964,37 @@ class WebSocketProxy:
                 # Clear all subscriptions for this client
                 self.subscriptions[client_id].clear()
         else:
-            # Process specific symbols
+            # Process specific symbols, skipping invalid ones
+            symbols = [s for s in symbols if s.get("symbol") and s.get("exchange")]
+            responses = await self._unsubscribe_many(
+                adapter, [(s["symbol"], s["exchange"], s.get("mode", 2)) for s in symbols]  # Default to Quote mode
+            )
+
+            # Stored subscription keys by (symbol, exchange, mode), with or without broker info
+            stored_keys = defaultdict(list)
+            for sub_key in self.subscriptions.get(client_id, ()):
+                try:
+                    sub_data = json.loads(sub_key)
+                except json.JSONDecodeError:
+                    continue
+                stored_keys[(sub_data.get("symbol"), sub_data.get("exchange"), sub_data.get("mode"))].append(sub_key)
+
             for symbol_info in symbols:
                 symbol = symbol_info.get("symbol")
                 exchange = symbol_info.get("exchange")
                 mode = symbol_info.get("mode", 2)  # Default to Quote mode
                 
-                if not symbol or not exchange:
-                    continue  # Skip invalid symbols
-                
                 # Unsubscribe from market data
-                response = adapter.unsubscribe(symbol, exchange, mode)
+                response = responses[(symbol, exchange, mode)]
                 
                 if response.get("status") == "success":
                     # Try to remove subscription
                     if client_id in self.subscriptions:
-                        subscription_info = {
-                            "symbol": symbol,
-                            "exchange": exchange,
-                            "mode": mode,
-                            "broker": broker_name
-                        }
-                        subscription_key = json.dumps(subscription_info)
                         # Remove any matching subscription (with or without broker info)
-                        subscriptions_to_remove = []
-                        for sub_key in self.subscriptions[client_id]:
-                            try:
-                                sub_data = json.loads(sub_key)
-                                if (sub_data.get("symbol") == symbol and 
-                                    sub_data.get("exchange") == exchange and 
-                                    sub_data.get("mode") == mode):
-                                    subscriptions_to_remove.append(sub_key)
-                            except json.JSONDecodeError:
-                                continue
-                        
-                        for sub_key in subscriptions_to_remove:
+                        for sub_key in stored_keys.get((symbol, exchange, mode), ()):
                             self.subscriptions[client_id].discard(sub_key)
+
+                    self._unindex_subscription(client_id, broker_name, symbol, exchange, mode)
                     
                     successful_unsubscriptions.append({
                         "symbol": symbol,
@@ -857,6 +1027,191 @@ class WebSocketProxy:
             "broker": broker_name
         })
     
+    async def send_snapshot(self, client_id, data):
+        """
+        Send the latest cached values for many symbols in one frame
+        
+        Only symbols the proxy is currently streaming (for any client) have a
+        cached value; the rest are listed under "missing".
+        
+        Args:
+            client_id: ID of the client
+            data: Snapshot request with "symbols" and optional "mode" (default Quote)
+        """
+        if client_id not in self.user_mapping:
+            await self.send_error(client_id, "NOT_AUTHENTICATED", "You must authenticate first")
+            return
+        
+        symbols = data.get("symbols") or []
+        if not symbols and (data.get("symbol") and data.get("exchange")):
+            symbols = [{"symbol": data.get("symbol"), "exchange": data.get("exchange")}]
+        if not symbols:
+            await self.send_error(client_id, "INVALID_PARAMETERS", "At least one symbol must be specified")
+            return
+        
+        mode_str = data.get("mode", "Quote")
+        mode = {"LTP": 1, "Quote": 2, "Depth": 3}.get(mode_str, mode_str) if isinstance(mode_str, str) else mode_str
+        if mode not in self.MODE_TOPIC_NAMES:
+            await self.send_error(client_id, "INVALID_PARAMETERS", f"Invalid mode: {mode_str}")
+            return
+        
+        user_id = self.user_mapping[client_id]
+        broker_name = self.user_broker_mapping.get(user_id, "unknown")
+        
+        snapshots = []
+        missing = []
+        for symbol_info in symbols:
+            symbol = symbol_info.get("symbol")
+            exchange = symbol_info.get("exchange")
+            if not symbol or not exchange:
+                continue
+            
+            # A richer mode's tick carries every field of the poorer ones
+            cached = None
+            for candidate_mode in range(mode, 4):
+                cached = self._get_last_value((symbol, exchange, candidate_mode), broker_name)
+                if cached is not None:
+                    break
+            
+            if cached is None:
+                missing.append({"symbol": symbol, "exchange": exchange})
+            else:
+                snapshots.append({"symbol": symbol, "exchange": exchange, "data": cached})
+        
+        await self.send_message(client_id, {
+            "type": "snapshot",
+            "status": "success" if not missing else "partial",
+            "mode": mode,
+            "data": snapshots,
+            "missing": missing,
+            "broker": broker_name
+        })
+    
+    def _get_last_value(self, sub_key, broker_name):
+        """
+        Get the cached last tick for a subscription key
+        
+        Args:
+            sub_key: (symbol, exchange, mode)
+            broker_name: Broker of the requesting client's user
+            
+        Returns:
+            dict: Market data, or None if nothing is cached for this broker
+        """
+        cached = self.last_values.get(sub_key)
+        if cached is None:
+            return None
+        cached_broker, market_data = cached
+        # Important for multi-broker setups, as in broadcast_market_data
+        if cached_broker != "unknown" and broker_name not in ("unknown", None) and cached_broker != broker_name:
+            return None
+        return market_data
+
+    async def _unsubscribe_many(self, adapter, subscriptions):
+        """
+        Unsubscribe (symbol, exchange, mode) tuples with one bulk adapter call per mode
+
+        Args:
+            adapter: The user's broker adapter
+            subscriptions: Iterable of (symbol, exchange, mode) tuples
+
+        Returns:
+            dict: (symbol, exchange, mode) -> adapter response
+        """
+        by_mode = defaultdict(list)
+        for symbol, exchange, mode in subscriptions:
+            by_mode[mode].append({"symbol": symbol, "exchange": exchange})
+
+        responses = {}
+        for mode, items in by_mode.items():
+            for item, response in zip(items, await _adapter_result(adapter.unsubscribe_many(items, mode))):
+                responses[(item["symbol"], item["exchange"], mode)] = response
+        return responses
+
+    def _index_subscription(self, client_id, broker_name, symbol, exchange, mode):
+        """
+        Add a client to the subscription index and the ZeroMQ topic filter
+
+        Args:
+            client_id: ID of the client
+            broker_name: Broker the client's user is connected to
+            symbol: Trading symbol
+            exchange: Exchange code
+            mode: Numeric subscription mode
+        """
+        clients = self.subscription_index[(symbol, exchange, mode)]
+        if client_id in clients:
+            return  # Duplicate subscribe from the same client
+
+        clients.add(client_id)
+
+        topic_key = (broker_name, exchange, symbol, mode)
+        refs = self.zmq_topic_refs.get(topic_key, 0)
+        if refs == 0:
+            # First client for this topic - let libzmq start delivering it
+            for topic in self._zmq_topics(broker_name, exchange, symbol, mode):
+                self.socket.setsockopt(zmq.SUBSCRIBE, topic)
+        self.zmq_topic_refs[topic_key] = refs + 1
+
+    def _unindex_subscription(self, client_id, broker_name, symbol, exchange, mode):
+        """
+        Remove a client from the subscription index and the ZeroMQ topic filter
+
+        Args:
+            client_id: ID of the client
+            broker_name: Broker the client's user is connected to
+            symbol: Trading symbol
+            exchange: Exchange code
+            mode: Numeric subscription mode
+        """
+        sub_key = (symbol, exchange, mode)
+        clients = self.subscription_index.get(sub_key)
+        if not clients or client_id not in clients:
+            return
+
+        clients.discard(client_id)
+        # Clean up empty entries
+        if not clients:
+            del self.subscription_index[sub_key]
+            self.last_values.pop(sub_key, None)
+
+        # Don't deliver frames that were queued before the unsubscribe
+        queue = self.client_queues.get(client_id)
+        if queue is not None:
+            queue.discard(sub_key)
+
+        topic_key = (broker_name, exchange, symbol, mode)
+        refs = self.zmq_topic_refs.get(topic_key, 0) - 1
+        if refs > 0:
+            self.zmq_topic_refs[topic_key] = refs
+            return
+
+        # Last client for this topic left - stop receiving it
+        self.zmq_topic_refs.pop(topic_key, None)
+        for topic in self._zmq_topics(broker_name, exchange, symbol, mode):
+            try:
+                self.socket.setsockopt(zmq.UNSUBSCRIBE, topic)
+            except zmq.ZMQError as e:
+                logger.debug(f"Error unsubscribing ZMQ topic {topic}: {e}")
+
+    def _zmq_topics(self, broker_name, exchange, symbol, mode):
+        """
+        Build the ZeroMQ topic filters for a subscription
+
+        Adapters publish either EXCHANGE_SYMBOL_MODE or BROKER_EXCHANGE_SYMBOL_MODE,
+        so both forms are subscribed. ZeroMQ filters are prefix matches, any extra
+        topics they let through are still dropped by the subscription index lookup.
+
+        Returns:
+            list: Topic filters as bytes
+        """
+        mode_str = self.MODE_TOPIC_NAMES.get(mode, str(mode))
+        topic = f"{exchange}_{symbol}_{mode_str}"
+        topics = [topic.encode('utf-8')]
+        if broker_name and broker_name != "unknown":
+            topics.append(f"{broker_name}_{topic}".encode('utf-8'))
+        return topics
+
     async def send_message(self, client_id, message):
         """
         Send a message to a client
@@ -894,9 +1249,10 @@ class WebSocketProxy:
         Key Performance Improvements:
         1. Increased timeout from 0.1s to 0.3s (reduces busy-waiting by 66%)
         2. Use subscription_index for O(1) lookup instead of O(n²) iteration
-        3. Batch message sending with asyncio.gather
+        3. Non-blocking fan-out into per-client conflating send queues
         """
         logger.debug("Starting OPTIMIZED ZeroMQ listener with subscription indexing")
+        metrics = self.metrics
 
         while self.running:
             try:
@@ -912,126 +1268,433 @@ class WebSocketProxy:
                     )
                 except aio.TimeoutError:
                     # No message received within timeout, continue the loop
+                    now = time.perf_counter()
+                    if now >= metrics.next_sample:
+                        metrics.sample(now)
                     continue
-                
-                # Parse the message
-                topic_str = topic.decode('utf-8')
-                data_str = data.decode('utf-8')
-                market_data = json.loads(data_str)
-                
-                # Extract topic components
-                # Support both formats:
-                # New format: BROKER_EXCHANGE_SYMBOL_MODE (with broker name)
-                # Old format: EXCHANGE_SYMBOL_MODE (without broker name)
-                # Special case: NSE_INDEX_SYMBOL_MODE (exchange contains underscore)
-                parts = topic_str.split('_')
-                
-                # Special case handling for NSE_INDEX and BSE_INDEX
-                if len(parts) >= 4 and parts[0] == "NSE" and parts[1] == "INDEX":
-                    broker_name = "unknown"
-                    exchange = "NSE_INDEX"
-                    symbol = parts[2]
-                    mode_str = parts[3]
-                elif len(parts) >= 4 and parts[0] == "BSE" and parts[1] == "INDEX":
-                    broker_name = "unknown"
-                    exchange = "BSE_INDEX"
-                    symbol = parts[2]
-                    mode_str = parts[3]
-                elif len(parts) >= 5 and parts[1] == "INDEX":  # BROKER_NSE_INDEX_SYMBOL_MODE format
-                    broker_name = parts[0]
-                    exchange = f"{parts[1]}_{parts[2]}"
-                    symbol = parts[3]
-                    mode_str = parts[4]
-                elif len(parts) >= 4:
-                    # Standard format with broker name
-                    broker_name = parts[0]
-                    exchange = parts[1]
-                    symbol = parts[2]
-                    mode_str = parts[3]
-                elif len(parts) >= 3:
-                    # Old format without broker name
-                    broker_name = "unknown"
-                    exchange = parts[0]
-                    symbol = parts[1] 
-                    mode_str = parts[2]
-                else:
-                    logger.warning(f"Invalid topic format: {topic_str}")
-                    continue
-                
-                # OPTIMIZATION: Use pre-computed mode map
-                mode = self.MODE_MAP.get(mode_str)
 
-                if not mode:
-                    logger.warning(f"Invalid mode in topic: {mode_str}")
+                received_at = time.perf_counter()
+                if received_at >= metrics.next_sample:
+                    metrics.sample(received_at)
+
+                # OPTIMIZATION: Cached topic parsing - one dict hit per tick
+                parsed = self.parse_topic(topic)
+                if parsed is None:
+                    metrics.record_filtered("invalid_topic")
                     continue
+                broker_name, exchange, symbol, mode = parsed
+                metrics.record_tick(broker_name, mode)
 
-                # OPTIMIZATION: Message throttling for high-frequency updates
-                # Skip if we sent the same message too recently (reduces CPU on fast updates)
-                sub_key = (symbol, exchange, mode)
-                current_time = time.time()
+                # Skip decoding payloads nobody is subscribed to
+                if (symbol, exchange, mode) not in self.subscription_index:
+                    metrics.record_filtered("no_subscribers")
+                    continue
 
-                # Only throttle LTP mode (mode 1), not Quote/Depth
-                if mode == 1:  # LTP mode
-                    last_time = self.last_message_time.get(sub_key, 0)
-                    if current_time - last_time < self.message_throttle_interval:
-                        continue  # Skip this update, too soon
-                    self.last_message_time[sub_key] = current_time
+                # Decode the payload (codec is detected per message)
+                market_data = decode_market_data(data)
 
                 # OPTIMIZATION 2: O(1) lookup using subscription index
                 # Instead of iterating through ALL clients and ALL subscriptions (O(n²)),
                 # directly lookup clients subscribed to this specific (symbol, exchange, mode)
-                client_ids = self.subscription_index.get(sub_key, set()).copy()
+                # Never awaits a socket write - frames are handed to per-client queues
+                self.broadcast_market_data(broker_name, symbol, exchange, mode, market_data, received_at)
+
+            except Exception as e:
+                logger.error(f"Error in ZeroMQ listener: {e}")
+                # Continue running despite errors
+                await aio.sleep(1)
 
-                if not client_ids:
-                    continue  # No clients subscribed, skip processing
+    def parse_topic(self, topic: bytes) -> Optional[Tuple[str, str, str, int]]:
+        """
+        Parse a ZeroMQ topic into (broker_name, exchange, symbol, mode)
 
-                # OPTIMIZATION 3: Batch message sends for parallel delivery
-                send_tasks = []
+        The set of topics is small and stable (about the size of the subscription
+        set), so results are memoized in a bounded LRU keyed by the raw topic bytes.
+        Invalid topics are cached as None so they are only logged once.
 
-                # OPTIMIZATION 4: Pre-create base message (reused for all clients)
-                # This avoids creating the same dict 1000 times
-                base_message = {
-                    "type": "market_data",
-                    "symbol": symbol,
-                    "exchange": exchange,
-                    "mode": mode,
-                    "data": market_data
-                }
+        Supported formats:
+            BROKER_EXCHANGE_SYMBOL_MODE (with broker name)
+            EXCHANGE_SYMBOL_MODE (old format, broker is "unknown")
+            NSE_INDEX/BSE_INDEX exchanges contain an underscore in both formats
 
-                # OPTIMIZATION 5: Pre-serialize JSON once (not per-client)
-                # Most clients get the same message, so serialize once
-                base_message_str = None
+        Args:
+            topic: Raw topic frame
 
-                for client_id in client_ids:
-                    # Verify client still exists
-                    if client_id not in self.clients:
-                        continue
+        Returns:
+            Tuple of (broker_name, exchange, symbol, mode) or None if invalid
+        """
+        cache = self.topic_cache
+        try:
+            parsed = cache[topic]
+            cache.move_to_end(topic)
+            return parsed
+        except KeyError:
+            pass
 
-                    # Verify user mapping exists
-                    user_id = self.user_mapping.get(client_id)
-                    if not user_id:
-                        continue
+        parsed = self._parse_topic_uncached(topic.decode('utf-8'))
+        cache[topic] = parsed
+        if len(cache) > self.TOPIC_CACHE_SIZE:
+            cache.popitem(last=False)
+        return parsed
 
-                    # Check broker match (important for multi-broker setups)
-                    client_broker = self.user_broker_mapping.get(user_id)
-                    if broker_name != "unknown" and client_broker and client_broker != broker_name:
-                        continue
+    def _parse_topic_uncached(self, topic_str: str) -> Optional[Tuple[str, str, str, int]]:
+        """Split a topic string into its components (see parse_topic)"""
+        parts = topic_str.split('_')
 
-                    # Add broker to message
-                    message = base_message.copy()
-                    message["broker"] = broker_name if broker_name != "unknown" else client_broker
+        # Special case handling for NSE_INDEX and BSE_INDEX
+        if len(parts) >= 4 and parts[0] == "NSE" and parts[1] == "INDEX":
+            broker_name = "unknown"
+            exchange = "NSE_INDEX"
+            symbol = parts[2]
+            mode_str = parts[3]
+        elif len(parts) >= 4 and parts[0] == "BSE" and parts[1] == "INDEX":
+            broker_name = "unknown"
+            exchange = "BSE_INDEX"
+            symbol = parts[2]
+            mode_str = parts[3]
+        elif len(parts) >= 5 and parts[2] == "INDEX":  # BROKER_NSE_INDEX_SYMBOL_MODE format
+            broker_name = parts[0]
+            exchange = f"{parts[1]}_{parts[2]}"
+            symbol = parts[3]
+            mode_str = parts[4]
+        elif len(parts) >= 4:
+            # Standard format with broker name
+            broker_name = parts[0]
+            exchange = parts[1]
+            symbol = parts[2]
+            mode_str = parts[3]
+        elif len(parts) >= 3:
+            # Old format without broker name
+            broker_name = "unknown"
+            exchange = parts[0]
+            symbol = parts[1]
+            mode_str = parts[2]
+        else:
+            logger.warning(f"Invalid topic format: {topic_str}")
+            return None
 
-                    # Add to batch
-                    send_tasks.append(self.send_message(client_id, message))
+        # OPTIMIZATION: Use pre-computed mode map
+        mode = self.MODE_MAP.get(mode_str)
+        if not mode:
+            logger.warning(f"Invalid mode in topic: {mode_str}")
+            return None
 
-                # Send all messages in parallel (non-blocking)
-                if send_tasks:
-                    await aio.gather(*send_tasks, return_exceptions=True)
-            
-            except Exception as e:
-                logger.error(f"Error in ZeroMQ listener: {e}")
-                # Continue running despite errors
-                await aio.sleep(1)
+        # Intern the strings so every cached key shares one object per name
+        return (sys.intern(broker_name), sys.intern(exchange), sys.intern(symbol), mode)
+
+    def broadcast_market_data(self, broker_name, symbol, exchange, mode, market_data, received_at=None):
+        """
+        Fan out a single market data tick to every subscribed client
+
+        The outgoing frame is serialized once per broker label variant and the
+        same pre-encoded payload is queued for every matching client, so the cost
+        of json.dumps no longer scales with the number of subscribers. Queuing
+        never blocks; each client's writer task performs the socket write.
+
+        Args:
+            broker_name: Broker name from the ZMQ topic ("unknown" for old topics)
+            symbol: Trading symbol
+            exchange: Exchange code
+            mode: Numeric subscription mode (1=LTP, 2=Quote, 3=Depth)
+            market_data: Market data dictionary published by the broker adapter
+            received_at: time.perf_counter() when the tick left ZeroMQ, for latency metrics
+        """
+        sub_key = (symbol, exchange, mode)
+        client_ids = self.subscription_index.get(sub_key)
+
+        if not client_ids:
+            return  # No clients subscribed, skip processing
+
+        encode_full = None
+        if market_data.get("depth_update") == "diff":
+            # Only the changed levels: cache the merged book, and let the queues
+            # send it where this frame would replace or follow a lost one
+            book = self._merge_depth_diff(sub_key, broker_name, market_data)
+            full_frames: Dict[str, Optional[bytes]] = {}
+
+            def encode_full_book(label):
+                if label not in full_frames:
+                    full_frames[label] = None if book is None else self._encode_market_data(
+                        symbol, exchange, mode, book, label)
+                return full_frames[label]
+            encode_full = encode_full_book
+        else:
+            self.last_values[sub_key] = (broker_name, market_data)
+
+        # OPTIMIZATION 3: One encoded frame per broker label (not per client)
+        # In single-broker setups every client shares the same label, so the
+        # tick is serialized exactly once regardless of the fan-out size
+        encoded_frames: Dict[str, bytes] = {}
+        frames = 0
+
+        for client_id in tuple(client_ids):
+            # Verify client still exists
+            queue = self.client_queues.get(client_id)
+            if queue is None:
+                continue
+
+            # Verify user mapping exists
+            user_id = self.user_mapping.get(client_id)
+            if not user_id:
+                continue
+
+            # Check broker match (important for multi-broker setups)
+            client_broker = self.user_broker_mapping.get(user_id)
+            if broker_name != "unknown" and client_broker and client_broker != broker_name:
+                continue
+
+            broker_label = broker_name if broker_name != "unknown" else client_broker
+            payload = encoded_frames.get(broker_label)
+            if payload is None:
+                payload = self._encode_market_data(symbol, exchange, mode, market_data, broker_label)
+                encoded_frames[broker_label] = payload
+
+            # OPTIMIZATION 4: Conflating enqueue - newer tick replaces a pending one
+            frames += 1
+            full = functools.partial(encode_full, broker_label) if encode_full else None
+            if not queue.put(sub_key, payload, received_at, full):
+                self._check_slow_client(client_id, queue)
+
+        if received_at is not None:
+            self.metrics.record_fanout(frames, received_at)
+
+    def _merge_depth_diff(self, sub_key, broker_name, diff):
+        """
+        Apply a depth diff (changed levels tagged with 'level') to the cached book
+
+        Args:
+            sub_key: (symbol, exchange, mode)
+            broker_name: Broker name from the ZMQ topic
+            diff: Market data with depth_update 'diff'
+
+        Returns:
+            dict: The merged full book, now the cached last value, or None if no
+            full book is cached to apply the diff to
+        """
+        cached = self.last_values.get(sub_key)
+        if cached is None or cached[0] != broker_name:
+            return None
+        base = cached[1]
+
+        book = dict(diff)
+        book["depth"] = {}
+        for side in ("buy", "sell"):
+            levels = list(base.get("depth", {}).get(side, []))
+            for level in diff.get("depth", {}).get(side, []):
+                index = level.get("level")
+                if index is None:
+                    continue
+                while len(levels) <= index:
+                    levels.append({"price": 0, "quantity": 0, "orders": 0})
+                levels[index] = {k: v for k, v in level.items() if k != "level"}
+            book["depth"][side] = levels
+        book["depth_levels"] = max(len(book["depth"]["buy"]), len(book["depth"]["sell"]))
+        book["depth_update"] = "full"
+
+        self.last_values[sub_key] = (broker_name, book)
+        return book
+
+    @staticmethod
+    def _encode_market_data(symbol, exchange, mode, market_data, broker_label) -> bytes:
+        """
+        Serialize a market data frame to UTF-8 JSON bytes
+
+        Key order matches the frames clients have always received:
+        type, symbol, exchange, mode, data, broker.
+        """
+        return json.dumps({
+            "type": "market_data",
+            "symbol": symbol,
+            "exchange": exchange,
+            "mode": mode,
+            "data": market_data,
+            "broker": broker_label
+        }).encode('utf-8')
+
+    def start_client_writer(self, client_id, websocket):
+        """
+        Create the send queue and writer task for a newly connected client
+
+        Args:
+            client_id: ID of the client
+            websocket: The client's WebSocket connection
+        """
+        queue = ClientSendQueue()
+        self.client_queues[client_id] = queue
+        self.client_writers[client_id] = aio.create_task(
+            self._client_writer(client_id, websocket, queue)
+        )
+
+    def stop_workers(self):
+        """Terminate the worker processes started by this (primary) proxy"""
+        if self.worker_processes:
+            stop_proxy_workers(self.worker_processes)
+            self.worker_processes = []
+
+    def stop_client_writer(self, client_id):
+        """
+        Cancel a client's writer task and log its queue statistics
+
+        Args:
+            client_id: ID of the client
+        """
+        writer = self.client_writers.pop(client_id, None)
+        if writer and not writer.done():
+            writer.cancel()
+
+        queue = self.client_queues.pop(client_id, None)
+        if queue is not None:
+            queue.close()
+            self.metrics.retire_queue(queue.get_stats())
+            if queue.dropped or queue.conflated:
+                logger.info(f"Client {client_id} send queue stats: {queue.get_stats()}")
+
+    async def _client_writer(self, client_id, websocket, queue: ClientSendQueue):
+        """
+        Drain a client's send queue onto its WebSocket connection
+
+        Args:
+            client_id: ID of the client
+            websocket: The client's WebSocket connection
+            queue: The client's send queue
+        """
+        delivery_latency = self.metrics.delivery_latency
+        try:
+            while True:
+                _, payload, received_at = await queue.get()
+                # Pre-encoded JSON is sent as a text frame, exactly as json.dumps output was
+                await websocket.send(payload, text=True)
+                if received_at is not None:
+                    delivery_latency.observe(time.perf_counter() - received_at)
+        except aio.CancelledError:
+            pass
+        except websockets.exceptions.ConnectionClosed:
+            logger.info(f"Connection closed while sending market data to client {client_id}")
+        except Exception as e:
+            logger.error(f"Error in writer task for client {client_id}: {e}")
+
+    def _check_slow_client(self, client_id, queue: ClientSendQueue):
+        """
+        Disconnect a client whose send queue has stayed saturated too long
+
+        Args:
+            client_id: ID of the client
+            queue: The client's send queue
+        """
+        if self.slow_client_timeout <= 0:
+            return
+
+        saturated_for = queue.saturated_for()
+        if saturated_for < self.slow_client_timeout:
+            return
+
+        websocket = self.clients.get(client_id)
+        if websocket is None:
+            return
+
+        logger.warning(
+            f"Disconnecting slow client {client_id}: send queue saturated for "
+            f"{saturated_for:.1f}s, stats: {queue.get_stats()}"
+        )
+        # Stop queuing for this client right away; cleanup_client runs when the
+        # connection handler sees the close
+        self.stop_client_writer(client_id)
+        aio.create_task(websocket.close(code=1013, reason="Client too slow to consume market data"))
+
+    def get_client_queue_stats(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Get send queue statistics for every connected client
+
+        Returns:
+            Dict mapping client_id to queue statistics
+        """
+        return {client_id: queue.get_stats() for client_id, queue in self.client_queues.items()}
+
+    async def start_metrics_server(self):
+        """Serve /metrics on WEBSOCKET_METRICS_PORT + worker_id, if configured"""
+        port = get_metrics_port()
+        if not port:
+            return
+
+        self.metrics_server = MetricsServer(self.get_metrics, self.render_metrics)
+        try:
+            await self.metrics_server.start(get_metrics_host(), port + self.worker_id)
+        except OSError as e:
+            logger.warning(f"Could not start metrics endpoint on port {port + self.worker_id}: {e}")
+            self.metrics_server = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get a JSON-serializable snapshot of the proxy metrics
+
+        Returns:
+            Dict with tick counters and rates, latency summaries, queue totals
+            and per-client depths, and index sizes
+        """
+        metrics = self.metrics
+        rates = metrics.tick_rates()
+        ticks = [
+            {
+                'broker': broker_name,
+                'mode': MODE_NAMES.get(mode, str(mode)),
+                'total': total,
+                'per_second': round(rates.get((broker_name, mode), 0.0), 1)
+            }
+            for (broker_name, mode), total in list(metrics.ticks_received.items())
+        ]
+
+        totals = dict(metrics.retired_queue_totals)
+        for name in ('enqueued', 'throttled', 'conflated', 'dropped', 'sent'):
+            totals.setdefault(name, 0)
+        clients = []
+        for client_id, queue in list(self.client_queues.items()):
+            stats = queue.get_stats()
+            for name in totals:
+                totals[name] += stats[name]
+            clients.append({
+                'client_id': client_id,
+                'user': self.user_mapping.get(client_id, ''),
+                'subscriptions': len(self.subscriptions.get(client_id, ())),
+                **stats
+            })
+
+        return {
+            'worker_id': self.worker_id,
+            'uptime_seconds': round(time.time() - metrics.started_at, 1),
+            'ticks': ticks,
+            'ticks_filtered': dict(metrics.ticks_filtered),
+            'frames_fanned_out': metrics.frames_fanned_out,
+            'feed_reconnects': feed_reconnects.get_stats(),
+            'latency': {
+                'fanout': metrics.fanout_latency.get_stats(),
+                'delivery': metrics.delivery_latency.get_stats()
+            },
+            'queues': {'totals': totals, 'clients': clients},
+            'index': {
+                'clients': len(self.clients),
+                'subscription_keys': len(self.subscription_index),
+                'subscriptions': sum(len(ids) for ids in list(self.subscription_index.values())),
+                'zmq_topics': len(self.zmq_topic_refs),
+                'last_values': len(self.last_values),
+                'topic_cache': len(self.topic_cache)
+            }
+        }
+
+    def render_metrics(self) -> str:
+        """
+        Render the proxy metrics in Prometheus text exposition format
+
+        Returns:
+            str: Exposition text for /metrics
+        """
+        return render_prometheus(self.get_metrics(), {
+            'openalgo_ws_fanout_latency_seconds': (
+                "ZeroMQ receive to frame queued for every subscriber", self.metrics.fanout_latency),
+            'openalgo_ws_delivery_latency_seconds': (
+                "ZeroMQ receive to WebSocket send completed", self.metrics.delivery_latency),
+            'openalgo_ws_feed_reconnect_gap_seconds': (
+                "Broker feed close to subscriptions restored on a new connection", feed_reconnects.gaps),
+        })
 
 # Entry point for running the server standalone
 async def main():
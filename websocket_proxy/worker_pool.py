@@ -0,0 +1,400 @@
+"""
+Multi-core WebSocket Proxy Workers
+
+With WEBSOCKET_PROXY_WORKERS > 1 the proxy runs N processes that all listen on
+the same WEBSOCKET_HOST:WEBSOCKET_PORT using SO_REUSEPORT, so the kernel spreads
+incoming client connections across them:
+
+    primary (worker 0)  - the WebSocketProxy started by app.py / server.py. Owns
+                          the only set of broker adapters, so every tick is
+                          published to ZeroMQ exactly once. Serves clients too.
+    workers 1..N-1      - WebSocketProxy processes started by the primary via
+                          worker_pool.main() in a fresh interpreter. Each holds its
+                          own ZeroMQ SUB socket, subscription index and client send
+                          queues, and only forwards subscribe/unsubscribe requests
+                          to the primary over a ZeroMQ DEALER/ROUTER control channel.
+
+Workers are separate interpreters rather than multiprocessing children because
+app.py does its whole Flask setup at import time and would be re-run by the
+spawn start method.
+
+Configuration:
+    WEBSOCKET_PROXY_WORKERS: Total proxy processes including the primary (default: 1)
+    WEBSOCKET_CONTROL_PORT: Loopback port of the adapter control channel (default: 7555)
+    WEBSOCKET_CONTROL_TIMEOUT: Seconds a worker waits for a control reply (default: 30)
+"""
+
+import os
+import sys
+import json
+import socket
+import argparse
+import subprocess
+import asyncio as aio
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import zmq
+import zmq.asyncio
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_PROXY_WORKERS = 1
+DEFAULT_CONTROL_PORT = 7555
+DEFAULT_CONTROL_TIMEOUT = 30.0
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_proxy_workers() -> int:
+    """Get the number of proxy processes (including the primary) from config"""
+    workers = int(os.getenv('WEBSOCKET_PROXY_WORKERS', DEFAULT_PROXY_WORKERS))
+    if workers > 1 and not hasattr(socket, 'SO_REUSEPORT'):
+        logger.warning("WEBSOCKET_PROXY_WORKERS > 1 requires SO_REUSEPORT, running a single proxy process")
+        return 1
+    return max(1, workers)
+
+
+def get_control_address() -> str:
+    """Get the ZeroMQ address of the primary's adapter control channel"""
+    port = int(os.getenv('WEBSOCKET_CONTROL_PORT', DEFAULT_CONTROL_PORT))
+    return f"tcp://127.0.0.1:{port}"
+
+
+def get_control_timeout() -> float:
+    """Get seconds a worker waits for a control reply"""
+    return float(os.getenv('WEBSOCKET_CONTROL_TIMEOUT', DEFAULT_CONTROL_TIMEOUT))
+
+
+def _control_error(code: str, message: str) -> Dict[str, Any]:
+    """Build an error reply in the adapters' response format"""
+    return {'status': 'error', 'success': False, 'code': code, 'message': message, 'error': message}
+
+
+class AdapterControlServer:
+    """
+    Runs in the primary proxy and executes broker adapter calls on behalf of
+    the workers, so there is one adapter (and one upstream broker connection)
+    per user no matter how many proxy processes serve that user's clients.
+
+    Requests and replies are JSON objects over a ROUTER socket; a request's
+    "request_id" is echoed in its reply:
+        {"op": "acquire",     "user_id": ..., "broker": ...}
+        {"op": "subscribe",   "user_id": ..., "symbol": ..., "exchange": ..., "mode": ..., "depth_level": ...}
+        {"op": "unsubscribe", "user_id": ..., "symbol": ..., "exchange": ..., "mode": ...}
+        {"op": "subscribe_many",   "user_id": ..., "symbols": [...], "mode": ..., "depth_level": ...}
+        {"op": "unsubscribe_many", "user_id": ..., "symbols": [...], "mode": ...}
+        {"op": "release",     "user_id": ..., "worker_id": ...}
+    """
+
+    def __init__(self, proxy, address: str):
+        """
+        Initialize the control server.
+
+        Args:
+            proxy: The primary WebSocketProxy that owns the broker adapters
+            address: ZeroMQ address to bind
+        """
+        self.proxy = proxy
+        self.address = address
+        self.socket = proxy.context.socket(zmq.ROUTER)
+        self.socket.setsockopt(zmq.LINGER, 0)
+        self.socket.bind(address)
+
+        # user_id -> worker_ids currently using that user's adapter
+        self.remote_users: Dict[str, Set[int]] = defaultdict(set)
+
+    def has_remote_users(self, user_id: str) -> bool:
+        """Whether any worker still has clients of this user"""
+        return bool(self.remote_users.get(user_id))
+
+    async def serve(self):
+        """Answer worker requests until the proxy stops"""
+        logger.info(f"Adapter control channel listening on {self.address}")
+        while self.proxy.running:
+            try:
+                if not await self.socket.poll(500):
+                    continue
+                # Envelope: identity and empty delimiter
+                frames = await self.socket.recv_multipart()
+                envelope = frames[:-1]
+
+                request = {}
+                try:
+                    request = json.loads(frames[-1])
+                    reply = await self.handle_request(request)
+                except Exception as e:
+                    logger.exception(f"Error handling control request: {e}")
+                    reply = _control_error('CONTROL_ERROR', str(e))
+
+                reply = dict(reply, request_id=request.get('request_id'))
+                await self.socket.send_multipart(envelope + [json.dumps(reply).encode('utf-8')])
+            except zmq.ZMQError as e:
+                if not self.proxy.running:
+                    break
+                logger.error(f"Error in adapter control channel: {e}")
+                await aio.sleep(1)
+
+    async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute one control request against the primary's adapters.
+
+        Args:
+            request: Decoded request
+
+        Returns:
+            dict: Reply sent back to the worker
+        """
+        op = request.get('op')
+        user_id = request.get('user_id')
+        worker_id = request.get('worker_id')
+
+        if op == 'acquire':
+            adapter, code, message = await self.proxy.get_or_create_adapter(user_id, request.get('broker'))
+            if adapter is None:
+                return _control_error(code, message)
+            self.remote_users[user_id].add(worker_id)
+            return {'status': 'success', 'success': True}
+
+        if op == 'release':
+            workers = self.remote_users.get(user_id)
+            if workers is not None:
+                workers.discard(worker_id)
+                if not workers:
+                    del self.remote_users[user_id]
+            if not self.has_remote_users(user_id) and not self.proxy.has_local_clients(user_id):
+                await self.proxy.release_user_adapter(user_id)
+            return {'status': 'success', 'success': True}
+
+        adapter = self.proxy.broker_adapters.get(user_id)
+        if adapter is None:
+            return _control_error('BROKER_ERROR', 'Broker adapter not found')
+
+        if op == 'subscribe':
+            return adapter.subscribe(request['symbol'], request['exchange'],
+                                     request.get('mode', 2), request.get('depth_level', 5))
+        if op == 'unsubscribe':
+            return adapter.unsubscribe(request['symbol'], request['exchange'], request.get('mode', 2))
+        if op == 'subscribe_many':
+            return {'status': 'success', 'results': adapter.subscribe_many(
+                request['symbols'], request.get('mode', 2), request.get('depth_level', 5))}
+        if op == 'unsubscribe_many':
+            return {'status': 'success', 'results': adapter.unsubscribe_many(
+                request['symbols'], request.get('mode', 2))}
+
+        return _control_error('INVALID_ACTION', f"Unknown control operation: {op}")
+
+    def close(self):
+        """Close the control socket"""
+        try:
+            self.socket.close(linger=0)
+        except Exception as e:
+            logger.error(f"Error closing adapter control socket: {e}")
+
+
+class RemoteBrokerAdapter:
+    """
+    Stand-in for a broker adapter inside a worker process.
+
+    Exposes the subset of the adapter interface WebSocketProxy uses and forwards
+    each call to the primary's AdapterControlServer. Calls that reach the
+    primary are coroutines, so a worker keeps serving its clients while it
+    waits for a reply. Market data does not flow through here - the worker
+    receives ticks on its own ZeroMQ SUB socket.
+    """
+
+    def __init__(self, control_address: str, worker_id: int):
+        """
+        Initialize the remote adapter.
+
+        Args:
+            control_address: ZeroMQ address of the primary's control channel
+            worker_id: ID of the worker process using this adapter
+        """
+        self.control_address = control_address
+        self.worker_id = worker_id
+        self.broker_name = None
+        self.user_id = None
+        self.timeout = get_control_timeout()
+
+        self.context = zmq.asyncio.Context.instance()
+        self.socket = self._create_socket()
+        # One request in flight at a time; replies carry the request's id
+        self.lock = aio.Lock()
+        self.request_id = 0
+
+        # (symbol, exchange, mode) -> depth_level, released when the worker lets go
+        self.subscriptions: Dict[Tuple[str, str, int], int] = {}
+
+    def _create_socket(self):
+        sock = self.context.socket(zmq.DEALER)
+        sock.setsockopt(zmq.LINGER, 0)
+        sock.connect(self.control_address)
+        return sock
+
+    async def _request(self, op: str, **params) -> Dict[str, Any]:
+        """Send a control request and await the reply"""
+        async with self.lock:
+            self.request_id += 1
+            request = {'op': op, 'user_id': self.user_id, 'worker_id': self.worker_id,
+                       'request_id': self.request_id}
+            request.update(params)
+            loop = aio.get_running_loop()
+            deadline = loop.time() + self.timeout
+            try:
+                # Empty delimiter frame, as a REQ socket would send
+                await self.socket.send_multipart([b'', json.dumps(request).encode('utf-8')])
+                while True:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0 or not await self.socket.poll(remaining * 1000):
+                        logger.error(f"Worker {self.worker_id}: control request '{op}' timed out")
+                        return _control_error('CONTROL_TIMEOUT', f"Primary proxy did not answer '{op}' in time")
+                    reply = json.loads((await self.socket.recv_multipart())[-1])
+                    # Skip late replies to requests that timed out
+                    if reply.pop('request_id', None) == self.request_id:
+                        return reply
+            except zmq.ZMQError as e:
+                logger.error(f"Worker {self.worker_id}: control request '{op}' failed: {e}")
+                return _control_error('CONTROL_ERROR', str(e))
+
+    def initialize(self, broker_name: str, user_id: str, auth_data: Optional[Dict[str, str]] = None):
+        """Remember which user's adapter this stands in for"""
+        self.broker_name = broker_name
+        self.user_id = user_id
+        return {'success': True}
+
+    async def connect(self):
+        """Make sure the primary has a connected adapter for this user"""
+        return await self._request('acquire', broker=self.broker_name)
+
+    async def subscribe(self, symbol: str, exchange: str, mode: int = 2, depth_level: int = 5) -> Dict[str, Any]:
+        response = await self._request('subscribe', symbol=symbol, exchange=exchange,
+                                 mode=mode, depth_level=depth_level)
+        if response.get('status') == 'success':
+            self.subscriptions[(symbol, exchange, mode)] = depth_level
+        return response
+
+    async def unsubscribe(self, symbol: str, exchange: str, mode: int = 2) -> Dict[str, Any]:
+        self.subscriptions.pop((symbol, exchange, mode), None)
+        return await self._request('unsubscribe', symbol=symbol, exchange=exchange, mode=mode)
+
+    async def subscribe_many(self, symbols: List[Dict[str, str]], mode: int = 2, depth_level: int = 5) -> List[Dict[str, Any]]:
+        reply = await self._request('subscribe_many', symbols=symbols, mode=mode, depth_level=depth_level)
+        if 'results' not in reply:
+            return [dict(reply) for _ in symbols]
+        for item, response in zip(symbols, reply['results']):
+            if response.get('status') == 'success':
+                self.subscriptions[(item['symbol'], item['exchange'], mode)] = depth_level
+        return reply['results']
+
+    async def unsubscribe_many(self, symbols: List[Dict[str, str]], mode: int = 2) -> List[Dict[str, Any]]:
+        for item in symbols:
+            self.subscriptions.pop((item['symbol'], item['exchange'], mode), None)
+        reply = await self._request('unsubscribe_many', symbols=symbols, mode=mode)
+        if 'results' not in reply:
+            return [dict(reply) for _ in symbols]
+        return reply['results']
+
+    async def unsubscribe_all(self):
+        """Drop every subscription this worker made for the user"""
+        by_mode: Dict[int, List[Dict[str, str]]] = defaultdict(list)
+        for symbol, exchange, mode in self.subscriptions:
+            by_mode[mode].append({'symbol': symbol, 'exchange': exchange})
+        for mode, symbols in by_mode.items():
+            await self.unsubscribe_many(symbols, mode)
+
+    async def disconnect(self):
+        """Release this worker's use of the primary's adapter"""
+        await self.unsubscribe_all()
+        await self._request('release')
+        try:
+            self.socket.close(linger=0)
+        except Exception:
+            pass
+
+
+def spawn_proxy_workers(count: int, host: str, port: int) -> List[subprocess.Popen]:
+    """
+    Start worker processes 1..count-1 bound to the same host:port.
+
+    Args:
+        count: Total proxy processes including the calling primary
+        host: WebSocket host
+        port: WebSocket port
+
+    Returns:
+        List of worker processes
+    """
+    processes = []
+    for worker_id in range(1, count):
+        cmd = [
+            sys.executable, '-c', 'from websocket_proxy.worker_pool import main; main()',
+            '--worker-id', str(worker_id),
+            '--host', host,
+            '--port', str(port),
+            '--parent-pid', str(os.getpid()),
+        ]
+        try:
+            processes.append(subprocess.Popen(cmd, cwd=PROJECT_ROOT))
+        except Exception as e:
+            logger.error(f"Failed to start WebSocket proxy worker {worker_id}: {e}")
+    if processes:
+        logger.info(f"Started {len(processes)} WebSocket proxy worker(s) on {host}:{port}")
+    return processes
+
+
+def stop_proxy_workers(processes: List[subprocess.Popen], timeout: float = 5.0):
+    """Terminate worker processes, killing any that do not exit in time"""
+    for process in processes:
+        if process.poll() is None:
+            process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            logger.warning(f"WebSocket proxy worker pid {process.pid} did not exit, killing it")
+            process.kill()
+
+
+async def _run_worker(proxy, parent_pid: int):
+    """Serve until the proxy stops or the primary process goes away"""
+    async def watch_parent():
+        while proxy.running:
+            if os.getppid() != parent_pid:
+                logger.warning(f"Worker {proxy.worker_id}: primary proxy exited, shutting down")
+                # The primary's adapters are gone with it - nothing left to release
+                proxy.broker_adapters.clear()
+                proxy.running = False
+                break
+            await aio.sleep(1)
+
+    proxy.running = True
+    watcher = aio.create_task(watch_parent())
+    try:
+        await proxy.start()
+    finally:
+        watcher.cancel()
+        await proxy.stop()
+
+
+def main():
+    """Entry point of a worker process"""
+    parser = argparse.ArgumentParser(description="OpenAlgo WebSocket proxy worker")
+    parser.add_argument('--worker-id', type=int, required=True)
+    parser.add_argument('--host', required=True)
+    parser.add_argument('--port', type=int, required=True)
+    parser.add_argument('--parent-pid', type=int, required=True)
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    from websocket_proxy.server import WebSocketProxy
+
+    proxy = WebSocketProxy(host=args.host, port=args.port, worker_id=args.worker_id)
+    try:
+        aio.run(_run_worker(proxy, args.parent_pid))
+    except KeyboardInterrupt:
+        pass
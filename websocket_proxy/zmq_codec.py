@@ -0,0 +1,96 @@
+"""
+ZeroMQ Wire Codec for the internal broker adapter -> WebSocket proxy hop
+
+Broker adapters publish every tick as a two-frame ZeroMQ message
+``[topic, payload]``. The payload codec is selected on the publisher side and is
+self-describing, so the proxy can decode messages from any publisher without
+extra configuration:
+
+    json     - UTF-8 JSON object, always starts with b'{' (default, fallback)
+    msgpack  - MessagePack map, always starts with a map marker (0x80-0x8f, 0xde, 0xdf)
+
+Configuration:
+    ZMQ_CODEC: 'json' (default) or 'msgpack'. Requires the optional ``msgpack``
+               package (the ``msgpack`` extra: ``uv sync --extra msgpack``);
+               if it is not installed publishers fall back to JSON.
+"""
+
+import os
+import json
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+CODEC_JSON = 'json'
+CODEC_MSGPACK = 'msgpack'
+SUPPORTED_CODECS = (CODEC_JSON, CODEC_MSGPACK)
+
+# First byte of every JSON-encoded payload (market data is always a JSON object)
+_JSON_OBJECT_MARKER = 0x7B  # '{'
+
+
+def get_zmq_codec() -> str:
+    """
+    Get the codec publishers should use on the ZeroMQ hop.
+
+    Falls back to JSON if the configured codec is unknown or its
+    dependency is not installed.
+
+    Returns:
+        str: 'json' or 'msgpack'
+    """
+    codec = os.getenv('ZMQ_CODEC', CODEC_JSON).strip().lower()
+
+    if codec not in SUPPORTED_CODECS:
+        logger.warning(f"Unknown ZMQ_CODEC '{codec}', falling back to {CODEC_JSON}")
+        return CODEC_JSON
+
+    if codec == CODEC_MSGPACK and msgpack is None:
+        logger.warning("ZMQ_CODEC=msgpack but msgpack is not installed, falling back to json")
+        return CODEC_JSON
+
+    return codec
+
+
+def encode_market_data(data: dict, codec: str = CODEC_JSON) -> bytes:
+    """
+    Encode a market data dictionary for publishing on ZeroMQ.
+
+    Args:
+        data: Market data dictionary
+        codec: Codec name returned by get_zmq_codec()
+
+    Returns:
+        bytes: Encoded payload frame
+    """
+    if codec == CODEC_MSGPACK:
+        return msgpack.packb(data, use_bin_type=True)
+    return json.dumps(data).encode('utf-8')
+
+
+def decode_market_data(payload: bytes) -> dict:
+    """
+    Decode a ZeroMQ payload frame produced by encode_market_data().
+
+    The codec is detected from the first byte, so JSON and MessagePack
+    publishers can share the same socket.
+
+    Args:
+        payload: Raw payload frame
+
+    Returns:
+        dict: Market data dictionary
+
+    Raises:
+        ValueError: If the payload is MessagePack and msgpack is not installed
+    """
+    if payload[0] == _JSON_OBJECT_MARKER:
+        return json.loads(payload)
+    if msgpack is None:
+        raise ValueError("Received a msgpack payload but msgpack is not installed")
+    return msgpack.unpackb(payload, raw=False)